@@ -0,0 +1,316 @@
+"""
+资产并发采集 - 从一个或多个已注册的搜索引擎并发分页拉取资产
+每个引擎使用独立的令牌桶限速并统计配额用量，可重试的失败按指数退避重试；
+首页返回总数后其余页并发请求，结果按规范化目标边到达边合并去重
+"""
+import importlib
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Union
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from core.logger import get_logger
+from core.rate_governor import TokenBucket
+from core.search_cache import SearchCache, get_search_cache
+from core.search_engine_base import SearchEngineBase, SearchResult, get_all_engines
+from core.target_utils import normalize_target
+from i18n import tr
+
+logger = get_logger("asset_collector")
+
+# 并发请求的线程数上限（各引擎共用，单个引擎的请求速率仍受其令牌桶限制）
+DEFAULT_WORKERS = 8
+# 可重试失败（超时、网络错误、限流）的最大重试次数
+DEFAULT_RETRIES = 3
+# 指数退避：第 n 次重试前等待 BACKOFF_BASE * 2^n 秒（加随机抖动），不超过 BACKOFF_MAX
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# 内置引擎模块，导入时通过 register_engine 注册
+_ENGINE_MODULES = ('core.fofa_client', 'core.quake_client', 'core.hunter_client', 'core.shodan_client')
+
+
+def load_engines() -> Dict[str, type]:
+    """导入内置引擎模块并返回全部已注册的引擎类"""
+    for module in _ENGINE_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning(f"Failed to load search engine {module}: {e}")
+    return get_all_engines()
+
+
+def create_engines(configs: Dict[str, dict]) -> Dict[str, SearchEngineBase]:
+    """按 {引擎名: {'api_key': ..., 'api_url': ..., ...}} 创建引擎实例，跳过未注册或未配置 API Key 的引擎"""
+    registry = load_engines()
+    engines = {}
+    for name, config in (configs or {}).items():
+        engine_class = registry.get(name)
+        config = dict(config or {})
+        if engine_class is None or not config.get('api_key'):
+            continue
+        engines[name] = engine_class(config.pop('api_key'), config.pop('api_url', ''), **config)
+    return engines
+
+
+@dataclass
+class EngineStats:
+    """单个引擎的采集统计与配额用量"""
+    name: str
+    total: int = 0            # 引擎报告的结果总数
+    planned_pages: int = 1    # 计划请求的页数
+    pages: int = 0            # 成功获取的页数（含缓存命中）
+    results: int = 0          # 返回的结果条数
+    unique: int = 0           # 去重后新增的目标数
+    cached_pages: int = 0     # 由本地缓存返回的页数（pages - cached_pages 为消耗的 API 调用次数）
+    retries: int = 0
+    failed_pages: int = 0
+    exhausted: bool = False   # 配额不足或已达到本次上限
+    error: str = ""
+
+
+@dataclass
+class CollectedAsset:
+    """去重后的一条资产：规范化目标 + 最先返回它的引擎及原始结果"""
+    target: str
+    engine: str
+    result: SearchResult
+
+
+class AssetCollector:
+    """
+    多引擎并发分页采集
+    engines 为 {引擎名: 引擎实例}（或实例列表）；query 为所有引擎共用的语句，
+    各引擎语法不同时传 {引擎名: 语句}；max_results 为每个引擎本次最多消耗的结果条数（0 表示不限）；
+    use_cache 为 True 时优先从本地搜索缓存取页，refresh 为 True 时跳过缓存读取但仍写入最新结果
+    """
+
+    def __init__(self, engines: Union[Dict[str, SearchEngineBase], List[SearchEngineBase]],
+                 query: Union[str, Dict[str, str]], page_size: int = 100, max_results: int = 1000,
+                 workers: int = DEFAULT_WORKERS, rates: Dict[str, float] = None,
+                 retries: int = DEFAULT_RETRIES, stop_check: Callable[[], bool] = None,
+                 use_cache: bool = True, refresh: bool = False):
+        if not isinstance(engines, dict):
+            engines = {engine.name: engine for engine in engines}
+        self.engines = engines
+        self.queries = {name: query.get(name, '') if isinstance(query, dict) else query for name in engines}
+        self.max_results = max(0, int(max_results or 0))
+        self.page_sizes = {}
+        self._buckets = {}
+        for name, engine in engines.items():
+            size = max(1, int(page_size or 100))
+            if engine.max_page_size:
+                size = min(size, engine.max_page_size)
+            if self.max_results:
+                size = min(size, self.max_results)
+            self.page_sizes[name] = size
+            rate = (rates or {}).get(name, engine.rate_limit)
+            self._buckets[name] = TokenBucket(rate, 1)
+        self.workers = max(1, workers)
+        self.retries = max(0, retries)
+        self.stats = {name: EngineStats(name) for name in engines}
+        self._cache = self._open_cache() if use_cache else None
+        self._refresh = refresh
+        self._stop_check = stop_check
+        self._stopped = False
+        self._seen = set()
+
+    @staticmethod
+    def _open_cache() -> Optional[SearchCache]:
+        try:
+            return get_search_cache()
+        except Exception as e:
+            logger.warning(f"Search cache unavailable: {e}")
+            return None
+
+    def stop(self):
+        self._stopped = True
+
+    def is_stopped(self) -> bool:
+        return self._stopped or bool(self._stop_check and self._stop_check())
+
+    def progress(self):
+        """(已完成页数, 计划页数)"""
+        done = sum(s.pages + s.failed_pages for s in self.stats.values())
+        return done, max(done, sum(s.planned_pages for s in self.stats.values()))
+
+    def collect(self, on_batch: Callable[[List[CollectedAsset]], None] = None,
+                on_progress: Callable[[int, int], None] = None) -> List[CollectedAsset]:
+        """执行采集并返回去重后的资产；每页合并出新资产时回调 on_batch，每页完成时回调 on_progress"""
+        assets = []
+        pending = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="AssetCollect")
+        try:
+            # 先请求各引擎首页以获知总数，再按总数与上限一次性提交其余页
+            for name in self.engines:
+                pending[pool.submit(self._fetch, name, 1)] = (name, 1)
+
+            while pending:
+                done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                if self.is_stopped():
+                    break
+                for future in done:
+                    name, page = pending.pop(future)
+                    if future.cancelled():
+                        continue
+                    result, retries = future.result()
+                    stats = self.stats[name]
+                    stats.retries += retries
+                    if result.get('cached'):
+                        stats.cached_pages += 1
+
+                    if not result.get('success'):
+                        stats.failed_pages += 1
+                        stats.error = result.get('error') or tr("search.search_failed")
+                        logger.warning(f"{name} page {page} failed: {stats.error}")
+                        # 首页失败或配额不足时放弃该引擎的其余页
+                        if page == 1 or result.get('quota_exhausted'):
+                            stats.exhausted = stats.exhausted or bool(result.get('quota_exhausted'))
+                            self._cancel_engine(pending, name)
+                        continue
+
+                    items = result.get('results') or []
+                    size = self.page_sizes[name]
+                    # 短页只在引擎未报告总数时视为结果末尾：部分引擎（及第三方代理）服务端去重后会返回不满的中间页，
+                    # 报告了总数时计划的页数已按总数确定，照常取完
+                    last_page = len(items) < size and result.get('total') is None
+                    if last_page:
+                        self._cancel_engine(pending, name, after_page=page)
+                    if self.max_results:
+                        # 按结果位置截断（第 page 页之前已有 (page - 1) * size 条），与各页完成的先后无关
+                        items = items[:max(0, self.max_results - (page - 1) * size)]
+                    stats.pages += 1
+                    stats.results += len(items)
+                    if self.max_results and stats.results >= self.max_results:
+                        stats.exhausted = True
+                    if page == 1 and not last_page:
+                        self._plan_pages(pool, pending, name, result.get('total'))
+
+                    batch = self._merge(name, items)
+                    assets.extend(batch)
+
+                    if batch and on_batch:
+                        on_batch(batch)
+                    if on_progress:
+                        on_progress(*self.progress())
+        finally:
+            for future in pending:
+                future.cancel()
+            # 已在进行中的请求由超时结束，结果丢弃，不阻塞调用方
+            pool.shutdown(wait=False)
+        return assets
+
+    def _plan_pages(self, pool, pending, name, total):
+        stats = self.stats[name]
+        size = self.page_sizes[name]
+        limit = math.ceil(self.max_results / size) if self.max_results else 0
+        if total is None:
+            # 引擎未报告总数时按上限计划页数，遇到短页后取消剩余页
+            pages = limit or 1
+        else:
+            stats.total = int(total or 0)
+            pages = math.ceil(stats.total / size)
+            if limit:
+                pages = min(pages, limit)
+        stats.planned_pages = max(1, pages)
+        for page in range(2, stats.planned_pages + 1):
+            pending[pool.submit(self._fetch, name, page)] = (name, page)
+
+    def _cancel_engine(self, pending, name, after_page: int = 0):
+        """取消该引擎尚未开始的请求（after_page 大于 0 时只取消其后的页）"""
+        for future, (engine_name, page) in list(pending.items()):
+            if engine_name == name and page > after_page and future.cancel():
+                del pending[future]
+                self.stats[name].planned_pages -= 1
+
+    def _merge(self, name, items) -> List[CollectedAsset]:
+        batch = []
+        for item in items:
+            target = normalize_target(item.get_target_url())
+            if not target or target in self._seen:
+                continue
+            self._seen.add(target)
+            batch.append(CollectedAsset(target, name, item))
+        self.stats[name].unique += len(batch)
+        return batch
+
+    def _fetch(self, name, page):
+        """在工作线程中请求一页（优先取本地缓存），返回 (结果, 重试次数)"""
+        engine = self.engines[name]
+        query, size = self.queries[name], self.page_sizes[name]
+        if self._cache is not None and not self._refresh:
+            cached = self._cache.get(name, query, page, size, engine.result_fields)
+            if cached is not None:
+                return cached, 0
+
+        bucket = self._buckets[name]
+        for attempt in range(self.retries + 1):
+            if not bucket.acquire(self.is_stopped):
+                return {'success': False, 'error': tr("search.collect_stopped")}, attempt
+            try:
+                result = engine.search(query, page, size)
+            except Exception as e:
+                # 引擎内部未处理的网络异常（requests 异常均为 OSError 子类）视为可重试
+                result = {'success': False, 'error': tr("search.search_error", error=str(e)),
+                          'retryable': isinstance(e, OSError)}
+            if result.get('success'):
+                if self._cache is not None:
+                    self._cache.put(name, query, page, size, result, engine.result_fields)
+                return result, attempt
+            if not result.get('retryable') or attempt == self.retries:
+                return result, attempt
+
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+            logger.debug(f"{name} page {page} retry in {delay:.1f}s: {result.get('error')}")
+            deadline = time.monotonic() + delay
+            while time.monotonic() < deadline:
+                if self.is_stopped():
+                    return result, attempt
+                time.sleep(min(0.2, deadline - time.monotonic()))
+        return result, self.retries
+
+
+class AssetCollectThread(QThread):
+    """后台执行多引擎资产采集"""
+
+    batch_signal = pyqtSignal(list)         # 新合并的一批 CollectedAsset
+    progress_signal = pyqtSignal(int, int)  # 已完成页数, 计划页数
+    result_signal = pyqtSignal(dict)        # {'success', 'results': [CollectedAsset], 'stats': {引擎名: dict}}
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, engines, query, page_size: int = 100, max_results: int = 1000,
+                 workers: int = DEFAULT_WORKERS, rates: Dict[str, float] = None):
+        super().__init__()
+        self.collector = AssetCollector(engines, query, page_size, max_results, workers, rates,
+                                        stop_check=self.isInterruptionRequested)
+
+    def run(self):
+        try:
+            assets = self.collector.collect(self.batch_signal.emit, self.progress_signal.emit)
+        except Exception as e:
+            self.error_signal.emit(tr("search.search_error", error=str(e)))
+            return
+        errors = collection_error(self.collector)
+        if not assets and errors:
+            self.error_signal.emit(errors)
+            return
+        self.result_signal.emit({
+            'success': True,
+            'results': assets,
+            'stats': {name: asdict(stats) for name, stats in self.collector.stats.items()},
+        })
+
+    def stop(self):
+        self.requestInterruption()
+        self.collector.stop()
+
+
+def collection_error(collector: AssetCollector) -> Optional[str]:
+    """汇总各引擎的失败信息（没有失败时返回 None）"""
+    errors = [f"{name}: {stats.error}" if len(collector.stats) > 1 else stats.error
+              for name, stats in collector.stats.items() if stats.error]
+    return "\n".join(errors) or None
@@ -0,0 +1,199 @@
+"""
+资产到扫描的流式流水线 - 搜索引擎边采集边扫描
+采集到的资产经规范化去重（AssetCollector）与存活探测后按块送入任务队列：
+尚未启动的流水线任务直接追加目标，已启动或已满时新建任务，由任务队列按序自动启动。
+nuclei 启动后目标列表即固定，因此运行中的任务不再追加目标。
+"""
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from core.asset_collector import AssetCollector, collection_error
+from core.logger import get_logger
+from core.target_utils import dedupe_targets
+from i18n import tr
+
+logger = get_logger("asset_pipeline")
+
+# 存活探测并发数与单次连接超时（秒）
+PROBE_WORKERS = 32
+PROBE_TIMEOUT = 3.0
+# 缓冲的存活目标达到该数量，或距上次送出超过 FLUSH_INTERVAL 秒时送出一块
+CHUNK_SIZE = 200
+FLUSH_INTERVAL = 3.0
+# 单个流水线任务的目标数上限，超出后新建任务
+MAX_TASK_TARGETS = 1000
+# 进度信号的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def probe_alive(target: str, timeout: float = PROBE_TIMEOUT) -> bool:
+    """TCP 连接探测目标端口是否开放"""
+    try:
+        parts = urlsplit(target if '://' in target else f"http://{target}")
+        host = parts.hostname
+        port = parts.port or _DEFAULT_PORTS.get(parts.scheme.lower(), 80)
+    except ValueError:
+        return False
+    if not host:
+        return False
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+class AssetPipelineThread(QThread):
+    """后台采集资产、探测存活，并按块发出可扫描的目标"""
+
+    chunk_ready = pyqtSignal(list)       # 一块存活目标（已规范化去重）
+    progress_signal = pyqtSignal(dict)   # {'collected', 'probed', 'alive', 'sent', 'pages', 'planned_pages'}
+    result_signal = pyqtSignal(dict)     # {'results': [CollectedAsset], 'stats': {...}}
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, engines, query, page_size: int = 100, max_results: int = 1000,
+                 check_alive: bool = True, chunk_size: int = CHUNK_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL, probe_timeout: float = PROBE_TIMEOUT):
+        super().__init__()
+        self.collector = AssetCollector(engines, query, page_size, max_results,
+                                        stop_check=self.isInterruptionRequested)
+        self.check_alive = check_alive
+        self.chunk_size = max(1, chunk_size)
+        self.flush_interval = flush_interval
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = 0.0
+        self._last_progress = 0.0
+        self._counts = {'collected': 0, 'probed': 0, 'alive': 0, 'sent': 0}
+        self._probe_pool = None
+
+    def run(self):
+        self._last_flush = time.monotonic()
+        if self.check_alive:
+            self._probe_pool = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="AssetProbe")
+        try:
+            assets = self.collector.collect(self._on_batch, lambda done, total: self._flush())
+            if self._probe_pool is not None:
+                # 采集结束后等待剩余探测完成，期间仍按时间间隔送出
+                self._probe_pool.shutdown(wait=True)
+            self._flush(force=True)
+        except Exception as e:
+            logger.error(f"Asset pipeline failed: {e}")
+            self.error_signal.emit(tr("search.search_error", error=str(e)))
+            return
+        finally:
+            if self._probe_pool is not None:
+                self._probe_pool.shutdown(wait=False)
+
+        error = collection_error(self.collector)
+        if not assets and error:
+            self.error_signal.emit(error)
+            return
+        self.result_signal.emit({
+            'results': assets,
+            'stats': dict(self._counts, engines={name: asdict(s) for name, s in self.collector.stats.items()}),
+        })
+
+    def stop(self):
+        self.requestInterruption()
+        self.collector.stop()
+
+    def _on_batch(self, batch):
+        with self._lock:
+            self._counts['collected'] += len(batch)
+        if self._probe_pool is None:
+            with self._lock:
+                self._buffer.extend(asset.target for asset in batch)
+            self._flush()
+            return
+        for asset in batch:
+            future = self._probe_pool.submit(self._probe, asset.target)
+            future.add_done_callback(self._on_probed)
+
+    def _probe(self, target):
+        if self.isInterruptionRequested():
+            return target, False
+        return target, probe_alive(target, self.probe_timeout)
+
+    def _on_probed(self, future):
+        if future.cancelled():
+            return
+        target, alive = future.result()
+        with self._lock:
+            self._counts['probed'] += 1
+            if alive:
+                self._counts['alive'] += 1
+                self._buffer.append(target)
+        self._flush()
+
+    def _flush(self, force: bool = False):
+        """缓冲满一块或超过送出间隔时发出目标（首块在几秒内送出，尽早开始扫描）"""
+        with self._lock:
+            now = time.monotonic()
+            due = len(self._buffer) >= self.chunk_size or force or (
+                self._buffer and now - self._last_flush >= self.flush_interval)
+            chunk = []
+            if due and self._buffer and not self.isInterruptionRequested():
+                chunk = self._buffer[:self.chunk_size] if not force else self._buffer
+                self._buffer = self._buffer[len(chunk):]
+                self._last_flush = now
+                self._counts['sent'] += len(chunk)
+            if not (chunk or force) and now - self._last_progress < PROGRESS_INTERVAL:
+                return
+            self._last_progress = now
+            counts = dict(self._counts)
+        if chunk:
+            self.chunk_ready.emit(chunk)
+        counts['pages'], counts['planned_pages'] = self.collector.progress()
+        self.progress_signal.emit(counts)
+
+
+class ScanTaskFeeder:
+    """
+    在主线程中把流水线送出的目标块写入任务队列
+    最后一个流水线任务尚未启动且未满时追加目标，否则新建自动启动的任务
+    """
+
+    def __init__(self, queue, name: str, templates: List[str], max_task_targets: int = MAX_TASK_TARGETS,
+                 custom_args: Dict = None):
+        self.queue = queue
+        self.name = name
+        self.templates = list(templates)
+        self.max_task_targets = max_task_targets
+        self.custom_args = custom_args or {}
+        self.task_ids = []
+
+    def feed(self, targets: List[str]) -> str:
+        """送入一块目标，返回接收它的任务 ID"""
+        targets = dedupe_targets(targets)
+        if not targets:
+            return ""
+        if self.task_ids:
+            task = self.queue.get_task(self.task_ids[-1])
+            if (task is not None and len(task.targets) + len(targets) <= self.max_task_targets
+                    and self.queue.append_targets(task.id, targets)):
+                return task.id
+
+        task_id = self.queue.add_task(
+            name=tr("task.pipeline_task_name", name=self.name, index=len(self.task_ids) + 1),
+            targets=targets,
+            templates=self.templates,
+            custom_args=self.custom_args,
+            tags=['pipeline'],
+            auto_start=True,
+        )
+        self.task_ids.append(task_id)
+        return task_id
+
+    def owns(self, task_id: str) -> bool:
+        return task_id in self.task_ids
@@ -0,0 +1,298 @@
+"""
+SQLite 访问层 - 单写线程 + 只读连接池
+所有写操作提交到每个数据库唯一的写线程，排队后合并为一个事务提交（组提交），
+写任务应只包含数据库操作，失败重试时可能被再次执行；
+读操作从只读连接池取连接，WAL 模式下与写线程互不阻塞。
+表结构迁移统一通过 Database.migrate 按 PRAGMA user_version 顺序执行。
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+from core.logger import get_logger
+
+logger = get_logger("db")
+
+# 写线程一次组提交最多合并的任务数
+MAX_GROUP_SIZE = 256
+# 空闲只读连接的保留上限
+READ_POOL_SIZE = 4
+
+_WRITER_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA wal_autocheckpoint=1000",
+)
+_READER_PRAGMAS = (
+    "PRAGMA query_only=1",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=67108864",
+)
+
+_STOP = object()
+
+
+def add_column(conn: sqlite3.Connection, table: str, column: str, ddl: str) -> bool:
+    """列不存在时 ALTER TABLE 添加，返回是否新增"""
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if column in columns:
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+    return True
+
+
+class _WriteJob:
+    __slots__ = ("fn", "future", "transactional")
+
+    def __init__(self, fn, transactional=True):
+        self.fn = fn
+        self.future = Future()
+        self.transactional = transactional
+
+
+class Database:
+    """单个 SQLite 文件的共享访问对象（通过 get_database 获取）"""
+
+    def __init__(self, path: str, timeout: float = 30):
+        self.path = str(path)
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._readers = queue.LifoQueue()
+        self._closed = False
+        self._writer_conn = None
+        self._open_error = None
+        self._ready = threading.Event()
+        self._writer = threading.Thread(target=self._run, name=f"DBWriter-{Path(self.path).name}", daemon=True)
+        self._writer.start()
+        self._ready.wait()
+        if self._open_error is not None:
+            raise self._open_error
+
+    # ---------- 写 ----------
+
+    def transaction(self, fn: Callable[[sqlite3.Connection], object], wait: bool = True):
+        """在写线程的事务中执行 fn(conn)；wait=True 时等待提交完成并返回 fn 的结果"""
+        if threading.current_thread() is self._writer:
+            # 写任务内部再次写入时直接在当前事务中执行，避免自锁
+            return fn(self._writer_conn)
+        if self._closed:
+            raise sqlite3.ProgrammingError(f"Database is closed: {self.path}")
+        job = _WriteJob(fn)
+        self._queue.put(job)
+        return job.future.result() if wait else job.future
+
+    def execute(self, sql: str, params: Sequence = (), wait: bool = True):
+        """执行单条写语句，返回 lastrowid"""
+        return self.transaction(lambda conn: conn.execute(sql, params).lastrowid, wait=wait)
+
+    def executemany(self, sql: str, rows, wait: bool = True):
+        """批量执行写语句，返回影响行数"""
+        return self.transaction(lambda conn: conn.executemany(sql, rows).rowcount, wait=wait)
+
+    def vacuum(self):
+        """VACUUM 不能在事务内执行，单独交给写线程"""
+        job = _WriteJob(lambda conn: conn.execute("VACUUM"), transactional=False)
+        self._queue.put(job)
+        job.future.result()
+
+    def migrate(self, migrations: List[Callable[[sqlite3.Connection], None]]):
+        """按 PRAGMA user_version 依次执行尚未应用的迁移（每一步都应幂等，兼容无版本号的旧库）"""
+        def _apply(conn):
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for index in range(version, len(migrations)):
+                migrations[index](conn)
+                conn.execute(f"PRAGMA user_version = {index + 1}")
+            return version
+        previous = self.transaction(_apply)
+        if previous < len(migrations):
+            logger.info(f"Migrated {Path(self.path).name}: v{previous} -> v{len(migrations)}")
+
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            for pragma in _WRITER_PRAGMAS:
+                conn.execute(pragma)
+            self._writer_conn = conn
+        except sqlite3.Error as e:
+            self._open_error = e
+            self._closed = True
+            return
+        finally:
+            self._ready.set()
+
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is _STOP:
+                break
+            group = [job]
+            while len(group) < MAX_GROUP_SIZE:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    stopping = True
+                    break
+                group.append(job)
+            self._run_group(conn, group)
+        conn.close()
+
+    def _run_group(self, conn, group):
+        pending = []
+        for job in group:
+            if job.transactional:
+                pending.append(job)
+                continue
+            self._commit(conn, pending)
+            pending = []
+            try:
+                job.future.set_result(job.fn(conn))
+            except Exception as e:
+                job.future.set_exception(e)
+        self._commit(conn, pending)
+
+    def _commit(self, conn, jobs):
+        """
+        一组任务共用一个事务提交；正常路径不使用 SAVEPOINT（子日志会让大表上的批量写入随表增长明显变慢）
+
+        某个任务失败时整组回滚：失败的任务直接返回异常、不再执行，
+        其余任务交给 _commit_isolated 在一个带 SAVEPOINT 的事务中重新提交。
+        失败任务之前的任务会因此再执行一次（第一次的写入已回滚），任务函数应只通过 conn 产生效果。
+        """
+        if not jobs:
+            return
+        results = []
+        running = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for running, job in enumerate(jobs):
+                results.append(job.fn(conn))
+            running = None
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            if running is None:
+                # BEGIN / COMMIT 本身失败（数据库锁定、磁盘已满等），与具体任务无关
+                for job in jobs:
+                    job.future.set_exception(e)
+                return
+            jobs[running].future.set_exception(e)
+            self._commit_isolated(conn, jobs[:running] + jobs[running + 1:])
+            return
+
+        for job, result in zip(jobs, results):
+            job.future.set_result(result)
+
+    def _commit_isolated(self, conn, jobs):
+        """重试路径：每个任务一个 SAVEPOINT，失败只回滚该任务自身的写入，其余任务照常提交"""
+        if not jobs:
+            return
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job in jobs:
+                conn.execute("SAVEPOINT job")
+                try:
+                    outcomes.append((True, job.fn(conn)))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    outcomes.append((False, e))
+                conn.execute("RELEASE job")
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for job in jobs:
+                job.future.set_exception(e)
+            return
+
+        for job, (ok, value) in zip(jobs, outcomes):
+            if ok:
+                job.future.set_result(value)
+            else:
+                job.future.set_exception(value)
+
+    # ---------- 读 ----------
+
+    def _open_reader(self):
+        uri = Path(self.path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in _READER_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """从只读连接池借出一个连接"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._open_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed or self._readers.qsize() >= READ_POOL_SIZE:
+                conn.close()
+            else:
+                self._readers.put(conn)
+
+    def query(self, sql: str, params: Sequence = ()) -> List[Dict]:
+        with self.reader() as conn:
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    def query_one(self, sql: str, params: Sequence = ()):
+        with self.reader() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    # ---------- 关闭 ----------
+
+    def close(self):
+        """等待队列中的写任务提交后关闭所有连接"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join(self.timeout)
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_databases: Dict[str, Database] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(path) -> Database:
+    """按文件路径获取共享的 Database（同一文件全进程只有一个写线程）"""
+    key = str(Path(path).resolve())
+    with _databases_lock:
+        db = _databases.get(key)
+        if db is None or db._closed:
+            db = _databases[key] = Database(key)
+        return db
+
+
+@atexit.register
+def close_all():
+    with _databases_lock:
+        databases = list(_databases.values())
+        _databases.clear()
+    for db in databases:
+        db.close()
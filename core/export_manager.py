@@ -1,14 +1,20 @@
 """
 扫描结果导出管理器
-支持导出为 CSV 表格和 HTML 报告格式
+支持导出为 CSV 表格、HTML 报告，以及 JSONL.gz / Parquet / SQLite 等机器可读格式
 """
+import base64
 import csv
+import gzip
 import json
 import os
+import shutil
+import tempfile
 from datetime import datetime
+from html import escape
 
 from i18n import tr, get_current_language
-from core.paths import external_path, resource_path
+from core.paths import resource_path
+from core.request_chain import RequestChainRenderer
 
 
 def _export_labels():
@@ -41,7 +47,7 @@ def _export_labels():
             'poc_chain_header': '✅ Full POC Request Chain - Actual Sent Content ({count} steps)',
             'copy': '📋 Copy',
             'copied': '✅ Copied',
-            'copy_failed_base64': 'Copy failed: Base64 decode error',
+            'detail_unavailable': 'Details could not be loaded. Please open this report in an up-to-date browser.',
             'trigger_request': 'Vulnerability Trigger Request',
             'nuclei_record': 'Nuclei Record',
             'trigger_request_note': 'Note: Nuclei usually records only the final request that triggered verification. See the full test chain above.',
@@ -63,6 +69,9 @@ def _export_labels():
             'field_target': 'Target URL',
             'field_poc_path': 'POC Path',
             'field_found_time': 'Found Time',
+            'change': 'Change',
+            'delta': {'new': 'New', 'recurring': 'Recurring', 'resolved': 'Resolved'},
+            'delta_title': 'Changes since previous scan',
         }
 
     return {
@@ -92,7 +101,7 @@ def _export_labels():
         'poc_chain_header': '✅ POC 完整请求链 - 实际发送内容 (共{count}个步骤)',
         'copy': '📋 复制',
         'copied': '✅ 已复制',
-        'copy_failed_base64': '复制失败：Base64解码错误',
+        'detail_unavailable': '无法加载详情，请使用较新版本的浏览器打开此报告',
         'trigger_request': '触发漏洞的请求',
         'nuclei_record': 'Nuclei 记录',
         'trigger_request_note': '注: Nuclei 通常仅记录触发验证的最后一步请求，完整测试链请见上方',
@@ -114,6 +123,9 @@ def _export_labels():
         'field_target': '目标地址',
         'field_poc_path': 'POC 路径',
         'field_found_time': '发现时间',
+        'change': '变化',
+        'delta': {'new': '新增', 'recurring': '重复', 'resolved': '已修复'},
+        'delta_title': '相对上次扫描的变化',
     }
 
 
@@ -127,225 +139,156 @@ def _load_chart_js():
         return ""
 
 
-def _build_poc_cache():
-    """构建 POC template_id -> 文件路径 的缓存，避免重复搜索"""
-    cache = {}
+# 逐块并行渲染时每块的行数
+CSV_CHUNK_SIZE = 500
+# 超过该条数时建议启用多进程渲染
+PARALLEL_EXPORT_THRESHOLD = 20000
+
+
+def request_chain_renderer() -> RequestChainRenderer:
+    """使用当前语言占位说明的请求链渲染器（导出与扫描详情共用）"""
+    return RequestChainRenderer(_export_labels())
+
+
+def _csv_row(idx: int, v: dict, labels: dict, delta: bool, renderer: RequestChainRenderer) -> list:
+    """渲染单条漏洞的 CSV 行"""
+    # 解析 raw_json 获取请求信息
+    raw_data = {}
     try:
-        from pathlib import Path
-        import yaml
-        poc_library = external_path("poc_library")
-        if poc_library.exists():
-            for yaml_file in poc_library.rglob("*.yaml"):
-                try:
-                    with open(yaml_file, 'r', encoding='utf-8') as pf:
-                        content = yaml.safe_load(pf)
-                        if content and content.get('id'):
-                            cache[content['id']] = str(yaml_file)
-                except Exception:
-                    continue
+        if v.get('raw_json'):
+            raw_data = json.loads(v['raw_json'])
     except Exception:
         pass
-    return cache
+
+    # 提取请求方法和请求体
+    method = "GET"
+    body = ""
+    full_request = ""
+    if raw_data:
+        if raw_data.get('request'):
+            full_request = raw_data['request']
+            first_line = full_request.split('\r\n')[0] if '\r\n' in full_request else full_request.split('\n')[0]
+            if first_line:
+                parts = first_line.split(' ')
+                if parts:
+                    method = parts[0]
+            if '\r\n\r\n' in full_request:
+                body = full_request.split('\r\n\r\n', 1)[1]
+            elif '\n\n' in full_request:
+                body = full_request.split('\n\n', 1)[1]
+        else:
+            method = raw_data.get('request_method', 'GET')
+            body = raw_data.get('request_body', '')
+
+    # === 从 POC 模板还原完整请求链 ===
+    poc_requests_text = ""
+    poc_path = v.get('template_path') or (raw_data.get('template-path') if raw_data else None)
+    try:
+        steps = renderer.render(poc_path, v.get('template_id', ''), v.get('matched_at', ''),
+                                full_request, raw_data.get('response', ''))
+    except Exception:
+        steps = ()
+    if len(steps) > 1:
+        poc_requests_text = " | ".join(
+            f"[{labels['step_format'].format(step=num)}] {step.content}" for num, step in enumerate(steps, 1)
+        )
+
+    return [
+        idx,
+        v.get('severity', 'unknown'),
+        v.get('template_id', ''),
+        v.get('matched_at', ''),
+        v.get('template_path', ''),
+        method,
+        (body or '').replace('\n', ' ').replace('\r', ''),  # 清理换行符
+        poc_requests_text.replace('\n', ' ').replace('\r', '')[:500],  # 限制长度
+        v.get('timestamp', '')
+    ] + ([labels['delta'].get(v.get('delta'), '')] if delta else [])
+
+
+def _iter_csv_rows(vulns, labels: dict, delta: bool, renderer: RequestChainRenderer = None, start: int = 1):
+    """逐条生成 CSV 行（vulns 可以是任意可迭代对象，如数据库游标生成器）"""
+    renderer = renderer or RequestChainRenderer(labels)
+    for idx, v in enumerate(vulns, start):
+        yield _csv_row(idx, v, labels, delta, renderer)
+
+
+# 多进程渲染：每个工作进程持有自己的请求链渲染器与缓存
+_worker_renderer = None
+
+
+def _init_csv_worker(labels: dict):
+    global _worker_renderer
+    _worker_renderer = RequestChainRenderer(labels)
+
+
+def _render_csv_chunk(start: int, chunk: list, labels: dict, delta: bool) -> list:
+    return list(_iter_csv_rows(chunk, labels, delta, _worker_renderer, start))
+
+
+def _iter_csv_rows_parallel(vulns, labels: dict, delta: bool, workers: int):
+    """
+    按块提交给进程池渲染，按提交顺序输出；同时在途的块数有上限，内存占用与总条数无关
+    工作进程以 spawn 方式启动：GUI 进程中有数据库写线程、采样线程和 Qt 线程，fork 会把它们持有的锁复制进子进程
+    """
+    import multiprocessing
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import islice
+
+    iterator = iter(vulns)
+    pending = deque()
+    start = 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_csv_worker, initargs=(labels,)) as pool:
+        while True:
+            chunk = list(islice(iterator, CSV_CHUNK_SIZE))
+            if chunk:
+                pending.append(pool.submit(_render_csv_chunk, start, chunk, labels, delta))
+                start += len(chunk)
+            if pending and (not chunk or len(pending) >= workers * 2):
+                yield from pending.popleft().result()
+            if not chunk and not pending:
+                break
+
+
+def default_export_workers(row_count: int) -> int:
+    """按导出条数给出建议的渲染进程数（0 表示在当前进程内逐行渲染）"""
+    if row_count < PARALLEL_EXPORT_THRESHOLD:
+        return 0
+    return max(0, min(4, (os.cpu_count() or 1) - 1))
 
 
-def export_to_csv(scan_record: dict, vulns: list, file_path: str) -> bool:
+def export_to_csv(scan_record: dict, vulns, file_path: str, delta: bool = False, workers: int = 0) -> bool:
     """
-    将扫描结果导出为 CSV 格式
+    将扫描结果导出为 CSV 格式（流式：逐行渲染、逐行写入，不整体载入结果）
     
     参数:
         scan_record: 扫描记录字典
-        vulns: 漏洞结果列表
+        vulns: 漏洞结果（列表或 ScanHistory.iter_scan_vulns 等生成器）
         file_path: 导出文件路径
+        delta: 差异模式，末尾增加“变化”列（new / resolved）
+        workers: 大于 0 时使用多进程按块并行渲染
         
     返回:
         是否导出成功
     """
     try:
         labels = _export_labels()
-        # 构建 POC 缓存避免重复搜索
-        poc_cache = _build_poc_cache()
+        if workers and workers > 0:
+            rows = _iter_csv_rows_parallel(vulns, labels, delta, workers)
+        else:
+            rows = _iter_csv_rows(vulns, labels, delta)
 
         with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
             writer = csv.writer(f)
 
             # 写入表头
-            writer.writerow(labels['csv_headers'])
+            writer.writerow(labels['csv_headers'] + ([labels['change']] if delta else []))
 
             # 写入漏洞数据
-            for idx, v in enumerate(vulns, 1):
-                # 解析 raw_json 获取请求信息
-                raw_data = {}
-                try:
-                    if v.get('raw_json'):
-                        raw_data = json.loads(v['raw_json'])
-                except:
-                    pass
-                
-                # 提取请求方法和请求体
-                method = "GET"
-                body = ""
-                if raw_data:
-                    if raw_data.get('request'):
-                        full_request = raw_data['request']
-                        first_line = full_request.split('\r\n')[0] if '\r\n' in full_request else full_request.split('\n')[0]
-                        if first_line:
-                            parts = first_line.split(' ')
-                            if parts:
-                                method = parts[0]
-                        if '\r\n\r\n' in full_request:
-                            body = full_request.split('\r\n\r\n', 1)[1] if len(full_request.split('\r\n\r\n')) > 1 else ""
-                        elif '\n\n' in full_request:
-                            body = full_request.split('\n\n', 1)[1] if len(full_request.split('\n\n')) > 1 else ""
-                    else:
-                        method = raw_data.get('request_method', 'GET')
-                        body = raw_data.get('request_body', '')
-                
-                # === 从 POC 文件解析完整请求链 ===
-                poc_requests_text = ""
-                poc_path = v.get('template_path') or (raw_data.get('template-path') if raw_data else None)
-                matched_url = v.get('matched_at', '')
-                
-                # 提取实际的 Hostname
-                actual_hostname = ""
-                actual_base_url = ""
-                if matched_url:
-                    try:
-                        from urllib.parse import urlparse
-                        parsed = urlparse(matched_url)
-                        if parsed.port and parsed.port not in [80, 443]:
-                            actual_hostname = f"{parsed.hostname}:{parsed.port}"
-                        else:
-                            actual_hostname = parsed.hostname or ""
-                        actual_base_url = f"{parsed.scheme}://{actual_hostname}"
-                    except:
-                        pass
-                
-                # 如果路径不存在，尝试从缓存查找
-                if poc_path and not os.path.exists(poc_path):
-                    template_id = v.get('template_id', '')
-                    if template_id and template_id in poc_cache:
-                        poc_path = poc_cache[template_id]
-
-                if poc_path and os.path.exists(poc_path):
-                    try:
-                        import yaml
-                        import re as regex_module
-                        with open(poc_path, 'r', encoding='utf-8') as pf:
-                            poc_content = yaml.safe_load(pf)
-                        
-                        # === 从 matched_url 提取随机生成的变量值 ===
-                        extracted_random_values = {}
-                        
-                        # 获取 POC 中定义的变量名和提取器名称
-                        poc_variable_names = []
-                        poc_extractor_names = []
-                        if poc_content.get('variables'):
-                            poc_variable_names = list(poc_content['variables'].keys())
-                            # 将 POC 中定义的变量默认值加入替换字典
-                            for var_name, var_value in poc_content['variables'].items():
-                                if var_value is not None:
-                                    # 处理不同类型的值
-                                    if isinstance(var_value, (int, float)):
-                                        extracted_random_values[var_name] = str(var_value)
-                                    elif isinstance(var_value, str):
-                                        extracted_random_values[var_name] = var_value
-                                    else:
-                                        extracted_random_values[var_name] = str(var_value)
-                        for item in poc_content.get('http', []):
-                            extractors = item.get('extractors', [])
-                            for ext in extractors:
-                                if ext.get('name'):
-                                    poc_extractor_names.append(ext['name'])
-                        
-                        # 从 matched_url 提取文件名
-                        if matched_url:
-                            try:
-                                from urllib.parse import urlparse
-                                parsed_url = urlparse(matched_url)
-                                url_path = parsed_url.path
-                                path_parts = url_path.split('/')
-                                if path_parts:
-                                    last_part = path_parts[-1]
-                                    if '.' in last_part:
-                                        full_filename = last_part
-                                        basename = last_part.rsplit('.', 1)[0]
-                                        
-                                        # 将文件名赋值给提取器变量
-                                        for ext_name in poc_extractor_names:
-                                            extracted_random_values[ext_name] = full_filename
-                                        if 'uploadfile' not in extracted_random_values:
-                                            extracted_random_values['uploadfile'] = full_filename
-                                        
-                                        if regex_module.match(r'^[a-zA-Z0-9]{6,50}$', basename):
-                                            extracted_random_values['random_filename'] = basename
-                                            extracted_random_values['rand_base(8)'] = basename
-                                            for var_name in poc_variable_names:
-                                                if 'name' in var_name.lower() or 'user' in var_name.lower():
-                                                    extracted_random_values[var_name] = basename
-                            except:
-                                pass
-                        
-                        http_section = poc_content.get('http', [])
-                        if http_section:
-                            request_steps = []
-                            step_num = 1
-                            
-                            for item in http_section:
-                                raw_requests = item.get('raw', [])
-                                if raw_requests:
-                                    for raw_req in raw_requests:
-                                        req_content = raw_req.strip()
-                                        if actual_hostname:
-                                            req_content = req_content.replace('{{Hostname}}', actual_hostname)
-                                            req_content = req_content.replace('{{BaseURL}}', actual_base_url)
-                                            req_content = req_content.replace('{{Host}}', actual_hostname)
-                                        # 替换所有变量
-                                        for var_name, var_value in extracted_random_values.items():
-                                            req_content = req_content.replace('{{' + var_name + '}}', var_value)
-                                        if extracted_random_values.get('random_filename'):
-                                            random_val = extracted_random_values['random_filename']
-                                            req_content = regex_module.sub(r'\{\{rand_base\(\d+\)\}\}', random_val, req_content)
-                                            req_content = regex_module.sub(r'\{\{to_lower\(rand_base\(\d+\)\)\}\}', random_val.lower(), req_content)
-                                            req_content = regex_module.sub(r'\{\{to_upper\(rand_base\(\d+\)\)\}\}', random_val.upper(), req_content)
-                                        # 替换其他未知变量
-                                        remaining_vars = regex_module.findall(r'\{\{([^}]+)\}\}', req_content)
-                                        for var in remaining_vars:
-                                            if extracted_random_values.get('random_filename'):
-                                                req_content = req_content.replace('{{' + var + '}}', f"[{extracted_random_values['random_filename']}]")
-                                        request_steps.append(f"[{labels['step_format'].format(step=step_num)}] {req_content}")
-                                        step_num += 1
-                                
-                                if item.get('path') or item.get('method'):
-                                    req_method = item.get('method', 'GET')
-                                    paths = item.get('path', [])
-                                    if isinstance(paths, str):
-                                        paths = [paths]
-                                    for path in paths:
-                                        actual_path = path
-                                        if actual_hostname:
-                                            actual_path = actual_path.replace('{{Hostname}}', actual_hostname)
-                                            actual_path = actual_path.replace('{{BaseURL}}', actual_base_url)
-                                        for var_name, var_value in extracted_random_values.items():
-                                            actual_path = actual_path.replace('{{' + var_name + '}}', var_value)
-                                        request_steps.append(f"[{labels['step_format'].format(step=step_num)}] {req_method} {actual_path}")
-                                        step_num += 1
-                            
-                            if len(request_steps) > 1:
-                                poc_requests_text = " | ".join(request_steps)
-                    except:
-                        pass
-                
-                writer.writerow([
-                    idx,
-                    v.get('severity', 'unknown'),
-                    v.get('template_id', ''),
-                    v.get('matched_at', ''),
-                    v.get('template_path', ''),
-                    method,
-                    body.replace('\n', ' ').replace('\r', ''),  # 清理换行符
-                    poc_requests_text.replace('\n', ' ').replace('\r', '')[:500],  # 限制长度
-                    v.get('timestamp', '')
-                ])
+            for row in rows:
+                writer.writerow(row)
         
         return True
     except Exception as e:
@@ -353,556 +296,148 @@ def export_to_csv(scan_record: dict, vulns: list, file_path: str) -> bool:
         return False
 
 
-def export_to_html(scan_record: dict, vulns: list, file_path: str) -> bool:
-    """
-    将扫描结果导出为美观的 HTML 报告
-    特点：单条漏洞默认折叠，点击展开详情
-    
-    参数:
-        scan_record: 扫描记录字典
-        vulns: 漏洞结果列表
-        file_path: 导出文件路径
-        
-    返回:
-        是否导出成功
-    """
+# HTML 报告：每个数据块包含的漏洞条数（详情按块压缩，浏览器展开时按块解压）
+HTML_CHUNK_SIZE = 200
+# 响应数据在报告中保留的最大长度
+HTML_RESPONSE_LIMIT = 2000
+
+def _vuln_type(v: dict, labels: dict) -> str:
+    """按标签 / POC ID / 名称关键字归类漏洞类型（用于图表）"""
+    all_text = f"{str(v.get('tags', '')).lower()} {str(v.get('template_id', '')).lower()} {str(v.get('name', '')).lower()}"
+    if any(k in all_text for k in ['rce', 'remote-code', 'command-execution', 'code-execution']):
+        return 'RCE'
+    if any(k in all_text for k in ['sqli', 'sql-injection', 'sql_injection']):
+        return 'SQLi'
+    if any(k in all_text for k in ['xss', 'cross-site-scripting']):
+        return 'XSS'
+    if 'ssrf' in all_text:
+        return 'SSRF'
+    if any(k in all_text for k in ['lfi', 'rfi', 'file-inclusion', 'path-traversal', 'file-read']):
+        return 'LFI'
+    if any(k in all_text for k in ['unauth', 'unauthorized', 'bypass', 'default-login']):
+        return labels['type_unauthorized']
+    if any(k in all_text for k in ['exposure', 'disclosure', 'leak', 'info']):
+        return labels['type_info_disclosure']
+    return labels['type_other']
+
+
+def _html_finding(v: dict, labels: dict, renderer: RequestChainRenderer) -> dict:
+    """单条漏洞的详情数据（写入报告的压缩数据块，由浏览器展开时渲染）"""
+    raw_data = {}
     try:
-        labels = _export_labels()
-        # 构建 POC 缓存避免重复搜索
-        poc_cache = _build_poc_cache()
+        if v.get('raw_json'):
+            raw_data = json.loads(v['raw_json'])
+    except Exception:
+        pass
 
-        # 加载本地 Chart.js 源码
-        chart_js_code = _load_chart_js()
+    full_request = raw_data.get('request', '') or ''
+    response_data = raw_data.get('response', '') or ''
+    template_path = v.get('template_path') or raw_data.get('template-path', '')
 
-        # 统计严重程度
-        severity_count = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0, 'info': 0, 'unknown': 0}
-        for v in vulns:
-            sev = v.get('severity', 'unknown').lower()
-            if sev in severity_count:
-                severity_count[sev] += 1
-            else:
-                severity_count['unknown'] += 1
-        
-        # 统计漏洞类型（用于图表）
-        type_count = {
-            'RCE': 0,
-            'SQLi': 0,
-            'XSS': 0,
-            'SSRF': 0,
-            'LFI': 0,
-            labels['type_unauthorized']: 0,
-            labels['type_info_disclosure']: 0,
-            labels['type_other']: 0,
-        }
-        for v in vulns:
-            tags = str(v.get('tags', '')).lower()
-            poc_id = str(v.get('template_id', '')).lower()
-            name = str(v.get('name', '')).lower()
-            all_text = f"{tags} {poc_id} {name}"
-            
-            if any(k in all_text for k in ['rce', 'remote-code', 'command-execution', 'code-execution']):
-                type_count['RCE'] += 1
-            elif any(k in all_text for k in ['sqli', 'sql-injection', 'sql_injection']):
-                type_count['SQLi'] += 1
-            elif any(k in all_text for k in ['xss', 'cross-site-scripting']):
-                type_count['XSS'] += 1
-            elif 'ssrf' in all_text:
-                type_count['SSRF'] += 1
-            elif any(k in all_text for k in ['lfi', 'rfi', 'file-inclusion', 'path-traversal', 'file-read']):
-                type_count['LFI'] += 1
-            elif any(k in all_text for k in ['unauth', 'unauthorized', 'bypass', 'default-login']):
-                type_count[labels['type_unauthorized']] += 1
-            elif any(k in all_text for k in ['exposure', 'disclosure', 'leak', 'info']):
-                type_count[labels['type_info_disclosure']] += 1
-            else:
-                type_count[labels['type_other']] += 1
-        
-        # 扫描时间
-        scan_time = scan_record.get('scan_time', '')[:19] if scan_record else datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # 生成漏洞条目 HTML
-        vuln_items_html = ""
-        for idx, v in enumerate(vulns, 1):
-            # 解析 raw_json
-            raw_data = {}
-            try:
-                if v.get('raw_json'):
-                    raw_data = json.loads(v['raw_json'])
-            except:
-                pass
-            
-            sev = v.get('severity', 'unknown').lower()
-            sev_class = f"severity-{sev}"
-            sev_label = labels['severity'].get(sev, labels['unknown'])
-            
-            # 提取请求信息
-            full_request = raw_data.get('request', '')
-            curl_command = raw_data.get('curl-command', '')
-            response_data = raw_data.get('response', '')
-            
-            # 处理请求方法
-            method = "GET"
-            if full_request:
-                first_line = full_request.split('\r\n')[0] if '\r\n' in full_request else full_request.split('\n')[0]
-                if first_line:
-                    parts = first_line.split(' ')
-                    if parts:
-                        method = parts[0]
-            
-            # === 从 POC 文件解析完整请求链 ===
-            poc_requests_html = ""
-            poc_path = v.get('template_path') or (raw_data.get('template-path') if raw_data else None)
-            matched_url = v.get('matched_at', '')
-            
-            # 提取实际的 Hostname
-            actual_hostname = ""
-            actual_base_url = ""
-            if matched_url:
-                try:
-                    from urllib.parse import urlparse
-                    parsed = urlparse(matched_url)
-                    if parsed.port and parsed.port not in [80, 443]:
-                        actual_hostname = f"{parsed.hostname}:{parsed.port}"
-                    else:
-                        actual_hostname = parsed.hostname or ""
-                    actual_base_url = f"{parsed.scheme}://{actual_hostname}"
-                except:
-                    pass
-            
-            # 如果路径不存在，尝试从缓存查找
-            if poc_path and not os.path.exists(poc_path):
-                template_id = v.get('template_id', '')
-                if template_id and template_id in poc_cache:
-                    poc_path = poc_cache[template_id]
-            
-            if poc_path and os.path.exists(poc_path):
-                try:
-                    import yaml
-                    import re as regex_module
-                    with open(poc_path, 'r', encoding='utf-8') as pf:
-                        poc_content = yaml.safe_load(pf)
-                    
-                    # === 从 matched_url 或 Nuclei 实际请求中提取随机生成的变量值 ===
-                    extracted_random_values = {}
-                    
-                    # 首先，从 POC 文件的 variables 和 extractors 部分获取变量名
-                    poc_variable_names = []
-                    poc_extractor_names = []
-                    
-                    # 获取 POC 中定义的变量及其默认值
-                    if poc_content.get('variables'):
-                        poc_variable_names = list(poc_content['variables'].keys())
-                        # 将 POC 中定义的变量默认值加入替换字典
-                        for var_name, var_value in poc_content['variables'].items():
-                            if var_value is not None:
-                                # 处理不同类型的值
-                                if isinstance(var_value, (int, float)):
-                                    extracted_random_values[var_name] = str(var_value)
-                                elif isinstance(var_value, str):
-                                    extracted_random_values[var_name] = var_value
-                                else:
-                                    extracted_random_values[var_name] = str(var_value)
-                    
-                    # 获取 POC 中的提取器名称
-                    for item in poc_content.get('http', []):
-                        extractors = item.get('extractors', [])
-                        for ext in extractors:
-                            if ext.get('name'):
-                                poc_extractor_names.append(ext['name'])
-                    
-                    # 尝试从 matched_url 的路径中提取文件名（适用于文件上传类漏洞）
-                    # 例如: /userfile/messageserv/402880f29a529b4d019bd10369fa2675.jsp -> 402880f29a529b4d019bd10369fa2675.jsp
-                    if matched_url:
-                        try:
-                            from urllib.parse import urlparse
-                            parsed_url = urlparse(matched_url)
-                            url_path = parsed_url.path
-                            path_parts = url_path.split('/')
-                            if path_parts:
-                                last_part = path_parts[-1]
-                                # 提取完整文件名
-                                if '.' in last_part:
-                                    full_filename = last_part  # 例如 402880f29a529b4d019bd10369fa2675.jsp
-                                    basename = last_part.rsplit('.', 1)[0]  # 例如 402880f29a529b4d019bd10369fa2675
-                                    
-                                    # 将文件名赋值给可能的提取器变量
-                                    for ext_name in poc_extractor_names:
-                                        if 'file' in ext_name.lower() or 'upload' in ext_name.lower() or 'path' in ext_name.lower():
-                                            extracted_random_values[ext_name] = full_filename
-                                    
-                                    # 如果 POC 未明确定义提取器名，使用通用名称
-                                    if 'uploadfile' not in extracted_random_values:
-                                        extracted_random_values['uploadfile'] = full_filename
-                                    
-                                    # 检查是否看起来像随机生成的值
-                                    if regex_module.match(r'^[a-zA-Z0-9]{6,50}$', basename):
-                                        extracted_random_values['random_filename'] = basename
-                                        extracted_random_values['rand_base(8)'] = basename
-                                        # 也为 POC 中定义的变量赋值
-                                        for var_name in poc_variable_names:
-                                            if 'name' in var_name.lower() or 'user' in var_name.lower() or 'file' in var_name.lower():
-                                                extracted_random_values[var_name] = basename
-                        except:
-                            pass
-                    
-                    # 从 Nuclei 记录的实际请求中提取变量值
-                    if full_request:
-                        try:
-                            # 从请求中提取文件名（例如从 Content-Disposition: form-data; name="file"; filename="xxx.jsp"）
-                            match = regex_module.search(r'filename="([^"]+)"', full_request)
-                            if match:
-                                actual_filename = match.group(1)
-                                if '.' in actual_filename:
-                                    basename = actual_filename.rsplit('.', 1)[0]
-                                    for var_name in poc_variable_names:
-                                        if var_name not in extracted_random_values:
-                                            extracted_random_values[var_name] = basename
-                            
-                            # 从 Cookie 或其他请求头中提取 session 等值
-                            match = regex_module.search(r'JSESSIONID=([a-zA-Z0-9]+)', full_request)
-                            if match:
-                                extracted_random_values['jsessionid'] = match.group(1)
-                        except:
-                            pass
-                    
-                    # 也尝试从 Nuclei 返回的 response 中提取（例如 CVE-2025-15503-gLCSDRzl）
-                    if response_data and not extracted_random_values.get('random_filename'):
-                        try:
-                            match = regex_module.search(r'CVE-\d+-\d+-([a-zA-Z0-9]{6,12})', response_data)
-                            if match:
-                                extracted_random_values['random_filename'] = match.group(1)
-                                extracted_random_values['rand_base(8)'] = match.group(1)
-                        except:
-                            pass
-                    
-                    http_section = poc_content.get('http', [])
-                    if http_section:
-                        request_steps = []
-                        step_num = 1
-                        
-                        for item in http_section:
-                            raw_requests = item.get('raw', [])
-                            if raw_requests:
-                                for raw_req in raw_requests:
-                                    req_content = raw_req.strip()
-                                    # 替换标准内置变量
-                                    if actual_hostname:
-                                        req_content = req_content.replace('{{Hostname}}', actual_hostname)
-                                        req_content = req_content.replace('{{BaseURL}}', actual_base_url)
-                                        req_content = req_content.replace('{{Host}}', actual_hostname)
-                                        req_content = req_content.replace('{{RootURL}}', actual_base_url)
-                                        # 提取并替换 Scheme、Port、Path
-                                        try:
-                                            from urllib.parse import urlparse
-                                            parsed = urlparse(matched_url)
-                                            req_content = req_content.replace('{{Scheme}}', parsed.scheme or 'http')
-                                            req_content = req_content.replace('{{Port}}', str(parsed.port) if parsed.port else ('443' if parsed.scheme == 'https' else '80'))
-                                            req_content = req_content.replace('{{Path}}', parsed.path or '/')
-                                        except:
-                                            pass
-                                    
-                                    # 替换提取到的随机变量（如 {{uploadfile}}, {{username}} 等）
-                                    for var_name, var_value in extracted_random_values.items():
-                                        req_content = req_content.replace('{{' + var_name + '}}', var_value)
-                                    
-                                    # 替换常见的 Nuclei 随机函数占位符
-                                    # 例如 {{rand_base(8)}}, {{rand_int(1000,9999)}}, {{to_lower(rand_base(6))}} 等
-                                    if extracted_random_values.get('random_filename'):
-                                        random_val = extracted_random_values['random_filename']
-                                        # 替换各种形式的随机函数
-                                        req_content = regex_module.sub(
-                                            r'\{\{rand_base\(\d+\)\}\}', 
-                                            random_val, 
-                                            req_content
-                                        )
-                                        req_content = regex_module.sub(
-                                            r'\{\{to_lower\(rand_base\(\d+\)\)\}\}', 
-                                            random_val.lower(), 
-                                            req_content
-                                        )
-                                        req_content = regex_module.sub(
-                                            r'\{\{to_upper\(rand_base\(\d+\)\)\}\}', 
-                                            random_val.upper(), 
-                                            req_content
-                                        )
-                                        # 替换其他随机字符串函数
-                                        req_content = regex_module.sub(
-                                            r'\{\{rand_text_alpha\(\d+\)\}\}', 
-                                            random_val, 
-                                            req_content
-                                        )
-                                        req_content = regex_module.sub(
-                                            r'\{\{rand_text_alphanumeric\(\d+\)\}\}', 
-                                            random_val, 
-                                            req_content
-                                        )
-                                        req_content = regex_module.sub(
-                                            r'\{\{rand_char\([^)]*\)\}\}', 
-                                            random_val[:1] if random_val else 'x', 
-                                            req_content
-                                        )
-                                    
-                                    # 替换随机整数（使用固定值表示已替换）
-                                    req_content = regex_module.sub(
-                                        r'\{\{rand_int\(\d+,\s*\d+\)\}\}', 
-                                        labels['random_number'],
-                                        req_content
-                                    )
-                                    
-                                    # 替换哈希函数（显示为占位符）
-                                    req_content = regex_module.sub(
-                                        r'\{\{md5\([^)]*\)\}\}', 
-                                        labels['md5_hash'],
-                                        req_content
-                                    )
-                                    req_content = regex_module.sub(
-                                        r'\{\{sha1\([^)]*\)\}\}', 
-                                        labels['sha1_hash'],
-                                        req_content
-                                    )
-                                    req_content = regex_module.sub(
-                                        r'\{\{sha256\([^)]*\)\}\}', 
-                                        labels['sha256_hash'],
-                                        req_content
-                                    )
-                                    
-                                    # 替换时间戳函数
-                                    req_content = regex_module.sub(
-                                        r'\{\{unix_time\(\)\}\}', 
-                                        labels['timestamp'],
-                                        req_content
-                                    )
-                                    
-                                    # 检查是否仍有未替换的变量，添加标注
-                                    remaining_vars = regex_module.findall(r'\{\{([^}]+)\}\}', req_content)
-                                    if remaining_vars:
-                                        # 尝试使用已有的值替换未知变量
-                                        for var in remaining_vars:
-                                            if extracted_random_values and 'random_filename' in extracted_random_values:
-                                                req_content = req_content.replace(
-                                                    '{{' + var + '}}', 
-                                                    f"[{extracted_random_values['random_filename']}]"
-                                                )
-                                    
-                                    request_steps.append({'step': step_num, 'content': req_content})
-                                    step_num += 1
-                            
-                            if item.get('path') or item.get('method'):
-                                req_method = item.get('method', 'GET')
-                                
-                                # 处理 Headers
-                                headers = item.get('headers', {})
-                                if headers is None:
-                                    headers = {}
-                                
-                                headers_str = ""
-                                # 自动补充 Host 头 (如果 YAML 中未定义)
-                                if actual_hostname and not any(k.lower() == 'host' for k in headers.keys()):
-                                    headers_str += f"\nHost: {actual_hostname}"
-
-                                for key, value in headers.items():
-                                    headers_str += f"\n{key}: {value}"
-                                
-                                # 处理 Body
-                                body = item.get('body', '')
-                                if body:
-                                    # 简单处理 Body 中的变量替换
-                                    for var_name, var_value in extracted_random_values.items():
-                                        body = body.replace('{{' + var_name + '}}', var_value)
-                                    
-                                    # 自动补充 Content-Length
-                                    if not any(k.lower() == 'content-length' for k in headers.keys()):
-                                        try:
-                                            # 计算字节长度
-                                            content_len = len(body.encode('utf-8'))
-                                            headers_str += f"\nContent-Length: {content_len}"
-                                        except:
-                                            headers_str += f"\nContent-Length: {len(body)}"
-                                        
-                                    body = f"\n\n{body}"
-                                
-                                paths = item.get('path', [])
-                                if isinstance(paths, str):
-                                    paths = [paths]
-                                for path in paths:
-                                    actual_path = path
-                                    if actual_hostname:
-                                        actual_path = actual_path.replace('{{Hostname}}', actual_hostname)
-                                        actual_path = actual_path.replace('{{BaseURL}}', actual_base_url)
-                                        actual_path = actual_path.replace('{{RootURL}}', actual_base_url)
-                                    # 替换随机变量
-                                    for var_name, var_value in extracted_random_values.items():
-                                        actual_path = actual_path.replace('{{' + var_name + '}}', var_value)
-                                    
-                                    # 拼接完整请求内容
-                                    full_content = f"{req_method} {actual_path}{headers_str}{body}"
-                                    request_steps.append({'step': step_num, 'content': full_content})
-                                    step_num += 1
-                        
-                        if len(request_steps) > 1:
-                            import base64
-                            poc_requests_html = f'<div class="code-section"><h4>{labels["poc_chain_header"].format(count=len(request_steps))}</h4>'
-                            for req in request_steps:
-                                # 转义 HTML 用于显示
-                                escaped_content = req['content'].replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                                # 使用 Base64 编码原始内容，避免特殊字符问题
-                                raw_base64 = base64.b64encode(req['content'].encode('utf-8')).decode('ascii')
-                                copy_btn_id = f"copy-step-{idx}-{req['step']}"
-                                poc_requests_html += f'''<div style="margin-bottom:10px;position:relative;"><strong style="color:#3498db;">{labels["step_format"].format(step=req["step"])}</strong><button class="copy-btn" onclick="copyBase64Content('{raw_base64}', '{copy_btn_id}')" id="{copy_btn_id}">{labels["copy"]}</button><pre>{escaped_content}</pre></div>'''
-                            poc_requests_html += '</div>'
-                except:
-                    pass
-            
-            # 转义 HTML 特殊字符并清理多余空行
-            def escape_html(text, clean_empty_lines=False):
-                if not text:
-                    return ""
-                result = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;').replace("'", '&#39;')
-                if clean_empty_lines:
-                    # 清理连续的空行，保留单个换行
-                    import re
-                    result = re.sub(r'\r\n', '\n', result)  # 统一换行符
-                    result = re.sub(r'\n{3,}', '\n\n', result)  # 最多保留一个空行
-                    result = result.strip()
-                return result
-
-            trigger_request_html = ""
-            if full_request:
-                request_raw = full_request.replace('"', '&quot;').replace(chr(10), '&#10;').replace(chr(13), '&#13;')
-                trigger_request_html = (
-                    f'<div class="code-section"><h4>{labels["trigger_request"]} ({labels["nuclei_record"]}) '
-                    f'<span style="font-size:11px;color:#7f8c8d;font-weight:normal;margin-left:10px;">'
-                    f'({labels["trigger_request_note"]})</span> '
-                    f'<button class="copy-btn" onclick="copyPreContent(this)">{labels["copy"]}</button></h4>'
-                    f'<pre data-raw="{request_raw}">{escape_html(full_request, True)}</pre></div>'
-                )
+    try:
+        steps = [step.content for step in renderer.render(
+            template_path, v.get('template_id', ''), v.get('matched_at', ''), full_request, response_data)]
+    except Exception:
+        steps = []
 
-            curl_html = ""
-            if curl_command:
-                curl_raw = curl_command.replace('"', '&quot;').replace(chr(10), '&#10;').replace(chr(13), '&#13;')
-                curl_html = (
-                    f'<div class="code-section"><h4>{labels["curl_command"]} '
-                    f'<button class="copy-btn" onclick="copyPreContent(this)">{labels["copy"]}</button></h4>'
-                    f'<pre data-raw="{curl_raw}">{escape_html(curl_command, True)}</pre></div>'
-                )
+    sev = (v.get('severity') or 'unknown').lower()
+    if len(response_data) > HTML_RESPONSE_LIMIT:
+        response_data = response_data[:HTML_RESPONSE_LIMIT] + labels['truncated']
+    return {
+        'severity': f"{labels['severity'].get(sev, labels['unknown'])} ({sev.upper()})",
+        'template_id': v.get('template_id', ''),
+        'matched_at': v.get('matched_at', ''),
+        'template_path': template_path,
+        'timestamp': v.get('timestamp', ''),
+        'steps': steps if len(steps) > 1 else [],
+        'request': full_request,
+        'curl': raw_data.get('curl-command', '') or '',
+        'response': response_data,
+    }
 
-            response_html = ""
-            if response_data:
-                response_text = response_data[:2000] + (labels['truncated'] if len(response_data) > 2000 else '')
-                response_html = f'<div class="code-section"><h4>{labels["response_data"]}</h4><pre>{escape_html(response_text, True)}</pre></div>'
-            
-            vuln_items_html += f'''
-            <div class="vuln-item">
-                <div class="vuln-header" onclick="toggleVuln('vuln-{idx}')">
-                    <span class="vuln-sev {sev_class}">{sev_label}</span>
-                    <span class="vuln-id">{escape_html(v.get('template_id', labels['unknown']))}</span>
-                    <span class="vuln-target">{escape_html(v.get('matched_at', ''))}</span>
-                    <span class="vuln-toggle" id="toggle-{idx}">▶</span>
-                </div>
-                <div class="vuln-detail" id="vuln-{idx}" style="display: none;">
-                    <table class="detail-table">
-                        <tr>
-                            <th>{labels['field_severity']}</th>
-                            <td>{sev_label} ({sev.upper()})</td>
-                        </tr>
-                        <tr>
-                            <th>POC ID</th>
-                            <td>{escape_html(v.get('template_id', ''))}</td>
-                        </tr>
-                        <tr>
-                            <th>{labels['field_target']}</th>
-                            <td><a href="{escape_html(v.get('matched_at', ''))}" target="_blank">{escape_html(v.get('matched_at', ''))}</a></td>
-                        </tr>
-                        <tr>
-                            <th>{labels['field_poc_path']}</th>
-                            <td>{escape_html(v.get('template_path', '') or raw_data.get('template-path', ''))}</td>
-                        </tr>
-                        <tr>
-                            <th>{labels['field_found_time']}</th>
-                            <td>{escape_html(v.get('timestamp', ''))}</td>
-                        </tr>
-                    </table>
-                    
-                    {poc_requests_html}
-                    {trigger_request_html}
-                    {curl_html}
-                    {response_html}
-                </div>
-            </div>
-            '''
-        
-        severity_chart_labels = json.dumps([
-            labels['severity']['critical'],
-            labels['severity']['high'],
-            labels['severity']['medium'],
-            labels['severity']['low'],
-            labels['severity']['info'],
-        ], ensure_ascii=False)
-        type_chart_labels = json.dumps(list(type_count.keys()), ensure_ascii=False)
-        type_chart_values = json.dumps(list(type_count.values()), ensure_ascii=False)
-        toggle_all_button_html = f'<button class="btn-expand-all" onclick="toggleAll()">{labels["toggle_all"]}</button>' if vulns else ''
-        no_vulns_html = f'<div class="no-vulns"><div class="no-vulns-icon">✅</div><p>{labels["no_vulns"]}</p></div>'
-
-        # 生成完整 HTML
-        html_content = f'''<!DOCTYPE html>
-<html lang="{labels['html_lang']}">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{labels['report_title']} - {scan_time}</title>
-    <!-- Chart.js inline fallback to avoid CDN dependency -->
-    <!-- CHART_JS_INLINE -->
-    <style>
-        * {{
+
+def _html_data_island(chunk_index: int, findings: list) -> str:
+    """将一块漏洞详情压缩为内嵌数据块（gzip + base64，浏览器用 DecompressionStream 解压）"""
+    payload = json.dumps(findings, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    encoded = base64.b64encode(gzip.compress(payload, 6, mtime=0)).decode('ascii')
+    return (f'<script type="application/octet-stream" id="vuln-data-{chunk_index}" '
+            f'data-encoding="gzip">{encoded}</script>\n')
+
+
+def _html_vuln_item(idx: int, v: dict, labels: dict, delta: bool) -> str:
+    """漏洞列表中的一行摘要，详情容器为空，展开时由脚本填充"""
+    sev = (v.get('severity') or 'unknown').lower()
+    delta_html = ""
+    if delta and v.get('delta'):
+        delta_html = (f'<span class="vuln-delta delta-{escape(v["delta"])}">'
+                      f'{labels["delta"].get(v["delta"], "")}</span>')
+    return (
+        f'<div class="vuln-item"><div class="vuln-header" onclick="toggleVuln({idx})">'
+        f'<span class="vuln-sev severity-{escape(sev)}">{labels["severity"].get(sev, labels["unknown"])}</span>'
+        f'{delta_html}'
+        f'<span class="vuln-id">{escape(v.get("template_id") or labels["unknown"])}</span>'
+        f'<span class="vuln-target">{escape(v.get("matched_at") or "")}</span>'
+        f'<span class="vuln-toggle" id="toggle-{idx}">▶</span></div>'
+        f'<div class="vuln-detail" id="vuln-{idx}" style="display: none;"></div></div>\n'
+    )
+
+
+def _json_for_script(value) -> str:
+    """序列化为可直接嵌入 <script> 的 JSON"""
+    return json.dumps(value, ensure_ascii=False).replace('<', '\\u003c')
+
+
+_HTML_STYLE = """\
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        body {{
+        body {
             font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
             background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%);
             min-height: 100vh;
             padding: 20px;
             color: #e0e0e0;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 1200px;
             margin: 0 auto;
-        }}
+        }
         
         /* Report header */
-        .report-header {{
+        .report-header {
             background: linear-gradient(135deg, #2d2d44 0%, #1f1f33 100%);
             border-radius: 12px;
             padding: 30px;
             margin-bottom: 20px;
             box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
             border: 1px solid rgba(255, 255, 255, 0.1);
-        }}
+        }
         
-        .report-title {{
+        .report-title {
             font-size: 28px;
             font-weight: 600;
             color: #ffffff;
             margin-bottom: 10px;
-        }}
+        }
         
-        .report-subtitle {{
+        .report-subtitle {
             color: #a0a0a0;
             font-size: 14px;
-        }}
+        }
         
         /* Statistics cards */
-        .stats-row {{
+        .stats-row {
             display: flex;
             gap: 15px;
             margin-bottom: 20px;
             flex-wrap: wrap;
-        }}
+        }
         
-        .stat-card {{
+        .stat-card {
             flex: 1;
             min-width: 150px;
             background: linear-gradient(135deg, #2d2d44 0%, #1f1f33 100%);
@@ -911,82 +446,82 @@ def export_to_html(scan_record: dict, vulns: list, file_path: str) -> bool:
             text-align: center;
             box-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);
             border: 1px solid rgba(255, 255, 255, 0.08);
-        }}
+        }
         
-        .stat-card.critical {{
+        .stat-card.critical {
             border-left: 4px solid #9b59b6;
-        }}
+        }
         
-        .stat-card.high {{
+        .stat-card.high {
             border-left: 4px solid #e74c3c;
-        }}
+        }
         
-        .stat-card.medium {{
+        .stat-card.medium {
             border-left: 4px solid #f39c12;
-        }}
+        }
         
-        .stat-card.low {{
+        .stat-card.low {
             border-left: 4px solid #3498db;
-        }}
+        }
         
-        .stat-card.info {{
+        .stat-card.info {
             border-left: 4px solid #1abc9c;
-        }}
+        }
         
-        .stat-card.total {{
+        .stat-card.total {
             border-left: 4px solid #7f8c8d;
-        }}
+        }
         
-        .stat-value {{
+        .stat-value {
             font-size: 32px;
             font-weight: 700;
             color: #ffffff;
-        }}
+        }
         
-        .stat-label {{
+        .stat-label {
             font-size: 13px;
             color: #a0a0a0;
             margin-top: 5px;
-        }}
+        }
         
         /* Vulnerability list */
-        .vuln-list {{
+        .vuln-list {
             background: linear-gradient(135deg, #2d2d44 0%, #1f1f33 100%);
             border-radius: 12px;
             padding: 20px;
             box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
             border: 1px solid rgba(255, 255, 255, 0.1);
-        }}
+        }
         
-        .vuln-list h3 {{
+        .vuln-list h3 {
             font-size: 18px;
             color: #ffffff;
             margin-bottom: 15px;
             padding-bottom: 10px;
             border-bottom: 1px solid rgba(255, 255, 255, 0.1);
-        }}
+        }
         
-        .vuln-item {{
+        .vuln-item {
             background: rgba(0, 0, 0, 0.2);
             border-radius: 8px;
             margin-bottom: 10px;
             overflow: hidden;
             border: 1px solid rgba(255, 255, 255, 0.05);
-        }}
+        }
         
-        .vuln-header {{
+        .vuln-header {
             display: flex;
             align-items: center;
             padding: 15px;
             cursor: pointer;
             transition: background 0.2s;
-        }}
+        }
         
-        .vuln-header:hover {{
+        .vuln-header:hover {
             background: rgba(255, 255, 255, 0.05);
-        }}
+        }
         
-        .vuln-sev {{
+        .vuln-sev {
             padding: 4px 12px;
             border-radius: 4px;
             font-size: 12px;
@@ -994,114 +529,129 @@ def export_to_html(scan_record: dict, vulns: list, file_path: str) -> bool:
             margin-right: 15px;
             min-width: 50px;
             text-align: center;
-        }}
+        }
         
-        .severity-critical {{
+        .severity-critical {
             background: linear-gradient(135deg, #9b59b6, #8e44ad);
             color: white;
-        }}
+        }
         
-        .severity-high {{
+        .severity-high {
             background: linear-gradient(135deg, #e74c3c, #c0392b);
             color: white;
-        }}
+        }
         
-        .severity-medium {{
+        .severity-medium {
             background: linear-gradient(135deg, #f39c12, #d68910);
             color: white;
-        }}
+        }
         
-        .severity-low {{
+        .severity-low {
             background: linear-gradient(135deg, #3498db, #2980b9);
             color: white;
-        }}
+        }
         
-        .severity-info {{
+        .severity-info {
             background: linear-gradient(135deg, #1abc9c, #16a085);
             color: white;
-        }}
+        }
         
-        .severity-unknown {{
+        .severity-unknown {
             background: linear-gradient(135deg, #7f8c8d, #6c7a7d);
             color: white;
-        }}
+        }
         
-        .vuln-id {{
+        .vuln-delta {
+            padding: 2px 8px;
+            border-radius: 4px;
+            font-size: 12px;
+            margin-right: 10px;
+            flex-shrink: 0;
+        }
+        .delta-new {
+            background: #dc2626;
+            color: #ffffff;
+        }
+        .delta-resolved {
+            background: #16a34a;
+            color: #ffffff;
+        }
+        .vuln-id {
             font-weight: 600;
             color: #ffffff;
             margin-right: 15px;
             flex-shrink: 0;
-        }}
+        }
         
-        .vuln-target {{
+        .vuln-target {
             color: #a0a0a0;
             font-size: 13px;
             flex-grow: 1;
             overflow: hidden;
             text-overflow: ellipsis;
             white-space: nowrap;
-        }}
+        }
         
-        .vuln-toggle {{
+        .vuln-toggle {
             color: #7f8c8d;
             font-size: 12px;
             transition: transform 0.3s;
-        }}
+        }
         
-        .vuln-toggle.expanded {{
+        .vuln-toggle.expanded {
             transform: rotate(90deg);
-        }}
+        }
         
-        .vuln-detail {{
+        .vuln-detail {
             padding: 0 20px 20px 20px;
             background: rgba(0, 0, 0, 0.1);
             border-top: 1px solid rgba(255, 255, 255, 0.05);
-        }}
+        }
         
-        .detail-table {{
+        .detail-table {
             width: 100%;
             border-collapse: collapse;
             margin-top: 15px;
-        }}
+        }
         
         .detail-table th,
-        .detail-table td {{
+        .detail-table td {
             padding: 10px 15px;
             text-align: left;
             border-bottom: 1px solid rgba(255, 255, 255, 0.05);
-        }}
+        }
         
-        .detail-table th {{
+        .detail-table th {
             width: 120px;
             color: #a0a0a0;
             font-weight: 500;
-        }}
+        }
         
-        .detail-table td {{
+        .detail-table td {
             color: #e0e0e0;
-        }}
+        }
         
-        .detail-table a {{
+        .detail-table a {
             color: #3498db;
             text-decoration: none;
-        }}
+        }
         
-        .detail-table a:hover {{
+        .detail-table a:hover {
             text-decoration: underline;
-        }}
+        }
         
-        .code-section {{
+        .code-section {
             margin-top: 15px;
-        }}
+        }
         
-        .code-section h4 {{
+        .code-section h4 {
             font-size: 13px;
             color: #a0a0a0;
             margin-bottom: 8px;
             font-weight: 500;
-        }}
+        }
         
-        .copy-btn {{
+        .copy-btn {
             background: linear-gradient(135deg, #10b981, #059669);
             color: white;
             border: none;
@@ -1111,18 +661,18 @@ def export_to_html(scan_record: dict, vulns: list, file_path: str) -> bool:
             font-size: 11px;
             margin-left: 10px;
             transition: all 0.2s;
-        }}
+        }
         
-        .copy-btn:hover {{
+        .copy-btn:hover {
             transform: scale(1.05);
             box-shadow: 0 4px 12px rgba(16, 185, 129, 0.4);
-        }}
+        }
         
-        .copy-btn.copied {{
+        .copy-btn.copied {
             background: linear-gradient(135deg, #3b82f6, #2563eb);
-        }}
+        }
         
-        .code-section pre {{
+        .code-section pre {
             background: #1a1a2e;
             padding: 15px;
             border-radius: 6px;
@@ -1135,31 +685,31 @@ def export_to_html(scan_record: dict, vulns: list, file_path: str) -> bool:
             word-wrap: normal; /* Avoid forced line breaks */
             max-height: 300px;
             overflow-y: auto;
-        }}
+        }
         
         /* Footer */
-        .report-footer {{
+        .report-footer {
             text-align: center;
             padding: 20px;
             color: #7f8c8d;
             font-size: 12px;
             margin-top: 20px;
-        }}
+        }
         
         /* Empty-state message */
-        .no-vulns {{
+        .no-vulns {
             text-align: center;
             padding: 60px 20px;
             color: #7f8c8d;
-        }}
+        }
         
-        .no-vulns-icon {{
+        .no-vulns-icon {
             font-size: 48px;
             margin-bottom: 15px;
-        }}
+        }
         
         /* Button styles */
-        .btn-expand-all {{
+        .btn-expand-all {
             background: linear-gradient(135deg, #3498db, #2980b9);
             color: white;
             border: none;
@@ -1169,22 +719,22 @@ def export_to_html(scan_record: dict, vulns: list, file_path: str) -> bool:
             font-size: 13px;
             margin-bottom: 15px;
             transition: all 0.2s;
-        }}
+        }
         
-        .btn-expand-all:hover {{
+        .btn-expand-all:hover {
             transform: translateY(-1px);
             box-shadow: 0 4px 12px rgba(52, 152, 219, 0.3);
-        }}
+        }
         
         /* Chart area */
-        .charts-row {{
+        .charts-row {
             display: flex;
             gap: 20px;
             margin-bottom: 20px;
             flex-wrap: wrap;
-        }}
+        }
         
-        .chart-card {{
+        .chart-card {
             flex: 1;
             min-width: 300px;
             background: linear-gradient(135deg, #2d2d44 0%, #1f1f33 100%);
@@ -1192,168 +742,216 @@ def export_to_html(scan_record: dict, vulns: list, file_path: str) -> bool:
             padding: 20px;
             box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
             border: 1px solid rgba(255, 255, 255, 0.1);
-        }}
+        }
         
-        .chart-card h4 {{
+        .chart-card h4 {
             font-size: 16px;
             color: #ffffff;
             margin-bottom: 15px;
             padding-bottom: 10px;
             border-bottom: 1px solid rgba(255, 255, 255, 0.1);
-        }}
+        }
         
-        .chart-container {{
+        .chart-container {
             position: relative;
             height: 250px;
             width: 100%;
-        }}
+        }
         
-        @media print {{
-            body {{
+        @media print {
+            body {
                 background: white;
                 color: #333;
-            }}
+            }
             
-            .report-header, .stat-card, .vuln-list, .vuln-item {{
+            .report-header, .stat-card, .vuln-list, .vuln-item {
                 background: white !important;
                 box-shadow: none !important;
                 border: 1px solid #ddd !important;
-            }}
+            }
             
-            .vuln-detail {{
+            .vuln-detail {
                 display: block !important;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <!-- Report header -->
-        <div class="report-header">
-            <h1 class="report-title">🔒 {labels['report_title']}</h1>
-            <p class="report-subtitle">{labels['scan_time']}: {scan_time} | {labels['target_count']}: {scan_record.get('target_count', 0) if scan_record else 0} | {labels['poc_count']}: {scan_record.get('poc_count', 0) if scan_record else 0}</p>
-        </div>
-        
-        <!-- Statistics cards -->
-        <div class="stats-row">
-            <div class="stat-card total">
-                <div class="stat-value">{len(vulns)}</div>
-                <div class="stat-label">{labels['total_vulns']}</div>
-            </div>
-            <div class="stat-card critical">
-                <div class="stat-value">{severity_count['critical']}</div>
-                <div class="stat-label">{labels['severity']['critical']}</div>
-            </div>
-            <div class="stat-card high">
-                <div class="stat-value">{severity_count['high']}</div>
-                <div class="stat-label">{labels['severity']['high']}</div>
-            </div>
-            <div class="stat-card medium">
-                <div class="stat-value">{severity_count['medium']}</div>
-                <div class="stat-label">{labels['severity']['medium']}</div>
-            </div>
-            <div class="stat-card low">
-                <div class="stat-value">{severity_count['low']}</div>
-                <div class="stat-label">{labels['severity']['low']}</div>
-            </div>
-            <div class="stat-card info">
-                <div class="stat-value">{severity_count['info']}</div>
-                <div class="stat-label">{labels['severity']['info']}</div>
-            </div>
-        </div>
+            }
+        }
         
-        <!-- Charts -->
-        <div class="charts-row">
-            <div class="chart-card">
-                <h4>{labels['severity_distribution']}</h4>
-                <div class="chart-container">
-                    <canvas id="severityChart"></canvas>
-                </div>
-            </div>
-            <div class="chart-card">
-                <h4>{labels['type_distribution']}</h4>
-                <div class="chart-container">
-                    <canvas id="typeChart"></canvas>
-                </div>
-            </div>
-        </div>
+        /* Lazily rendered detail blocks */
+        .poc-step {
+            margin-bottom: 10px;
+            position: relative;
+        }
         
-        <!-- Vulnerability list -->
-        <div class="vuln-list">
-            <h3>{labels['vuln_detail_list']}</h3>
-            {toggle_all_button_html}
-            
-            {vuln_items_html if vulns else no_vulns_html}
-        </div>
+        .poc-step strong {
+            color: #3498db;
+        }
         
-        <!-- Footer -->
-        <div class="report-footer">
-            <p>{labels['footer']} | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        </div>
-    </div>
-    
-    <script>
-        function toggleVuln(id) {{
-            const detail = document.getElementById(id);
-            const toggle = document.getElementById('toggle-' + id.split('-')[1]);
-            
-            if (detail.style.display === 'none') {{
-                detail.style.display = 'block';
-                toggle.classList.add('expanded');
-            }} else {{
-                detail.style.display = 'none';
-                toggle.classList.remove('expanded');
-            }}
-        }}
+        .code-note {
+            font-size: 11px;
+            color: #7f8c8d;
+            font-weight: normal;
+            margin-left: 10px;
+        }
         
+        .detail-error {
+            padding-top: 15px;
+            color: #e67e22;
+        }
+"""
+
+_HTML_SCRIPT = r"""
+        const LABELS = __LABELS__;
+        const REPORT = __REPORT__;
+        const chunkCache = {};
+
+        // 按块解压漏洞详情（gzip + base64 数据块），同一块只解压一次
+        function loadChunk(index) {
+            if (!chunkCache[index]) {
+                chunkCache[index] = (async () => {
+                    const island = document.getElementById('vuln-data-' + index);
+                    const binary = window.atob(island.textContent.trim());
+                    const bytes = new Uint8Array(binary.length);
+                    for (let i = 0; i < binary.length; i++) {
+                        bytes[i] = binary.charCodeAt(i);
+                    }
+                    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+                    return JSON.parse(await new Response(stream).text());
+                })();
+            }
+            return chunkCache[index];
+        }
+
+        function createElement(tag, className, text) {
+            const element = document.createElement(tag);
+            if (className) element.className = className;
+            if (text !== undefined && text !== null) element.textContent = text;
+            return element;
+        }
+
+        // 统一换行符并最多保留一个空行
+        function cleanText(text) {
+            return text.replace(/\r\n/g, '\n').replace(/\n{3,}/g, '\n\n').trim();
+        }
+
+        function copyButton(text) {
+            const btn = createElement('button', 'copy-btn', LABELS.copy);
+            btn.addEventListener('click', (event) => {
+                event.stopPropagation();
+                copyToClipboard(text, btn);
+            });
+            return btn;
+        }
+
+        function codeSection(title, note, text, copyText) {
+            const section = createElement('div', 'code-section');
+            const heading = createElement('h4', null, title);
+            if (note) heading.appendChild(createElement('span', 'code-note', note));
+            if (copyText) heading.appendChild(copyButton(copyText));
+            section.appendChild(heading);
+            section.appendChild(createElement('pre', null, text));
+            return section;
+        }
+
+        function renderDetail(container, v) {
+            const table = createElement('table', 'detail-table');
+            const rows = [
+                [LABELS.field_severity, v.severity],
+                ['POC ID', v.template_id],
+                [LABELS.field_target, v.matched_at],
+                [LABELS.field_poc_path, v.template_path],
+                [LABELS.field_found_time, v.timestamp],
+            ];
+            rows.forEach(([label, value], row) => {
+                const tr = document.createElement('tr');
+                tr.appendChild(createElement('th', null, label));
+                const td = createElement('td');
+                if (row === 2 && /^https?:\/\//i.test(value)) {
+                    const link = createElement('a', null, value);
+                    link.href = value;
+                    link.target = '_blank';
+                    td.appendChild(link);
+                } else {
+                    td.textContent = value;
+                }
+                tr.appendChild(td);
+                table.appendChild(tr);
+            });
+            container.appendChild(table);
+
+            if (v.steps.length) {
+                const section = createElement('div', 'code-section');
+                section.appendChild(createElement('h4', null, LABELS.poc_chain_header.replace('{count}', v.steps.length)));
+                v.steps.forEach((content, i) => {
+                    const step = createElement('div', 'poc-step');
+                    step.appendChild(createElement('strong', null, LABELS.step_format.replace('{step}', i + 1)));
+                    step.appendChild(copyButton(content));
+                    step.appendChild(createElement('pre', null, content));
+                    section.appendChild(step);
+                });
+                container.appendChild(section);
+            }
+            if (v.request) {
+                container.appendChild(codeSection(
+                    LABELS.trigger_request + ' (' + LABELS.nuclei_record + ') ',
+                    '(' + LABELS.trigger_request_note + ')', cleanText(v.request), v.request));
+            }
+            if (v.curl) {
+                container.appendChild(codeSection(LABELS.curl_command + ' ', null, cleanText(v.curl), v.curl));
+            }
+            if (v.response) {
+                container.appendChild(codeSection(LABELS.response_data, null, cleanText(v.response), null));
+            }
+        }
+
+        // 首次展开时才解压并渲染详情
+        async function ensureDetail(idx) {
+            const detail = document.getElementById('vuln-' + idx);
+            if (detail.dataset.rendered) return detail;
+            detail.dataset.rendered = '1';
+            try {
+                const chunk = await loadChunk(Math.floor((idx - 1) / REPORT.chunkSize));
+                renderDetail(detail, chunk[(idx - 1) % REPORT.chunkSize]);
+            } catch (e) {
+                console.error('Failed to load vulnerability detail', e);
+                detail.appendChild(createElement('p', 'detail-error', LABELS.detail_unavailable));
+            }
+            return detail;
+        }
+
+        function setExpanded(idx, expanded) {
+            document.getElementById('vuln-' + idx).style.display = expanded ? 'block' : 'none';
+            document.getElementById('toggle-' + idx).classList.toggle('expanded', expanded);
+        }
+
+        async function toggleVuln(idx) {
+            const detail = document.getElementById('vuln-' + idx);
+            if (detail.style.display === 'none') {
+                await ensureDetail(idx);
+                setExpanded(idx, true);
+            } else {
+                setExpanded(idx, false);
+            }
+        }
+
         let allExpanded = false;
-        function toggleAll() {{
-            const details = document.querySelectorAll('.vuln-detail');
-            const toggles = document.querySelectorAll('.vuln-toggle');
-            
+        async function toggleAll() {
             allExpanded = !allExpanded;
-            
-            details.forEach(detail => {{
-                detail.style.display = allExpanded ? 'block' : 'none';
-            }});
-            
-            toggles.forEach(toggle => {{
-                if (allExpanded) {{
-                    toggle.classList.add('expanded');
-                }} else {{
-                    toggle.classList.remove('expanded');
-                }}
-            }});
-        }}
-        
-        // Decode Base64 and copy
-        function copyBase64Content(base64, btnId) {{
-            try {{
-                const binaryString = window.atob(base64);
-                const bytes = new Uint8Array(binaryString.length);
-                for (let i = 0; i < binaryString.length; i++) {{
-                    bytes[i] = binaryString.charCodeAt(i);
-                }}
-                const text = new TextDecoder().decode(bytes);
-                copyToClipboard(text, btnId);
-            }} catch (e) {{
-                console.error('Base64 decoding failed', e);
-                alert('{labels['copy_failed_base64']}');
-            }}
-        }}
-
-        // Copy content to clipboard for request steps
-        function copyToClipboard(text, btnId) {{
-            navigator.clipboard.writeText(text).then(() => {{
-                const btn = document.getElementById(btnId);
+            for (let idx = 1; idx <= REPORT.total; idx++) {
+                if (allExpanded) await ensureDetail(idx);
+                setExpanded(idx, allExpanded);
+            }
+        }
+
+        // Copy content to clipboard
+        function copyToClipboard(text, btn) {
+            navigator.clipboard.writeText(text).then(() => {
                 const originalText = btn.textContent;
-                btn.textContent = '{labels['copied']}';
+                btn.textContent = LABELS.copied;
                 btn.classList.add('copied');
-                setTimeout(() => {{
+                setTimeout(() => {
                     btn.textContent = originalText;
                     btn.classList.remove('copied');
-                }}, 2000);
-            }}).catch(err => {{
+                }, 2000);
+            }).catch(err => {
                 // Fallback: use the legacy copy method
                 const textarea = document.createElement('textarea');
                 textarea.value = text;
@@ -1361,132 +959,456 @@ def export_to_html(scan_record: dict, vulns: list, file_path: str) -> bool:
                 textarea.select();
                 document.execCommand('copy');
                 document.body.removeChild(textarea);
-                const btn = document.getElementById(btnId);
-                btn.textContent = '{labels['copied']}';
-                setTimeout(() => {{ btn.textContent = '{labels['copy']}'; }}, 2000);
-            }});
-        }}
-        
-        // Copy raw content from the pre[data-raw] attribute
-        function copyPreContent(btn) {{
-            const pre = btn.closest('.code-section').querySelector('pre');
-            let rawContent = pre.getAttribute('data-raw');
-            if (rawContent) {{
-                // Decode HTML entities
-                rawContent = rawContent.replace(/&#10;/g, '\\n').replace(/&#13;/g, '\\r').replace(/&quot;/g, '"');
-            }} else {{
-                rawContent = pre.textContent;
-            }}
-            navigator.clipboard.writeText(rawContent).then(() => {{
-                const originalText = btn.textContent;
-                btn.textContent = '{labels['copied']}';
-                btn.classList.add('copied');
-                setTimeout(() => {{
-                    btn.textContent = originalText;
-                    btn.classList.remove('copied');
-                }}, 2000);
-            }}).catch(err => {{
-                const textarea = document.createElement('textarea');
-                textarea.value = rawContent;
-                document.body.appendChild(textarea);
-                textarea.select();
-                document.execCommand('copy');
-                document.body.removeChild(textarea);
-                btn.textContent = '{labels['copied']}';
-                setTimeout(() => {{ btn.textContent = '{labels['copy']}'; }}, 2000);
-            }});
-        }}
-        
+                btn.textContent = LABELS.copied;
+                setTimeout(() => { btn.textContent = LABELS.copy; }, 2000);
+            });
+        }
+
         // Initialize charts
-        function initCharts() {{
+        function initCharts() {
+            if (!window.Chart) return;
+
             // Severity data
-            const severityData = {{
-                labels: {severity_chart_labels},
-                datasets: [{{
-                    data: [{severity_count['critical']}, {severity_count['high']}, {severity_count['medium']}, {severity_count['low']}, {severity_count['info']}],
+            const severityData = {
+                labels: REPORT.severityLabels,
+                datasets: [{
+                    data: REPORT.severityValues,
                     backgroundColor: ['#9b59b6', '#e74c3c', '#f39c12', '#3498db', '#1abc9c'],
                     borderWidth: 0
-                }}]
-            }};
-            
+                }]
+            };
+
             // Vulnerability type data
-            const typeData = {{
-                labels: {type_chart_labels},
-                datasets: [{{
-                    data: {type_chart_values},
+            const typeData = {
+                labels: REPORT.typeLabels,
+                datasets: [{
+                    data: REPORT.typeValues,
                     backgroundColor: [
-                        '#e74c3c', '#f39c12', '#27ae60', '#3498db', 
+                        '#e74c3c', '#f39c12', '#27ae60', '#3498db',
                         '#9b59b6', '#e67e22', '#1abc9c', '#7f8c8d'
                     ],
                     borderWidth: 0
-                }}]
-            }};
-            
+                }]
+            };
+
             // Shared chart options
-            const commonOptions = {{
+            const commonOptions = {
                 responsive: true,
                 maintainAspectRatio: false,
-                plugins: {{
-                    legend: {{
+                plugins: {
+                    legend: {
                         position: 'right',
-                        labels: {{
+                        labels: {
                             color: '#e0e0e0',
-                            font: {{ size: 12 }}
-                        }}
-                    }}
-                }}
-            }};
-            
+                            font: { size: 12 }
+                        }
+                    }
+                }
+            };
+
             // Render severity chart
             const ctxSev = document.getElementById('severityChart');
-            if (ctxSev) {{
-                new Chart(ctxSev, {{
+            if (ctxSev) {
+                new Chart(ctxSev, {
                     type: 'doughnut',
                     data: severityData,
-                    options: {{
+                    options: {
                         ...commonOptions,
                         cutout: '60%'
-                    }}
-                }});
-            }}
-            
+                    }
+                });
+            }
+
             // Render type chart
             const ctxType = document.getElementById('typeChart');
-            if (ctxType) {{
-                new Chart(ctxType, {{
+            if (ctxType) {
+                new Chart(ctxType, {
                     type: 'pie',
                     data: typeData,
                     options: commonOptions
-                }});
-            }}
-        }}
-        
+                });
+            }
+        }
+
         // Initialize after page load
         document.addEventListener('DOMContentLoaded', initCharts);
-    </script>
-</body>
-</html>
-'''
-
-        # 将 Chart.js 源码内联替换占位符
-        if chart_js_code:
-            html_content = html_content.replace(
-                '<!-- CHART_JS_INLINE -->',
-                f'<script>{chart_js_code}</script>'
-            )
-        else:
-            # 降级：如果本地文件不存在，使用多个 CDN 备选
-            html_content = html_content.replace(
-                '<!-- CHART_JS_INLINE -->',
-                '<script src="https://cdn.bootcdn.net/ajax/libs/Chart.js/4.4.1/chart.umd.min.js" defer></script>\n'
-                '    <script>window.Chart || document.write(\'<script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js" defer><\\/script>\')</script>'
-            )
+"""
+
+
+def _write_html_head(f, scan_record: dict, labels: dict, delta: bool, severity_count: dict, total: int):
+    """写入报告头部：样式、Chart.js、标题、统计卡片与图表容器"""
+    scan_time = scan_record.get('scan_time', '')[:19] if scan_record else datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    f.write(f'''<!DOCTYPE html>
+<html lang="{labels['html_lang']}">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{labels['report_title']} - {escape(scan_time)}</title>
+''')
+    # 内联本地 Chart.js，避免依赖 CDN；本地文件不存在时降级为多个 CDN 备选
+    chart_js_code = _load_chart_js()
+    if chart_js_code:
+        f.write('    <script>')
+        f.write(chart_js_code)
+        f.write('</script>\n')
+    else:
+        f.write('    <script src="https://cdn.bootcdn.net/ajax/libs/Chart.js/4.4.1/chart.umd.min.js" defer></script>\n'
+                '    <script>window.Chart || document.write(\'<script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js" defer><\\/script>\')</script>\n')
+    f.write('    <style>\n')
+    f.write(_HTML_STYLE)
+    f.write('    </style>\n</head>\n')
+
+    stat_cards = ''.join(
+        f'''
+            <div class="stat-card {sev}">
+                <div class="stat-value">{severity_count[sev]}</div>
+                <div class="stat-label">{labels['severity'][sev]}</div>
+            </div>'''
+        for sev in ('critical', 'high', 'medium', 'low', 'info')
+    )
+    f.write(f'''<body>
+    <div class="container">
+        <!-- Report header -->
+        <div class="report-header">
+            <h1 class="report-title">🔒 {labels['report_title']}{' - ' + labels['delta_title'] if delta else ''}</h1>
+            <p class="report-subtitle">{labels['scan_time']}: {escape(scan_time)} | {labels['target_count']}: {scan_record.get('target_count', 0) if scan_record else 0} | {labels['poc_count']}: {scan_record.get('poc_count', 0) if scan_record else 0}</p>
+        </div>
+        
+        <!-- Statistics cards -->
+        <div class="stats-row">
+            <div class="stat-card total">
+                <div class="stat-value">{total}</div>
+                <div class="stat-label">{labels['total_vulns']}</div>
+            </div>{stat_cards}
+        </div>
+        
+        <!-- Charts -->
+        <div class="charts-row">
+            <div class="chart-card">
+                <h4>{labels['severity_distribution']}</h4>
+                <div class="chart-container">
+                    <canvas id="severityChart"></canvas>
+                </div>
+            </div>
+            <div class="chart-card">
+                <h4>{labels['type_distribution']}</h4>
+                <div class="chart-container">
+                    <canvas id="typeChart"></canvas>
+                </div>
+            </div>
+        </div>
+        
+        <!-- Vulnerability list -->
+        <div class="vuln-list">
+            <h3>{labels['vuln_detail_list']}</h3>
+''')
+
+
+def _write_html_tail(f, labels: dict, severity_count: dict, type_count: dict, total: int):
+    """写入报告尾部：页脚与渲染脚本"""
+    script_labels = {key: labels[key] for key in (
+        'copy', 'copied', 'step_format', 'poc_chain_header', 'trigger_request', 'nuclei_record',
+        'trigger_request_note', 'curl_command', 'response_data', 'field_severity', 'field_target',
+        'field_poc_path', 'field_found_time', 'detail_unavailable',
+    )}
+    report = {
+        'total': total,
+        'chunkSize': HTML_CHUNK_SIZE,
+        'severityLabels': [labels['severity'][sev] for sev in ('critical', 'high', 'medium', 'low', 'info')],
+        'severityValues': [severity_count[sev] for sev in ('critical', 'high', 'medium', 'low', 'info')],
+        'typeLabels': list(type_count.keys()),
+        'typeValues': list(type_count.values()),
+    }
+    f.write(f'''        </div>
+        
+        <!-- Footer -->
+        <div class="report-footer">
+            <p>{labels['footer']} | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+        </div>
+    </div>
+    
+    <script>
+''')
+    f.write(_HTML_SCRIPT.replace('__LABELS__', _json_for_script(script_labels))
+            .replace('__REPORT__', _json_for_script(report)))
+    f.write('    </script>\n</body>\n</html>\n')
 
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+
+def export_to_html(scan_record: dict, vulns, file_path: str, delta: bool = False) -> bool:
+    """
+    将扫描结果导出为美观的 HTML 报告（流式写入）
+    特点：单条漏洞默认折叠；详情按块压缩内嵌在报告中，点击展开时才在浏览器中解压渲染
+    
+    参数:
+        scan_record: 扫描记录字典
+        vulns: 漏洞结果（列表或 ScanHistory.iter_scan_vulns 等生成器）
+        file_path: 导出文件路径
+        delta: 差异模式，标题注明并为每条漏洞标记 new / resolved
+        
+    返回:
+        是否导出成功
+    """
+    try:
+        labels = _export_labels()
+        renderer = RequestChainRenderer(labels)
+
+        severity_count = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0, 'info': 0, 'unknown': 0}
+        type_count = {
+            'RCE': 0,
+            'SQLi': 0,
+            'XSS': 0,
+            'SSRF': 0,
+            'LFI': 0,
+            labels['type_unauthorized']: 0,
+            labels['type_info_disclosure']: 0,
+            labels['type_other']: 0,
+        }
+        total = 0
+
+        # 漏洞列表与详情数据块先流式写入临时文件，统计完成后接在报告头部之后
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as body:
+            chunk = []
+            for total, v in enumerate(vulns, 1):
+                sev = (v.get('severity') or 'unknown').lower()
+                severity_count[sev if sev in severity_count else 'unknown'] += 1
+                type_count[_vuln_type(v, labels)] += 1
+
+                body.write(_html_vuln_item(total, v, labels, delta))
+                chunk.append(_html_finding(v, labels, renderer))
+                if len(chunk) >= HTML_CHUNK_SIZE:
+                    body.write(_html_data_island((total - 1) // HTML_CHUNK_SIZE, chunk))
+                    chunk = []
+            if chunk:
+                body.write(_html_data_island((total - 1) // HTML_CHUNK_SIZE, chunk))
+
+            with open(file_path, 'w', encoding='utf-8') as f:
+                _write_html_head(f, scan_record, labels, delta, severity_count, total)
+                if total:
+                    f.write(f'            <button class="btn-expand-all" onclick="toggleAll()">{labels["toggle_all"]}</button>\n')
+                    body.seek(0)
+                    shutil.copyfileobj(body, f)
+                else:
+                    f.write(f'            <div class="no-vulns"><div class="no-vulns-icon">✅</div><p>{labels["no_vulns"]}</p></div>\n')
+                _write_html_tail(f, labels, severity_count, type_count, total)
 
         return True
     except Exception as e:
         print(f"[!] {tr('export.html_failed', error=str(e))}")
         return False
 
+
+# 机器可读导出（JSONL.gz / Parquet / SQLite）共用的列，顺序与类型保持稳定，新列只能追加在末尾
+EXPORT_COLUMNS = (
+    ('scan_id', 'INTEGER'),
+    ('scan_time', 'TEXT'),
+    ('finding_id', 'INTEGER'),
+    ('template_id', 'TEXT'),
+    ('template_name', 'TEXT'),
+    ('template_path', 'TEXT'),
+    ('host', 'TEXT'),
+    ('matched_at', 'TEXT'),
+    ('severity', 'TEXT'),
+    ('tags', 'TEXT'),            # JSON 数组
+    ('delta', 'TEXT'),           # new / recurring / resolved
+    ('timestamp', 'TEXT'),
+    ('request', 'TEXT'),
+    ('response', 'TEXT'),
+    ('curl_command', 'TEXT'),
+)
+# Parquet / SQLite 每批写入的行数
+EXPORT_BATCH_SIZE = 5000
+
+
+def _export_record(v: dict, scan_time: str) -> dict:
+    """将一条漏洞结果整理为 EXPORT_COLUMNS 对应的记录（旧数据缺少的字段从原始结果补齐）"""
+    raw_data = {}
+    try:
+        if v.get('raw_json'):
+            raw_data = json.loads(v['raw_json'])
+    except Exception:
+        pass
+    info = raw_data.get('info') or {}
+
+    tags = v.get('tags')
+    if tags is None:
+        tags = info.get('tags') or []
+        if isinstance(tags, str):
+            tags = [t.strip() for t in tags.split(',') if t.strip()]
+        tags = json.dumps(tags, ensure_ascii=False)
+
+    return {
+        'scan_id': v.get('scan_id'),
+        'scan_time': scan_time,
+        'finding_id': v.get('finding_id'),
+        'template_id': v.get('template_id') or raw_data.get('template-id', ''),
+        'template_name': v.get('name') or info.get('name', ''),
+        'template_path': v.get('template_path') or raw_data.get('template-path', ''),
+        'host': v.get('host') or raw_data.get('host', ''),
+        'matched_at': v.get('matched_at') or raw_data.get('matched-at', ''),
+        'severity': (v.get('severity') or info.get('severity') or 'unknown').lower(),
+        'tags': tags,
+        'delta': v.get('delta'),
+        'timestamp': v.get('timestamp') or raw_data.get('timestamp', ''),
+        'request': raw_data.get('request', ''),
+        'response': raw_data.get('response', ''),
+        'curl_command': raw_data.get('curl-command', ''),
+    }
+
+
+def _iter_export_records(scan_record: dict, vulns):
+    scan_time = str((scan_record or {}).get('scan_time') or '')
+    for v in vulns:
+        yield _export_record(v, scan_time)
+
+
+def parquet_available() -> bool:
+    """Parquet 导出依赖可选的 pyarrow"""
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def export_to_jsonl_gz(scan_record: dict, vulns, file_path: str) -> bool:
+    """
+    将扫描结果导出为 gzip 压缩的 JSON Lines（每行一条记录，字段见 EXPORT_COLUMNS）
+    
+    参数:
+        scan_record: 扫描记录字典
+        vulns: 漏洞结果（列表或 ScanHistory.iter_scan_vulns 等生成器）
+        file_path: 导出文件路径
+        
+    返回:
+        是否导出成功
+    """
+    try:
+        with gzip.open(file_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            for record in _iter_export_records(scan_record, vulns):
+                record['tags'] = json.loads(record['tags'] or '[]')
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+                f.write('\n')
+        return True
+    except Exception as e:
+        print(f"[!] {tr('export.data_failed', format='JSONL', error=str(e))}")
+        return False
+
+
+def export_to_parquet(scan_record: dict, vulns, file_path: str) -> bool:
+    """
+    将扫描结果导出为 Parquet（需要 pyarrow；按批写入 row group，列见 EXPORT_COLUMNS，tags 为字符串列表）
+    
+    参数:
+        scan_record: 扫描记录字典
+        vulns: 漏洞结果（列表或 ScanHistory.iter_scan_vulns 等生成器）
+        file_path: 导出文件路径
+        
+    返回:
+        是否导出成功
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print(f"[!] {tr('export.parquet_unavailable')}")
+        return False
+
+    try:
+        types = {'INTEGER': pa.int64(), 'TEXT': pa.string()}
+        schema = pa.schema([
+            (name, pa.list_(pa.string()) if name == 'tags' else types[sql_type])
+            for name, sql_type in EXPORT_COLUMNS
+        ])
+
+        def _write(writer, batch):
+            for record in batch:
+                record['tags'] = json.loads(record['tags'] or '[]')
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+        with pq.ParquetWriter(file_path, schema, compression='zstd') as writer:
+            batch = []
+            for record in _iter_export_records(scan_record, vulns):
+                batch.append(record)
+                if len(batch) >= EXPORT_BATCH_SIZE:
+                    _write(writer, batch)
+                    batch = []
+            if batch:
+                _write(writer, batch)
+        return True
+    except Exception as e:
+        print(f"[!] {tr('export.data_failed', format='Parquet', error=str(e))}")
+        return False
+
+
+def export_to_sqlite(scan_record: dict, vulns, file_path: str) -> bool:
+    """
+    将扫描结果导出为独立的 SQLite 文件：scans 表保存扫描记录，findings 表的列见 EXPORT_COLUMNS
+    先写入临时文件，完成后再替换目标文件
+    
+    参数:
+        scan_record: 扫描记录字典
+        vulns: 漏洞结果（列表或 ScanHistory.iter_scan_vulns 等生成器）
+        file_path: 导出文件路径
+        
+    返回:
+        是否导出成功
+    """
+    import sqlite3
+
+    tmp_path = f"{file_path}.tmp"
+    try:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("""
+                CREATE TABLE scans (
+                    id INTEGER PRIMARY KEY,
+                    scan_time TEXT,
+                    target_count INTEGER,
+                    poc_count INTEGER,
+                    vuln_count INTEGER,
+                    duration_seconds REAL,
+                    status TEXT
+                )
+            """)
+            columns = ', '.join(f"{name} {sql_type}" for name, sql_type in EXPORT_COLUMNS)
+            conn.execute(f"CREATE TABLE findings (id INTEGER PRIMARY KEY, {columns})")
+
+            if scan_record:
+                conn.execute(
+                    "INSERT INTO scans VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    tuple(scan_record.get(key) for key in (
+                        'id', 'scan_time', 'target_count', 'poc_count', 'vuln_count', 'duration_seconds', 'status'
+                    ))
+                )
+
+            names = [name for name, _ in EXPORT_COLUMNS]
+            insert_sql = (f"INSERT INTO findings ({', '.join(names)}) "
+                          f"VALUES ({', '.join('?' for _ in names)})")
+            batch = []
+            for record in _iter_export_records(scan_record, vulns):
+                batch.append(tuple(record[name] for name in names))
+                if len(batch) >= EXPORT_BATCH_SIZE:
+                    conn.executemany(insert_sql, batch)
+                    batch = []
+            if batch:
+                conn.executemany(insert_sql, batch)
+
+            # 写完数据后再建索引，比逐行维护索引快
+            for column in ('template_id', 'host', 'severity'):
+                conn.execute(f"CREATE INDEX idx_findings_{column} ON findings({column})")
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, file_path)
+        return True
+    except Exception as e:
+        print(f"[!] {tr('export.data_failed', format='SQLite', error=str(e))}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
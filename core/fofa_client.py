@@ -2,9 +2,21 @@
 FOFA API 客户端 - 支持第三方 API 接口
 """
 import base64
+from typing import Dict, List
+
 import requests
 from PyQt5.QtCore import QThread, pyqtSignal
 from i18n import tr
+from .search_engine_base import SearchEngineBase, SearchResult, register_engine
+
+# 并发采集时 FOFA 每页请求的结果数
+FOFA_PAGE_SIZE = 1000
+# 请求的返回字段
+FOFA_FIELDS = "host,ip,port,title,protocol"
+
+
+class FofaRequestError(ValueError):
+    """网络请求失败（可重试）"""
 
 
 class FofaSearchThread(QThread):
@@ -24,14 +36,25 @@ class FofaSearchThread(QThread):
         self.page_size = page_size
     
     def run(self):
+        from core.asset_collector import AssetCollector, collection_error
+
         try:
             self.progress_signal.emit(tr("search.fofa.connecting"))
-            client = FofaClient(self.api_url, self.email, self.api_key)
-            results = client.search(self.query, self.page_size)
-            self.result_signal.emit(results)
+            engine = FofaEngine(self.api_key, self.api_url, email=self.email)
+            # 超过单页上限时按页并发请求，结果按目标去重
+            collector = AssetCollector({engine.name: engine}, self.query,
+                                       page_size=FOFA_PAGE_SIZE, max_results=self.page_size)
+            assets = collector.collect(on_progress=self._emit_progress)
+            error = collection_error(collector)
+            if not assets and error:
+                raise ValueError(error)
+            self.result_signal.emit([asset.result.extra['row'] for asset in assets])
         except Exception as e:
             self.error_signal.emit(tr("search.search_failed_with_error", error=str(e)))
 
+    def _emit_progress(self, done, total):
+        self.progress_signal.emit(tr("search.collect_progress", done=done, total=total))
+
 
 class FofaClient:
     """
@@ -57,6 +80,13 @@ class FofaClient:
         :param size: 返回结果数量
         :return: 搜索结果列表 [{"host": "xxx", "ip": "xxx", "port": "xxx", "title": "xxx"}, ...]
         """
+        return self.search_page(query, 1, size)[1]
+
+    def search_page(self, query: str, page: int = 1, size: int = 100) -> tuple:
+        """
+        请求一页 FOFA 结果
+        :return: (结果总数, 本页结果列表)；接口未返回总数时为 None
+        """
         if not self.api_url or not self.api_key:
             raise ValueError(tr("search.fofa.config_required"))
         
@@ -66,8 +96,9 @@ class FofaClient:
         # 构建请求参数（兼容官方和大多数第三方 API）
         params = {
             "qbase64": query_b64,
+            "page": page,
             "size": size,
-            "fields": "host,ip,port,title,protocol"
+            "fields": FOFA_FIELDS
         }
         
         # 根据 API 类型添加认证参数
@@ -117,10 +148,11 @@ class FofaClient:
                 
                 results.append(result)
             
-            return results
+            total = data.get("size")
+            return (int(total) if isinstance(total, (int, str)) and str(total).isdigit() else None), results
             
         except requests.RequestException as e:
-            raise ValueError(tr("search.network_request_failed", error=str(e)))
+            raise FofaRequestError(tr("search.network_request_failed", error=str(e)))
         except Exception as e:
             raise ValueError(tr("search.parse_response_failed", error=str(e)))
     
@@ -135,3 +167,57 @@ class FofaClient:
             return True
         except:
             return False
+
+
+class FofaEngine(SearchEngineBase):
+    """FOFA 搜索引擎（供多引擎并发采集使用，结果的原始字段保存在 extra['row']）"""
+
+    name = "fofa"
+    display_name = "FOFA"
+    max_page_size = 10000
+    rate_limit = 2.0
+    result_fields = FOFA_FIELDS
+
+    def search(self, query: str, page: int = 1, page_size: int = 100) -> Dict:
+        client = FofaClient(self.api_url, self.extra_config.get('email', ''), self.api_key)
+        try:
+            total, rows = client.search_page(query, page, page_size)
+        except FofaRequestError as e:
+            return {'success': False, 'error': str(e), 'retryable': True}
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+
+        results = []
+        for row in rows:
+            host = row.get("host", "")
+            port = str(row.get("port", ""))
+            results.append(SearchResult(
+                ip=row.get("ip", ""),
+                port=int(port) if port.isdigit() else 0,
+                # FOFA 的 host 对 HTTPS 资产带协议，其余为 host[:port]
+                url=host if '://' in host else (f"http://{host}" if host else ""),
+                title=row.get("title", ""),
+                protocol=row.get("protocol", ""),
+                extra={'row': row},
+            ))
+        return {'success': True, 'total': total, 'results': results}
+
+    def test_connection(self) -> Dict:
+        result = self.search('port="80"', page=1, page_size=1)
+        if result.get('success'):
+            return {
+                'success': True,
+                'message': tr("search.connection_success_with_total", total=result.get('total') or 0),
+            }
+        return {'success': False, 'message': result.get('error', tr("search.connection_failed"))}
+
+    def get_config_fields(self) -> List[Dict]:
+        return [
+            {'name': 'api_url', 'label': 'API URL', 'type': 'text', 'required': True},
+            {'name': 'email', 'label': 'Email', 'type': 'text', 'required': False},
+            {'name': 'api_key', 'label': 'API Key', 'type': 'password', 'required': True},
+        ]
+
+
+# 注册引擎
+register_engine(FofaEngine)
@@ -5,10 +5,57 @@
 import sqlite3
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 
+from core.db import get_database
+from core.logger import get_logger
 from core.paths import database_path
 
+logger = get_logger("history_manager")
+
+
+def _migrate_v1(conn):
+    """FOFA / AI / 扫描历史表"""
+    # FOFA 搜索历史表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fofa_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            query TEXT NOT NULL,
+            result_count INTEGER DEFAULT 0,
+            search_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            results TEXT
+        )
+    ''')
+
+    # AI 生成历史表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ai_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_type TEXT NOT NULL,
+            input_text TEXT NOT NULL,
+            output_text TEXT,
+            model_name TEXT,
+            create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 旧版扫描历史表（现由 ScanHistory 统一存储，旧记录在启动时导入后删除）
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scan_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target_count INTEGER,
+            poc_count INTEGER,
+            duration REAL,
+            vuln_count INTEGER,
+            status TEXT,
+            scan_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            results TEXT
+        )
+    ''')
+
+
+_MIGRATIONS = [_migrate_v1]
+
 
 class HistoryManager:
     """通用历史记录管理器"""
@@ -17,42 +64,48 @@ class HistoryManager:
         if db_path is None:
             db_path = str(database_path("history.db"))
         self.db_path = db_path
+        self._db = get_database(db_path)
         self.init_db()
 
     def init_db(self):
         """初始化数据库"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            # FOFA 搜索历史表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS fofa_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    query TEXT NOT NULL,
-                    result_count INTEGER DEFAULT 0,
-                    search_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    results TEXT
-                )
-            ''')
-
-            # AI 生成历史表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ai_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    task_type TEXT NOT NULL,
-                    input_text TEXT NOT NULL,
-                    output_text TEXT,
-                    model_name TEXT,
-                    create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            conn.commit()
+        self._db.migrate(_MIGRATIONS)
+        self._import_legacy_scans()
+
+    def _import_legacy_scans(self):
+        """一次性把旧版 scan_history 表中的记录导入 ScanHistory，每条导入后从旧表删除（中断后下次启动继续）"""
+        try:
+            if self._db.query_one('SELECT 1 FROM scan_history LIMIT 1') is None:
+                return
+            from core.scan_history import get_scan_history
+            history = get_scan_history()
+            imported = 0
+            while True:
+                rows = self._db.query('SELECT * FROM scan_history ORDER BY id LIMIT 50')
+                if not rows:
+                    break
+                for row in rows:
+                    try:
+                        results = json.loads(row['results'] or '[]')
+                    except json.JSONDecodeError:
+                        results = []
+                    results = [result for result in results if isinstance(result, dict)]
+                    scan_id = history.add_scan_record(
+                        row['target_count'] or 0, row['poc_count'] or 0, row['vuln_count'] or 0,
+                        row['duration'] or 0, targets=[], pocs=[], config={},
+                        status=row['status'] or 'completed', scan_time=row['scan_time'])
+                    history.add_vuln_results(scan_id, results,
+                                             recorded_at=[_local_time(row['scan_time'])] * len(results))
+                    self._db.execute('DELETE FROM scan_history WHERE id = ?', (row['id'],))
+                    imported += 1
+            logger.info(f"Imported {imported} legacy scan history records")
+        except Exception as e:
+            logger.error(f"Import legacy scan history failed: {e}")
 
     # ========== FOFA 历史 ==========
     def add_fofa_history(self, query: str, result_count: int = 0, results: list = None) -> int:
         """添加 FOFA 搜索历史"""
-        with sqlite3.connect(self.db_path) as conn:
+        def _upsert(conn):
             cursor = conn.cursor()
 
             # 检查是否已存在相同查询，如果存在则更新
@@ -73,13 +126,13 @@ class HistoryManager:
                 ''', (query, result_count, json.dumps(results if results else [], ensure_ascii=False)))
                 record_id = cursor.lastrowid
 
-            conn.commit()
             return record_id
 
+        return self._db.transaction(_upsert)
+
     def get_fofa_history(self, limit: int = 20) -> list:
         """获取 FOFA 搜索历史"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._db.reader() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -93,7 +146,7 @@ class HistoryManager:
 
     def get_fofa_results(self, history_id: int) -> list:
         """获取 FOFA 历史记录的结果"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._db.reader() as conn:
             cursor = conn.cursor()
 
             cursor.execute('SELECT results FROM fofa_history WHERE id = ?', (history_id,))
@@ -108,38 +161,24 @@ class HistoryManager:
 
     def delete_fofa_history(self, history_id: int):
         """删除 FOFA 历史记录"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM fofa_history WHERE id = ?', (history_id,))
-            conn.commit()
+        self._db.execute('DELETE FROM fofa_history WHERE id = ?', (history_id,))
 
     def clear_fofa_history(self):
         """清空 FOFA 历史"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM fofa_history')
-            conn.commit()
-            cursor.execute('VACUUM')
+        self._db.execute('DELETE FROM fofa_history')
+        self._db.vacuum()
 
     # ========== AI 历史 ==========
     def add_ai_history(self, task_type: str, input_text: str, output_text: str, model_name: str = "") -> int:
         """添加 AI 生成历史"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                INSERT INTO ai_history (task_type, input_text, output_text, model_name)
-                VALUES (?, ?, ?, ?)
-            ''', (task_type, input_text, output_text, model_name))
-
-            record_id = cursor.lastrowid
-            conn.commit()
-            return record_id
+        return self._db.execute('''
+            INSERT INTO ai_history (task_type, input_text, output_text, model_name)
+            VALUES (?, ?, ?, ?)
+        ''', (task_type, input_text, output_text, model_name))
 
     def get_ai_history(self, task_type: str = None, limit: int = 20) -> list:
         """获取 AI 生成历史"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._db.reader() as conn:
             cursor = conn.cursor()
 
             if task_type:
@@ -161,100 +200,71 @@ class HistoryManager:
 
     def delete_ai_history(self, history_id: int):
         """删除 AI 历史记录"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM ai_history WHERE id = ?', (history_id,))
-            conn.commit()
+        self._db.execute('DELETE FROM ai_history WHERE id = ?', (history_id,))
 
     def clear_ai_history(self):
         """清空 AI 历史"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM ai_history')
-            conn.commit()
-            cursor.execute('VACUUM')
+        self._db.execute('DELETE FROM ai_history')
+        self._db.vacuum()
 
     # ========== 扫描历史 ==========
     def init_scan_history(self):
-        """初始化扫描历史表"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS scan_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    target_count INTEGER,
-                    poc_count INTEGER,
-                    duration REAL,
-                    vuln_count INTEGER,
-                    status TEXT,
-                    scan_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    results TEXT
-                )
-            ''')
-            conn.commit()
+        """初始化扫描历史表（已并入 init_db 的迁移，保留以兼容旧调用）"""
+        self._db.migrate(_MIGRATIONS)
 
     def add_scan_history(self, target_count: int, poc_count: int, duration: float,
                          vuln_count: int, status: str, results: list = None) -> int:
-        """添加扫描历史记录"""
-        # 确保表存在
-        self.init_scan_history()
-
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                INSERT INTO scan_history (target_count, poc_count, duration, vuln_count, status, results)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (target_count, poc_count, duration, vuln_count, status,
-                  json.dumps(results if results else [], ensure_ascii=False)))
-
-            record_id = cursor.lastrowid
-            conn.commit()
-            return record_id
+        """添加扫描历史记录（写入 ScanHistory 与统一发现库，不再单独序列化结果）"""
+        from core.scan_history import get_scan_history
+        history = get_scan_history()
+        scan_id = history.add_scan_record(target_count, poc_count, vuln_count, duration,
+                                          targets=[], pocs=[], config={}, status=status)
+        history.add_vuln_results(scan_id, results or [])
+        return scan_id
 
     def get_scan_history(self, limit: int = 50) -> list:
         """获取扫描历史"""
-        # 确保表存在
-        self.init_scan_history()
-
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT * FROM scan_history
-                ORDER BY scan_time DESC
-                LIMIT ?
-            ''', (limit,))
-
-            results = [dict(row) for row in cursor.fetchall()]
-            return results
+        from core.scan_history import get_scan_history
+        return [
+            {
+                'id': record['id'],
+                'target_count': record['target_count'],
+                'poc_count': record['poc_count'],
+                'duration': record['duration_seconds'],
+                'vuln_count': record['vuln_count'],
+                'status': record['status'],
+                'scan_time': record['scan_time'],
+            }
+            for record in get_scan_history().get_recent_scans(limit)
+        ]
 
     def get_scan_results(self, history_id: int) -> list:
         """获取扫描历史的具体结果"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            cursor.execute('SELECT results FROM scan_history WHERE id = ?', (history_id,))
-            row = cursor.fetchone()
-
-            if row and row[0]:
-                try:
-                    return json.loads(row[0])
-                except json.JSONDecodeError:
-                    return []
-            return []
+        from core.scan_history import get_scan_history
+        results = []
+        for vuln in get_scan_history().get_scan_vulns(history_id):
+            try:
+                results.append(json.loads(vuln.get('raw_json') or '{}'))
+            except json.JSONDecodeError:
+                continue
+        return results
 
     def clear_scan_history(self):
-        """清空扫描历史"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            try:
-                cursor.execute('DELETE FROM scan_history')
-                conn.commit()
-                cursor.execute('VACUUM')
-            except sqlite3.Error:
-                pass
+        """清空旧版 scan_history 表（当前扫描历史由 ScanHistory.clear_history 清空）"""
+        try:
+            self._db.execute('DELETE FROM scan_history')
+            self._db.vacuum()
+        except sqlite3.Error:
+            pass
+
+
+def _local_time(utc_text) -> str:
+    """旧表 scan_time 为 SQLite CURRENT_TIMESTAMP（UTC），转为结果记录时间使用的本地 ISO 时间"""
+    try:
+        utc = datetime.strptime(str(utc_text)[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+        return utc.astimezone().replace(tzinfo=None).isoformat()
+    except ValueError:
+        return datetime.now().isoformat()
 
 
 # 全局单例
@@ -14,6 +14,7 @@ class HunterClient(SearchEngineBase):
     
     name = "hunter"
     display_name = tr("search.hunter.display_name")
+    rate_limit = 0.5
     
     def __init__(self, api_key: str = "", api_url: str = "", **kwargs):
         super().__init__(api_key, api_url, **kwargs)
@@ -90,9 +91,9 @@ class HunterClient(SearchEngineBase):
             }
             
         except requests.exceptions.Timeout:
-            return {'success': False, 'error': tr("search.hunter.request_timeout")}
+            return {'success': False, 'error': tr("search.hunter.request_timeout"), 'retryable': True}
         except requests.exceptions.RequestException as e:
-            return {'success': False, 'error': tr("search.hunter.request_failed", error=str(e))}
+            return {'success': False, 'error': tr("search.hunter.request_failed", error=str(e)), 'retryable': True}
         except Exception as e:
             return {'success': False, 'error': tr("search.hunter.parse_failed", error=str(e))}
     
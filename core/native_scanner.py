@@ -5,10 +5,12 @@ import re
 import urllib3
 import logging
 import threading
+import time
 from urllib.parse import urljoin
 from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from PyQt5.QtCore import QObject, pyqtSignal
 from i18n import tr
+from core.target_utils import count_targets, iter_targets
 
 # 禁用 SSL 警告（扫描工具通常需要访问自签名证书的目标）
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -23,8 +25,9 @@ class NativeScanner(QObject):
     progress_signal = pyqtSignal(int, int, str)
     finished_signal = pyqtSignal()
 
-    def __init__(self, targets, templates, config=None):
+    def __init__(self, targets, templates, config=None, telemetry=None):
         super().__init__()
+        self.telemetry = telemetry  # 可选 ScanTelemetry，记录每个模板/主机的请求与耗时
         self.targets = targets
         self.templates = templates  # List of YAML file paths
         self.config = config or {}
@@ -81,13 +84,13 @@ class NativeScanner(QObject):
             return not self._is_running
 
     def _expand_target_urls(self):
-        expanded_targets = []
-        for target in self.targets:
+        """惰性生成目标 URL（CIDR / IP 段 / 端口列表按需展开）"""
+        for target in iter_targets(self.targets):
             if not target.startswith(('http://', 'https://')):
-                expanded_targets.extend([f'http://{target}', f'https://{target}'])
+                yield f'http://{target}'
+                yield f'https://{target}'
             else:
-                expanded_targets.append(target)
-        return expanded_targets
+                yield target
 
     def run(self):
         """Execute the scan with bounded in-flight tasks."""
@@ -115,8 +118,7 @@ class NativeScanner(QObject):
             except Exception as e:
                 self.log_signal.emit(tr("scanner.template_parse_failed", path=t_path, error=e))
 
-        expanded_targets = self._expand_target_urls()
-        total_tasks = len(expanded_targets) * len(parsed_templates)
+        total_tasks = count_targets(self.targets) * len(parsed_templates)
         processed_count = 0
 
         def submit_pending_jobs(executor, jobs_iter, in_flight):
@@ -132,7 +134,7 @@ class NativeScanner(QObject):
 
         try:
             self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
-            jobs_iter = iter((base_url, tmpl) for base_url in expanded_targets for tmpl in parsed_templates)
+            jobs_iter = iter((base_url, tmpl) for base_url in self._expand_target_urls() for tmpl in parsed_templates)
             in_flight = set()
             submit_pending_jobs(self._executor, jobs_iter, in_flight)
 
@@ -189,7 +191,22 @@ class NativeScanner(QObject):
             pass
 
     def _scan_single_target(self, target, tmpl):
-        """扫描单个目标"""
+        """扫描单个目标，并向遥测汇总请求数、错误数与耗时"""
+        started = time.monotonic()
+        stats = {'requests': 0, 'errors': 0}
+        result = self._run_template(target, tmpl, stats)
+        if self.telemetry is not None and stats['requests']:
+            self.telemetry.record(
+                tmpl['path'], target,
+                requests=stats['requests'],
+                errors=stats['errors'],
+                matches=1 if result else 0,
+                duration_ms=(time.monotonic() - started) * 1000,
+            )
+        return result
+
+    def _run_template(self, target, tmpl, stats):
+        """对单个目标执行模板的全部请求"""
         if not self._is_running:
             return None
 
@@ -220,7 +237,10 @@ class NativeScanner(QObject):
                         if not self._is_running:
                             return None
                         
+                        stats['requests'] += 1
                         result = self._send_raw_request(target, raw_request)
+                        if not result:
+                            stats['errors'] += 1
                         if result:
                             last_response = result['response']
                             last_matched_url = result['url']
@@ -245,6 +265,7 @@ class NativeScanner(QObject):
                         if not self._session:
                             return None
                             
+                        stats['requests'] += 1
                         response = self._session.request(
                             method=method,
                             url=path,
@@ -291,7 +312,7 @@ class NativeScanner(QObject):
                 # 如果是因为 Session 关闭导致的错误，静默处理
                 if not self._is_running:
                     return None
-                pass
+                stats['errors'] += 1
         
         return None
     
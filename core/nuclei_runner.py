@@ -3,15 +3,21 @@ import json
 import os
 import tempfile
 import threading
+import time
 import datetime as import_datetime
 import traceback
 import platform
+import re
 import signal
 from PyQt5.QtCore import QThread, pyqtSignal
 from i18n import tr
 from core.oast_manager import cleanup_oast_plan, prepare_oast_scan
+from core.scan_stats import StatsSeries, parse_stats_event
+from core.scan_telemetry import ScanTelemetry, TraceLogReader
 from core.paths import external_path, log_dir
-from core.target_utils import dedupe_targets
+from core.template_scheduler import order_templates_by_value
+from core.template_validator import filter_broken_templates
+from core.target_utils import dedupe_targets, is_normalized, is_target_spec, iter_targets
 
 # 导入日志模块
 from core.logger import get_logger, log_exception
@@ -19,6 +25,10 @@ from core.logger import get_logger, log_exception
 # 获取模块日志器
 logger = get_logger("scanner")
 
+# nuclei 被中断时输出的 resume 文件路径，如 "[INF] Creating resume file: /root/.config/nuclei/resume-xxx.cfg"
+RESUME_FILE_PATTERN = re.compile(r"Creating resume file:\s*(\S+)")
+ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;]*m")
+
 def log_debug(msg):
     """文件调试日志"""
     try:
@@ -82,12 +92,21 @@ class NucleiScanThread(QThread):
     result_signal = pyqtSignal(dict)
     finished_signal = pyqtSignal()
     progress_signal = pyqtSignal(int, int, str)
+    stats_signal = pyqtSignal(dict)  # nuclei -stats 完整采样（含实时 RPS、错误率、ETA）
     
     # 分批阈值
     BATCH_THRESHOLD = 100
     BATCH_SIZE = 50
+    # 速率系数变化后重启 nuclei 的最小间隔（秒），重启需要重新加载模板
+    RATE_RESTART_INTERVAL = 30
+    # 随速率系数缩放的 nuclei 参数及其别名
+    RATE_FLAGS = {"-rl": ("-rl", "-rate-limit"), "-bs": ("-bs", "-bulk-size"), "-c": ("-c", "-concurrency")}
+    # nuclei 默认模板并发数
+    DEFAULT_CONCURRENCY = 25
+    # nuclei -stats 输出间隔（秒）
+    STATS_INTERVAL = 3
     
-    def __init__(self, targets, templates, rate_limit=150, bulk_size=25, custom_args=None, use_native_scanner=False, oast_config=None):
+    def __init__(self, targets, templates, rate_limit=150, bulk_size=25, custom_args=None, use_native_scanner=False, oast_config=None, trace_log=False):
         super().__init__()
         self.targets = self._normalize_targets(targets)
         self.templates = templates
@@ -96,6 +115,8 @@ class NucleiScanThread(QThread):
         self.custom_args = custom_args or []
         self.use_native_scanner = use_native_scanner
         self.oast_config = oast_config or {}
+        # 是否通过 nuclei -tlog 收集逐请求遥测（日志随请求数增长，默认关闭）
+        self.trace_log = trace_log
         self._is_running = True
         self._is_paused = False
         self._pause_event = threading.Event()
@@ -105,10 +126,25 @@ class NucleiScanThread(QThread):
         self.native_scanner = None
         self.scanned_target_index = 0
         self.current_batch_index = 0
+        # RateGovernor 设置的速率系数；与当前进程启动时的系数不同时，以缩放后的 -rl/-bs/-c 重启 nuclei 并续扫
+        self.rate_factor = 1.0
+        self._applied_rate_factor = 1.0
+        self._rate_base = None
+        self._rate_restart_pending = False
+        self._process_started_at = None
+        # 最近一次恢复挂起进程的时间（monotonic），用于识别受挂起影响的错误率采样
+        self._last_resumed_at = None
+        # 按模板/主机汇总的扫描遥测，扫描结束后由调用方写入 POCStatsManager
+        self.telemetry = ScanTelemetry()
+        # nuclei -stats 时间序列，扫描结束后随扫描记录保存
+        self.stats_series = StatsSeries()
         
         log_debug(f"Init: {len(targets)} targets, {len(templates)} templates")
     
     def _normalize_targets(self, targets):
+        if is_normalized(targets):
+            log_debug(f"_normalize_targets 跳过: 目标已归一化, 数量={len(targets)}")
+            return targets
         log_debug(f"_normalize_targets 输入: 类型={type(targets)}, 数量={len(targets) if targets else 0}")
         if targets:
             log_debug(f"_normalize_targets 第一个元素: {targets[0]}, 类型={type(targets[0])}")
@@ -197,12 +233,86 @@ class NucleiScanThread(QThread):
         if self._is_paused and self.process and self.process.poll() is None:
             self._set_process_suspended(self.process, False)
 
+    def set_rate_factor(self, factor):
+        """调整扫描速率系数（由 RateGovernor 驱动）
+
+        nuclei 不支持运行中修改 -rl/-bs/-c，因此结束当前进程（nuclei 退出时写入 resume 文件），
+        再以缩放后的参数加 -resume 续扫，已完成的模板/目标不会重复也不会遗漏。扫描启动前调用时只记录系数。
+        """
+        factor = max(0.1, min(1.0, float(factor)))
+        with self._lock:
+            self.rate_factor = factor
+        log_debug(f"Rate factor set: {factor}")
+        self._maybe_restart_for_rate()
+
+    def _maybe_restart_for_rate(self):
+        """速率参数与当前进程不同且距上次启动已超过 RATE_RESTART_INTERVAL 时，结束进程由 run_single_mode 重启"""
+        with self._lock:
+            process = self.process
+            if (not self._is_running or self._is_paused or self._rate_restart_pending
+                    or self._rate_base is None or process is None or process.poll() is not None):
+                return
+            if (self._scaled_rate_args(self._rate_base, self.rate_factor)
+                    == self._scaled_rate_args(self._rate_base, self._applied_rate_factor)):
+                return
+            if time.monotonic() - self._process_started_at < self.RATE_RESTART_INTERVAL:
+                return
+            self._rate_restart_pending = True
+        log_debug(f"Restarting nuclei for rate factor {self.rate_factor}: pid={process.pid}")
+        try:
+            # nuclei 收到 SIGTERM 后正常退出并写入 resume 文件；Windows 下无法发送信号，只能直接结束，随后整体重扫
+            process.terminate()
+        except OSError:
+            pass
+
+    def _split_rate_args(self):
+        """返回 (速率参数基准值, 去掉速率参数后的自定义参数)；自定义参数中指定的 -rl/-bs/-c 优先"""
+        base = {"-rl": self.rate_limit, "-bs": self.bulk_size, "-c": self.DEFAULT_CONCURRENCY}
+        aliases = {alias: flag for flag, names in self.RATE_FLAGS.items() for alias in names}
+        args = [str(arg) for arg in self.custom_args]
+        rest = []
+        i = 0
+        while i < len(args):
+            flag = aliases.get(args[i])
+            if flag and i + 1 < len(args):
+                try:
+                    base[flag] = int(args[i + 1])
+                    i += 2
+                    continue
+                except ValueError:
+                    pass
+            rest.append(args[i])
+            i += 1
+        return base, rest
+
+    @staticmethod
+    def _scaled_rate_args(base, factor):
+        args = []
+        for flag, value in base.items():
+            # 0 表示不限制，保持原样
+            args.extend([flag, str(max(1, int(round(value * factor))) if value else 0)])
+        return args
+
+    def _suspension_affects_stats(self):
+        """当前 stats 采样是否可能包含因进程挂起而超时的请求
+
+        暂停期间及恢复后一个 stats 间隔加请求超时的时间内，错误率不能反映目标状态。
+        """
+        if self._is_paused:
+            return True
+        if self._last_resumed_at is None:
+            return False
+        grace = self.STATS_INTERVAL + float(self.oast_config.get('timeout', 10) or 10)
+        return time.monotonic() - self._last_resumed_at < grace
+
     def _set_process_suspended(self, process, suspend):
         """Suspend or resume the nuclei subprocess."""
         if not process or process.poll() is not None:
             return True
 
         action = "suspend" if suspend else "resume"
+        if not suspend:
+            self._last_resumed_at = time.monotonic()
         try:
             if os.name == "nt":
                 return self._set_windows_process_suspended(process.pid, suspend)
@@ -276,6 +386,23 @@ class NucleiScanThread(QThread):
             log_debug("WARNING: templates 列表为空!")
             return
 
+        # 剔除后台校验已确认损坏的模板，避免 nuclei 加载阶段中途失败
+        templates, broken_templates = filter_broken_templates(templates)
+        if broken_templates:
+            self.log_signal.emit("[WARNING] " + tr("validator.skipped_broken", count=len(broken_templates)))
+            log_debug(f"跳过已知损坏的模板: {broken_templates[:20]}")
+            if not templates:
+                self.log_signal.emit("[WARNING] " + tr("nuclei.no_templates_warning"))
+                return
+
+        # 按历史命中率与成本排序，高产出模板优先执行
+        templates = order_templates_by_value(templates)
+
+        tmp_target_path = None
+        tmp_template_path = None
+        trace_log_paths = []
+        resume_files = []
+        trace_reader = None
         try:
             oast_plan = prepare_oast_scan(templates, self.oast_config)
             templates = oast_plan.templates
@@ -295,26 +422,24 @@ class NucleiScanThread(QThread):
 
             cmd = [nuclei_cmd]
             
-            tmp_target_path = None
-            if len(targets) == 1:
+            if len(targets) == 1 and not is_target_spec(targets[0]):
                 cmd.extend(["-u", targets[0]])
             else:
+                # CIDR / IP 段 / 端口列表在此惰性展开，逐行写入目标文件，不在内存中物化
                 with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.txt', encoding='utf-8') as tmp_target:
                     tmp_target_path = tmp_target.name
-                    for t in targets:
+                    for t in iter_targets(targets):
                         tmp_target.write(t + '\n')
                 cmd.extend(["-l", tmp_target_path])
 
+            rate_base, custom_args = self._split_rate_args()
             cmd.extend([
                 "-jsonl",
-                "-rl", str(self.rate_limit),
-                "-bs", str(self.bulk_size),
                 "-stats",
-                "-stats-interval", "3"
+                "-stats-interval", str(self.STATS_INTERVAL)
             ])
 
             # POC 处理 - 使用临时文件避免命令行长度限制
-            tmp_template_path = None
             if len(templates) == 1:
                 # 单个模板直接用 -t 参数
                 cmd.extend(["-t", templates[0]])
@@ -328,76 +453,62 @@ class NucleiScanThread(QThread):
                 log_debug(f"模板列表写入临时文件: {tmp_template_path}, 共 {len(templates)} 个模板")
                 cmd.extend(["-t", tmp_template_path])
 
-            if self.custom_args:
-                cmd.extend(self.custom_args)
+            if custom_args:
+                cmd.extend(custom_args)
             if oast_plan and oast_plan.args:
                 cmd.extend(oast_plan.args)
-            
-            log_debug(f"启动 subprocess: {' '.join(cmd)}")
-            
-            startupinfo = None
-            if os.name == 'nt':
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            
-            env = os.environ.copy()
-            bin_dir = str(external_path('bin'))
-            env["PATH"] = bin_dir + os.pathsep + env["PATH"]
-            env["PYTHONIOENCODING"] = "utf-8"
-            
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                stdin=subprocess.DEVNULL,
-                text=True,
-                bufsize=1,
-                startupinfo=startupinfo,
-                encoding='utf-8',
-                errors='ignore',
-                env=env
-            )
-            
-            log_debug(f"Subprocess PID: {self.process.pid}")
-            if self.is_paused():
-                self._set_process_suspended(self.process, True)
-            
-            for line in iter(self.process.stdout.readline, ''):
-                if not self._is_running:
-                    break
-                line = line.strip()
-                if line:
-                    log_debug(f"Output: {line[:100]}") # 记录部分输出证明有动静
-                    try:
-                        result = json.loads(line)
-                        if 'template-id' in result:
-                            self.result_signal.emit(result)
-                        elif 'percent' in result:
-                            # 解析 nuclei stats 输出的进度
-                            # nuclei stats 格式可能包含: percent, requests, total, hosts 等
-                            percent = result.get('percent', 0)
-                            # 确保 percent 是有效数值
-                            try:
-                                percent = float(percent)
-                                # 限制在 0-99 范围内，100% 由 finished_signal 处理
-                                percent = max(0, min(99, int(percent)))
-                            except (ValueError, TypeError):
-                                percent = 0
-
-                            # 只有当进度大于0时才发送，避免重置进度条
-                            if percent > 0:
-                                self.progress_signal.emit(percent, 100, tr("nuclei.scan_progress"))
-                    except json.JSONDecodeError:
-                        # 非 JSON 输出
-                        self.log_signal.emit(line)
 
-            self.process.wait()
-            log_debug("Subprocess wait() 返回")
+            # 速率系数变化时以新参数重启 nuclei，并通过 resume 文件跳过已完成的部分
+            resume_file = None
+            restarted = False
+            seen_results = set()
+            while True:
+                with self._lock:
+                    factor = self.rate_factor
+                    self._rate_restart_pending = False
+                run_cmd = cmd + self._scaled_rate_args(rate_base, factor)
+                if resume_file:
+                    run_cmd.extend(["-resume", resume_file])
+
+                # trace 日志逐请求记录模板与目标，用于统计每个模板的请求数与错误数；
+                # 文件大小与请求数成正比（扫描结束后删除），因此仅在设置中开启时使用。nuclei 每次启动会截断文件，重启时换新文件
+                if self.trace_log:
+                    trace_fd, trace_log_path = tempfile.mkstemp(prefix='nuclei_trace_', suffix='.jsonl')
+                    os.close(trace_fd)
+                    trace_log_paths.append(trace_log_path)
+                    run_cmd.extend(["-tlog", trace_log_path])
+                    trace_reader = TraceLogReader(trace_log_path, self.telemetry)
+                    trace_reader.start()
+
+                resume_file = self._run_process(run_cmd, factor, rate_base, seen_results, restarted)
+                if resume_file:
+                    resume_files.append(resume_file)
+
+                if trace_reader:
+                    trace_reader.stop()
+                    trace_reader.join(5)
+                if not (self._is_running and self._rate_restart_pending):
+                    break
+                restarted = True
+                if resume_file:
+                    self.log_signal.emit("[INFO] " + tr("nuclei.rate_restart", percent=int(self.rate_factor * 100)))
+                else:
+                    self.log_signal.emit("[WARNING] " + tr("nuclei.rate_restart_no_resume", percent=int(self.rate_factor * 100)))
+            log_debug(f"扫描遥测: {self.telemetry.summary()}, 高成本模板: {self.telemetry.costliest_templates(3)}")
             
         except Exception as e:
             log_debug(f"run_single_mode 异常: {e}\n{traceback.format_exc()}")
             logger.error(f"run_single_mode 异常: {e}")
         finally:
+            if trace_reader and trace_reader.is_alive():
+                trace_reader.stop()
+                trace_reader.join(5)
+            for path in trace_log_paths + resume_files:
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
             # 清理临时目标文件
             if tmp_target_path and os.path.exists(tmp_target_path):
                 try:
@@ -411,3 +522,93 @@ class NucleiScanThread(QThread):
                 except OSError:
                     pass
             cleanup_oast_plan(oast_plan)
+
+    def _run_process(self, cmd, factor, rate_base, seen_results, restarted):
+        """启动一次 nuclei 并读取输出直到进程退出，返回 nuclei 退出时写入的 resume 文件路径（如有）"""
+        log_debug(f"启动 subprocess: {' '.join(cmd)}")
+
+        startupinfo = None
+        if os.name == 'nt':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+        env = os.environ.copy()
+        bin_dir = str(external_path('bin'))
+        env["PATH"] = bin_dir + os.pathsep + env["PATH"]
+        env["PYTHONIOENCODING"] = "utf-8"
+
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+            startupinfo=startupinfo,
+            encoding='utf-8',
+            errors='ignore',
+            env=env
+        )
+        with self._lock:
+            self.process = process
+            self._rate_base = rate_base
+            self._applied_rate_factor = factor
+            self._process_started_at = time.monotonic()
+            if not self._is_running:
+                # 启动期间被停止
+                process.terminate()
+
+        log_debug(f"Subprocess PID: {process.pid}")
+        if self.is_paused():
+            self._set_process_suspended(process, True)
+
+        resume_file = None
+        for line in iter(process.stdout.readline, ''):
+            if not self._is_running:
+                break
+            line = line.strip()
+            if line:
+                log_debug(f"Output: {line[:100]}") # 记录部分输出证明有动静
+                try:
+                    result = json.loads(line)
+                    if 'template-id' in result:
+                        key = self._result_key(result)
+                        if restarted and key in seen_results:
+                            # 无 resume 文件整体重扫时，跳过重启前已上报的结果
+                            continue
+                        seen_results.add(key)
+                        self.telemetry.record_match(
+                            result.get('template-path') or result.get('template-id'),
+                            result.get('host') or result.get('matched-at', ''),
+                        )
+                        self.result_signal.emit(result)
+                    elif 'percent' in result:
+                        # 解析 nuclei stats 输出: percent, requests, total, rps, errors, hosts, matched, duration
+                        sample = self.stats_series.add(parse_stats_event(result))
+                        data = sample.to_dict()
+                        data['suspended'] = self._suspension_affects_stats()
+                        self.stats_signal.emit(data)
+                        # 限制在 0-99 范围内，100% 由 finished_signal 处理
+                        percent = max(0, min(99, int(sample.percent)))
+
+                        # 只有当进度大于0时才发送，避免重置进度条
+                        if percent > 0:
+                            self.progress_signal.emit(percent, 100, tr("nuclei.scan_progress"))
+                        self._maybe_restart_for_rate()
+                except json.JSONDecodeError:
+                    match = RESUME_FILE_PATTERN.search(ANSI_ESCAPE_PATTERN.sub('', line))
+                    if match:
+                        resume_file = match.group(1)
+                    if not self._rate_restart_pending:
+                        # 非 JSON 输出（速率重启导致的退出日志不展示）
+                        self.log_signal.emit(line)
+
+        process.wait()
+        log_debug("Subprocess wait() 返回")
+        return resume_file if resume_file and os.path.exists(resume_file) else None
+
+    @staticmethod
+    def _result_key(result):
+        extracted = result.get('extracted-results') or []
+        return (result.get('template-id'), result.get('matched-at') or result.get('host'),
+                result.get('matcher-name'), tuple(str(item) for item in extracted))
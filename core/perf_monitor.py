@@ -1,14 +1,16 @@
 """
 性能监控模块
-实时监控CPU、内存、网络使用情况
+实时监控CPU、内存、网络使用情况，以及本程序进程树（GUI、nuclei 子进程、工作线程）的资源占用
 """
+import os
 import threading
-from typing import Dict, List
-from dataclasses import dataclass
+import time
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field
 from datetime import datetime
 from collections import deque
 
-from PyQt5.QtCore import QObject, pyqtSignal, QTimer
+from PyQt5.QtCore import QObject, pyqtSignal
 
 from core.logger import get_logger
 from i18n import tr
@@ -27,6 +29,21 @@ class PerformanceSnapshot:
     network_sent_mb: float = 0.0
     network_recv_mb: float = 0.0
     active_threads: int = 0
+    processes: List['ProcessStats'] = field(default_factory=list)
+    threads: List['ThreadStats'] = field(default_factory=list)
+
+    @property
+    def own_cpu_percent(self) -> float:
+        """本程序进程树的 CPU 占用总和"""
+        return sum(p.cpu_percent for p in self.processes)
+
+    @property
+    def own_rss_mb(self) -> float:
+        return sum(p.rss_mb for p in self.processes)
+
+    @property
+    def own_sockets(self) -> int:
+        return sum(p.sockets for p in self.processes)
     
     def to_dict(self) -> Dict:
         return {
@@ -36,21 +53,89 @@ class PerformanceSnapshot:
             'memory_used_mb': round(self.memory_used_mb, 1),
             'network_sent_mb': round(self.network_sent_mb, 2),
             'network_recv_mb': round(self.network_recv_mb, 2),
-            'active_threads': self.active_threads
+            'active_threads': self.active_threads,
+            'own_cpu_percent': round(self.own_cpu_percent, 1),
+            'own_rss_mb': round(self.own_rss_mb, 1),
+            'own_sockets': self.own_sockets,
+            'processes': [p.to_dict() for p in self.processes],
+            'threads': [t.to_dict() for t in self.threads]
+        }
+
+
+@dataclass
+class ProcessStats:
+    """进程树中单个进程的资源占用"""
+    pid: int
+    parent_pid: Optional[int]
+    name: str
+    role: str  # gui / nuclei / child
+    cpu_percent: float = 0.0
+    rss_mb: float = 0.0
+    sockets: int = 0
+    io_read_mb: float = 0.0
+    io_write_mb: float = 0.0
+    num_threads: int = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'pid': self.pid,
+            'parent_pid': self.parent_pid,
+            'name': self.name,
+            'role': self.role,
+            'cpu_percent': round(self.cpu_percent, 1),
+            'rss_mb': round(self.rss_mb, 1),
+            'sockets': self.sockets,
+            'io_read_mb': round(self.io_read_mb, 2),
+            'io_write_mb': round(self.io_write_mb, 2),
+            'num_threads': self.num_threads
+        }
+
+
+@dataclass
+class ThreadStats:
+    """GUI 进程内单个线程的 CPU 占用"""
+    thread_id: int
+    name: str
+    cpu_percent: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'thread_id': self.thread_id,
+            'name': self.name,
+            'cpu_percent': round(self.cpu_percent, 1)
         }
 
 
+def _process_role(proc, own_pid: int) -> str:
+    if proc.pid == own_pid:
+        return 'gui'
+    try:
+        name = proc.name().lower()
+    except Exception:
+        return 'child'
+    return 'nuclei' if 'nuclei' in name else 'child'
+
+
 class PerformanceMonitor(QObject):
     """性能监控器"""
     
     stats_updated = pyqtSignal(dict)
     alert_triggered = pyqtSignal(str, str)
+    throttle_requested = pyqtSignal(str)  # 告警级别：warning / critical
     
     DEFAULT_THRESHOLDS = {
         'cpu_warning': 80,
         'cpu_critical': 95,
         'memory_warning': 80,
-        'memory_critical': 95
+        'memory_critical': 95,
+        # 本程序进程树阈值（CPU 为多核累计百分比）
+        'process_cpu_warning': 200,
+        'process_cpu_critical': 350,
+        'process_rss_warning_mb': 2048,
+        'process_rss_critical_mb': 4096,
+        'process_sockets_warning': 3000,
+        # 超过进程阈值时请求降低扫描速率
+        'auto_throttle': False
     }
     
     def __init__(self, history_size: int = 300):
@@ -58,10 +143,16 @@ class PerformanceMonitor(QObject):
         self._history_size = history_size
         self._history: deque = deque(maxlen=history_size)
         self._is_running = False
-        self._timer = None
+        self._stop_event = None
+        # 停止后未结束的上一轮采样可能与新线程重叠，采样过程串行执行
+        self._sample_lock = threading.Lock()
         self._thresholds = self.DEFAULT_THRESHOLDS.copy()
         self._last_net_io = None
         self._psutil_available = self._check_psutil()
+        # pid -> psutil.Process，复用对象才能得到 cpu_percent 的增量值
+        self._proc_cache = {}
+        # 线程 ID -> (采样时间, 累计 CPU 秒)
+        self._thread_cpu = {}
     
     def _check_psutil(self) -> bool:
         try:
@@ -72,24 +163,31 @@ class PerformanceMonitor(QObject):
             return False
     
     def start(self, interval_ms: int = 1000):
+        """在后台线程中按间隔采样，结果通过 stats_updated 等信号发回 GUI 线程"""
         if self._is_running:
             return
         self._is_running = True
-        self._timer = QTimer()
-        self._timer.timeout.connect(self._collect_stats)
-        self._timer.start(interval_ms)
+        # 遍历进程树与 net_connections 可能耗时数百毫秒，不能放在 GUI 线程的定时器中执行
+        self._stop_event = threading.Event()
+        threading.Thread(target=self._run, args=(interval_ms / 1000, self._stop_event),
+                         name='PerfMonitor', daemon=True).start()
         logger.info('Performance monitor started')
     
     def stop(self):
         self._is_running = False
-        if self._timer:
-            self._timer.stop()
-            self._timer = None
+        if self._stop_event:
+            self._stop_event.set()
+            self._stop_event = None
         logger.info('Performance monitor stopped')
+
+    def _run(self, interval: float, stop_event: threading.Event):
+        while not stop_event.wait(interval):
+            self._collect_stats()
     
     def _collect_stats(self):
         try:
-            snapshot = self._get_snapshot()
+            with self._sample_lock:
+                snapshot = self._get_snapshot()
             self._history.append(snapshot)
             self.stats_updated.emit(snapshot.to_dict())
             self._check_alerts(snapshot)
@@ -112,9 +210,102 @@ class PerformanceMonitor(QObject):
                 snapshot.network_sent_mb = (net_io.bytes_sent - self._last_net_io.bytes_sent) / (1024 * 1024)
                 snapshot.network_recv_mb = (net_io.bytes_recv - self._last_net_io.bytes_recv) / (1024 * 1024)
             self._last_net_io = net_io
+
+            snapshot.processes = self._collect_process_tree(psutil)
+            snapshot.threads = self._collect_threads()
         
         snapshot.active_threads = threading.active_count()
         return snapshot
+
+    def _collect_process_tree(self, psutil) -> List[ProcessStats]:
+        """采集 GUI 进程及其所有子进程（nuclei 等）的资源占用"""
+        own_pid = os.getpid()
+        root = self._proc_cache.get(own_pid)
+        if root is None:
+            root = self._proc_cache[own_pid] = psutil.Process(own_pid)
+        try:
+            tree = [root] + root.children(recursive=True)
+        except psutil.Error:
+            tree = [root]
+
+        alive = set()
+        result = []
+        for candidate in tree:
+            proc = self._proc_cache.setdefault(candidate.pid, candidate)
+            try:
+                with proc.oneshot():
+                    stats = ProcessStats(
+                        pid=proc.pid,
+                        parent_pid=proc.ppid() if proc.pid != own_pid else None,
+                        name=proc.name(),
+                        role=_process_role(proc, own_pid),
+                        cpu_percent=proc.cpu_percent(interval=None),
+                        rss_mb=proc.memory_info().rss / (1024 * 1024),
+                        num_threads=proc.num_threads()
+                    )
+                    stats.sockets = self._count_sockets(proc)
+                    if hasattr(proc, 'io_counters'):
+                        io = proc.io_counters()
+                        stats.io_read_mb = io.read_bytes / (1024 * 1024)
+                        stats.io_write_mb = io.write_bytes / (1024 * 1024)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            except psutil.AccessDenied:
+                stats = ProcessStats(pid=proc.pid, parent_pid=None, name='?', role='child')
+            alive.add(proc.pid)
+            result.append(stats)
+
+        # 清理已退出的进程，避免缓存无限增长
+        for pid in list(self._proc_cache):
+            if pid not in alive:
+                del self._proc_cache[pid]
+        return result
+
+    @staticmethod
+    def _count_sockets(proc) -> int:
+        try:
+            if hasattr(proc, 'net_connections'):
+                return len(proc.net_connections(kind='inet'))
+            return len(proc.connections(kind='inet'))
+        except Exception:
+            return 0
+
+    def _collect_threads(self) -> List[ThreadStats]:
+        """按 CPU 时间增量计算 GUI 进程内各线程的占用（含 Qt 线程和原生扫描工作线程）"""
+        proc = self._proc_cache.get(os.getpid())
+        if proc is None:
+            return []
+        try:
+            raw_threads = proc.threads()
+        except Exception:
+            return []
+
+        names = {}
+        for thread in threading.enumerate():
+            native_id = getattr(thread, 'native_id', None)
+            if native_id is not None:
+                names[native_id] = thread.name
+        if threading.main_thread().native_id is not None:
+            names[threading.main_thread().native_id] = 'MainThread (GUI)'
+
+        now = time.monotonic()
+        previous = self._thread_cpu
+        self._thread_cpu = {}
+        result = []
+        for item in raw_threads:
+            cpu_time = item.user_time + item.system_time
+            self._thread_cpu[item.id] = (now, cpu_time)
+            last = previous.get(item.id)
+            cpu_percent = 0.0
+            if last and now > last[0]:
+                cpu_percent = max(0.0, (cpu_time - last[1]) / (now - last[0]) * 100)
+            result.append(ThreadStats(
+                thread_id=item.id,
+                name=names.get(item.id, f'thread-{item.id}'),
+                cpu_percent=cpu_percent
+            ))
+        result.sort(key=lambda t: t.cpu_percent, reverse=True)
+        return result
     
     def _check_alerts(self, snapshot: PerformanceSnapshot):
         if snapshot.cpu_percent >= self._thresholds['cpu_critical']:
@@ -126,9 +317,46 @@ class PerformanceMonitor(QObject):
             self.alert_triggered.emit('critical', tr('perf.memory_critical', value=snapshot.memory_percent))
         elif snapshot.memory_percent >= self._thresholds['memory_warning']:
             self.alert_triggered.emit('warning', tr('perf.memory_warning', value=snapshot.memory_percent))
+
+        level = self._check_process_alerts(snapshot)
+        if level and self._thresholds.get('auto_throttle'):
+            self.throttle_requested.emit(level)
+
+    def _check_process_alerts(self, snapshot: PerformanceSnapshot) -> Optional[str]:
+        """检查本程序进程树阈值，返回最高告警级别"""
+        if not snapshot.processes:
+            return None
+        level = None
+        cpu = snapshot.own_cpu_percent
+        rss = snapshot.own_rss_mb
+        if cpu >= self._thresholds['process_cpu_critical']:
+            self.alert_triggered.emit('critical', tr('perf.process_cpu_critical', value=round(cpu, 1)))
+            level = 'critical'
+        elif cpu >= self._thresholds['process_cpu_warning']:
+            self.alert_triggered.emit('warning', tr('perf.process_cpu_warning', value=round(cpu, 1)))
+            level = 'warning'
+
+        if rss >= self._thresholds['process_rss_critical_mb']:
+            self.alert_triggered.emit('critical', tr('perf.process_rss_critical', value=round(rss)))
+            level = 'critical'
+        elif rss >= self._thresholds['process_rss_warning_mb']:
+            self.alert_triggered.emit('warning', tr('perf.process_rss_warning', value=round(rss)))
+            level = level or 'warning'
+
+        if snapshot.own_sockets >= self._thresholds['process_sockets_warning']:
+            self.alert_triggered.emit('warning', tr('perf.process_sockets_warning', value=snapshot.own_sockets))
+            level = level or 'warning'
+        return level
     
     def set_thresholds(self, thresholds: Dict):
-        self._thresholds.update(thresholds)
+        self._thresholds.update({k: v for k, v in (thresholds or {}).items() if k in self.DEFAULT_THRESHOLDS})
+
+    def get_thresholds(self) -> Dict:
+        return self._thresholds.copy()
+
+    @property
+    def is_running(self) -> bool:
+        return self._is_running
     
     def get_current_stats(self) -> Dict:
         if self._history:
@@ -33,16 +33,20 @@ class POCLibrary:
         # POC 缓存
         self._poc_cache = None
         self._cache_valid = False
+        self._poc_count = None
         self._cache_file = user_data_path("cache", "poc_index.json")
     
     def get_poc_count(self) -> int:
-        """快速获取 POC 数量（不解析内容，仅计数文件）"""
-        return sum(1 for _ in self._iter_poc_files())
+        """快速获取 POC 数量（不解析内容，仅计数文件；结果缓存到库内容变化为止）"""
+        if self._poc_count is None:
+            self._poc_count = sum(1 for _ in self._iter_poc_files())
+        return self._poc_count
     
     def invalidate_cache(self):
         """使缓存失效"""
         self._cache_valid = False
         self._poc_cache = None
+        self._poc_count = None
 
     def _iter_poc_files(self):
         """遍历全部 POC 文件并返回来源标记"""
@@ -222,8 +226,10 @@ class POCLibrary:
         disk_cache = self._load_persistent_cache()
         next_cache = {}
         pocs = []
+        file_count = 0
 
         for file, source in self._iter_poc_files():
+            file_count += 1
             try:
                 stat_result = file.stat()
             except OSError:
@@ -260,6 +266,7 @@ class POCLibrary:
         # 更新缓存
         self._poc_cache = pocs
         self._cache_valid = True
+        self._poc_count = file_count
 
         return pocs
     
@@ -3,13 +3,100 @@ POC 使用统计管理器 - 记录 POC 使用次数和发现漏洞次数
 独立模块，通过钩子方式集成，不修改现有核心逻辑
 """
 import os
-import sqlite3
+import shutil
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from core.db import add_column, get_database
+from core.logger import get_logger
+from core.paths import database_path, user_data_path
 from i18n import tr
 
+logger = get_logger("poc_stats_manager")
+
+DB_FILENAME = "poc_stats.db"
+
+
+def _migrate_v1(conn):
+    """使用统计与使用历史表"""
+    # POC 使用统计表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS poc_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            poc_id TEXT NOT NULL,
+            poc_path TEXT,
+            use_count INTEGER DEFAULT 0,
+            vuln_count INTEGER DEFAULT 0,
+            last_used_at TEXT,
+            first_used_at TEXT,
+            UNIQUE(poc_id)
+        )
+    ''')
+
+    # 兼容旧数据库：补充耗时与请求数字段，用于模板调度
+    add_column(conn, 'poc_usage', 'total_runtime_ms', 'REAL DEFAULT 0')
+    add_column(conn, 'poc_usage', 'total_requests', 'INTEGER DEFAULT 0')
+    add_column(conn, 'poc_usage', 'timed_runs', 'INTEGER DEFAULT 0')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_poc_usage_path ON poc_usage(poc_path)')
+
+    # POC 使用历史记录表
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS poc_usage_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            poc_id TEXT NOT NULL,
+            scan_id INTEGER,
+            target_count INTEGER DEFAULT 0,
+            vuln_found INTEGER DEFAULT 0,
+            used_at TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_poc_usage_history_poc ON poc_usage_history(poc_id, used_at)')
+
+
+def _migrate_v2(conn):
+    """旧版本以 trace 日志首末请求的时间跨度作为耗时，并发下接近整个扫描时长，清除后按请求数估算成本"""
+    conn.execute('UPDATE poc_usage SET total_runtime_ms = 0')
+
+
+def _migrate_v3(conn):
+    """旧版本把没有 trace 数据（请求数为 0）的运行也计入 timed_runs，估算成本接近 0，清除这类计数"""
+    conn.execute('''
+        UPDATE poc_usage SET timed_runs = 0
+        WHERE COALESCE(total_requests, 0) = 0 AND COALESCE(total_runtime_ms, 0) = 0
+    ''')
+
+
+def _migrate_v4(conn):
+    """命中扫描次数（至少发现一个漏洞的运行数），与 use_count 同为按扫描计数；按使用历史回填"""
+    add_column(conn, 'poc_usage', 'hit_scans', 'INTEGER DEFAULT 0')
+    conn.execute('''
+        UPDATE poc_usage SET hit_scans = (
+            SELECT COUNT(*) FROM poc_usage_history h
+            WHERE h.poc_id = poc_usage.poc_id AND h.vuln_found > 0
+        )
+    ''')
+
+
+_MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4]
+
+
+def _default_db_path() -> str:
+    """用户数据目录下的 poc_stats.db；旧版本保存在当前工作目录，首次启动时移入"""
+    target = user_data_path(DB_FILENAME)
+    legacy = Path.cwd() / DB_FILENAME
+    if not target.exists() and legacy.is_file() and legacy.resolve() != target.resolve():
+        try:
+            # 连同未清理的回滚日志一起移动，保证数据库一致
+            for suffix in ("", "-journal", "-wal", "-shm"):
+                source = Path(str(legacy) + suffix)
+                if source.exists():
+                    shutil.move(str(source), str(target) + suffix)
+            logger.info(f"Moved legacy POC stats database from {legacy} to {target}")
+        except OSError as e:
+            logger.warning(f"Move legacy POC stats database failed: {e}")
+    return str(database_path(DB_FILENAME))
+
 
 class POCStatsManager:
     """POC 使用统计管理器"""
@@ -19,47 +106,18 @@ class POCStatsManager:
         初始化统计管理器
         
         参数:
-            db_path: 数据库文件路径，默认为当前目录下的 poc_stats.db
+            db_path: 数据库文件路径，默认为用户数据目录下的 poc_stats.db
         """
         if db_path is None:
-            db_path = "poc_stats.db"
+            db_path = _default_db_path()
         
         self.db_path = db_path
+        self._db = get_database(db_path)
         self._init_db()
     
     def _init_db(self):
         """初始化数据库表"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # POC 使用统计表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS poc_usage (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                poc_id TEXT NOT NULL,
-                poc_path TEXT,
-                use_count INTEGER DEFAULT 0,
-                vuln_count INTEGER DEFAULT 0,
-                last_used_at TEXT,
-                first_used_at TEXT,
-                UNIQUE(poc_id)
-            )
-        ''')
-        
-        # POC 使用历史记录表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS poc_usage_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                poc_id TEXT NOT NULL,
-                scan_id INTEGER,
-                target_count INTEGER DEFAULT 0,
-                vuln_found INTEGER DEFAULT 0,
-                used_at TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        self._db.migrate(_MIGRATIONS)
     
     def record_usage(self, poc_id: str, poc_path: str = None, 
                      vuln_found: int = 0, target_count: int = 0,
@@ -74,49 +132,133 @@ class POCStatsManager:
             target_count: 本次扫描的目标数量
             scan_id: 关联的扫描记录 ID
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         now = datetime.now().isoformat()
         
-        try:
+        def _record(conn):
+            cursor = conn.cursor()
             # 更新或插入使用统计
             cursor.execute('''
-                INSERT INTO poc_usage (poc_id, poc_path, use_count, vuln_count, last_used_at, first_used_at)
-                VALUES (?, ?, 1, ?, ?, ?)
+                INSERT INTO poc_usage (poc_id, poc_path, use_count, vuln_count, hit_scans, last_used_at, first_used_at)
+                VALUES (?, ?, 1, ?, ?, ?, ?)
                 ON CONFLICT(poc_id) DO UPDATE SET
                     use_count = use_count + 1,
                     vuln_count = vuln_count + ?,
+                    hit_scans = COALESCE(hit_scans, 0) + excluded.hit_scans,
                     last_used_at = ?,
                     poc_path = COALESCE(?, poc_path)
-            ''', (poc_id, poc_path, vuln_found, now, now, vuln_found, now, poc_path))
+            ''', (poc_id, poc_path, vuln_found, 1 if vuln_found else 0, now, now, vuln_found, now, poc_path))
             
             # 记录使用历史
             cursor.execute('''
                 INSERT INTO poc_usage_history (poc_id, scan_id, target_count, vuln_found, used_at)
                 VALUES (?, ?, ?, ?, ?)
             ''', (poc_id, scan_id, target_count, vuln_found, now))
-            
-            conn.commit()
+        
+        try:
+            self._db.transaction(_record)
         except Exception as e:
             print(f"[!] {tr('poc.record_stats_failed', error=str(e))}")
-        finally:
-            conn.close()
     
     def record_batch_usage(self, poc_stats: List[Dict]):
         """
         批量记录 POC 使用情况
         
         参数:
-            poc_stats: POC 统计列表，每项包含 {'poc_id', 'poc_path', 'vuln_found', 'target_count', 'scan_id'}
+            poc_stats: POC 统计列表，每项包含 {'poc_id', 'poc_path', 'vuln_found', 'target_count', 'scan_id'}，
+                       可选 'runtime_ms' 与 'requests'（来自扫描遥测）
         """
+        if not poc_stats:
+            return
+        
+        now = datetime.now().isoformat()
+        usage_rows = []
+        history_rows = []
         for stat in poc_stats:
-            self.record_usage(
-                poc_id=stat.get('poc_id', ''),
-                poc_path=stat.get('poc_path'),
-                vuln_found=stat.get('vuln_found', 0),
-                target_count=stat.get('target_count', 0),
-                scan_id=stat.get('scan_id')
-            )
+            poc_id = stat.get('poc_id', '')
+            poc_path = stat.get('poc_path')
+            vuln_found = stat.get('vuln_found', 0)
+            # 可选的扫描遥测：本次运行的请求数与实测耗时（毫秒，仅原生模式），
+            # 只有测到请求或耗时的运行才计入 timed_runs（请求数为 0 说明没有 trace 数据）
+            runtime_ms = stat.get('runtime_ms')
+            requests = stat.get('requests')
+            timed = runtime_ms is not None or bool(requests)
+            usage_rows.append((
+                poc_id, poc_path, vuln_found, 1 if vuln_found else 0, now, now,
+                runtime_ms or 0, requests or 0, 1 if timed else 0,
+            ))
+            history_rows.append((poc_id, stat.get('scan_id'), stat.get('target_count', 0), vuln_found, now))
+        
+        # 写线程中单事务批量写入，避免每个 POC 单独提交
+        def _record(conn):
+            conn.executemany('''
+                INSERT INTO poc_usage (poc_id, poc_path, use_count, vuln_count, hit_scans, last_used_at,
+                                       first_used_at, total_runtime_ms, total_requests, timed_runs)
+                VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(poc_id) DO UPDATE SET
+                    use_count = use_count + 1,
+                    vuln_count = vuln_count + excluded.vuln_count,
+                    hit_scans = COALESCE(hit_scans, 0) + excluded.hit_scans,
+                    last_used_at = excluded.last_used_at,
+                    poc_path = COALESCE(excluded.poc_path, poc_path),
+                    total_runtime_ms = COALESCE(total_runtime_ms, 0) + excluded.total_runtime_ms,
+                    total_requests = COALESCE(total_requests, 0) + excluded.total_requests,
+                    timed_runs = COALESCE(timed_runs, 0) + excluded.timed_runs
+            ''', usage_rows)
+            conn.executemany('''
+                INSERT INTO poc_usage_history (poc_id, scan_id, target_count, vuln_found, used_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', history_rows)
+
+        try:
+            self._db.transaction(_record)
+        except Exception as e:
+            print(f"[!] {tr('poc.record_stats_failed', error=str(e))}")
+    
+    def get_stats_by_paths(self, poc_paths: List[str]) -> Dict[str, Dict]:
+        """
+        按 POC 路径批量获取使用统计（供模板调度使用）
+        
+        参数:
+            poc_paths: POC 文件路径列表
+        
+        返回:
+            {poc_path: 统计信息字典}，没有记录的路径不包含在结果中
+        """
+        paths = [p for p in dict.fromkeys(poc_paths or []) if p]
+        stats = {}
+        if not paths:
+            return stats
+        
+        with self._db.reader() as conn:
+            cursor = conn.cursor()
+            # SQLite 单条语句参数数量有限，分块查询
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT poc_id, poc_path, use_count, vuln_count,
+                           total_runtime_ms, total_requests, timed_runs, hit_scans
+                    FROM poc_usage
+                    WHERE poc_path IN ({placeholders})
+                ''', chunk)
+                for row in cursor.fetchall():
+                    stats[row[1]] = {
+                        'poc_id': row[0],
+                        'poc_path': row[1],
+                        'use_count': row[2] or 0,
+                        'vuln_count': row[3] or 0,
+                        'total_runtime_ms': row[4] or 0,
+                        'total_requests': row[5] or 0,
+                        'timed_runs': row[6] or 0,
+                        'hit_scans': row[7] or 0,
+                    }
+        return stats
+
+    def get_mean_hit_rate(self) -> float:
+        """所有 POC 的平均命中率（命中扫描次数 / 使用次数），作为没有历史的模板的先验"""
+        row = self._db.query_one('SELECT SUM(hit_scans), SUM(use_count) FROM poc_usage')
+        hits, uses = (row[0] or 0, row[1] or 0) if row else (0, 0)
+        return hits / uses if uses else 0.0
     
     def get_poc_stats(self, poc_id: str) -> Optional[Dict]:
         """
@@ -128,17 +270,16 @@ class POCStatsManager:
         返回:
             统计信息字典，不存在则返回 None
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._db.reader() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT poc_id, poc_path, use_count, vuln_count, last_used_at, first_used_at
-            FROM poc_usage
-            WHERE poc_id = ?
-        ''', (poc_id,))
+            cursor.execute('''
+                SELECT poc_id, poc_path, use_count, vuln_count, last_used_at, first_used_at
+                FROM poc_usage
+                WHERE poc_id = ?
+            ''', (poc_id,))
         
-        row = cursor.fetchone()
-        conn.close()
+            row = cursor.fetchone()
         
         if row:
             return {
@@ -161,18 +302,17 @@ class POCStatsManager:
         返回:
             POC 统计列表，按使用次数降序排列
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._db.reader() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT poc_id, poc_path, use_count, vuln_count, last_used_at
-            FROM poc_usage
-            ORDER BY use_count DESC
-            LIMIT ?
-        ''', (limit,))
+            cursor.execute('''
+                SELECT poc_id, poc_path, use_count, vuln_count, last_used_at
+                FROM poc_usage
+                ORDER BY use_count DESC
+                LIMIT ?
+            ''', (limit,))
         
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
         
         return [{
             'poc_id': row[0],
@@ -192,19 +332,18 @@ class POCStatsManager:
         返回:
             POC 统计列表，按发现漏洞数降序排列
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._db.reader() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT poc_id, poc_path, use_count, vuln_count, last_used_at
-            FROM poc_usage
-            WHERE vuln_count > 0
-            ORDER BY vuln_count DESC
-            LIMIT ?
-        ''', (limit,))
+            cursor.execute('''
+                SELECT poc_id, poc_path, use_count, vuln_count, last_used_at
+                FROM poc_usage
+                WHERE vuln_count > 0
+                ORDER BY vuln_count DESC
+                LIMIT ?
+            ''', (limit,))
         
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
         
         return [{
             'poc_id': row[0],
@@ -225,18 +364,17 @@ class POCStatsManager:
         返回:
             POC 统计列表，按最后使用时间降序排列
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._db.reader() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT poc_id, poc_path, use_count, vuln_count, last_used_at
-            FROM poc_usage
-            ORDER BY last_used_at DESC
-            LIMIT ?
-        ''', (limit,))
+            cursor.execute('''
+                SELECT poc_id, poc_path, use_count, vuln_count, last_used_at
+                FROM poc_usage
+                ORDER BY last_used_at DESC
+                LIMIT ?
+            ''', (limit,))
         
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
         
         return [{
             'poc_id': row[0],
@@ -253,21 +391,20 @@ class POCStatsManager:
         返回:
             统计概览字典
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._db.reader() as conn:
+            cursor = conn.cursor()
         
-        # 总计
-        cursor.execute('SELECT COUNT(*), SUM(use_count), SUM(vuln_count) FROM poc_usage')
-        row = cursor.fetchone()
+            # 总计
+            cursor.execute('SELECT COUNT(*), SUM(use_count), SUM(vuln_count) FROM poc_usage')
+            row = cursor.fetchone()
         
-        total_pocs = row[0] or 0
-        total_uses = row[1] or 0
-        total_vulns = row[2] or 0
+            total_pocs = row[0] or 0
+            total_uses = row[1] or 0
+            total_vulns = row[2] or 0
         
-        # 从未使用的 POC 数量（这个需要与 POC 库对比）
-        # 这里只返回已使用的统计
+            # 从未使用的 POC 数量（这个需要与 POC 库对比）
+            # 这里只返回已使用的统计
         
-        conn.close()
         
         return {
             'total_pocs_used': total_pocs,
@@ -287,19 +424,18 @@ class POCStatsManager:
         返回:
             使用历史列表
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT scan_id, target_count, vuln_found, used_at
-            FROM poc_usage_history
-            WHERE poc_id = ?
-            ORDER BY used_at DESC
-            LIMIT ?
-        ''', (poc_id, limit))
-        
-        rows = cursor.fetchall()
-        conn.close()
+        with self._db.reader() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute('''
+                SELECT scan_id, target_count, vuln_found, used_at
+                FROM poc_usage_history
+                WHERE poc_id = ?
+                ORDER BY used_at DESC
+                LIMIT ?
+            ''', (poc_id, limit))
+        
+            rows = cursor.fetchall()
         
         return [{
             'scan_id': row[0],
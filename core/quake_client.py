@@ -8,11 +8,16 @@ from .search_engine_base import SearchEngineBase, SearchResult, register_engine
 from i18n import tr
 
 
+# 请求的返回字段
+QUAKE_FIELDS = ('ip', 'port', 'hostname', 'transport', 'service', 'location', 'title')
+
+
 class QuakeClient(SearchEngineBase):
     """Quake 搜索引擎客户端"""
     
     name = "quake"
     display_name = tr("search.quake.display_name")
+    result_fields = ','.join(QUAKE_FIELDS)
     
     def __init__(self, api_key: str = "", api_url: str = "", **kwargs):
         super().__init__(api_key, api_url, **kwargs)
@@ -42,7 +47,7 @@ class QuakeClient(SearchEngineBase):
                 'query': query,
                 'start': (page - 1) * page_size,
                 'size': min(page_size, 100),
-                'include': ['ip', 'port', 'hostname', 'transport', 'service', 'location', 'title'],
+                'include': list(QUAKE_FIELDS),
             }
             
             response = requests.post(self.api_url, json=payload, headers=headers, timeout=30)
@@ -90,9 +95,9 @@ class QuakeClient(SearchEngineBase):
             }
             
         except requests.exceptions.Timeout:
-            return {'success': False, 'error': tr("search.quake.request_timeout")}
+            return {'success': False, 'error': tr("search.quake.request_timeout"), 'retryable': True}
         except requests.exceptions.RequestException as e:
-            return {'success': False, 'error': tr("search.quake.request_failed", error=str(e))}
+            return {'success': False, 'error': tr("search.quake.request_failed", error=str(e)), 'retryable': True}
         except Exception as e:
             return {'success': False, 'error': tr("search.quake.parse_failed", error=str(e))}
     
@@ -0,0 +1,155 @@
+"""
+扫描速率调节器 - 根据性能告警与目标错误率闭环调整运行中扫描的速率
+持续过载或错误率上升时按比例降低速率（乘性减），压力解除后逐步恢复（加性增）
+"""
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from core.logger import get_logger
+
+logger = get_logger("rate_governor")
+
+MIN_FACTOR = 0.1
+MAX_FACTOR = 1.0
+
+
+class TokenBucket:
+    """线程安全的令牌桶，rate 为每秒令牌数，<= 0 表示不限速"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self._lock = threading.Lock()
+        self._rate = 0.0
+        self._capacity = 1.0
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self.set_rate(rate, capacity)
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float, capacity: float = None):
+        with self._lock:
+            self._refill()
+            self._rate = max(0.0, float(rate or 0))
+            self._capacity = max(1.0, float(capacity) if capacity else self._rate)
+            self._tokens = min(self._tokens, self._capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, stop_check=None, max_wait: float = 0.2) -> bool:
+        """取一个令牌；等待期间 stop_check() 返回 True 时放弃并返回 False"""
+        while True:
+            with self._lock:
+                if self._rate <= 0:
+                    return True
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self._rate
+            if stop_check and stop_check():
+                return False
+            time.sleep(min(wait, max_wait))
+
+
+class RateGovernor(QObject):
+    """AIMD 速率调节器，输出 0.1 ~ 1.0 的速率系数"""
+
+    factor_changed = pyqtSignal(float, str)  # 新系数, 原因（pressure / errors / recovered）
+
+    def __init__(self, sustain_samples: int = 3, recover_samples: int = 10, cooldown_samples: int = 5,
+                 error_rate_threshold: float = 0.3):
+        super().__init__()
+        self.sustain_samples = sustain_samples
+        self.recover_samples = recover_samples
+        self.cooldown_samples = cooldown_samples
+        self.error_rate_threshold = error_rate_threshold
+        self.reset()
+
+    def reset(self):
+        self.factor = MAX_FACTOR
+        self._pending_level = None
+        self._pressure_streak = 0
+        self._calm_streak = 0
+        self._cooldown = 0
+        # 每个扫描（任务 ID）单独跟踪错误率基线与连续升高次数，并发任务的采样互不干扰
+        self._error_streaks = {}
+        self._baseline_error_rates = {}
+
+    def on_pressure(self, level):
+        """PerformanceMonitor.throttle_requested：记录本次采样的最高压力级别"""
+        if level == 'critical' or self._pending_level is None:
+            self._pending_level = level
+
+    def on_sample(self, _stats=None):
+        """PerformanceMonitor.stats_updated：每个采样周期评估一次上一周期的压力"""
+        level, self._pending_level = self._pending_level, None
+        if self._cooldown:
+            self._cooldown -= 1
+
+        if level:
+            self._calm_streak = 0
+            self._pressure_streak += 1
+            if level == 'critical' or self._pressure_streak >= self.sustain_samples:
+                # 严重告警立即减半且不受冷却限制
+                self._decrease(0.5 if level == 'critical' else 0.75, 'pressure', force=level == 'critical')
+            return
+
+        self._pressure_streak = 0
+        if any(self._error_streaks.values()):
+            return
+        self._calm_streak += 1
+        if self.factor < MAX_FACTOR and self._calm_streak >= self.recover_samples:
+            self._calm_streak = 0
+            self._set_factor(min(MAX_FACTOR, self.factor + 0.1), 'recovered')
+
+    def on_scan_stats(self, sample, source=None):
+        """nuclei -stats 采样：目标错误率明显高于基线时降速（目标被打挂或触发限流），source 区分并发的扫描"""
+        if sample.get('suspended'):
+            # 手动暂停导致的超时也计为错误，忽略暂停期间及恢复后不久的采样
+            self._error_streaks[source] = 0
+            return
+        error_rate = sample.get('interval_error_rate')
+        if error_rate is None or not sample.get('interval_rps'):
+            return
+        baseline = self._baseline_error_rates.get(source)
+        if baseline is None:
+            self._baseline_error_rates[source] = error_rate
+            return
+
+        rising = error_rate >= self.error_rate_threshold and error_rate > baseline * 1.5
+        if rising:
+            self._error_streaks[source] = self._error_streaks.get(source, 0) + 1
+            if self._error_streaks[source] >= 2:
+                self._decrease(0.75, 'errors')
+        else:
+            self._error_streaks[source] = 0
+            # 缓慢跟踪基线，避免一次尖峰永久抬高阈值
+            self._baseline_error_rates[source] = baseline * 0.9 + error_rate * 0.1
+
+    def forget_source(self, source):
+        """扫描结束后丢弃其错误率状态"""
+        self._error_streaks.pop(source, None)
+        self._baseline_error_rates.pop(source, None)
+
+    def _decrease(self, multiplier, reason, force=False):
+        if self._cooldown and not force:
+            return
+        self._pressure_streak = 0
+        self._error_streaks = dict.fromkeys(self._error_streaks, 0)
+        self._cooldown = self.cooldown_samples
+        self._set_factor(max(MIN_FACTOR, self.factor * multiplier), reason)
+
+    def _set_factor(self, factor, reason):
+        factor = round(factor, 2)
+        if factor == self.factor:
+            return
+        self.factor = factor
+        logger.info(f"Rate factor -> {factor} ({reason})")
+        self.factor_changed.emit(factor, reason)
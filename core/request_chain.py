@@ -0,0 +1,307 @@
+"""
+POC 请求链渲染 - CSV / HTML 导出与扫描详情共用
+每个模板的请求步骤只编译一次：{{...}} 占位符在编译时拆成字面量与占位符片段并归类，
+渲染时逐个片段查值、一次拼接（单遍替换，不再对整段文本反复做字符串替换和正则替换）；
+同一模板在相同主机与变量取值下的渲染结果会被缓存复用
+"""
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from core.logger import get_logger
+from core.paths import external_path
+
+logger = get_logger("request_chain")
+
+# 渲染结果缓存的条目上限
+RENDER_CACHE_SIZE = 4096
+# 变量值中再嵌套占位符时的最大展开深度
+_MAX_DEPTH = 3
+
+_PLACEHOLDER_RE = re.compile(r'\{\{([^}]+)\}\}')
+_RANDOM_BASENAME_RE = re.compile(r'^[a-zA-Z0-9]{6,50}$')
+_FILENAME_RE = re.compile(r'filename="([^"]+)"')
+_JSESSIONID_RE = re.compile(r'JSESSIONID=([a-zA-Z0-9]+)')
+_CVE_SUFFIX_RE = re.compile(r'CVE-\d+-\d+-([a-zA-Z0-9]{6,12})')
+
+# 占位符分类（编译时确定，渲染时不再匹配正则）
+_PLACEHOLDER_KINDS = (
+    ('rand_base', re.compile(r'rand_base\(\d+\)')),
+    ('to_lower', re.compile(r'to_lower\(rand_base\(\d+\)\)')),
+    ('to_upper', re.compile(r'to_upper\(rand_base\(\d+\)\)')),
+    ('rand_text', re.compile(r'rand_text_alpha\(\d+\)|rand_text_alphanumeric\(\d+\)')),
+    ('rand_char', re.compile(r'rand_char\([^)]*\)')),
+    ('random_number', re.compile(r'rand_int\(\d+,\s*\d+\)')),
+    ('md5_hash', re.compile(r'md5\([^)]*\)')),
+    ('sha1_hash', re.compile(r'sha1\([^)]*\)')),
+    ('sha256_hash', re.compile(r'sha256\([^)]*\)')),
+    ('timestamp', re.compile(r'unix_time\(\)')),
+)
+# 无法还原实际值的函数显示为占位说明（键与导出标签一致）
+_LABEL_KINDS = ('random_number', 'md5_hash', 'sha1_hash', 'sha256_hash', 'timestamp')
+
+
+@dataclass(frozen=True)
+class RequestStep:
+    """请求链中的一步：kind 为 raw（原始请求）或 path（method + path 形式）"""
+    kind: str
+    content: str
+
+
+def _classify(expr: str) -> str:
+    for kind, pattern in _PLACEHOLDER_KINDS:
+        if pattern.fullmatch(expr):
+            return kind
+    return 'name'
+
+
+@lru_cache(maxsize=8192)
+def compile_text(text: str) -> tuple:
+    """把文本拆成片段：str 为字面量，(expr, kind) 为占位符"""
+    parts = []
+    position = 0
+    for match in _PLACEHOLDER_RE.finditer(text):
+        if match.start() > position:
+            parts.append(text[position:match.start()])
+        parts.append((match.group(1), _classify(match.group(1))))
+        position = match.end()
+    if position < len(text):
+        parts.append(text[position:])
+    return tuple(parts)
+
+
+@dataclass(frozen=True, eq=False)
+class _Plan:
+    """一个 POC 模板编译后的请求链（按对象身份哈希，作为渲染缓存键的一部分）"""
+    variables: tuple          # ((name, value), ...)
+    extractor_names: tuple
+    # ('raw', parts) 或 ('path', method, path_parts, ((header, value_parts), ...), body_parts)
+    steps: tuple
+
+
+def _compile_plan(poc_content: dict) -> _Plan:
+    variables = []
+    for name, value in (poc_content.get('variables') or {}).items():
+        if value is not None:
+            variables.append((name, value if isinstance(value, str) else str(value)))
+
+    http_section = poc_content.get('http') or []
+    extractor_names = []
+    steps = []
+    for item in http_section:
+        extractor_names.extend(ext['name'] for ext in item.get('extractors', []) if ext.get('name'))
+        for raw_req in item.get('raw', []) or []:
+            steps.append(('raw', compile_text(raw_req.strip())))
+        if item.get('path') or item.get('method'):
+            headers = tuple((str(key), compile_text(str(value)))
+                            for key, value in (item.get('headers') or {}).items())
+            body = compile_text(item.get('body') or '')
+            paths = item.get('path', [])
+            if isinstance(paths, str):
+                paths = [paths]
+            for path in paths:
+                steps.append(('path', item.get('method', 'GET'), compile_text(path), headers, body))
+    return _Plan(tuple(variables), tuple(extractor_names), tuple(steps))
+
+
+# 编译结果按文件路径缓存，(mtime, size) 变化时重新编译
+_plans = {}
+_poc_index = None
+
+
+def _poc_index_lookup(template_id: str):
+    """template_id -> POC 文件路径（复用 POC 库按 mtime 校验的索引，首次需要时构建）"""
+    global _poc_index
+    if _poc_index is None:
+        index = {}
+        try:
+            from core.poc_library import POCLibrary
+            for poc in POCLibrary(external_path("poc_library")).get_all_pocs():
+                if poc.get('id') and poc.get('path'):
+                    index.setdefault(poc['id'], poc['path'])
+        except Exception as e:
+            logger.warning(f"Failed to build POC index: {e}")
+        _poc_index = index
+    return _poc_index.get(template_id)
+
+
+def _load_plan(poc_path: str, template_id: str = ''):
+    """返回编译后的请求链；模板不可用时返回 None"""
+    if not poc_path:
+        return None
+    try:
+        stat = os.stat(poc_path)
+    except OSError:
+        # 路径不存在（如 POC 库已迁移）时按 template_id 查 POC 库索引
+        poc_path = _poc_index_lookup(template_id) if template_id else None
+        if not poc_path:
+            return None
+        try:
+            stat = os.stat(poc_path)
+        except OSError:
+            return None
+
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _plans.get(poc_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    plan = None
+    try:
+        import yaml
+        with open(poc_path, 'r', encoding='utf-8') as f:
+            plan = _compile_plan(yaml.safe_load(f) or {})
+    except Exception as e:
+        logger.debug(f"Failed to compile request chain for {poc_path}: {e}")
+    _plans[poc_path] = (signature, plan)
+    return plan
+
+
+def _build_context(plan: _Plan, matched_url: str, request: str, response: str):
+    """由命中 URL、Nuclei 记录的请求 / 响应推导占位符取值：(内置变量, 变量, 随机值)"""
+    values = dict(plan.variables)
+    variable_names = [name for name, _ in plan.variables]
+
+    builtins = {}
+    parsed = None
+    if matched_url:
+        try:
+            parsed = urlparse(matched_url)
+            if parsed.port and parsed.port not in [80, 443]:
+                hostname = f"{parsed.hostname}:{parsed.port}"
+            else:
+                hostname = parsed.hostname or ""
+            if hostname:
+                base_url = f"{parsed.scheme}://{hostname}"
+                builtins = {
+                    'Hostname': hostname, 'Host': hostname, 'BaseURL': base_url, 'RootURL': base_url,
+                    'Scheme': parsed.scheme or 'http',
+                    'Port': str(parsed.port) if parsed.port else ('443' if parsed.scheme == 'https' else '80'),
+                    'Path': parsed.path or '/',
+                }
+        except ValueError:
+            pass
+
+    # 从 matched_url 的路径中提取文件名（适用于文件上传类漏洞）
+    # 例如: /userfile/messageserv/402880f29a529b4d019bd10369fa2675.jsp -> 402880f29a529b4d019bd10369fa2675.jsp
+    if parsed is not None:
+        last_part = parsed.path.split('/')[-1]
+        if '.' in last_part:
+            basename = last_part.rsplit('.', 1)[0]
+            for ext_name in plan.extractor_names:
+                if 'file' in ext_name.lower() or 'upload' in ext_name.lower() or 'path' in ext_name.lower():
+                    values[ext_name] = last_part
+            if 'uploadfile' not in values:
+                values['uploadfile'] = last_part
+
+            # 看起来像随机生成的值时，也赋给 POC 中定义的变量
+            if _RANDOM_BASENAME_RE.match(basename):
+                values['random_filename'] = basename
+                values['rand_base(8)'] = basename
+                for name in variable_names:
+                    if 'name' in name.lower() or 'user' in name.lower() or 'file' in name.lower():
+                        values[name] = basename
+
+    # 从 Nuclei 记录的实际请求中提取变量值（上传文件名、JSESSIONID）
+    if request:
+        match = _FILENAME_RE.search(request)
+        if match and '.' in match.group(1):
+            basename = match.group(1).rsplit('.', 1)[0]
+            for name in variable_names:
+                if name not in values:
+                    values[name] = basename
+        match = _JSESSIONID_RE.search(request)
+        if match:
+            values['jsessionid'] = match.group(1)
+
+    # 也尝试从响应中提取（例如 CVE-2025-15503-gLCSDRzl）
+    if response and not values.get('random_filename'):
+        match = _CVE_SUFFIX_RE.search(response)
+        if match:
+            values['random_filename'] = match.group(1)
+            values['rand_base(8)'] = match.group(1)
+
+    return builtins, values, values.get('random_filename')
+
+
+class RequestChainRenderer:
+    """按命中结果还原 POC 完整请求链；labels 提供无法还原的函数（随机数、哈希、时间戳）的占位说明"""
+
+    def __init__(self, labels: dict = None):
+        self._labels = {kind: (labels or {}).get(kind) for kind in _LABEL_KINDS}
+        self._cache = OrderedDict()
+
+    def render(self, poc_path: str, template_id: str = '', matched_url: str = '',
+               request: str = '', response: str = '') -> tuple:
+        """返回 RequestStep 元组；模板不可用时返回空元组"""
+        plan = _load_plan(poc_path, template_id)
+        if plan is None or not plan.steps:
+            return ()
+
+        builtins, values, random_val = _build_context(plan, matched_url or '', request or '', response or '')
+        key = (plan, tuple(builtins.items()), tuple(values.items()))
+        steps = self._cache.get(key)
+        if steps is not None:
+            self._cache.move_to_end(key)
+            return steps
+
+        context = (builtins, values, random_val)
+        steps = tuple(self._render_step(step, context) for step in plan.steps)
+        self._cache[key] = steps
+        if len(self._cache) > RENDER_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return steps
+
+    def _render_step(self, step, context) -> RequestStep:
+        if step[0] == 'raw':
+            return RequestStep('raw', self._render(step[1], context))
+
+        _, method, path_parts, headers, body_parts = step
+        hostname = context[0].get('Hostname')
+        headers_str = ""
+        # 自动补充 Host 头 (如果 YAML 中未定义)
+        if hostname and not any(name.lower() == 'host' for name, _ in headers):
+            headers_str += f"\nHost: {hostname}"
+        for name, value_parts in headers:
+            headers_str += f"\n{name}: {self._render(value_parts, context)}"
+
+        body = self._render(body_parts, context)
+        if body:
+            # 自动补充 Content-Length
+            if not any(name.lower() == 'content-length' for name, _ in headers):
+                headers_str += f"\nContent-Length: {len(body.encode('utf-8'))}"
+            body = f"\n\n{body}"
+        return RequestStep('path', f"{method} {self._render(path_parts, context)}{headers_str}{body}")
+
+    def _render(self, parts: tuple, context, depth: int = 0) -> str:
+        return ''.join(part if part.__class__ is str else self._resolve(part[0], part[1], context, depth)
+                       for part in parts)
+
+    def _resolve(self, expr: str, kind: str, context, depth: int) -> str:
+        builtins, values, random_val = context
+        value = builtins.get(expr)
+        if value is not None:
+            return value
+        value = values.get(expr)
+        if value is not None:
+            # 变量默认值本身也可能是模板表达式（如 "{{rand_base(6)}}"）
+            if '{{' in value and depth < _MAX_DEPTH:
+                return self._render(compile_text(value), context, depth + 1)
+            return value
+        if random_val:
+            if kind in ('rand_base', 'rand_text'):
+                return random_val
+            if kind == 'to_lower':
+                return random_val.lower()
+            if kind == 'to_upper':
+                return random_val.upper()
+            if kind == 'rand_char':
+                return random_val[:1]
+        label = self._labels.get(kind)
+        if label:
+            return label
+        # 仍无法还原的变量使用已提取的随机值标注
+        return f"[{random_val}]" if random_val else '{{' + expr + '}}'
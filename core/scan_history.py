@@ -1,19 +1,557 @@
 """
 扫描历史记录管理 - 使用 SQLite 存储
 """
-import sqlite3
+import hashlib
 import json
 import os
-from datetime import datetime
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
 
+from core.db import add_column, get_database
+from core.logger import get_logger
 from core.paths import database_path
 
+logger = get_logger("scan_history")
+
+# scan_records 中保留的目标/POC 预览条数，完整列表存于 scan_targets / scan_templates
+TARGET_PREVIEW = 100
+POC_PREVIEW = 50
+# 旧库 raw_json 转为压缩 raw_blob 时每批处理的行数
+BLOB_MIGRATION_BATCH = 500
+
+
+def _compress_raw(result: dict) -> bytes:
+    return zlib.compress(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+
+
+def _decompress_raw(blob) -> str:
+    return zlib.decompress(blob).decode('utf-8') if blob else ''
+
+
+def _migrate_v1(conn):
+    """基础表结构（兼容早期无 status / stats_series 字段的旧库）"""
+    # 扫描记录表
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scan_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            scan_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            target_count INTEGER,
+            poc_count INTEGER,
+            vuln_count INTEGER,
+            duration_seconds REAL,
+            status TEXT DEFAULT 'completed',
+            targets TEXT,
+            pocs TEXT,
+            config TEXT
+        )
+    """)
+    add_column(conn, 'scan_records', 'status', "TEXT DEFAULT 'completed'")
+    # nuclei -stats 时间序列（JSON），用于回看吞吐与错误率
+    add_column(conn, 'scan_records', 'stats_series', 'TEXT')
+
+    # 迁移旧版中文状态值到英文键
+    _status_migration = {
+        '扫描完成': 'completed',
+        '扫描失败': 'failed',
+        '用户停止': 'stopped',
+        '任务完成': 'completed',
+    }
+    for old_val, new_val in _status_migration.items():
+        conn.execute("UPDATE scan_records SET status = ? WHERE status = ?", (new_val, old_val))
+
+    # 漏洞结果表
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vuln_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            scan_id INTEGER,
+            template_id TEXT,
+            template_path TEXT,
+            matched_at TEXT,
+            severity TEXT,
+            timestamp TEXT,
+            raw_json TEXT,
+            FOREIGN KEY (scan_id) REFERENCES scan_records(id)
+        )
+    """)
+    add_column(conn, 'vuln_results', 'template_path', 'TEXT')
+
+
+def _migrate_v2(conn):
+    """索引、压缩原始结果与完整目标/模板表"""
+    # 原始结果以 zlib 压缩存储，raw_json 仅保留给未迁移的旧数据
+    add_column(conn, 'vuln_results', 'raw_blob', 'BLOB')
+
+    # 完整的目标 / 模板列表（scan_records 只保留预览）
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scan_targets (
+            scan_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            target TEXT NOT NULL,
+            FOREIGN KEY (scan_id) REFERENCES scan_records(id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scan_templates (
+            scan_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            template TEXT NOT NULL,
+            FOREIGN KEY (scan_id) REFERENCES scan_records(id)
+        )
+    """)
+
+    # 索引：按扫描取结果、分布统计、趋势与最近记录均走索引
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vuln_scan_id ON vuln_results(scan_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vuln_template_id ON vuln_results(template_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vuln_severity ON vuln_results(severity)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vuln_matched_at ON vuln_results(matched_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_records_time ON scan_records(scan_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_targets_scan ON scan_targets(scan_id, position)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_templates_scan ON scan_templates(scan_id, position)")
+
+
+def _migrate_v3(conn):
+    """仪表盘汇总表：由触发器在写入/删除时增量维护，读取统计不再扫描 vuln_results"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_severity (
+            severity TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_templates (
+            template_id TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stats_templates_count ON stats_templates(count)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_daily (
+            day TEXT PRIMARY KEY,
+            scans INTEGER NOT NULL DEFAULT 0,
+            vulns INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vuln_results_insert AFTER INSERT ON vuln_results
+        BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('vulns', 1)
+                ON CONFLICT(name) DO UPDATE SET value = value + 1;
+            INSERT INTO stats_severity (severity, count) VALUES (COALESCE(NEW.severity, 'unknown'), 1)
+                ON CONFLICT(severity) DO UPDATE SET count = count + 1;
+            INSERT INTO stats_templates (template_id, count) VALUES (COALESCE(NEW.template_id, ''), 1)
+                ON CONFLICT(template_id) DO UPDATE SET count = count + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vuln_results_delete AFTER DELETE ON vuln_results
+        BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'vulns';
+            UPDATE stats_severity SET count = count - 1 WHERE severity = COALESCE(OLD.severity, 'unknown');
+            UPDATE stats_templates SET count = count - 1 WHERE template_id = COALESCE(OLD.template_id, '');
+            DELETE FROM stats_templates WHERE template_id = COALESCE(OLD.template_id, '') AND count <= 0;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_scan_records_insert AFTER INSERT ON scan_records
+        BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('scans', 1)
+                ON CONFLICT(name) DO UPDATE SET value = value + 1;
+            INSERT INTO stats_daily (day, scans, vulns) VALUES (DATE(NEW.scan_time), 1, COALESCE(NEW.vuln_count, 0))
+                ON CONFLICT(day) DO UPDATE SET scans = scans + 1, vulns = vulns + excluded.vulns;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_scan_records_update AFTER UPDATE OF vuln_count ON scan_records
+        BEGIN
+            UPDATE stats_daily SET vulns = vulns - COALESCE(OLD.vuln_count, 0) + COALESCE(NEW.vuln_count, 0)
+                WHERE day = DATE(NEW.scan_time);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_scan_records_delete AFTER DELETE ON scan_records
+        BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'scans';
+            UPDATE stats_daily SET scans = scans - 1, vulns = vulns - COALESCE(OLD.vuln_count, 0)
+                WHERE day = DATE(OLD.scan_time);
+        END
+    """)
+
+    # 用现有数据回填一次
+    _rebuild_stats(conn)
+
+
+def _rebuild_stats(conn):
+    """按明细表重新计算全部汇总"""
+    for table in ('stats_counters', 'stats_severity', 'stats_templates', 'stats_daily'):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("INSERT INTO stats_counters (name, value) SELECT 'scans', COUNT(*) FROM scan_records")
+    conn.execute("INSERT INTO stats_counters (name, value) SELECT 'vulns', COUNT(*) FROM vuln_results")
+    conn.execute("""
+        INSERT INTO stats_severity (severity, count)
+        SELECT COALESCE(severity, 'unknown'), COUNT(*) FROM vuln_results GROUP BY 1
+    """)
+    conn.execute("""
+        INSERT INTO stats_templates (template_id, count)
+        SELECT COALESCE(template_id, ''), COUNT(*) FROM vuln_results GROUP BY 1
+    """)
+    conn.execute("""
+        INSERT INTO stats_daily (day, scans, vulns)
+        SELECT DATE(scan_time), COUNT(*), COALESCE(SUM(vuln_count), 0) FROM scan_records GROUP BY 1
+    """)
+
+
+# 严重程度等级，用于“最低严重程度”筛选
+SEVERITY_RANKS = {'info': 1, 'low': 2, 'medium': 3, 'high': 4, 'critical': 5}
+_SEVERITY_RANK_SQL = """
+    CASE LOWER({column})
+        WHEN 'critical' THEN 5 WHEN 'high' THEN 4 WHEN 'medium' THEN 3
+        WHEN 'low' THEN 2 WHEN 'info' THEN 1 ELSE 0
+    END
+"""
+
+
+def _fts_available(conn) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scan_targets_fts'"
+    ).fetchone() is not None
+
+
+def _migrate_v4(conn):
+    """历史浏览：键集分页索引、每次扫描的最高严重程度、目标子串检索"""
+    add_column(conn, 'scan_records', 'max_severity_rank', 'INTEGER DEFAULT 0')
+    conn.execute(f"""
+        UPDATE scan_records SET max_severity_rank = COALESCE((
+            SELECT MAX({_SEVERITY_RANK_SQL.format(column='v.severity')})
+            FROM vuln_results v WHERE v.scan_id = scan_records.id
+        ), 0)
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_vuln_results_severity AFTER INSERT ON vuln_results
+        BEGIN
+            UPDATE scan_records
+            SET max_severity_rank = MAX(COALESCE(max_severity_rank, 0),
+                                        {_SEVERITY_RANK_SQL.format(column='NEW.severity')})
+            WHERE id = NEW.scan_id;
+        END
+    """)
+
+    # (scan_time, id) 键集分页；状态/严重程度索引带上排序列，筛选后仍按索引顺序读取
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_records_time_id ON scan_records(scan_time, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_records_status ON scan_records(status, scan_time, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_records_severity "
+                 "ON scan_records(max_severity_rank, scan_time, id)")
+
+    # v2 之前的记录只有 JSON 预览，补写到 scan_targets 以便按目标筛选
+    legacy = conn.execute("""
+        SELECT id, targets FROM scan_records r
+        WHERE targets IS NOT NULL AND NOT EXISTS (SELECT 1 FROM scan_targets t WHERE t.scan_id = r.id)
+    """).fetchall()
+    for row in legacy:
+        try:
+            targets = json.loads(row['targets'] or '[]')
+        except (TypeError, ValueError):
+            continue
+        conn.executemany(
+            "INSERT INTO scan_targets (scan_id, position, target) VALUES (?, ?, ?)",
+            [(row['id'], i, str(target)) for i, target in enumerate(targets or [])]
+        )
+
+    # 目标子串检索使用 FTS5 trigram 索引（SQLite 3.34+），不可用时回退为 LIKE
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS scan_targets_fts
+            USING fts5(target, scan_id UNINDEXED, tokenize = 'trigram')
+        """)
+    except sqlite3.OperationalError as e:
+        logger.info(f"FTS5 trigram unavailable, target filter falls back to LIKE: {e}")
+        return
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_scan_targets_fts_insert AFTER INSERT ON scan_targets
+        BEGIN
+            INSERT INTO scan_targets_fts (rowid, target, scan_id) VALUES (NEW.rowid, NEW.target, NEW.scan_id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_scan_targets_fts_delete AFTER DELETE ON scan_targets
+        BEGIN
+            DELETE FROM scan_targets_fts WHERE rowid = OLD.rowid;
+        END
+    """)
+    conn.execute("DELETE FROM scan_targets_fts")
+    conn.execute("INSERT INTO scan_targets_fts (rowid, target, scan_id) "
+                 "SELECT rowid, target, scan_id FROM scan_targets")
+
+
+def extractor_hash(result: dict) -> str:
+    """匹配器/提取器输出的摘要，与 template-id、matched-at 一起构成发现的唯一键"""
+    payload = [result.get('matcher-name') or '', result.get('extractor-name') or '',
+               sorted(str(value) for value in result.get('extracted-results') or [])]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def finding_key(result: dict) -> tuple:
+    """发现的内容寻址键 (template-id, matched-at, extractor hash)"""
+    return (result.get('template-id') or '', result.get('matched-at') or '', extractor_hash(result))
+
+
+# 分析视图的事件表达式：vuln_results 关联 findings，与汇总触发器中的取值保持一致
+_EVENT_HOST_SQL = "COALESCE((SELECT host FROM findings WHERE id = {ref}.finding_id), '')"
+_EVENT_NAME_SQL = "(SELECT name FROM findings WHERE id = {ref}.finding_id)"
+
+
+def _migrate_v5(conn):
+    """统一发现库：原始结果按 (template-id, matched-at, extractor hash) 只存一份，扫描通过 finding_id 引用；
+    漏洞分析的按天汇总由 vuln_results 上的触发器维护"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS findings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            template_id TEXT NOT NULL,
+            matched_at TEXT NOT NULL,
+            extractor_hash TEXT NOT NULL,
+            template_path TEXT,
+            host TEXT,
+            name TEXT,
+            severity TEXT,
+            tags TEXT,
+            raw_blob BLOB,
+            first_seen TEXT,
+            last_seen TEXT,
+            UNIQUE (template_id, matched_at, extractor_hash)
+        )
+    """)
+    add_column(conn, 'vuln_results', 'finding_id', 'INTEGER REFERENCES findings(id)')
+    # 结果写入的本地时间，分析视图按它分桶；旧数据取所属扫描的时间
+    add_column(conn, 'vuln_results', 'recorded_at', 'TEXT')
+    conn.execute("""
+        UPDATE vuln_results SET recorded_at = (
+            SELECT STRFTIME('%Y-%m-%dT%H:%M:%S', r.scan_time, 'localtime')
+            FROM scan_records r WHERE r.id = vuln_results.scan_id
+        ) WHERE recorded_at IS NULL
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vuln_finding ON vuln_results(finding_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vuln_recorded_at ON vuln_results(recorded_at)")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_daily_severity (
+            day TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, severity)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_daily_template (
+            day TEXT NOT NULL,
+            template_id TEXT NOT NULL,
+            name TEXT,
+            severity TEXT,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, template_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_daily_host (
+            day TEXT NOT NULL,
+            host TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, host, severity)
+        ) WITHOUT ROWID
+    """)
+
+    host_new, name_new = _EVENT_HOST_SQL.format(ref='NEW'), _EVENT_NAME_SQL.format(ref='NEW')
+    host_old = _EVENT_HOST_SQL.format(ref='OLD')
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_vuln_results_analytics_insert AFTER INSERT ON vuln_results
+        WHEN NEW.recorded_at IS NOT NULL
+        BEGIN
+            INSERT INTO analytics_daily_severity (day, severity, count)
+                VALUES (SUBSTR(NEW.recorded_at, 1, 10), COALESCE(NEW.severity, 'unknown'), 1)
+                ON CONFLICT(day, severity) DO UPDATE SET count = count + 1;
+            INSERT INTO analytics_daily_template (day, template_id, name, severity, count)
+                VALUES (SUBSTR(NEW.recorded_at, 1, 10), COALESCE(NEW.template_id, ''), {name_new},
+                        COALESCE(NEW.severity, 'unknown'), 1)
+                ON CONFLICT(day, template_id) DO UPDATE
+                SET count = count + 1, name = excluded.name, severity = excluded.severity;
+            INSERT INTO analytics_daily_host (day, host, severity, count)
+                VALUES (SUBSTR(NEW.recorded_at, 1, 10), {host_new}, COALESCE(NEW.severity, 'unknown'), 1)
+                ON CONFLICT(day, host, severity) DO UPDATE SET count = count + 1;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_vuln_results_analytics_delete AFTER DELETE ON vuln_results
+        WHEN OLD.recorded_at IS NOT NULL
+        BEGIN
+            UPDATE analytics_daily_severity SET count = count - 1
+                WHERE day = SUBSTR(OLD.recorded_at, 1, 10) AND severity = COALESCE(OLD.severity, 'unknown');
+            UPDATE analytics_daily_template SET count = count - 1
+                WHERE day = SUBSTR(OLD.recorded_at, 1, 10) AND template_id = COALESCE(OLD.template_id, '');
+            UPDATE analytics_daily_host SET count = count - 1
+                WHERE day = SUBSTR(OLD.recorded_at, 1, 10) AND host = {host_old}
+                  AND severity = COALESCE(OLD.severity, 'unknown');
+            DELETE FROM analytics_daily_severity WHERE day = SUBSTR(OLD.recorded_at, 1, 10) AND count <= 0;
+            DELETE FROM analytics_daily_template WHERE day = SUBSTR(OLD.recorded_at, 1, 10) AND count <= 0;
+            DELETE FROM analytics_daily_host WHERE day = SUBSTR(OLD.recorded_at, 1, 10) AND count <= 0;
+        END
+    """)
+    _rebuild_analytics(conn)
+
+
+def _rebuild_analytics(conn):
+    """按 vuln_results / findings 重新计算漏洞分析的按天汇总"""
+    for table in ('analytics_daily_severity', 'analytics_daily_template', 'analytics_daily_host'):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("""
+        INSERT INTO analytics_daily_severity (day, severity, count)
+        SELECT SUBSTR(recorded_at, 1, 10), COALESCE(severity, 'unknown'), COUNT(*)
+        FROM vuln_results WHERE recorded_at IS NOT NULL GROUP BY 1, 2
+    """)
+    # 名称与严重程度取当天最后写入的结果（与触发器一致）
+    conn.execute(f"""
+        INSERT INTO analytics_daily_template (day, template_id, name, severity, count)
+        SELECT day, template_id, name, severity, n FROM (
+            SELECT SUBSTR(v.recorded_at, 1, 10) AS day, COALESCE(v.template_id, '') AS template_id,
+                   {_EVENT_NAME_SQL.format(ref='v')} AS name, COALESCE(v.severity, 'unknown') AS severity,
+                   COUNT(*) AS n, MAX(v.id)
+            FROM vuln_results v WHERE v.recorded_at IS NOT NULL GROUP BY 1, 2
+        )
+    """)
+    conn.execute(f"""
+        INSERT INTO analytics_daily_host (day, host, severity, count)
+        SELECT SUBSTR(v.recorded_at, 1, 10), {_EVENT_HOST_SQL.format(ref='v')}, COALESCE(v.severity, 'unknown'),
+               COUNT(*)
+        FROM vuln_results v WHERE v.recorded_at IS NOT NULL GROUP BY 1, 2, 3
+    """)
+
+
+def _store_findings(conn, results: list, seen_at: str) -> list:
+    """
+    把结果写入发现库并返回与 results 对应的 finding_id 列表
+
+    每个发现只存一份原始结果：已存在的发现替换为最近一次出现的原始结果并更新 last_seen，
+    导出与详情展示的请求/响应、时间戳均为最新一次
+    """
+    ids = {}
+    seen = []
+    keys = [finding_key(result) for result in results]
+    # 同一批中重复出现的发现取最后一次的原始结果
+    latest = dict(zip(keys, results))
+    for key, result in latest.items():
+        row = conn.execute(
+            "SELECT id FROM findings WHERE template_id = ? AND matched_at = ? AND extractor_hash = ?", key
+        ).fetchone()
+        if row:
+            ids[key] = row[0]
+            seen.append((_compress_raw(result), seen_at, row[0]))
+            continue
+        info = result.get('info') or {}
+        ids[key] = conn.execute("""
+            INSERT INTO findings
+            (template_id, matched_at, extractor_hash, template_path, host, name, severity, tags, raw_blob,
+             first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, key + (result.get('template-path', ''),
+                    result.get('host', ''),
+                    info.get('name') or result.get('template-id', ''),
+                    info.get('severity', 'unknown'),
+                    json.dumps(info.get('tags') or [], ensure_ascii=False),
+                    _compress_raw(result),
+                    seen_at, seen_at)).lastrowid
+    conn.executemany(
+        "UPDATE findings SET raw_blob = ?, last_seen = MAX(COALESCE(last_seen, ''), ?) WHERE id = ?", seen
+    )
+    return [ids[key] for key in keys]
+
+
+def _collect_findings(conn, finding_ids):
+    """删除不再被任何扫描结果引用的发现"""
+    conn.executemany(
+        "DELETE FROM findings WHERE id = ? AND NOT EXISTS (SELECT 1 FROM vuln_results WHERE finding_id = ?)",
+        [(finding_id, finding_id) for finding_id in finding_ids]
+    )
+
+
+def target_set_hash(targets) -> str:
+    """目标集合指纹（去空白、去重、排序后摘要），用于找到同一批资产的上一次扫描；空集合返回 None"""
+    normalized = sorted({str(target).strip() for target in targets or [] if str(target).strip()})
+    if not normalized:
+        return None
+    return hashlib.sha1('\n'.join(normalized).encode('utf-8')).hexdigest()
+
+
+def _backfill_delta(conn):
+    """按上一次同目标扫描为尚未标记的结果补写 new / recurring"""
+    conn.execute("""
+        UPDATE vuln_results SET delta = CASE WHEN EXISTS (
+            SELECT 1 FROM scan_records r
+            JOIN vuln_results p ON p.scan_id = r.previous_scan_id AND p.finding_id = vuln_results.finding_id
+            WHERE r.id = vuln_results.scan_id
+        ) THEN 'recurring' ELSE 'new' END
+        WHERE delta IS NULL AND scan_id IS NOT NULL AND finding_id IS NOT NULL
+    """)
+
+
+def _migrate_v6(conn):
+    """跨扫描差异：目标集合指纹、上一次同目标的完成扫描、结果相对上一次的 new / recurring 标记"""
+    add_column(conn, 'scan_records', 'target_set_hash', 'TEXT')
+    add_column(conn, 'scan_records', 'previous_scan_id', 'INTEGER')
+    add_column(conn, 'vuln_results', 'delta', 'TEXT')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_records_target_set ON scan_records(target_set_hash, id)")
+    # 发现指纹索引：判断某发现是否出现在指定扫描中
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vuln_scan_finding ON vuln_results(scan_id, finding_id)")
+
+    targets_by_scan = defaultdict(list)
+    for row in conn.execute("SELECT scan_id, target FROM scan_targets ORDER BY scan_id, position"):
+        targets_by_scan[row[0]].append(row[1])
+    last_completed = {}
+    updates = []
+    for row in conn.execute("SELECT id, status FROM scan_records ORDER BY id").fetchall():
+        digest = target_set_hash(targets_by_scan.get(row['id']))
+        updates.append((digest, last_completed.get(digest) if digest else None, row['id']))
+        if digest and row['status'] == 'completed':
+            last_completed[digest] = row['id']
+    conn.executemany("UPDATE scan_records SET target_set_hash = ?, previous_scan_id = ? WHERE id = ?", updates)
+    _backfill_delta(conn)
+
+
+# 按顺序追加，已应用的版本记录在 PRAGMA user_version
+_MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5, _migrate_v6]
+
+
+@dataclass
+class ScanFilter:
+    """扫描历史筛选条件（空值表示不筛选）"""
+    status: str = ""
+    date_from: str = ""       # YYYY-MM-DD，含当天
+    date_to: str = ""         # YYYY-MM-DD，含当天
+    target: str = ""          # 目标子串
+    min_severity: str = ""    # info / low / medium / high / critical
+
+    def is_empty(self) -> bool:
+        return not (self.status or self.date_from or self.date_to or self.target.strip() or self.min_severity)
+
+    def key(self) -> tuple:
+        return (self.status, self.date_from, self.date_to, self.target.strip().lower(), self.min_severity)
+
 
 class ScanHistory:
     """
     扫描历史记录管理器
-    使用 SQLite 数据库存储
+    使用 SQLite 数据库存储（共享单写线程，读走只读连接池）
     """
     
     def __init__(self, db_path: str = None):
@@ -21,111 +559,279 @@ class ScanHistory:
             # 默认存储在程序目录下
             db_path = str(database_path("scan_history.db"))
         self.db_path = db_path
+        self._db = get_database(db_path)
+        # 带筛选条件的记录数缓存，任何写入后清空
+        self._count_cache = {}
+        # 旧数据的后台迁移：完成前统计与分析汇总可能不完整
+        self._migration_ready = threading.Event()
+        self._migration_done = 0
+        self._migration_total = 0
+        self._migration_thread = None
         self.init_db()
+        self._has_fts = self._db.transaction(_fts_available)
+
+    def close(self):
+        self._db.close()
     
     def init_db(self):
         """初始化数据库"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        self._db.migrate(_MIGRATIONS)
+        # 上次运行中途退出、未能结束的流式记录
+        self._db.execute("UPDATE scan_records SET status = 'interrupted' WHERE status = 'running'")
+        self._start_data_migration()
 
-            # 扫描记录表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS scan_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    scan_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    target_count INTEGER,
-                    poc_count INTEGER,
-                    vuln_count INTEGER,
-                    duration_seconds REAL,
-                    status TEXT DEFAULT 'completed',
-                    targets TEXT,
-                    pocs TEXT,
-                    config TEXT
-                )
-            ''')
+    def _start_data_migration(self):
+        """旧版结果的压缩与并入发现库在后台线程中分批提交给写线程，不阻塞启动"""
+        row = self._db.query_one("""
+            SELECT (SELECT COUNT(*) FROM vuln_results WHERE raw_json IS NOT NULL AND raw_blob IS NULL),
+                   (SELECT COUNT(*) FROM vuln_results WHERE finding_id IS NULL)
+        """)
+        self._migration_total = (row[0] or 0) + (row[1] or 0)
+        if not self._migration_total:
+            self._migration_ready.set()
+            return
+        logger.info(f"Migrating {self._migration_total} legacy vuln results in the background")
+        self._migration_thread = threading.Thread(target=self._run_data_migration,
+                                                  name="ScanHistoryMigration", daemon=True)
+        self._migration_thread.start()
 
-            # 检查是否需要添加 status 字段（兼容旧数据库）
-            cursor.execute("PRAGMA table_info(scan_records)")
-            columns = [col[1] for col in cursor.fetchall()]
-            if 'status' not in columns:
-                cursor.execute("ALTER TABLE scan_records ADD COLUMN status TEXT DEFAULT 'completed'")
-
-            # 迁移旧版中文状态值到英文键
-            _status_migration = {
-                '扫描完成': 'completed',
-                '扫描失败': 'failed',
-                '用户停止': 'stopped',
-                '任务完成': 'completed',
-            }
-            for old_val, new_val in _status_migration.items():
-                cursor.execute("UPDATE scan_records SET status = ? WHERE status = ?", (new_val, old_val))
+    def _run_data_migration(self):
+        try:
+            self._migrate_raw_blobs()
+            self._migrate_findings()
+        except Exception as e:
+            logger.error(f"Migrate legacy vuln results failed: {e}")
+        finally:
+            self._count_cache.clear()
+            self._migration_ready.set()
 
-            # 漏洞结果表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS vuln_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    scan_id INTEGER,
-                    template_id TEXT,
-                    template_path TEXT,
-                    matched_at TEXT,
-                    severity TEXT,
-                    timestamp TEXT,
-                    raw_json TEXT,
-                    FOREIGN KEY (scan_id) REFERENCES scan_records(id)
-                )
-            ''')
+    def is_ready(self) -> bool:
+        """旧数据迁移是否已完成（未完成时统计与分析汇总可能不完整）"""
+        return self._migration_ready.is_set()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        return self._migration_ready.wait(timeout)
+
+    def migration_progress(self) -> tuple:
+        """后台迁移进度 (已处理条数, 总条数)"""
+        return min(self._migration_done, self._migration_total), self._migration_total
+
+    def _migrate_raw_blobs(self):
+        """将旧版明文 raw_json 分批压缩到 raw_blob（每批一个事务，中断后下次启动继续）"""
+        def _batch(conn):
+            rows = conn.execute("""
+                SELECT id, raw_json FROM vuln_results
+                WHERE raw_json IS NOT NULL AND raw_blob IS NULL
+                LIMIT ?
+            """, (BLOB_MIGRATION_BATCH,)).fetchall()
+            conn.executemany(
+                "UPDATE vuln_results SET raw_blob = ?, raw_json = NULL WHERE id = ?",
+                [(zlib.compress(row['raw_json'].encode('utf-8')), row['id']) for row in rows]
+            )
+            return len(rows)
+
+        migrated = 0
+        while True:
+            count = self._db.transaction(_batch)
+            if not count:
+                break
+            migrated += count
+            self._migration_done += count
+        if migrated:
+            logger.info(f"Compressed {migrated} legacy vuln results")
+
+    def _migrate_findings(self):
+        """旧版逐条保存原始结果的记录分批并入发现库，并释放各自的 raw_blob"""
+        def _batch(conn):
+            rows = conn.execute("""
+                SELECT v.id, v.template_id, v.template_path, v.matched_at, v.severity, v.raw_blob,
+                       COALESCE(v.recorded_at, '') AS recorded_at
+                FROM vuln_results v
+                WHERE v.finding_id IS NULL
+                LIMIT ?
+            """, (BLOB_MIGRATION_BATCH,)).fetchall()
+            results = []
+            for row in rows:
+                try:
+                    result = json.loads(_decompress_raw(row['raw_blob']) or '{}')
+                except (ValueError, zlib.error):
+                    result = {}
+                result.setdefault('template-id', row['template_id'] or '')
+                result.setdefault('template-path', row['template_path'] or '')
+                result.setdefault('matched-at', row['matched_at'] or '')
+                result.setdefault('info', {}).setdefault('severity', row['severity'] or 'unknown')
+                results.append(result)
+            finding_ids = _store_findings(conn, results, '')
+            conn.executemany(
+                "UPDATE vuln_results SET finding_id = ?, raw_blob = NULL, raw_json = NULL WHERE id = ?",
+                [(finding_id, row['id']) for finding_id, row in zip(finding_ids, rows)]
+            )
+            # 首次/最近出现时间取引用它的结果时间
+            conn.executemany("""
+                UPDATE findings SET
+                    first_seen = CASE WHEN COALESCE(first_seen, '') = '' OR first_seen > ?2 THEN ?2 ELSE first_seen END,
+                    last_seen = MAX(COALESCE(last_seen, ''), ?2)
+                WHERE id = ?1
+            """, [(finding_id, row['recorded_at']) for finding_id, row in zip(finding_ids, rows)])
+            return len(rows)
 
-            # 检查是否需要添加 template_path 字段（兼容旧数据库）
-            cursor.execute("PRAGMA table_info(vuln_results)")
-            v_columns = [col[1] for col in cursor.fetchall()]
-            if 'template_path' not in v_columns:
-                cursor.execute("ALTER TABLE vuln_results ADD COLUMN template_path TEXT")
+        migrated = 0
+        while True:
+            count = self._db.transaction(_batch)
+            if not count:
+                break
+            migrated += count
+            self._migration_done += count
+        if migrated:
+            # 结果与发现关联后主机/名称与差异标记才可用，重算分析汇总
+            def _finish(conn):
+                _rebuild_analytics(conn)
+                _backfill_delta(conn)
 
-            conn.commit()
+            self._db.transaction(_finish)
+            logger.info(f"Linked {migrated} legacy vuln results to the findings store")
     
     def add_scan_record(self, target_count: int, poc_count: int, vuln_count: int,
                         duration: float, targets: list, pocs: list, config: dict,
-                        status: str = "completed") -> int:
-        """添加扫描记录，返回记录ID"""
-        with sqlite3.connect(self.db_path) as conn:
+                        status: str = "completed", stats_series: dict = None, scan_time: str = None) -> int:
+        """添加扫描记录，返回记录ID（scan_time 为 UTC 'YYYY-MM-DD HH:MM:SS'，导入旧数据时使用，默认当前时间）"""
+        digest = target_set_hash(targets)
+
+        def _insert(conn):
             cursor = conn.cursor()
 
+            # 同一目标集合上一次完成的扫描，作为差异对比基准
+            previous = cursor.execute('''
+                SELECT id FROM scan_records
+                WHERE target_set_hash = ? AND status = 'completed'
+                ORDER BY id DESC LIMIT 1
+            ''', (digest,)).fetchone() if digest else None
             cursor.execute('''
                 INSERT INTO scan_records
-                (target_count, poc_count, vuln_count, duration_seconds, status, targets, pocs, config)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (target_count, poc_count, vuln_count, duration, status,
-                  json.dumps(targets[:100], ensure_ascii=False),  # 只保存前100个
-                  json.dumps(pocs[:50], ensure_ascii=False),      # 只保存前50个
-                  json.dumps(config, ensure_ascii=False)))
-
+                (scan_time, target_count, poc_count, vuln_count, duration_seconds, status, targets, pocs, config,
+                 stats_series, target_set_hash, previous_scan_id)
+                VALUES (COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (scan_time, target_count, poc_count, vuln_count, duration, status,
+                  json.dumps(targets[:TARGET_PREVIEW], ensure_ascii=False),  # 列表预览
+                  json.dumps(pocs[:POC_PREVIEW], ensure_ascii=False),
+                  json.dumps(config, ensure_ascii=False),
+                  json.dumps(stats_series, ensure_ascii=False) if stats_series else None,
+                  digest, previous[0] if previous else None))
             scan_id = cursor.lastrowid
-            conn.commit()
+
+            cursor.executemany(
+                "INSERT INTO scan_targets (scan_id, position, target) VALUES (?, ?, ?)",
+                ((scan_id, i, str(target)) for i, target in enumerate(targets or []))
+            )
+            cursor.executemany(
+                "INSERT INTO scan_templates (scan_id, position, template) VALUES (?, ?, ?)",
+                ((scan_id, i, str(poc)) for i, poc in enumerate(pocs or []))
+            )
             return scan_id
+
+        scan_id = self._db.transaction(_insert)
+        self._count_cache.clear()
+        return scan_id
     
+    def begin_scan_record(self, targets: list, pocs: list, config: dict) -> int:
+        """扫描开始时创建状态为 running 的记录，结果可在扫描过程中流式写入"""
+        return self.add_scan_record(len(targets), len(pocs), 0, 0, targets, pocs, config, status="running")
+
+    def finish_scan_record(self, scan_id: int, vuln_count: int, duration: float, status: str = "completed",
+                           target_count: int = None, poc_count: int = None, stats_series: dict = None):
+        """扫描结束时更新流式记录的统计与状态"""
+        self._db.execute('''
+            UPDATE scan_records
+            SET vuln_count = ?, duration_seconds = ?, status = ?,
+                target_count = COALESCE(?, target_count),
+                poc_count = COALESCE(?, poc_count),
+                stats_series = COALESCE(?, stats_series)
+            WHERE id = ?
+        ''', (vuln_count, duration, status, target_count, poc_count,
+              json.dumps(stats_series, ensure_ascii=False) if stats_series else None,
+              scan_id))
+        self._count_cache.clear()
+
+    @staticmethod
+    def _classify(conn, scan_id: int, finding_ids: list) -> list:
+        """相对上一次同目标扫描，标记每个发现为 new / recurring（未关联扫描的结果返回 None）"""
+        if scan_id is None:
+            return [None] * len(finding_ids)
+        row = conn.execute("SELECT previous_scan_id FROM scan_records WHERE id = ?", (scan_id,)).fetchone()
+        previous = row[0] if row else None
+        recurring = set()
+        if previous is not None:
+            unique = list(set(finding_ids))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                recurring.update(r[0] for r in conn.execute(
+                    f"SELECT finding_id FROM vuln_results WHERE scan_id = ? "
+                    f"AND finding_id IN ({', '.join('?' * len(chunk))})",
+                    [previous] + chunk
+                ))
+        return ['recurring' if finding_id in recurring else 'new' for finding_id in finding_ids]
+
+    @staticmethod
+    def _vuln_row(scan_id: int, finding_id: int, delta: str, result: dict, recorded_at: str) -> tuple:
+        return (scan_id,
+                finding_id,
+                delta,
+                result.get('template-id', ''),
+                result.get('template-path', ''),
+                result.get('matched-at', ''),
+                result.get('info', {}).get('severity', 'unknown'),
+                result.get('timestamp', ''),
+                recorded_at)
+
+    def add_vuln_results(self, scan_id: int, results: list, recorded_at: list = None) -> int:
+        """
+        批量添加漏洞结果（写线程组提交 + executemany），返回写入条数
+
+        原始结果存入发现库（相同发现只存一份），vuln_results 只保存引用；
+        recorded_at 为与 results 一一对应的记录时间（导入旧数据时使用），默认当前时间
+        """
+        results = list(results or [])
+        if not results:
+            return 0
+        now = datetime.now().isoformat()
+        times = list(recorded_at) if recorded_at else [now] * len(results)
+
+        def _insert(conn):
+            finding_ids = _store_findings(conn, results, now)
+            deltas = self._classify(conn, scan_id, finding_ids)
+            conn.executemany('''
+                INSERT INTO vuln_results
+                (scan_id, finding_id, delta, template_id, template_path, matched_at, severity, timestamp,
+                 recorded_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [self._vuln_row(scan_id, finding_id, delta, result, at)
+                  for finding_id, delta, result, at in zip(finding_ids, deltas, results, times)])
+
+        self._db.transaction(_insert)
+        # 最高严重程度随结果写入变化，带严重程度筛选的计数需要失效
+        self._count_cache.clear()
+        return len(results)
+
     def add_vuln_result(self, scan_id: int, result: dict):
         """添加漏洞结果"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        self.add_vuln_results(scan_id, [result])
 
-            cursor.execute('''
-                INSERT INTO vuln_results
-                (scan_id, template_id, template_path, matched_at, severity, timestamp, raw_json)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (scan_id,
-                  result.get('template-id', ''),
-                  result.get('template-path', ''),
-                  result.get('matched-at', ''),
-                  result.get('info', {}).get('severity', 'unknown'),
-                  result.get('timestamp', ''),
-                  json.dumps(result, ensure_ascii=False)))
-
-            conn.commit()
+    def open_result_stream(self, scan_id: int) -> 'VulnResultStream':
+        """打开后台流式写入器，扫描期间逐条提交结果、按批落库"""
+        stream = VulnResultStream(self, scan_id)
+        stream.start()
+        return stream
+
+    def write_results_async(self, scan_id: int, results: list, on_finished=None) -> 'VulnResultStream':
+        """把一次性保存的结果交给后台写入线程，立即返回；全部落库后回调 on_finished(scan_id)"""
+        stream = self.open_result_stream(scan_id)
+        stream.extend(results)
+        stream.finish(on_finished=on_finished)
+        return stream
     
     def get_recent_scans(self, limit: int = 20) -> list:
         """获取最近的扫描记录"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._db.reader() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -139,8 +845,7 @@ class ScanHistory:
     
     def get_scan_record(self, scan_id: int) -> dict:
         """获取单条扫描记录"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._db.reader() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -151,60 +856,131 @@ class ScanHistory:
             row = cursor.fetchone()
             return dict(row) if row else None
     
-    def get_scan_vulns(self, scan_id: int) -> list:
-        """获取扫描的漏洞结果"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    def _iter_vuln_rows(self, sql: str, params: tuple, chunk_size: int):
+        """按块从只读游标读取结果并逐条解压 raw_blob，遍历期间占用一个只读连接"""
+        with self._db.reader() as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    vuln = dict(row)
+                    blob = vuln.pop('raw_blob')
+                    if blob is not None:
+                        vuln['raw_json'] = _decompress_raw(blob)
+                    yield vuln
 
-            cursor.execute('''
-                SELECT * FROM vuln_results
-                WHERE scan_id = ?
-                ORDER BY id
-            ''', (scan_id,))
+    def iter_scan_vulns(self, scan_id: int, delta_only: bool = False, chunk_size: int = 500):
+        """
+        逐条生成扫描的漏洞结果（raw_json 为解压后的 JSON 字符串，delta 为 new / recurring），
+        用于导出等不需要整体载入内存的场景
 
-            results = [dict(row) for row in cursor.fetchall()]
-            return results
+        delta_only: 只返回相对上一次同目标扫描新出现的结果
+        """
+        yield from self._iter_vuln_rows(f'''
+            SELECT v.id, v.scan_id, v.finding_id, v.template_id, v.template_path, v.matched_at,
+                   v.severity, v.timestamp, v.delta, f.host, f.name, f.tags,
+                   v.raw_json, COALESCE(v.raw_blob, f.raw_blob) AS raw_blob
+            FROM vuln_results v
+            LEFT JOIN findings f ON f.id = v.finding_id
+            WHERE v.scan_id = ? {"AND v.delta = 'new'" if delta_only else ""}
+            ORDER BY v.id
+        ''', (scan_id,), chunk_size)
+
+    def get_scan_vulns(self, scan_id: int, delta_only: bool = False) -> list:
+        """
+        获取扫描的漏洞结果（raw_json 为解压后的 JSON 字符串，delta 为 new / recurring）
+
+        delta_only: 只返回相对上一次同目标扫描新出现的结果
+        """
+        return list(self.iter_scan_vulns(scan_id, delta_only))
+
+    def _resolved_sql(self, columns: str) -> str:
+        """上一次同目标扫描中出现、本次扫描未再出现的发现"""
+        return f'''
+            SELECT {columns}
+            FROM scan_records r
+            JOIN findings f ON f.id IN (SELECT p.finding_id FROM vuln_results p WHERE p.scan_id = r.previous_scan_id)
+            WHERE r.id = ? AND r.status != 'running'
+              AND NOT EXISTS (SELECT 1 FROM vuln_results c WHERE c.scan_id = r.id AND c.finding_id = f.id)
+        '''
+
+    def iter_resolved_findings(self, scan_id: int, chunk_size: int = 500):
+        """逐条生成相对上一次同目标扫描已消失（resolved）的发现，字段与 iter_scan_vulns 一致"""
+        yield from self._iter_vuln_rows(self._resolved_sql('''
+            NULL AS id, r.previous_scan_id AS scan_id, f.id AS finding_id, f.template_id, f.template_path,
+            f.matched_at, f.severity, f.last_seen AS timestamp, 'resolved' AS delta, f.host, f.name, f.tags,
+            '' AS raw_json, f.raw_blob
+        ''') + " ORDER BY f.id", (scan_id,), chunk_size)
+
+    def get_resolved_findings(self, scan_id: int) -> list:
+        """获取相对上一次同目标扫描已消失（resolved）的发现，字段与 get_scan_vulns 一致"""
+        return list(self.iter_resolved_findings(scan_id))
+
+    def get_scan_delta(self, scan_id: int) -> dict:
+        """本次扫描相对上一次同目标扫描的差异计数"""
+        with self._db.reader() as conn:
+            row = conn.execute("SELECT previous_scan_id FROM scan_records WHERE id = ?", (scan_id,)).fetchone()
+            counts = dict(conn.execute(
+                "SELECT delta, COUNT(*) FROM vuln_results WHERE scan_id = ? GROUP BY delta", (scan_id,)
+            ).fetchall())
+            resolved = conn.execute(f"SELECT COUNT(*) FROM ({self._resolved_sql('f.id')})", (scan_id,)).fetchone()[0]
+        return {
+            'previous_scan_id': row[0] if row else None,
+            'new': counts.get('new', 0),
+            'recurring': counts.get('recurring', 0),
+            'resolved': resolved,
+        }
+
+    def get_scan_targets(self, scan_id: int) -> list:
+        """获取扫描的完整目标列表"""
+        with self._db.reader() as conn:
+            rows = conn.execute(
+                "SELECT target FROM scan_targets WHERE scan_id = ? ORDER BY position", (scan_id,)
+            ).fetchall()
+            return [row[0] for row in rows]
+
+    def get_scan_templates(self, scan_id: int) -> list:
+        """获取扫描的完整模板列表"""
+        with self._db.reader() as conn:
+            rows = conn.execute(
+                "SELECT template FROM scan_templates WHERE scan_id = ? ORDER BY position", (scan_id,)
+            ).fetchall()
+            return [row[0] for row in rows]
     
+    def _counter(self, cursor, name: str) -> int:
+        cursor.execute('SELECT value FROM stats_counters WHERE name = ?', (name,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
     def get_statistics(self) -> dict:
-        """获取统计数据"""
-        with sqlite3.connect(self.db_path) as conn:
+        """获取统计数据（读取触发器维护的汇总表，与历史总量无关）"""
+        with self._db.reader() as conn:
             cursor = conn.cursor()
 
-            # 总扫描次数
-            cursor.execute('SELECT COUNT(*) FROM scan_records')
-            total_scans = cursor.fetchone()[0]
-
-            # 总发现漏洞数
-            cursor.execute('SELECT COUNT(*) FROM vuln_results')
-            total_vulns = cursor.fetchone()[0]
+            # 总扫描次数 / 总发现漏洞数
+            total_scans = self._counter(cursor, 'scans')
+            total_vulns = self._counter(cursor, 'vulns')
 
             # 漏洞严重程度分布
-            cursor.execute('''
-                SELECT severity, COUNT(*) as count
-                FROM vuln_results
-                GROUP BY severity
-            ''')
+            cursor.execute('SELECT severity, count FROM stats_severity WHERE count > 0')
             severity_dist = {row[0]: row[1] for row in cursor.fetchall()}
 
             # 最近7天趋势
             cursor.execute('''
-                SELECT DATE(scan_time) as date,
-                       SUM(vuln_count) as vulns,
-                       COUNT(*) as scans
-                FROM scan_records
-                WHERE scan_time >= DATE('now', '-7 days')
-                GROUP BY DATE(scan_time)
-                ORDER BY date
+                SELECT day, vulns, scans
+                FROM stats_daily
+                WHERE day >= DATE('now', '-7 days') AND scans > 0
+                ORDER BY day
             ''')
             trend_7days = [{'date': row[0], 'vulns': row[1], 'scans': row[2]} for row in cursor.fetchall()]
 
             # TOP 5 漏洞模板
             cursor.execute('''
-                SELECT template_id, COUNT(*) as count
-                FROM vuln_results
-                GROUP BY template_id
-                ORDER BY count DESC
+                SELECT template_id, count
+                FROM stats_templates
+                ORDER BY count DESC, template_id
                 LIMIT 5
             ''')
             top_templates = [{'template': row[0], 'count': row[1]} for row in cursor.fetchall()]
@@ -216,26 +992,63 @@ class ScanHistory:
                 'trend_7days': trend_7days,
                 'top_templates': top_templates
             }
+
+    def rebuild_statistics(self):
+        """按明细表重建汇总（汇总与明细不一致时的修复手段）"""
+        def _rebuild(conn):
+            _rebuild_stats(conn)
+            _rebuild_analytics(conn)
+
+        self._db.transaction(_rebuild)
     
     def delete_scan(self, scan_id: int):
         """删除扫描记录"""
-        with sqlite3.connect(self.db_path) as conn:
+        def _delete(conn):
             cursor = conn.cursor()
 
+            finding_ids = [row[0] for row in cursor.execute(
+                'SELECT DISTINCT finding_id FROM vuln_results WHERE scan_id = ? AND finding_id IS NOT NULL',
+                (scan_id,)
+            )]
             cursor.execute('DELETE FROM vuln_results WHERE scan_id = ?', (scan_id,))
+            _collect_findings(conn, finding_ids)
+            cursor.execute('DELETE FROM scan_targets WHERE scan_id = ?', (scan_id,))
+            cursor.execute('DELETE FROM scan_templates WHERE scan_id = ?', (scan_id,))
             cursor.execute('DELETE FROM scan_records WHERE id = ?', (scan_id,))
 
-            conn.commit()
+        self._db.transaction(_delete)
+        self._count_cache.clear()
+
+    def delete_results_before(self, cutoff: datetime) -> int:
+        """删除 cutoff（本地时间）之前的扫描及其结果、未关联扫描的旧结果，返回删除的结果条数"""
+        scan_cutoff = cutoff.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        result_cutoff = cutoff.isoformat()
+
+        def _delete(conn):
+            scan_ids = "SELECT id FROM scan_records WHERE scan_time < ?"
+            where = f"scan_id IN ({scan_ids}) OR (scan_id IS NULL AND recorded_at < ?)"
+            params = (scan_cutoff, result_cutoff)
+            finding_ids = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT finding_id FROM vuln_results WHERE finding_id IS NOT NULL AND ({where})", params
+            )]
+            removed = conn.execute(f"DELETE FROM vuln_results WHERE {where}", params).rowcount
+            for table in ('scan_targets', 'scan_templates'):
+                conn.execute(f"DELETE FROM {table} WHERE scan_id IN ({scan_ids})", (scan_cutoff,))
+            conn.execute("DELETE FROM scan_records WHERE scan_time < ?", (scan_cutoff,))
+            _collect_findings(conn, finding_ids)
+            return removed
+
+        removed = self._db.transaction(_delete)
+        self._count_cache.clear()
+        return removed
     
     def get_all_scans(self, page: int = 1, page_size: int = 50) -> dict:
         """分页获取所有扫描记录"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._db.reader() as conn:
             cursor = conn.cursor()
 
             # 获取总记录数
-            cursor.execute('SELECT COUNT(*) FROM scan_records')
-            total = cursor.fetchone()[0]
+            total = self._counter(cursor, 'scans')
 
             # 分页查询
             offset = (page - 1) * page_size
@@ -253,17 +1066,184 @@ class ScanHistory:
                 'page_size': page_size,
                 'records': records
             }
-    
+
+    def _filter_sql(self, filters: ScanFilter):
+        """把筛选条件转换为 WHERE 子句列表与参数"""
+        clauses, params = [], []
+        if filters is None:
+            return clauses, params
+        if filters.status:
+            clauses.append("r.status = ?")
+            params.append(filters.status)
+        if filters.date_from:
+            clauses.append("r.scan_time >= ?")
+            params.append(filters.date_from)
+        if filters.date_to:
+            clauses.append("r.scan_time < DATE(?, '+1 day')")
+            params.append(filters.date_to)
+        rank = SEVERITY_RANKS.get((filters.min_severity or '').lower())
+        if rank:
+            clauses.append("r.max_severity_rank >= ?")
+            params.append(rank)
+        target = filters.target.strip()
+        if target:
+            # trigram 至少需要 3 个字符，更短的关键字回退为 LIKE
+            if self._has_fts and len(target) >= 3:
+                clauses.append("r.id IN (SELECT scan_id FROM scan_targets_fts WHERE target MATCH ?)")
+                params.append('"' + target.replace('"', '""') + '"')
+            else:
+                escaped = target.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                clauses.append("EXISTS (SELECT 1 FROM scan_targets t "
+                               "WHERE t.scan_id = r.id AND t.target LIKE ? ESCAPE '\\')")
+                params.append(f"%{escaped}%")
+        return clauses, params
+
+    def query_scans(self, filters: ScanFilter = None, after: tuple = None, before: tuple = None,
+                    from_end: bool = False, limit: int = 50) -> list:
+        """
+        键集分页查询扫描记录（按 scan_time, id 倒序）
+
+        after: 当前页最后一行的 (scan_time, id)，取更早的一页
+        before: 当前页第一行的 (scan_time, id)，取更新的一页
+        from_end: 取最早的 limit 条（末页）
+        """
+        clauses, params = self._filter_sql(filters)
+        ascending = before is not None or from_end
+        if after is not None:
+            clauses.append("(r.scan_time, r.id) < (?, ?)")
+            params.extend(after)
+        elif before is not None:
+            clauses.append("(r.scan_time, r.id) > (?, ?)")
+            params.extend(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "ASC" if ascending else "DESC"
+
+        with self._db.reader() as conn:
+            rows = conn.execute(f'''
+                SELECT r.id, r.scan_time, r.target_count, r.poc_count, r.vuln_count,
+                       r.duration_seconds, r.status, r.max_severity_rank
+                FROM scan_records r
+                {where}
+                ORDER BY r.scan_time {order}, r.id {order}
+                LIMIT ?
+            ''', params + [limit]).fetchall()
+
+        records = [dict(row) for row in rows]
+        if ascending:
+            records.reverse()
+        return records
+
+    def count_scans(self, filters: ScanFilter = None) -> int:
+        """符合筛选条件的记录数；无筛选时读汇总计数，有筛选时按条件缓存到下次写入"""
+        if filters is None or filters.is_empty():
+            with self._db.reader() as conn:
+                return self._counter(conn.cursor(), 'scans')
+
+        key = filters.key()
+        cached = self._count_cache.get(key)
+        if cached is not None:
+            return cached
+        clauses, params = self._filter_sql(filters)
+        with self._db.reader() as conn:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM scan_records r WHERE {' AND '.join(clauses)}", params
+            ).fetchone()[0]
+        self._count_cache[key] = total
+        return total
+
     def clear_history(self):
         """清空所有历史记录"""
-        with sqlite3.connect(self.db_path) as conn:
+        def _clear(conn):
             cursor = conn.cursor()
 
             cursor.execute('DELETE FROM vuln_results')
+            cursor.execute('DELETE FROM findings')
+            cursor.execute('DELETE FROM scan_targets')
+            cursor.execute('DELETE FROM scan_templates')
             cursor.execute('DELETE FROM scan_records')
+            _rebuild_stats(conn)
+            _rebuild_analytics(conn)
+
+        self._db.transaction(_clear)
+        self._count_cache.clear()
+        self._db.vacuum()
+
+
+class VulnResultStream(threading.Thread):
+    """扫描期间的漏洞结果流式写入线程：GUI 线程只入队，后台按批 executemany 落库"""
+
+    BATCH_SIZE = 200
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, history: ScanHistory, scan_id: int):
+        super().__init__(name=f"VulnResultStream-{scan_id}", daemon=True)
+        self.history = history
+        self.scan_id = scan_id
+        self.written = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._finish_args = None
+        self._on_finished = None
+
+    def add(self, result: dict):
+        if not self._closed:
+            self._queue.put(result)
+
+    def close(self, timeout: float = 30):
+        """停止接收新结果，等待队列中的结果全部写入"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self.join(timeout)
+
+    def extend(self, results):
+        for result in results or []:
+            self.add(result)
+
+    def finish(self, on_finished=None, **record):
+        """
+        停止接收新结果并立即返回：写入线程落完剩余结果后，按 record（finish_scan_record 的参数，
+        如 vuln_count / duration / status）更新扫描记录，再回调 on_finished(scan_id)
+        """
+        if self._closed:
+            return
+        self._finish_args = record or None
+        self._on_finished = on_finished
+        self._closed = True
+        self._queue.put(None)
+
+    def run(self):
+        batch = []
+        deadline = time.monotonic() + self.FLUSH_INTERVAL
+        finished = False
+        while not finished:
+            try:
+                item = self._queue.get(timeout=max(0.05, deadline - time.monotonic()))
+                if item is None:
+                    finished = True
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if batch and (finished or len(batch) >= self.BATCH_SIZE or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.FLUSH_INTERVAL
+        if self._finish_args is not None:
+            try:
+                self.history.finish_scan_record(self.scan_id, **self._finish_args)
+            except Exception as e:
+                logger.error(f"Finish scan record failed (scan {self.scan_id}): {e}")
+            if self._on_finished is not None:
+                self._on_finished(self.scan_id)
 
-            conn.commit()
-            cursor.execute('VACUUM')
+    def _flush(self, batch):
+        try:
+            self.written += self.history.add_vuln_results(self.scan_id, batch)
+        except Exception as e:
+            logger.error(f"Stream vuln results failed (scan {self.scan_id}): {e}")
 
 
 # 全局单例
@@ -0,0 +1,389 @@
+"""
+扫描性能剖析 - 可选的诊断模式
+采样 GUI 进程所有 Python 线程的调用栈、nuclei 子进程的 CPU/RSS/文件描述符以及 Qt 事件循环延迟，
+扫描结束后导出 speedscope JSON、折叠栈（flamegraph.pl / inferno 可直接绘制火焰图）和指标摘要，
+用于判断卡住的扫描是阻塞在 GUI、结果解析还是 nuclei 本身。
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from PyQt5.QtCore import QObject, QTimer
+
+from core.logger import get_logger
+from core.paths import user_data_path
+
+logger = get_logger("scan_profiler")
+
+# 调用栈采样间隔（秒）；比 cProfile 的逐调用插桩开销小，且能覆盖所有线程
+STACK_INTERVAL = 0.01
+# 进程资源采样间隔（秒）
+PROCESS_INTERVAL = 1.0
+# 事件循环探针间隔（毫秒）
+EVENT_LOOP_INTERVAL_MS = 50
+# 单个栈的最大深度，防止深递归导致内存膨胀
+MAX_STACK_DEPTH = 128
+_GUI_THREAD_LABEL = "MainThread (GUI)"
+# 栈顶帧位于这些标准库模块时，线程正阻塞在锁、队列、select 或 socket/子进程 I/O 上，不计为活跃采样
+_WAIT_MODULES = frozenset(("threading.py", "queue.py", "selectors.py", "socket.py", "ssl.py", "subprocess.py"))
+# 栈顶帧为这些函数时同样视为等待（线程池 worker 阻塞在 C 实现的工作队列上）
+_WAIT_FUNCTIONS = frozenset(("_worker",))
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def _is_waiting(leaf) -> bool:
+    """按栈顶帧判断线程是否处于等待/休眠"""
+    func, filename, _ = leaf
+    return os.path.basename(filename) in _WAIT_MODULES or func in _WAIT_FUNCTIONS
+
+
+def _thread_label(ident, frame, names):
+    """Name a thread by its Python name, or by the class/method at the bottom of its stack."""
+    if ident == threading.main_thread().ident:
+        return _GUI_THREAD_LABEL
+    if ident in names:
+        return names[ident]
+    root = frame
+    while root.f_back is not None:
+        root = root.f_back
+    owner = root.f_locals.get("self")
+    name = root.f_code.co_name
+    if owner is not None:
+        name = f"{type(owner).__name__}.{name}"
+    return f"{name} [{ident}]"
+
+
+class ProcessSample:
+    """单个进程的一次资源采样"""
+
+    __slots__ = ("ts", "cpu_percent", "rss_mb", "open_fds", "threads")
+
+    def __init__(self, ts, cpu_percent=0.0, rss_mb=0.0, open_fds=0, threads=0):
+        self.ts = ts
+        self.cpu_percent = cpu_percent
+        self.rss_mb = rss_mb
+        self.open_fds = open_fds
+        self.threads = threads
+
+    def to_dict(self) -> Dict:
+        return {
+            "ts": round(self.ts, 3),
+            "cpu_percent": round(self.cpu_percent, 1),
+            "rss_mb": round(self.rss_mb, 1),
+            "open_fds": self.open_fds,
+            "threads": self.threads,
+        }
+
+
+class _ProcessWatcher:
+    """通过 psutil 跟踪一个进程；psutil 不可用或进程已退出时静默跳过"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.samples: List[ProcessSample] = []
+        self._process = None
+        try:
+            import psutil
+            self._process = psutil.Process(pid)
+            self._process.cpu_percent(None)  # 首次调用只建立基线
+        except Exception:
+            self._process = None
+
+    def sample(self, started_at):
+        if self._process is None:
+            return
+        try:
+            with self._process.oneshot():
+                if hasattr(self._process, "num_fds"):
+                    open_fds = self._process.num_fds()
+                else:
+                    open_fds = self._process.num_handles()  # Windows
+                self.samples.append(ProcessSample(
+                    ts=time.perf_counter() - started_at,
+                    cpu_percent=self._process.cpu_percent(None),
+                    rss_mb=self._process.memory_info().rss / (1024 * 1024),
+                    open_fds=open_fds,
+                    threads=self._process.num_threads(),
+                ))
+        except Exception:
+            # 进程退出后停止采样
+            self._process = None
+
+    def summary(self) -> Dict:
+        if not self.samples:
+            return {"pid": self.pid, "samples": 0}
+        return {
+            "pid": self.pid,
+            "samples": len(self.samples),
+            "cpu_avg": round(sum(s.cpu_percent for s in self.samples) / len(self.samples), 1),
+            "cpu_max": round(max(s.cpu_percent for s in self.samples), 1),
+            "rss_max_mb": round(max(s.rss_mb for s in self.samples), 1),
+            "open_fds_max": max(s.open_fds for s in self.samples),
+        }
+
+
+class _SamplerThread(threading.Thread):
+    """后台采样线程：高频采集调用栈，低频采集进程资源"""
+
+    def __init__(self, profiler: "ScanProfiler"):
+        super().__init__(name="ScanProfilerSampler", daemon=True)
+        self.profiler = profiler
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        profiler = self.profiler
+        next_process_sample = 0.0
+        while not self._stop_event.is_set():
+            now = time.perf_counter()
+            try:
+                profiler._sample_stacks(self.ident)
+                if now >= next_process_sample:
+                    profiler._sample_processes()
+                    next_process_sample = now + profiler.process_interval
+            except Exception as e:
+                logger.debug(f"Profiler sample failed: {e}")
+            self._stop_event.wait(profiler.stack_interval)
+
+
+class EventLoopProbe(QObject):
+    """Qt 事件循环延迟探针：定时器实际触发时间与预期间隔之差即为 GUI 阻塞时长"""
+
+    def __init__(self, interval_ms: int = EVENT_LOOP_INTERVAL_MS, history_size: int = 6000):
+        super().__init__()
+        self.interval_ms = interval_ms
+        self.lags = deque(maxlen=history_size)
+        self.max_lag_ms = 0.0
+        self._last = None
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._on_tick)
+
+    def start(self):
+        self._last = time.perf_counter()
+        self._timer.start(self.interval_ms)
+
+    def stop(self):
+        self._timer.stop()
+
+    def _on_tick(self):
+        now = time.perf_counter()
+        lag = max(0.0, (now - self._last) * 1000 - self.interval_ms)
+        self._last = now
+        self.lags.append(lag)
+        self.max_lag_ms = max(self.max_lag_ms, lag)
+
+    def summary(self) -> Dict:
+        lags = sorted(self.lags)
+        if not lags:
+            return {"ticks": 0}
+        return {
+            "ticks": len(lags),
+            "lag_avg_ms": round(sum(lags) / len(lags), 1),
+            "lag_p95_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.95))], 1),
+            "lag_max_ms": round(self.max_lag_ms, 1),
+            "stalls_over_250ms": sum(1 for lag in lags if lag >= 250),
+        }
+
+
+class ScanProfiler:
+    """扫描级性能剖析器，需在 GUI 线程中创建和启动（事件循环探针依赖 QTimer）"""
+
+    def __init__(self, name: str = "scan", pid_provider: Optional[Callable[[], Optional[int]]] = None,
+                 stack_interval: float = STACK_INTERVAL, process_interval: float = PROCESS_INTERVAL):
+        self.name = name
+        self.pid_provider = pid_provider
+        self.stack_interval = stack_interval
+        self.process_interval = process_interval
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._lock = threading.Lock()
+        # 线程名 -> Counter[栈(根在前)] ，按栈聚合而非保存时间线，长扫描内存有界
+        self._stacks: Dict[str, Counter] = {}
+        self._stack_samples = 0
+        self._gui_process = None
+        self._child_processes: Dict[int, _ProcessWatcher] = {}
+        self._sampler = None
+        self._event_loop = EventLoopProbe()
+
+    @property
+    def is_running(self) -> bool:
+        return self._sampler is not None
+
+    def start(self):
+        if self._sampler is not None:
+            return
+        self.started_at = time.perf_counter()
+        self._gui_process = _ProcessWatcher(os.getpid())
+        self._sampler = _SamplerThread(self)
+        self._sampler.start()
+        self._event_loop.start()
+        logger.info(f"Scan profiler started: {self.name}")
+
+    def stop(self):
+        if self._sampler is None:
+            return
+        self._event_loop.stop()
+        self._sampler.stop()
+        self._sampler.join(2)
+        self._sampler = None
+        self.duration = time.perf_counter() - self.started_at
+        logger.info(f"Scan profiler stopped: {self.name} ({self._stack_samples} stack samples)")
+
+    def _sample_stacks(self, sampler_ident):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == sampler_ident:
+                continue
+            label = _thread_label(ident, frame, names)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            stack.reverse()
+            with self._lock:
+                self._stacks.setdefault(label, Counter())[tuple(stack)] += 1
+        self._stack_samples += 1
+
+    def _sample_processes(self):
+        if self._gui_process is not None:
+            self._gui_process.sample(self.started_at)
+        pid = None
+        if self.pid_provider is not None:
+            try:
+                pid = self.pid_provider()
+            except Exception:
+                pid = None
+        if pid and pid not in self._child_processes:
+            self._child_processes[pid] = _ProcessWatcher(pid)
+        for watcher in self._child_processes.values():
+            watcher.sample(self.started_at)
+
+    def thread_breakdown(self) -> Dict[str, int]:
+        """各线程的采样数（存活线程每次都会被采到，只反映存活时长）"""
+        with self._lock:
+            return {label: sum(counter.values()) for label, counter in self._stacks.items()}
+
+    def busy_threads(self, limit: int = 0) -> List[tuple]:
+        """按活跃采样数（栈顶不在等待/休眠帧）从高到低排列的 [(线程名, 采样数)]，limit 为 0 时不截断"""
+        with self._lock:
+            stacks = {label: dict(counter) for label, counter in self._stacks.items()}
+        busy = Counter()
+        for label, counter in stacks.items():
+            idle_loop = None
+            if label == _GUI_THREAD_LABEL:
+                # GUI 线程空闲时阻塞在 exec_() 中，栈即为其它所有栈的公共前缀（最短的那个）
+                shortest = min(counter, key=len)
+                if all(stack[:len(shortest)] == shortest for stack in counter):
+                    idle_loop = shortest
+            busy[label] = sum(count for stack, count in counter.items()
+                              if stack and stack != idle_loop and not _is_waiting(stack[-1]))
+        ranked = [(label, count) for label, count in busy.most_common() if count]
+        return ranked[:limit] if limit else ranked
+
+    def summary(self) -> Dict:
+        return {
+            "name": self.name,
+            "duration_seconds": round(self.duration or (time.perf_counter() - self.started_at), 1),
+            "stack_interval_ms": round(self.stack_interval * 1000, 1),
+            "stack_samples": self._stack_samples,
+            "threads": self.thread_breakdown(),
+            "busy_threads": dict(self.busy_threads()),
+            "event_loop": self._event_loop.summary(),
+            "gui_process": self._gui_process.summary() if self._gui_process else {},
+            "nuclei_processes": [watcher.summary() for watcher in self._child_processes.values()],
+        }
+
+    def to_speedscope(self) -> Dict:
+        """Build a speedscope file with one sampled profile per thread."""
+        frames = []
+        frame_index = {}
+
+        def index_of(key):
+            if key not in frame_index:
+                func, filename, line = key
+                frame_index[key] = len(frames)
+                frames.append({"name": func, "file": filename, "line": line})
+            return frame_index[key]
+
+        weight_ms = self.stack_interval * 1000
+        profiles = []
+        with self._lock:
+            stacks = {label: dict(counter) for label, counter in self._stacks.items()}
+        for label, counter in sorted(stacks.items(), key=lambda item: -sum(item[1].values())):
+            samples = []
+            weights = []
+            for stack, count in counter.items():
+                samples.append([index_of(key) for key in stack])
+                weights.append(round(count * weight_ms, 3))
+            profiles.append({
+                "type": "sampled",
+                "name": label,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            })
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "NucleiGUI scan profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+    def to_folded(self) -> List[str]:
+        """折叠栈格式：'线程;帧1;帧2 次数'，可直接交给 flamegraph.pl / inferno 生成火焰图"""
+        lines = []
+        with self._lock:
+            stacks = {label: dict(counter) for label, counter in self._stacks.items()}
+        for label, counter in stacks.items():
+            thread = label.replace(";", ":").replace(" ", "_")
+            for stack, count in counter.items():
+                names = [f"{func} ({os.path.basename(filename)}:{line})".replace(";", ":").replace(" ", "_")
+                         for func, filename, line in stack]
+                lines.append(f"{';'.join([thread] + names)} {count}")
+        return lines
+
+    def metrics(self) -> Dict:
+        return {
+            "summary": self.summary(),
+            "event_loop_lag_ms": [round(lag, 1) for lag in self._event_loop.lags],
+            "gui_process": [s.to_dict() for s in (self._gui_process.samples if self._gui_process else [])],
+            "nuclei_processes": {
+                str(pid): [s.to_dict() for s in watcher.samples]
+                for pid, watcher in self._child_processes.items()
+            },
+        }
+
+    def export(self, directory=None) -> Dict[str, str]:
+        """写出 speedscope / 折叠栈 / 指标文件，返回 {格式: 路径}"""
+        directory = str(directory or user_data_path("profiles", create_parent=False))
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+        paths = {
+            "speedscope": f"{stem}.speedscope.json",
+            "folded": f"{stem}.folded",
+            "metrics": f"{stem}.metrics.json",
+        }
+        with open(paths["speedscope"], "w", encoding="utf-8") as f:
+            json.dump(self.to_speedscope(), f)
+        with open(paths["folded"], "w", encoding="utf-8") as f:
+            f.write("\n".join(self.to_folded()))
+        with open(paths["metrics"], "w", encoding="utf-8") as f:
+            json.dump(self.metrics(), f, ensure_ascii=False, indent=2)
+        return paths
@@ -0,0 +1,156 @@
+"""
+nuclei -stats 输出解析 - 将统计 JSON 转换为类型化的时间序列
+用于实时展示 RPS、错误率与预计剩余时间，并随扫描记录一起保存
+"""
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional
+
+# 保存到扫描记录时的最大采样点数，超出后按 2:1 抽稀
+MAX_POINTS = 400
+
+
+@dataclass
+class StatsSample:
+    """单次 nuclei 统计采样"""
+    elapsed: float = 0.0      # 已运行秒数
+    percent: float = 0.0
+    requests: int = 0
+    total: int = 0
+    rps: float = 0.0          # nuclei 报告的平均 RPS
+    errors: int = 0
+    hosts: int = 0
+    matched: int = 0
+    templates: int = 0
+    interval_rps: float = 0.0         # 与上一采样之间的实时 RPS
+    interval_error_rate: float = 0.0  # 与上一采样之间的错误率
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """按最近吞吐估算剩余时间，无法估算时返回 None"""
+        remaining = self.total - self.requests
+        if remaining <= 0:
+            return 0.0 if self.total else None
+        rate = self.interval_rps or self.rps
+        return remaining / rate if rate > 0 else None
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['error_rate'] = round(self.error_rate, 4)
+        data['eta_seconds'] = self.eta_seconds
+        return data
+
+
+SAMPLE_FIELDS = [f.name for f in fields(StatsSample)]
+
+
+def parse_duration(value) -> float:
+    """解析 nuclei 的耗时字段（'0:01:05' 或 '1m5s'）为秒"""
+    text = str(value or '').strip()
+    if not text:
+        return 0.0
+    if ':' in text:
+        seconds = 0.0
+        for part in text.split(':'):
+            try:
+                seconds = seconds * 60 + float(part)
+            except ValueError:
+                return 0.0
+        return seconds
+
+    total = 0.0
+    number = ''
+    units = {'h': 3600, 'm': 60, 's': 1}
+    for char in text:
+        if char.isdigit() or char == '.':
+            number += char
+        elif char in units and number:
+            total += float(number) * units[char]
+            number = ''
+    return total
+
+
+def _to_int(value) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_stats_event(event: Dict) -> Optional[StatsSample]:
+    """Convert one nuclei -stats JSON object into a StatsSample."""
+    if not isinstance(event, dict) or 'percent' not in event:
+        return None
+    return StatsSample(
+        elapsed=parse_duration(event.get('duration')),
+        percent=_to_float(event.get('percent')),
+        requests=_to_int(event.get('requests')),
+        total=_to_int(event.get('total')),
+        rps=_to_float(event.get('rps')),
+        errors=_to_int(event.get('errors')),
+        hosts=_to_int(event.get('hosts')),
+        matched=_to_int(event.get('matched')),
+        templates=_to_int(event.get('templates')),
+    )
+
+
+class StatsSeries:
+    """扫描期间的统计时间序列（有界）"""
+
+    def __init__(self, max_points: int = MAX_POINTS):
+        self.max_points = max_points
+        self.samples: List[StatsSample] = []
+
+    def add(self, sample: StatsSample) -> StatsSample:
+        previous = self.samples[-1] if self.samples else None
+        if previous is not None:
+            delta_t = sample.elapsed - previous.elapsed
+            delta_requests = sample.requests - previous.requests
+            if delta_t > 0 and delta_requests >= 0:
+                sample.interval_rps = delta_requests / delta_t
+            if delta_requests > 0:
+                sample.interval_error_rate = max(0, sample.errors - previous.errors) / delta_requests
+        else:
+            sample.interval_rps = sample.rps
+            sample.interval_error_rate = sample.error_rate
+
+        self.samples.append(sample)
+        if len(self.samples) > self.max_points:
+            # 保留最新一点，其余隔点抽稀，保证长时间扫描的序列大小有界
+            self.samples = self.samples[:-1:2] + [self.samples[-1]]
+        return sample
+
+    @property
+    def latest(self) -> Optional[StatsSample]:
+        return self.samples[-1] if self.samples else None
+
+    def series(self, name: str) -> List[float]:
+        return [getattr(sample, name) for sample in self.samples]
+
+    def to_dict(self) -> Dict:
+        """紧凑格式：字段名 + 行数据，便于存入扫描记录"""
+        latest = self.latest
+        return {
+            'fields': SAMPLE_FIELDS,
+            'points': [[getattr(sample, name) for name in SAMPLE_FIELDS] for sample in self.samples],
+            'summary': latest.to_dict() if latest else {},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'StatsSeries':
+        series = cls()
+        names = (data or {}).get('fields') or []
+        for point in (data or {}).get('points') or []:
+            values = dict(zip(names, point))
+            series.samples.append(StatsSample(**{k: v for k, v in values.items() if k in SAMPLE_FIELDS}))
+        return series
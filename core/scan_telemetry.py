@@ -0,0 +1,214 @@
+"""
+扫描遥测 - 按模板、按主机汇总请求数、错误数、命中数与耗时
+数据来自 nuclei -trace-log 输出（需在设置中开启）或原生扫描器钩子，扫描结束后写入 POCStatsManager
+"""
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from core.logger import get_logger
+
+logger = get_logger("scan_telemetry")
+
+# RFC3339 时间戳中的小数秒部分
+_FRACTION_RE = re.compile(r"(\.\d+)(?=[+-]\d{2}:\d{2}$|$)")
+
+
+class TelemetryCounter:
+    """单个模板或主机的计数器"""
+
+    __slots__ = ("requests", "errors", "matches", "busy_ms", "first_ts", "last_ts")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.matches = 0
+        self.busy_ms = 0.0
+        self.first_ts = 0.0
+        self.last_ts = 0.0
+
+    @property
+    def runtime_ms(self) -> Optional[float]:
+        # 只有原生模式能测得每个请求的实际耗时；nuclei 并发执行时首末请求的跨度接近整个扫描时长，
+        # 不能代表模板成本，此时返回 None，由调用方按请求数估算
+        return self.busy_ms or None
+
+    def to_dict(self) -> Dict:
+        runtime_ms = self.runtime_ms
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "matches": self.matches,
+            "runtime_ms": None if runtime_ms is None else round(runtime_ms, 1),
+            # 首末请求的事件时间跨度，仅用于诊断
+            "span_ms": round((self.last_ts - self.first_ts) * 1000, 1) if self.first_ts else 0.0,
+        }
+
+
+def host_key(value) -> str:
+    """Reduce a URL or host:port to a compact per-host key."""
+    value = str(value or "").strip()
+    if not value:
+        return ""
+    if "://" in value:
+        return urlsplit(value).netloc.lower() or value
+    return value.split("/", 1)[0].lower()
+
+
+class ScanTelemetry:
+    """线程安全的内存聚合器，每个模板/主机只保留一个计数器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates: Dict[str, TelemetryCounter] = {}
+        self._hosts: Dict[str, TelemetryCounter] = {}
+
+    def _touch(self, table, key, ts):
+        counter = table.get(key)
+        if counter is None:
+            counter = table[key] = TelemetryCounter()
+            counter.first_ts = counter.last_ts = ts
+        # trace 日志按完成顺序写入，并发下事件时间不一定递增
+        counter.first_ts = min(counter.first_ts, ts)
+        counter.last_ts = max(counter.last_ts, ts)
+        return counter
+
+    def record(self, template: str, host: str = "", requests: int = 1, errors: int = 0,
+               matches: int = 0, duration_ms: Optional[float] = None, ts: Optional[float] = None):
+        ts = ts or time.time()
+        host = host_key(host)
+        with self._lock:
+            counters = [self._touch(self._templates, template or "unknown", ts)]
+            if host:
+                counters.append(self._touch(self._hosts, host, ts))
+            for counter in counters:
+                counter.requests += requests
+                counter.errors += errors
+                counter.matches += matches
+                if duration_ms:
+                    counter.busy_ms += duration_ms
+
+    def record_match(self, template: str, host: str = ""):
+        self.record(template, host, requests=0, matches=1)
+
+    def template_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {key: counter.to_dict() for key, counter in self._templates.items()}
+
+    def host_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {key: counter.to_dict() for key, counter in self._hosts.items()}
+
+    def lookup_template(self, *keys) -> Optional[Dict]:
+        """按模板路径或 ID 查找统计（trace 日志记录路径，结果记录 ID）"""
+        with self._lock:
+            for key in keys:
+                counter = self._templates.get(key) if key else None
+                if counter is not None:
+                    return counter.to_dict()
+        return None
+
+    def costliest_templates(self, limit: int = 5) -> List[Dict]:
+        """按实测耗时（原生模式）或请求数排序的高成本模板"""
+        stats = self.template_stats()
+        ranked = sorted(stats.items(), key=lambda item: (item[1]["runtime_ms"] or 0, item[1]["requests"]),
+                        reverse=True)[:limit]
+        return [{"template": key, **value} for key, value in ranked]
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "templates": len(self._templates),
+                "hosts": len(self._hosts),
+                "requests": sum(c.requests for c in self._templates.values()),
+                "errors": sum(c.errors for c in self._templates.values()),
+                "matches": sum(c.matches for c in self._templates.values()),
+            }
+
+
+def parse_event_time(value) -> Optional[float]:
+    """解析 trace 事件的 timestamp（RFC3339 字符串或 Unix 时间戳），无法解析时返回 None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value) if value > 0 else None
+    if not isinstance(value, str) or not value:
+        return None
+    text = value.strip().replace("Z", "+00:00")
+    # Go 输出最多 9 位的小数秒，旧版 fromisoformat 只接受 3 或 6 位
+    match = _FRACTION_RE.search(text)
+    if match:
+        text = text[:match.start()] + match.group(1)[:7].ljust(7, "0") + text[match.end():]
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_trace_line(line):
+    """Parse one nuclei -trace-log JSON line into (template, host, is_error, ts)."""
+    try:
+        event = json.loads(line)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(event, dict):
+        return None
+
+    template = event.get("template") or event.get("id")
+    if not template:
+        return None
+    host = event.get("input") or event.get("address") or ""
+    error = str(event.get("error") or "none").lower()
+    ts = parse_event_time(event.get("timestamp")) or time.time()
+    return template, host, error not in ("none", "", "null"), ts
+
+
+class TraceLogReader(threading.Thread):
+    """跟随读取 nuclei trace 日志并汇总到 ScanTelemetry"""
+
+    def __init__(self, path, telemetry: ScanTelemetry, poll_interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.path = path
+        self.telemetry = telemetry
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        handle = None
+        buffer = ""
+        try:
+            while True:
+                stopping = self._stop_event.is_set()
+                if handle is None and os.path.exists(self.path):
+                    handle = open(self.path, "r", encoding="utf-8", errors="ignore")
+                if handle is not None:
+                    chunk = handle.read()
+                    if chunk:
+                        buffer += chunk
+                        lines = buffer.split("\n")
+                        buffer = lines.pop()
+                        for line in lines:
+                            parsed = parse_trace_line(line)
+                            if parsed:
+                                template, host, is_error, ts = parsed
+                                self.telemetry.record(template, host, errors=int(is_error), ts=ts)
+                        continue
+                # 收到停止信号后再读一轮，确保进程退出前写入的内容被处理
+                if stopping:
+                    break
+                self._stop_event.wait(self.poll_interval)
+            parsed = parse_trace_line(buffer)
+            if parsed:
+                template, host, is_error, ts = parsed
+                self.telemetry.record(template, host, errors=int(is_error), ts=ts)
+        except Exception as e:
+            logger.warning(f"Trace log reader failed: {e}")
+        finally:
+            if handle is not None:
+                handle.close()
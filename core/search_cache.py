@@ -0,0 +1,291 @@
+"""
+搜索结果缓存 - 各资产搜索引擎共用的本地查询缓存
+以 (引擎, 语句, 返回字段) 标识一条查询，按结果偏移记录已获取的区间：
+请求的页落在未过期的已缓存区间内时直接从本地返回（页大小不同的重叠请求同样命中），
+资产按 (引擎, 规范化目标) 存为独立行，多个查询共用；按 TTL 与缓存结果条数上限淘汰
+"""
+import json
+import sqlite3
+import threading
+import time
+
+from core.db import get_database
+from core.logger import get_logger
+from core.paths import database_path
+from core.search_engine_base import SearchResult
+from core.target_utils import normalize_target
+
+logger = get_logger("search_cache")
+
+# 缓存有效期（秒）
+DEFAULT_TTL = 24 * 3600
+# 缓存的查询结果条数上限，超出时按最近使用时间淘汰整条查询
+MAX_CACHED_RESULTS = 200000
+# 每写入多少页执行一次淘汰
+PRUNE_INTERVAL = 50
+
+_ASSET_COLUMNS = ('ip', 'port', 'domain', 'url', 'title', 'banner', 'protocol',
+                  'country', 'region', 'city', 'isp', 'os', 'server')
+# 按 IN (...) 回查资产 ID 时每批的参数个数
+_LOOKUP_BATCH = 500
+
+
+def _migrate_v1(conn):
+    """查询、已获取区间、按位置的结果与规范化资产表"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS search_queries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            engine TEXT NOT NULL,
+            query TEXT NOT NULL,
+            fields TEXT NOT NULL DEFAULT '',
+            total INTEGER,
+            last_used REAL NOT NULL,
+            UNIQUE (engine, query, fields)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_search_queries_used ON search_queries(last_used)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS search_pages (
+            query_id INTEGER NOT NULL,
+            start INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (query_id, start)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_search_pages_fetched ON search_pages(fetched_at)")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS search_assets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            engine TEXT NOT NULL,
+            target TEXT NOT NULL,
+            {', '.join(f'{column} {"INTEGER" if column == "port" else "TEXT"}' for column in _ASSET_COLUMNS)},
+            extra TEXT,
+            UNIQUE (engine, target)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS search_results (
+            query_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            asset_id INTEGER NOT NULL,
+            PRIMARY KEY (query_id, position)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_search_results_asset ON search_results(asset_id)")
+
+
+def _migrate_v2(conn):
+    """旧版本不保存无目标的行，这类区间命中时会返回短页，删除后重新请求"""
+    conn.execute("""
+        DELETE FROM search_pages WHERE count > (
+            SELECT COUNT(*) FROM search_results r
+            WHERE r.query_id = search_pages.query_id
+              AND r.position >= search_pages.start AND r.position < search_pages.start + search_pages.count
+        )
+    """)
+
+
+_MIGRATIONS = [_migrate_v1, _migrate_v2]
+
+
+def _covered_until(start: int, ranges) -> int:
+    """从 start 起被已获取区间连续覆盖到的偏移"""
+    covered = start
+    for range_start, count in ranges:
+        if range_start > covered:
+            break
+        covered = max(covered, range_start + count)
+    return covered
+
+
+class SearchCache:
+    """资产搜索结果缓存（通过 get_search_cache 获取）"""
+
+    def __init__(self, db_path: str = None, ttl: float = DEFAULT_TTL, max_results: int = MAX_CACHED_RESULTS):
+        if db_path is None:
+            db_path = str(database_path("search_cache.db"))
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_results = max_results
+        self._db = get_database(db_path)
+        self._db.migrate(_MIGRATIONS)
+        self._lock = threading.Lock()
+        self._puts = 0
+
+    def get(self, engine: str, query: str, page: int, page_size: int, fields: str = ''):
+        """命中时返回与 SearchEngineBase.search 相同结构的结果（附 'cached': True），否则返回 None"""
+        start = (page - 1) * page_size
+        end = start + page_size
+        try:
+            with self._db.reader() as conn:
+                row = conn.execute(
+                    "SELECT id, total FROM search_queries WHERE engine = ? AND query = ? AND fields = ?",
+                    (engine, query, fields)
+                ).fetchone()
+                if row is None:
+                    return None
+                query_id, total = row['id'], row['total']
+                ranges = conn.execute(
+                    "SELECT start, count FROM search_pages "
+                    "WHERE query_id = ? AND fetched_at >= ? AND start + count >= ? AND start <= ? ORDER BY start",
+                    (query_id, time.time() - self.ttl, start, end)
+                ).fetchall()
+                if not ranges:
+                    return None
+                wanted = end if total is None else min(end, total)
+                if _covered_until(start, ranges) < wanted:
+                    return None
+                rows = conn.execute(
+                    "SELECT a.* FROM search_results r JOIN search_assets a ON a.id = r.asset_id "
+                    "WHERE r.query_id = ? AND r.position >= ? AND r.position < ? ORDER BY r.position",
+                    (query_id, start, end)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache lookup failed: {e}")
+            return None
+
+        self._db.execute("UPDATE search_queries SET last_used = ? WHERE id = ?", (time.time(), query_id),
+                         wait=False)
+        return {
+            'success': True,
+            'total': total,
+            'results': [self._to_result(row) for row in rows],
+            'cached': True,
+        }
+
+    def put(self, engine: str, query: str, page: int, page_size: int, result: dict, fields: str = ''):
+        """保存一页成功的搜索结果"""
+        if not result.get('success') or result.get('cached'):
+            return
+        items = result.get('results') or []
+        start = (page - 1) * page_size
+        total = result.get('total')
+        if total is None and len(items) < page_size:
+            # 引擎未报告总数时，短页即为结果末尾
+            total = start + len(items)
+
+        positions = []
+        assets = {}
+        for offset, item in enumerate(items):
+            # 没有可扫描目标的行也占住它的位置（同一引擎的这类行共用一条空目标资产），
+            # 否则命中缓存时返回的页变短，会被采集端当作最后一页
+            target = normalize_target(item.get_target_url())
+            positions.append((start + offset, target))
+            assets[target] = (engine, target, *(getattr(item, column) for column in _ASSET_COLUMNS),
+                              json.dumps(item.extra or {}, ensure_ascii=False, default=str))
+        now = time.time()
+
+        def _store(conn):
+            conn.execute("""
+                INSERT INTO search_queries (engine, query, fields, total, last_used) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(engine, query, fields) DO UPDATE SET
+                    total = COALESCE(excluded.total, total), last_used = excluded.last_used
+            """, (engine, query, fields, total, now))
+            query_id = conn.execute(
+                "SELECT id FROM search_queries WHERE engine = ? AND query = ? AND fields = ?",
+                (engine, query, fields)
+            ).fetchone()[0]
+
+            conn.executemany(f"""
+                INSERT INTO search_assets (engine, target, {', '.join(_ASSET_COLUMNS)}, extra)
+                VALUES ({', '.join('?' * (len(_ASSET_COLUMNS) + 3))})
+                ON CONFLICT(engine, target) DO UPDATE SET
+                    {', '.join(f'{column} = excluded.{column}' for column in _ASSET_COLUMNS)},
+                    extra = excluded.extra
+            """, assets.values())
+            ids = {}
+            targets = list(assets)
+            for i in range(0, len(targets), _LOOKUP_BATCH):
+                batch = targets[i:i + _LOOKUP_BATCH]
+                ids.update(conn.execute(
+                    f"SELECT target, id FROM search_assets WHERE engine = ? AND target IN ({', '.join('?' * len(batch))})",
+                    (engine, *batch)
+                ).fetchall())
+
+            conn.execute("DELETE FROM search_results WHERE query_id = ? AND position >= ? AND position < ?",
+                         (query_id, start, start + len(items)))
+            conn.executemany("INSERT INTO search_results (query_id, position, asset_id) VALUES (?, ?, ?)",
+                             [(query_id, position, ids[target]) for position, target in positions])
+            conn.execute("INSERT OR REPLACE INTO search_pages (query_id, start, count, fetched_at) "
+                         "VALUES (?, ?, ?, ?)", (query_id, start, len(items), now))
+
+        try:
+            self._db.transaction(_store)
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache store failed: {e}")
+            return
+
+        with self._lock:
+            self._puts += 1
+            due = self._puts % PRUNE_INTERVAL == 0
+        if due:
+            self.prune(wait=False)
+
+    def prune(self, wait: bool = True):
+        """删除过期区间，超出条数上限时按最近使用时间淘汰整条查询，并清理不再被引用的资产"""
+        def _prune(conn):
+            conn.execute("DELETE FROM search_pages WHERE fetched_at < ?", (time.time() - self.ttl,))
+            conn.execute("DELETE FROM search_queries WHERE id NOT IN (SELECT query_id FROM search_pages)")
+
+            count = conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+            if count > self.max_results:
+                rows = conn.execute("""
+                    SELECT q.id, (SELECT COUNT(*) FROM search_results r WHERE r.query_id = q.id) AS n
+                    FROM search_queries q ORDER BY q.last_used
+                """).fetchall()
+                for row in rows:
+                    if count <= self.max_results:
+                        break
+                    conn.execute("DELETE FROM search_pages WHERE query_id = ?", (row['id'],))
+                    conn.execute("DELETE FROM search_queries WHERE id = ?", (row['id'],))
+                    count -= row['n']
+
+            # 不在任何有效区间内的结果与不再被引用的资产
+            conn.execute("""
+                DELETE FROM search_results WHERE NOT EXISTS (
+                    SELECT 1 FROM search_pages p
+                    WHERE p.query_id = search_results.query_id
+                      AND search_results.position >= p.start AND search_results.position < p.start + p.count
+                )
+            """)
+            conn.execute("DELETE FROM search_assets WHERE id NOT IN (SELECT asset_id FROM search_results)")
+
+        try:
+            future = self._db.transaction(_prune, wait=wait)
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache prune failed: {e}")
+            return
+        if not wait:
+            future.add_done_callback(
+                lambda f: f.exception() and logger.warning(f"Search cache prune failed: {f.exception()}"))
+
+    def clear(self):
+        """清空全部缓存"""
+        def _clear(conn):
+            for table in ('search_results', 'search_pages', 'search_queries', 'search_assets'):
+                conn.execute(f"DELETE FROM {table}")
+        self._db.transaction(_clear)
+
+    @staticmethod
+    def _to_result(row) -> SearchResult:
+        try:
+            extra = json.loads(row['extra'] or '{}')
+        except ValueError:
+            extra = {}
+        values = {column: row[column] for column in _ASSET_COLUMNS if row[column] is not None}
+        return SearchResult(**values, extra=extra)
+
+
+# 全局单例
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """获取搜索结果缓存单例"""
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = SearchCache()
+        return _cache_instance
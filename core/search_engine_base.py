@@ -72,6 +72,12 @@ class SearchEngineBase(ABC):
     name: str = "BaseEngine"
     # 引擎显示名称
     display_name: str = tr("search.base_engine")
+    # 单页结果数上限（并发采集时按此切分页）
+    max_page_size: int = 100
+    # 默认请求速率（每秒请求数，<= 0 表示不限速）
+    rate_limit: float = 1.0
+    # 返回字段集合，作为搜索缓存键的一部分（字段变化时不复用旧结果）
+    result_fields: str = ""
     
     def __init__(self, api_key: str = "", api_url: str = "", **kwargs):
         """
@@ -102,6 +108,8 @@ class SearchEngineBase(ABC):
                 'total': int,  # 总结果数
                 'results': List[SearchResult],
                 'error': str,  # 错误信息（如有）
+                'retryable': bool,  # 失败可重试（超时、网络错误、限流），可选
+                'quota_exhausted': bool,  # 配额不足，可选
             }
         """
         pass
@@ -153,38 +161,28 @@ class SearchEngineThread(QThread):
         self._is_stopped = False
     
     def run(self):
-        """执行搜索"""
-        all_results = []
-        total = 0
-        
-        for current_page in range(1, self.max_pages + 1):
-            if self._is_stopped:
-                break
-            
-            try:
-                result = self.engine.search(self.query, current_page, self.page_size)
-                
-                if not result.get('success'):
-                    self.error_signal.emit(result.get('error', tr("search.search_failed")))
-                    return
-                
-                total = result.get('total', 0)
-                all_results.extend(result.get('results', []))
-                
-                self.progress_signal.emit(current_page, self.max_pages)
-                
-                # 如果已经获取了所有结果，提前结束
-                if len(all_results) >= total:
-                    break
-                    
-            except Exception as e:
-                self.error_signal.emit(tr("search.search_error", error=str(e)))
-                return
-        
+        """执行搜索：首页获知总数后其余页并发请求，结果按目标去重"""
+        from core.asset_collector import AssetCollector, collection_error
+
+        collector = AssetCollector({self.engine.name: self.engine}, self.query,
+                                   page_size=self.page_size,
+                                   max_results=self.page_size * max(1, self.max_pages),
+                                   stop_check=lambda: self._is_stopped)
+        try:
+            assets = collector.collect(on_progress=self.progress_signal.emit)
+        except Exception as e:
+            self.error_signal.emit(tr("search.search_error", error=str(e)))
+            return
+
+        error = collection_error(collector)
+        if not assets and error:
+            self.error_signal.emit(error)
+            return
+
         self.result_signal.emit({
             'success': True,
-            'total': total,
-            'results': all_results,
+            'total': collector.stats[self.engine.name].total,
+            'results': [asset.result for asset in assets],
         })
     
     def stop(self):
@@ -150,6 +150,7 @@ class SettingsManager:
             "verbose": str(self.settings.value("scan_verbose", "false")).lower() == "true",
             "proxy": self.settings.value("scan_proxy", ""),
             "use_native_scanner": str(self.settings.value("scan_use_native", "false")).lower() == "true",
+            "trace_log": str(self.settings.value("scan_trace_log", "false")).lower() == "true",
             "oast_mode": self.settings.value("scan_oast_mode", "auto"),
             "oast_server": self.settings.value("scan_oast_server", ""),
             "oast_token": self.settings.value("scan_oast_token", ""),
@@ -172,6 +173,7 @@ class SettingsManager:
         self.settings.setValue("scan_verbose", "true" if config.get("verbose") else "false")
         self.settings.setValue("scan_proxy", config.get("proxy", ""))
         self.settings.setValue("scan_use_native", "true" if config.get("use_native_scanner") else "false")
+        self.settings.setValue("scan_trace_log", "true" if config.get("trace_log") else "false")
         self.settings.setValue("scan_oast_mode", config.get("oast_mode", "auto"))
         self.settings.setValue("scan_oast_server", config.get("oast_server", ""))
         self.settings.setValue("scan_oast_token", config.get("oast_token", ""))
@@ -238,6 +240,34 @@ class SettingsManager:
         self.settings.setValue("update_auto_check", "true" if enabled else "false")
         self.settings.sync()
 
+    # ============== 诊断配置 ==============
+
+    def get_scan_profiling(self) -> bool:
+        """获取是否在扫描期间启用性能剖析"""
+        return str(self.settings.value("scan_profiling", "false")).lower() == "true"
+
+    def set_scan_profiling(self, enabled: bool):
+        """设置是否在扫描期间启用性能剖析"""
+        self.settings.setValue("scan_profiling", "true" if enabled else "false")
+        self.settings.sync()
+
+    def get_perf_thresholds(self) -> dict:
+        """获取性能监控告警阈值（仅返回用户修改过的项）"""
+        value = self.settings.value("perf_thresholds", "")
+        if value:
+            try:
+                thresholds = json.loads(value)
+                if isinstance(thresholds, dict):
+                    return thresholds
+            except json.JSONDecodeError:
+                pass
+        return {}
+
+    def save_perf_thresholds(self, thresholds: dict):
+        """保存性能监控告警阈值"""
+        self.settings.setValue("perf_thresholds", json.dumps(thresholds))
+        self.settings.sync()
+
     # ============== UI 缩放配置 ==============
 
     def get_ui_scale(self) -> float:
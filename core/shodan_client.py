@@ -45,9 +45,11 @@ class ShodanClient(SearchEngineBase):
             if response.status_code == 401:
                 return {'success': False, 'error': tr("search.shodan.invalid_api_key")}
             elif response.status_code == 402:
-                return {'success': False, 'error': tr("search.shodan.insufficient_quota")}
+                return {'success': False, 'error': tr("search.shodan.insufficient_quota"), 'quota_exhausted': True}
             elif response.status_code != 200:
-                return {'success': False, 'error': tr("search.shodan.api_error", code=response.status_code)}
+                # 429 限流与 5xx 服务端错误可重试
+                return {'success': False, 'error': tr("search.shodan.api_error", code=response.status_code),
+                        'retryable': response.status_code == 429 or response.status_code >= 500}
             
             data = response.json()
             
@@ -92,9 +94,9 @@ class ShodanClient(SearchEngineBase):
             }
             
         except requests.exceptions.Timeout:
-            return {'success': False, 'error': tr("search.shodan.request_timeout")}
+            return {'success': False, 'error': tr("search.shodan.request_timeout"), 'retryable': True}
         except requests.exceptions.RequestException as e:
-            return {'success': False, 'error': tr("search.shodan.request_failed", error=str(e))}
+            return {'success': False, 'error': tr("search.shodan.request_failed", error=str(e)), 'retryable': True}
         except Exception as e:
             return {'success': False, 'error': tr("search.shodan.parse_failed", error=str(e))}
     
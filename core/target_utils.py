@@ -1,6 +1,195 @@
+import ipaddress
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Tuple
 from urllib.parse import urlsplit, urlunsplit
 
 
+# 常见形式的快速路径: host[:port] 与 scheme://host[:port][/]
+# 不含 userinfo、IPv6、路径、查询串的目标无需经过 urlsplit/urlunsplit
+_FAST_TARGET_RE = re.compile(
+    r"^(?:(?P<scheme>[hH][tT][tT][pP][sS]?)://)?"
+    r"(?P<host>[A-Za-z0-9_.-]+)"
+    r"(?::(?P<port>[0-9]{1,5}))?"
+    r"/?$"
+)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# 可展开的目标写法: 10.0.0.0/24、10.0.0.1-10.0.0.50、10.0.0.1-50，
+# 以及可选的端口列表后缀 :80,443,8000-8010（也可用于普通域名）
+_SPEC_SCHEME_RE = re.compile(r"^(?P<scheme>[hH][tT][tT][pP][sS]?)://")
+_PORT_LIST_RE = re.compile(r"^[0-9]{1,5}(?:-[0-9]{1,5})?(?:,[0-9]{1,5}(?:-[0-9]{1,5})?)*$")
+_IPV4_CIDR_RE = re.compile(r"^[0-9]{1,3}(?:\.[0-9]{1,3}){3}/[0-9]{1,2}$")
+_IPV4_RANGE_RE = re.compile(
+    r"^(?P<start>[0-9]{1,3}(?:\.[0-9]{1,3}){3})-(?P<end>[0-9]{1,3}(?:\.[0-9]{1,3}){3}|[0-9]{1,3})$"
+)
+
+
+@dataclass(frozen=True)
+class TargetSpec:
+    """可展开的目标描述（CIDR / IP 段 / 端口列表），按需惰性生成目标。
+
+    first/last 为 IPv4 地址的整数区间；host 不为空时表示单个域名或地址。
+    ports 为闭区间列表，空元组表示不指定端口。
+    """
+    source: str
+    scheme: str = ""
+    first: int = 0
+    last: int = -1
+    host: str = ""
+    ports: Tuple[Tuple[int, int], ...] = ()
+
+    def host_count(self) -> int:
+        if self.host:
+            return 1
+        return max(0, self.last - self.first + 1)
+
+    def port_count(self) -> int:
+        if not self.ports:
+            return 1
+        return sum(hi - lo + 1 for lo, hi in self.ports)
+
+    def __len__(self) -> int:
+        return self.host_count() * self.port_count()
+
+    def iter_hosts(self) -> Iterator[str]:
+        if self.host:
+            yield self.host
+            return
+        for value in range(self.first, self.last + 1):
+            yield str(ipaddress.IPv4Address(value))
+
+    def iter_ports(self) -> Iterator[Optional[int]]:
+        if not self.ports:
+            yield None
+            return
+        for lo, hi in self.ports:
+            yield from range(lo, hi + 1)
+
+    def __iter__(self) -> Iterator[str]:
+        prefix = f"{self.scheme}://" if self.scheme else ""
+        for host in self.iter_hosts():
+            for port in self.iter_ports():
+                suffix = "" if port is None else f":{port}"
+                yield normalize_target(f"{prefix}{host}{suffix}")
+
+
+def _parse_port_list(text):
+    ranges = []
+    for item in text.split(","):
+        lo, _, hi = item.partition("-")
+        lo = int(lo)
+        hi = int(hi) if hi else lo
+        if not 1 <= lo <= hi <= 65535:
+            return None
+        ranges.append((lo, hi))
+    return tuple(ranges)
+
+
+def _parse_ipv4_hosts(text):
+    """Return the inclusive integer address range for a CIDR or IP range."""
+    try:
+        if _IPV4_CIDR_RE.match(text):
+            network = ipaddress.IPv4Network(text, strict=False)
+            first = int(network.network_address)
+            last = int(network.broadcast_address)
+            # 跳过网络地址和广播地址（/31、/32 除外）
+            if network.num_addresses > 2:
+                first += 1
+                last -= 1
+            return first, last
+
+        match = _IPV4_RANGE_RE.match(text)
+        if match:
+            start = ipaddress.IPv4Address(match.group("start"))
+            end_text = match.group("end")
+            if "." not in end_text:
+                end_text = match.group("start").rsplit(".", 1)[0] + "." + end_text
+            end = ipaddress.IPv4Address(end_text)
+            if int(end) < int(start):
+                return None
+            return int(start), int(end)
+    except ValueError:
+        return None
+    return None
+
+
+def parse_target_spec(target) -> Optional[TargetSpec]:
+    """Parse a CIDR / IP range / port list target; return None for literal targets."""
+    if not isinstance(target, str):
+        return None
+    source = target.strip()
+    if not source or "@" in source or "?" in source:
+        return None
+
+    rest = source
+    scheme = ""
+    match = _SPEC_SCHEME_RE.match(rest)
+    if match:
+        scheme = match.group("scheme").lower()
+        rest = rest[match.end():]
+    if rest.endswith("/"):
+        rest = rest[:-1]
+
+    ports = ()
+    multi_port = False
+    host_part, sep, port_part = rest.rpartition(":")
+    if sep and _PORT_LIST_RE.match(port_part):
+        ports = _parse_port_list(port_part)
+        if ports is None:
+            return None
+        multi_port = len(ports) > 1 or ports[0][0] != ports[0][1]
+    else:
+        host_part = rest
+
+    hosts = _parse_ipv4_hosts(host_part)
+    if hosts is not None:
+        return TargetSpec(source=source, scheme=scheme, first=hosts[0], last=hosts[1], ports=ports)
+
+    if multi_port and _FAST_TARGET_RE.match(host_part):
+        return TargetSpec(source=source, scheme=scheme, host=host_part.lower(), ports=ports)
+    return None
+
+
+def is_target_spec(target) -> bool:
+    """Return True if the target expands to multiple hosts or ports."""
+    return parse_target_spec(target) is not None
+
+
+class NormalizedTargets(list):
+    """已归一化并去重的目标列表，后续阶段据此跳过重复处理。
+
+    仅作为标记使用：如果在此列表上追加未归一化的目标，标记将不再可信，
+    应重新调用 dedupe_targets 生成新的列表。
+    """
+
+
+def is_normalized(targets):
+    """Return True if the target list was produced by dedupe_targets."""
+    return isinstance(targets, NormalizedTargets)
+
+
+def _normalize_fast(target):
+    """Fast path for plain host[:port] targets; return None to fall back."""
+    match = _FAST_TARGET_RE.match(target)
+    if not match:
+        return None
+
+    scheme = (match.group("scheme") or "http").lower()
+    host = match.group("host").lower()
+    port = match.group("port")
+    if port is None:
+        return f"{scheme}://{host}"
+
+    port = int(port)
+    if port > 65535:
+        return None
+    if _DEFAULT_PORTS[scheme] == port:
+        return f"{scheme}://{host}"
+    return f"{scheme}://{host}:{port}"
+
+
 def normalize_target(target):
     """Return a stable target URL used for display, queueing, and scanning."""
     if not isinstance(target, str):
@@ -10,6 +199,10 @@ def normalize_target(target):
     if not target:
         return ""
 
+    fast = _normalize_fast(target)
+    if fast is not None:
+        return fast
+
     if not target.lower().startswith(("http://", "https://")):
         target = "http://" + target
 
@@ -47,12 +240,23 @@ def normalize_target(target):
 
 
 def dedupe_targets(targets):
-    """Normalize targets and remove duplicates while preserving input order."""
-    unique_targets = []
+    """Normalize targets and remove duplicates while preserving input order.
+
+    The result is a NormalizedTargets list; passing it back in returns it
+    unchanged, so queueing, task registration and the scan thread only pay
+    for normalization once. CIDR / range / port list entries are kept in
+    their compact form; use iter_targets to expand them.
+    """
+    if isinstance(targets, NormalizedTargets):
+        return targets
+
+    unique_targets = NormalizedTargets()
     seen = set()
 
     for target in targets or []:
-        normalized = normalize_target(target)
+        # 可展开目标保留原始写法，直到扫描阶段再惰性生成
+        spec = parse_target_spec(target)
+        normalized = spec.source if spec else normalize_target(target)
         if not normalized or normalized in seen:
             continue
         seen.add(normalized)
@@ -64,3 +268,32 @@ def dedupe_targets(targets):
 def parse_targets_text(text):
     """Parse multiline target text into normalized, deduplicated targets."""
     return dedupe_targets((text or "").splitlines())
+
+
+def iter_targets(targets: Iterable[str]) -> Iterator[str]:
+    """Lazily yield scan-ready targets, expanding CIDR / range / port list entries.
+
+    Expanded entries are generated one at a time and never materialized, so
+    a /16 with several ports streams in constant memory. Literal targets are
+    normalized unless the list is already a NormalizedTargets.
+    """
+    normalized = is_normalized(targets)
+    for target in targets or []:
+        spec = parse_target_spec(target)
+        if spec is not None:
+            yield from spec
+        elif normalized:
+            yield target
+        else:
+            value = normalize_target(target)
+            if value:
+                yield value
+
+
+def count_targets(targets: Iterable[str]) -> int:
+    """Return how many targets iter_targets would yield, without expanding them."""
+    total = 0
+    for target in targets or []:
+        spec = parse_target_spec(target)
+        total += len(spec) if spec is not None else 1
+    return total
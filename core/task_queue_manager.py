@@ -188,6 +188,7 @@ class TaskQueueWorker(QThread):
     task_failed = pyqtSignal(str, str)  # 任务ID, 错误信息
     log_signal = pyqtSignal(str)  # 日志
     result_found = pyqtSignal(str, dict)  # 任务ID, 单个漏洞结果
+    task_stats = pyqtSignal(str, dict)  # 任务ID, nuclei 统计采样
     
     def __init__(self, task: ScanTask, scan_config: Dict = None):
         super().__init__()
@@ -204,6 +205,7 @@ class TaskQueueWorker(QThread):
         self._pause_mutex = QMutex()
         self._pause_condition = QWaitCondition()
         self._scan_thread = None
+        self._rate_factor = 1.0
     
     def run(self):
         """执行任务"""
@@ -264,8 +266,11 @@ class TaskQueueWorker(QThread):
                 bulk_size=self.scan_config.get('bulk_size', 25),
                 custom_args=custom_args,
                 use_native_scanner=self.scan_config.get('use_native_scanner', False),
-                oast_config=self.scan_config
+                oast_config=self.scan_config,
+                trace_log=self.scan_config.get('trace_log', False)
             )
+            # 继承任务启动前 RateGovernor 已设定的速率系数
+            self._scan_thread.set_rate_factor(self._rate_factor)
             self.log_signal.emit(f"[DEBUG] NucleiScanThread created, Templates: {len(self.task.templates)}, first: {self.task.templates[0] if self.task.templates else 'None'}")
             
             # 连接信号
@@ -290,6 +295,7 @@ class TaskQueueWorker(QThread):
             self._scan_thread.result_signal.connect(on_result)
             self._scan_thread.progress_signal.connect(on_progress)
             self._scan_thread.log_signal.connect(on_log)
+            self._scan_thread.stats_signal.connect(lambda sample: self.task_stats.emit(self.task.id, sample))
 
             # 连接 finished_signal 以便调试
             def on_finished():
@@ -359,6 +365,8 @@ class TaskQueueWorker(QThread):
             self.task_completed.emit(self.task.id, {
                 'results': results,
                 'vuln_count': vuln_count[0],
+                'telemetry': self._scan_thread.telemetry,
+                'stats_series': self._scan_thread.stats_series,
             })
             
         except Exception as e:
@@ -408,6 +416,13 @@ class TaskQueueWorker(QThread):
                 return False
         return True
     
+    def set_rate_factor(self, factor):
+        """调整运行中扫描的速率系数（由 RateGovernor 驱动）"""
+        self._rate_factor = factor
+        scan_thread = self._scan_thread
+        if scan_thread and scan_thread.isRunning():
+            scan_thread.set_rate_factor(factor)
+
     def cancel(self):
         """取消任务"""
         self._is_cancelled = True
@@ -423,6 +438,7 @@ class TaskQueueManager(QObject):
     task_added = pyqtSignal(str)  # 任务添加
     task_removed = pyqtSignal(str)  # 任务移除
     task_status_changed = pyqtSignal(str, str)  # 任务ID, 新状态
+    task_stats = pyqtSignal(str, dict)  # 任务ID, nuclei 统计采样（所有运行中的任务）
     
     def __init__(self, max_concurrent: int = 1):
         """
@@ -437,6 +453,7 @@ class TaskQueueManager(QObject):
         self._workers: Dict[str, TaskQueueWorker] = {}
         self._queue: List[str] = []  # 任务ID队列
         self._scan_config = {}
+        self._rate_factor = 1.0
     
     def set_scan_config(self, config: Dict):
         """设置扫描配置"""
@@ -525,6 +542,16 @@ class TaskQueueManager(QObject):
         logger.info(tr("task_status.external_task_registered", id=task.id, name=name, status=status.value))
         return task.id
     
+    def append_targets(self, task_id: str, targets: List[str]) -> bool:
+        """向尚未启动的任务追加目标（已创建工作线程的任务目标已固定，返回 False）"""
+        task = self._tasks.get(task_id)
+        if (not task or task_id in self._workers
+                or task.status not in [TaskStatus.PENDING, TaskStatus.SCHEDULED]):
+            return False
+        task.targets = dedupe_targets(list(task.targets) + list(targets))
+        self.queue_updated.emit()
+        return True
+    
     def update_task_progress(self, task_id: str, progress: int, vuln_count: int = None):
         """更新任务进度"""
         task = self._tasks.get(task_id)
@@ -560,13 +587,25 @@ class TaskQueueManager(QObject):
     def get_worker(self, task_id: str):
         """获取任务的工作线程"""
         return self._workers.get(task_id)
+
+    def get_running_task_ids(self) -> List[str]:
+        """返回工作线程仍在运行的任务ID"""
+        return [task_id for task_id, worker in self._workers.items() if worker.isRunning()]
+
+    def set_rate_factor(self, factor: float) -> int:
+        """将速率系数应用到所有运行中的任务，之后启动的任务也沿用该系数；返回受影响的任务数"""
+        self._rate_factor = factor
+        workers = [worker for worker in self._workers.values() if worker.isRunning()]
+        for worker in workers:
+            worker.set_rate_factor(factor)
+        return len(workers)
     
     def _try_start_next(self):
         """尝试启动下一个等待中的任务（按优先级排序）"""
-        # 统计运行中的任务数
+        # 统计运行中的任务数（已创建工作线程但尚未进入 RUNNING 的任务也计入）
         running_count = sum(
-            1 for t in self._tasks.values()
-            if t.status == TaskStatus.RUNNING
+            1 for task_id, t in self._tasks.items()
+            if t.status == TaskStatus.RUNNING or (t.status == TaskStatus.PENDING and task_id in self._workers)
         )
         
         if running_count >= self.max_concurrent:
@@ -576,6 +615,7 @@ class TaskQueueManager(QObject):
         pending_tasks = [
             self._tasks[task_id] for task_id in self._queue
             if task_id in self._tasks and self._tasks[task_id].status == TaskStatus.PENDING
+            and task_id not in self._workers
         ]
         
         if pending_tasks:
@@ -611,7 +651,9 @@ class TaskQueueManager(QObject):
             return
         
         worker = TaskQueueWorker(task, self._scan_config)
+        worker.set_rate_factor(self._rate_factor)
         worker.task_started.connect(self._on_task_started)
+        worker.task_stats.connect(self.task_stats)
         worker.task_progress.connect(self._on_task_progress)
         worker.task_completed.connect(self._on_task_completed)
         worker.task_failed.connect(self._on_task_failed)
@@ -649,6 +691,8 @@ class TaskQueueManager(QObject):
                 task.results = result['results']
                 task.result_count = len(task.results)
                 task.vuln_count = result.get('vuln_count', 0)
+                task.telemetry = result.get('telemetry')
+                task.stats_series = result.get('stats_series')
 
         # 先发出状态变更信号，让 UI 有机会处理
         self.task_status_changed.emit(task_id, TaskStatus.COMPLETED.value)
@@ -0,0 +1,92 @@
+"""
+模板调度 - 根据历史命中率与执行成本对模板排序
+期望价值 = 命中率 / 平均成本，高产出的模板优先执行，缩短首个漏洞的发现时间
+"""
+from dataclasses import dataclass
+from typing import Dict, List
+
+from core.logger import get_logger
+
+logger = get_logger("template_scheduler")
+
+# 每个请求折算的成本（毫秒），nuclei 模式只有请求数，按此估算
+REQUEST_COST_MS = 50.0
+# 没有任何历史数据时的默认成本
+DEFAULT_COST_MS = 200.0
+# 命中率先验的权重（相当于按全局平均命中率虚拟运行的次数）
+PRIOR_RUNS = 2.0
+
+
+@dataclass
+class TemplateScore:
+    path: str
+    hit_rate: float
+    cost_ms: float
+
+    @property
+    def value(self) -> float:
+        return self.hit_rate / max(self.cost_ms, 1.0)
+
+
+def estimate_hit_rate(stats: Dict, prior_rate: float = 0.0) -> float:
+    """
+    每次扫描的命中率（至少发现一个漏洞的扫描占比），以全局平均命中率为先验平滑：
+    没有历史的模板取平均值，使用次数越多越接近自身的实际命中率
+    """
+    use_count = stats.get('use_count', 0) if stats else 0
+    hit_scans = min(stats.get('hit_scans', 0), use_count) if stats else 0
+    return (hit_scans + PRIOR_RUNS * prior_rate) / (use_count + PRIOR_RUNS)
+
+
+def estimate_cost_ms(stats: Dict, default_cost: float = DEFAULT_COST_MS) -> float:
+    """平均单次运行成本：取实测耗时（原生模式）与按请求数估算的较大者"""
+    if not stats:
+        return default_cost
+    timed_runs = stats.get('timed_runs', 0)
+    if timed_runs:
+        runtime = stats.get('total_runtime_ms', 0) / timed_runs
+        requests = stats.get('total_requests', 0) / timed_runs
+        return max(runtime, requests * REQUEST_COST_MS, 1.0)
+    return default_cost
+
+
+def score_templates(template_paths: List[str], stats_by_path: Dict[str, Dict],
+                    prior_rate: float = 0.0) -> List[TemplateScore]:
+    known_costs = sorted(
+        estimate_cost_ms(stats) for stats in stats_by_path.values() if stats.get('timed_runs')
+    )
+    # 无耗时数据的模板使用已知成本的中位数，保持中性排序
+    default_cost = known_costs[len(known_costs) // 2] if known_costs else DEFAULT_COST_MS
+
+    return [
+        TemplateScore(
+            path=path,
+            hit_rate=estimate_hit_rate(stats_by_path.get(path), prior_rate),
+            cost_ms=estimate_cost_ms(stats_by_path.get(path), default_cost),
+        )
+        for path in template_paths
+    ]
+
+
+def order_templates_by_value(template_paths: List[str], stats_manager=None) -> List[str]:
+    """按期望价值降序排列模板；统计不可用时保持原顺序"""
+    template_paths = list(template_paths or [])
+    if len(template_paths) < 2:
+        return template_paths
+
+    try:
+        if stats_manager is None:
+            from core.poc_stats_manager import get_poc_stats_manager
+            stats_manager = get_poc_stats_manager()
+        stats_by_path = stats_manager.get_stats_by_paths(template_paths)
+        prior_rate = stats_manager.get_mean_hit_rate() if stats_by_path else 0.0
+    except Exception as e:
+        logger.warning(f"Load template stats failed: {e}")
+        return template_paths
+
+    if not stats_by_path:
+        return template_paths
+
+    scores = score_templates(template_paths, stats_by_path, prior_rate)
+    # sorted 是稳定排序，价值相同的模板保持用户选择的顺序
+    return [score.path for score in sorted(scores, key=lambda s: s.value, reverse=True)]
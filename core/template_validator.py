@@ -0,0 +1,356 @@
+"""
+模板预校验缓存 - 后台校验 POC 模板一次，按内容哈希保存 pass/warn/fail 结果
+内部结构校验发现的问题只作警告，交由 nuclei -validate 确认；扫描启动时只剔除 nuclei 确认损坏的模板
+"""
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from core.logger import get_logger
+from core.paths import user_data_path
+
+logger = get_logger("template_validator")
+
+STATUS_PASS = "pass"
+STATUS_WARN = "warn"
+STATUS_FAIL = "fail"
+
+PROTOCOL_KEYS = (
+    "http", "requests", "dns", "tcp", "network", "file", "headless",
+    "ssl", "websocket", "whois", "code", "javascript", "flow", "workflows",
+)
+KNOWN_SEVERITIES = {"info", "low", "medium", "high", "critical", "unknown"}
+KNOWN_MATCHER_TYPES = {"status", "size", "word", "regex", "binary", "dsl", "xpath"}
+
+# 停止校验时检查 stop_check 的间隔（秒）
+STOP_POLL_INTERVAL = 0.2
+
+
+class TemplateValidationCache:
+    """按内容哈希保存模板校验结果的磁盘缓存"""
+
+    # v2：结果记录模板路径，fail 仅表示 nuclei 确认损坏
+    VERSION = 2
+
+    def __init__(self, cache_file=None):
+        self._cache_file = Path(cache_file) if cache_file else user_data_path("cache", "template_validation.json")
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        # (path, mtime_ns, size) -> content hash，避免重复读取未变化的文件
+        self._hash_memo = {}
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if not self._cache_file.exists():
+            return {}
+        try:
+            with open(self._cache_file, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if not isinstance(payload, dict) or payload.get("version") != self.VERSION:
+                return {}
+            entries = payload.get("entries", {})
+            return entries if isinstance(entries, dict) else {}
+        except Exception:
+            return {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {"version": self.VERSION, "entries": dict(self._entries)}
+            self._dirty = False
+        try:
+            with open(self._cache_file, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+        except Exception as e:
+            logger.warning(f"Save template validation cache failed: {e}")
+
+    def content_hash(self, path):
+        """Return the sha1 of a template file, memoized by path/mtime/size."""
+        path = Path(str(path))
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._hash_memo.get(memo_key)
+        if cached:
+            return cached
+        try:
+            digest = hashlib.sha1(path.read_bytes()).hexdigest()
+        except OSError:
+            return None
+        with self._lock:
+            self._hash_memo[memo_key] = digest
+        return digest
+
+    def get(self, content_hash):
+        with self._lock:
+            return self._entries.get(content_hash)
+
+    def put(self, content_hash, result):
+        with self._lock:
+            self._entries[content_hash] = result
+            self._dirty = True
+
+    def lookup(self, path):
+        """Return the cached result for a template file, or None if it was never checked."""
+        content_hash = self.content_hash(path)
+        return self.get(content_hash) if content_hash else None
+
+    def prune(self):
+        """删除模板文件已不存在或内容已变化的缓存项，返回删除数量"""
+        with self._lock:
+            entries = list(self._entries.items())
+        stale = [
+            content_hash for content_hash, result in entries
+            if not result.get("path") or self.content_hash(result["path"]) != content_hash
+        ]
+        with self._lock:
+            for content_hash in stale:
+                self._entries.pop(content_hash, None)
+            live = set(self._entries)
+            self._hash_memo = {key: digest for key, digest in self._hash_memo.items() if digest in live}
+            if stale:
+                self._dirty = True
+        return len(stale)
+
+
+def validate_template_text(text) -> dict:
+    """内部结构校验，返回 {'status', 'messages'}"""
+    errors = []
+    warnings = []
+
+    try:
+        data = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        return _make_result([f"yaml: {str(e).splitlines()[0]}"], [])
+
+    if not isinstance(data, dict):
+        return _make_result(["template is not a mapping"], [])
+    if not data.get("id"):
+        errors.append("missing id")
+
+    info = data.get("info")
+    if not isinstance(info, dict):
+        errors.append("missing info")
+    else:
+        if not info.get("name"):
+            warnings.append("missing info.name")
+        severity = str(info.get("severity", "")).lower()
+        if severity not in KNOWN_SEVERITIES:
+            warnings.append(f"unknown severity: {info.get('severity')}")
+
+    protocols = [key for key in PROTOCOL_KEYS if data.get(key)]
+    if not protocols:
+        errors.append("no protocol section")
+
+    for key in ("http", "requests"):
+        blocks = data.get(key) or []
+        if not isinstance(blocks, list):
+            errors.append(f"{key} must be a list")
+            continue
+        for index, block in enumerate(blocks):
+            if not isinstance(block, dict):
+                errors.append(f"{key}[{index}] must be a mapping")
+                continue
+            if not block.get("path") and not block.get("raw"):
+                errors.append(f"{key}[{index}] has no path or raw request")
+            matchers = block.get("matchers") or []
+            if not matchers and not block.get("extractors"):
+                warnings.append(f"{key}[{index}] has no matchers or extractors")
+            for matcher in matchers if isinstance(matchers, list) else []:
+                if not isinstance(matcher, dict):
+                    errors.append(f"{key}[{index}] matcher must be a mapping")
+                    continue
+                m_type = matcher.get("type")
+                if m_type not in KNOWN_MATCHER_TYPES:
+                    errors.append(f"{key}[{index}] unknown matcher type: {m_type}")
+                if m_type == "regex":
+                    for pattern in matcher.get("regex") or []:
+                        try:
+                            re.compile(str(pattern))
+                        except re.error:
+                            # Go 与 Python 正则语法略有差异，仅作警告
+                            warnings.append(f"{key}[{index}] regex may be invalid: {pattern}")
+
+    return _make_result(errors, warnings)
+
+
+def _nuclei_unavailable(reason) -> dict:
+    result = _make_result([], [f"nuclei validate unavailable: {reason}"])
+    result["unavailable"] = True
+    return result
+
+
+def validate_with_nuclei(path, nuclei_cmd, timeout=30, stop_check=None) -> dict:
+    """调用 nuclei -validate 校验单个模板；stop_check() 返回 True 时结束子进程"""
+    try:
+        proc = subprocess.Popen(
+            [nuclei_cmd, "-validate", "-t", str(path), "-silent", "-nc"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+            text=True, encoding="utf-8", errors="ignore",
+        )
+    except (subprocess.SubprocessError, OSError) as e:
+        return _nuclei_unavailable(e)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            stdout, stderr = proc.communicate(timeout=STOP_POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            stopped = bool(stop_check and stop_check())
+            if stopped or time.monotonic() >= deadline:
+                proc.kill()
+                proc.communicate()
+                return _nuclei_unavailable("stopped" if stopped else f"timed out after {timeout}s")
+
+    output = [line.strip() for line in (stdout + stderr).splitlines() if line.strip()]
+    if proc.returncode != 0:
+        return _make_result(output[-5:] or [f"nuclei -validate exit code {proc.returncode}"], [])
+    warnings = [line for line in output if "WRN" in line]
+    return _make_result([], warnings[-5:])
+
+
+def _make_result(errors, warnings) -> dict:
+    if errors:
+        status = STATUS_FAIL
+    elif warnings:
+        status = STATUS_WARN
+    else:
+        status = STATUS_PASS
+    return {
+        "status": status,
+        "messages": errors + warnings,
+        "checked_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def validate_template(path, cache=None, nuclei_cmd=None, nuclei_all=False, stop_check=None) -> dict:
+    """Validate one template, reusing the cached result for unchanged content.
+
+    内部结构校验可能误报（新协议、新字段），发现的错误只记为警告并标记 suspect；
+    提供 nuclei_cmd 时由 nuclei -validate 确认 suspect 模板（nuclei_all 为 True 时确认全部模板），
+    只有 nuclei 确认的才记为 fail。
+    """
+    cache = cache or get_validation_cache()
+    content_hash = cache.content_hash(path)
+    if not content_hash:
+        return _make_result(["file not readable"], [])
+
+    cached = cache.get(content_hash)
+    if cached and (cached.get("engine") == "nuclei" or not nuclei_cmd
+                   or not (nuclei_all or cached.get("suspect"))):
+        return cached
+
+    try:
+        text = Path(str(path)).read_text(encoding="utf-8", errors="ignore")
+    except OSError as e:
+        return _make_result([str(e)], [])
+
+    result = validate_template_text(text)
+    suspect = result["status"] == STATUS_FAIL
+    nuclei_result = None
+    if nuclei_cmd and (nuclei_all or suspect):
+        nuclei_result = validate_with_nuclei(path, nuclei_cmd, stop_check=stop_check)
+
+    if nuclei_result is not None and not nuclei_result.get("unavailable"):
+        nuclei_result["messages"] = result["messages"] + nuclei_result["messages"]
+        if nuclei_result["status"] == STATUS_PASS and result["messages"]:
+            nuclei_result["status"] = STATUS_WARN
+        nuclei_result["engine"] = "nuclei"
+        result = nuclei_result
+    else:
+        if suspect:
+            result["status"] = STATUS_WARN
+        result["engine"] = "schema"
+        result["suspect"] = suspect
+
+    result["path"] = str(path)
+    if not (stop_check and stop_check()):
+        cache.put(content_hash, result)
+    return result
+
+
+def filter_broken_templates(template_paths, cache=None):
+    """剔除缓存中 nuclei -validate 确认损坏的模板，返回 (可用模板, 已剔除模板)
+
+    仅使用已有的校验结果，不在扫描启动路径上做新的校验；目录、未校验过及仅内部结构校验有问题的模板原样保留。
+    """
+    cache = cache or get_validation_cache()
+    kept = []
+    broken = []
+    for template_path in template_paths or []:
+        if os.path.isfile(str(template_path)):
+            result = cache.lookup(template_path)
+            if result and result.get("status") == STATUS_FAIL and result.get("engine") == "nuclei":
+                broken.append(template_path)
+                continue
+        kept.append(template_path)
+    return kept, broken
+
+
+class TemplateValidationThread(QThread):
+    """后台模板校验线程"""
+
+    progress_signal = pyqtSignal(int, int)
+    finished_signal = pyqtSignal(dict)
+
+    def __init__(self, template_paths, use_nuclei=False, cache=None):
+        """use_nuclei 为 True 时用 nuclei -validate 校验全部模板，否则只确认内部结构校验有问题的模板"""
+        super().__init__()
+        self.template_paths = list(template_paths or [])
+        self.use_nuclei = use_nuclei
+        self.cache = cache or get_validation_cache()
+        self._is_running = True
+
+    def stop(self):
+        self._is_running = False
+
+    def run(self):
+        from core.nuclei_runner import get_nuclei_path
+        nuclei_cmd = get_nuclei_path()
+
+        summary = {STATUS_PASS: 0, STATUS_WARN: 0, STATUS_FAIL: 0}
+        total = len(self.template_paths)
+        for index, path in enumerate(self.template_paths, 1):
+            if not self._is_running:
+                break
+            try:
+                result = validate_template(path, self.cache, nuclei_cmd, self.use_nuclei,
+                                           stop_check=lambda: not self._is_running)
+                summary[result.get("status", STATUS_FAIL)] += 1
+            except Exception as e:
+                logger.debug(f"Validate template failed: {path}: {e}")
+            if index % 50 == 0 or index == total:
+                self.progress_signal.emit(index, total)
+
+        if self._is_running:
+            # 完整校验一轮后清理已删除或已修改模板的旧结果，避免缓存无限增长
+            pruned = self.cache.prune()
+            if pruned:
+                logger.debug(f"Pruned {pruned} stale template validation entries")
+        self.cache.save()
+        self.finished_signal.emit(summary)
+
+
+_cache_instance = None
+
+
+def get_validation_cache() -> TemplateValidationCache:
+    """获取模板校验缓存单例"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = TemplateValidationCache()
+    return _cache_instance
@@ -1,16 +1,23 @@
 """
 漏洞趋势分析模块
 提供漏洞数据统计、趋势分析功能
+数据来自扫描历史的统一发现库（vuln_results 引用 findings），按天的严重程度/模板/主机汇总
+由 scan_history 中的触发器增量维护；查询只读取时间范围内的汇总行（起始日不足一天的部分走
+recorded_at 索引读取明细）
 """
+import csv
 import json
 import os
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 from collections import defaultdict
 from dataclasses import dataclass, field
 from pathlib import Path
 
+from core.db import get_database
 from core.logger import get_logger
+from core.scan_history import ScanHistory, get_scan_history
 
 logger = get_logger('vuln_analytics')
 
@@ -56,85 +63,120 @@ class VulnAnalytics:
         'unknown': '#6b7280'
     }
     
-    def __init__(self, data_dir: str = None):
+    # 明细（vuln_results v）上与汇总表各列对应的表达式，与 scan_history 触发器中的取值一致
+    _SEVERITY = "COALESCE(v.severity, 'unknown')"
+    _TEMPLATE = "COALESCE(v.template_id, '')"
+    _NAME = "(SELECT name FROM findings WHERE id = v.finding_id)"
+    _HOST = "COALESCE((SELECT host FROM findings WHERE id = v.finding_id), '')"
+    _DAY = "SUBSTR(v.recorded_at, 1, 10)"
+    
+    def __init__(self, data_dir: str = None, history: ScanHistory = None):
+        """
+        参数:
+            data_dir: 旧版 vuln_history.json 所在目录（仅用于一次性导入）
+            history: 提供发现库的扫描历史，默认使用全局单例
+        """
         if data_dir:
             self.data_dir = Path(data_dir)
         else:
             app_data = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
             self.data_dir = Path(app_data) / 'NucleiGUI' / 'analytics'
-        self.data_dir.mkdir(parents=True, exist_ok=True)
-        self._vuln_records: List[VulnRecord] = []
-        self._load_history()
+        self.history = history or get_scan_history()
+        self._db = get_database(self.history.db_path)
+        self._import_thread = None
+        if self._get_history_file().exists():
+            # 导入量与旧文件大小成正比，放到后台执行，不阻塞界面
+            self._import_thread = threading.Thread(target=self._import_legacy_history,
+                                                   name="VulnAnalyticsImport", daemon=True)
+            self._import_thread.start()
     
     def _get_history_file(self) -> Path:
-        """获取历史数据文件路径"""
+        """旧版 JSON 历史数据文件路径"""
         return self.data_dir / 'vuln_history.json'
     
-    def _load_history(self):
-        """加载历史漏洞数据"""
+    def wait_imported(self, timeout: float = None) -> bool:
+        """等待旧版数据导入完成（没有待导入数据时立即返回 True）"""
+        if self._import_thread is not None:
+            self._import_thread.join(timeout)
+            return not self._import_thread.is_alive()
+        return True
+    
+    def _import_legacy_history(self):
+        """一次性导入旧版 vuln_history.json，导入后改名保留为备份
+
+        旧数据没有扫描记录，导入时创建一条状态为 imported 的合成扫描承载这些结果，
+        使其与普通扫描结果一样可以按扫描查看、删除和清理。
+        """
         history_file = self._get_history_file()
         if not history_file.exists():
             return
         try:
             with open(history_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-            for record in data.get('records', []):
-                self._vuln_records.append(VulnRecord(
-                    id=record['id'],
-                    template_id=record['template_id'],
-                    name=record['name'],
-                    severity=record['severity'],
-                    host=record['host'],
-                    matched_at=record['matched_at'],
-                    timestamp=datetime.fromisoformat(record['timestamp']),
-                    tags=record.get('tags', [])
-                ))
-            logger.info(f'Loaded {len(self._vuln_records)} vuln records')
-        except Exception as e:
-            logger.error(f'Load history failed: {e}')
-    
-    def _save_history(self):
-        """保存历史漏洞数据"""
-        try:
-            data = {
-                'records': [
+            records = data.get('records', [])
+            if records:
+                results = [
                     {
-                        'id': r.id,
-                        'template_id': r.template_id,
-                        'name': r.name,
-                        'severity': r.severity,
-                        'host': r.host,
-                        'matched_at': r.matched_at,
-                        'timestamp': r.timestamp.isoformat(),
-                        'tags': r.tags
+                        'template-id': record['template_id'],
+                        'matched-at': record['matched_at'],
+                        'host': record['host'],
+                        'info': {'name': record['name'], 'severity': record['severity'],
+                                 'tags': record.get('tags', [])},
                     }
-                    for r in self._vuln_records
-                ],
-                'updated_at': datetime.now().isoformat()
-            }
-            with open(self._get_history_file(), 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                    for record in records
+                ]
+                times = [datetime.fromisoformat(record['timestamp']) for record in records]
+                hosts = sorted({record['host'] for record in records if record.get('host')})
+                templates = sorted({record['template_id'] for record in records})
+                scan_time = min(times).astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                scan_id = self.history.add_scan_record(
+                    len(hosts), len(templates), len(results), 0, hosts, templates,
+                    {'source': history_file.name}, status='imported', scan_time=scan_time,
+                )
+                self.history.add_vuln_results(scan_id, results, recorded_at=[t.isoformat() for t in times])
+            history_file.replace(history_file.with_suffix('.json.migrated'))
+            logger.info(f'Imported {len(records)} vuln records from {history_file.name}')
         except Exception as e:
-            logger.error(f'Save history failed: {e}')
+            logger.error(f'Import legacy history failed: {e}')
     
-    def add_scan_results(self, results: List[Dict]):
-        """添加扫描结果到历史记录"""
-        for result in results:
-            record = VulnRecord.from_scan_result(result)
-            self._vuln_records.append(record)
-        self._save_history()
-        logger.info(f'Added {len(results)} vuln records')
+    @staticmethod
+    def _range(days: int = None):
+        """
+        把“最近 N 天”拆成两段：起始日当天 cutoff 之后的明细 + 之后整天的汇总
+        
+        返回 (cutoff, next_day)，days 为空时返回 (None, None) 表示全部汇总
+        """
+        if days is None:
+            return None, None
+        cutoff = datetime.now() - timedelta(days=days)
+        next_day = (cutoff + timedelta(days=1)).strftime('%Y-%m-%d')
+        return cutoff.isoformat(), next_day
+    
+    def _bucket_sql(self, agg_columns: str, event_columns: str, agg_table: str, days: int = None):
+        """
+        合并汇总行与起始日明细的子查询，统一输出 agg_columns 列 + count
+        
+        event_columns 为明细（vuln_results v）中与 agg_columns 对应的表达式
+        """
+        cutoff, next_day = self._range(days)
+        if cutoff is None:
+            return f"SELECT {agg_columns}, count FROM {agg_table}", []
+        sql = f"""
+            SELECT {agg_columns}, count FROM {agg_table} WHERE day >= ?
+            UNION ALL
+            SELECT {event_columns}, 1 FROM vuln_results v WHERE v.recorded_at >= ? AND v.recorded_at < ?
+        """
+        return sql, [next_day, cutoff, next_day]
+
     
     def get_severity_distribution(self, days: int = None) -> Dict[str, int]:
         """获取漏洞严重程度分布"""
-        records = self._filter_by_days(days)
-        distribution = defaultdict(int)
-        for record in records:
-            distribution[record.severity] += 1
+        sub, params = self._bucket_sql('severity', self._SEVERITY, 'analytics_daily_severity', days)
+        rows = self._db.query(f"SELECT severity, SUM(count) AS n FROM ({sub}) GROUP BY severity", params)
+        distribution = {row['severity']: row['n'] for row in rows}
         for severity in self.SEVERITY_ORDER:
-            if severity not in distribution:
-                distribution[severity] = 0
-        return dict(distribution)
+            distribution.setdefault(severity, 0)
+        return distribution
     
     def get_trend_data(self, days: int = 30) -> Dict:
         """获取漏洞趋势数据"""
@@ -142,11 +184,12 @@ class VulnAnalytics:
         start_date = end_date - timedelta(days=days)
         date_groups = defaultdict(lambda: defaultdict(int))
         
-        for record in self._vuln_records:
-            if record.timestamp >= start_date:
-                date_key = record.timestamp.strftime('%Y-%m-%d')
-                date_groups[date_key][record.severity] += 1
-                date_groups[date_key]['total'] += 1
+        sub, params = self._bucket_sql('day, severity', f'{self._DAY}, {self._SEVERITY}',
+                                       'analytics_daily_severity', days)
+        for row in self._db.query(f"SELECT day, severity, SUM(count) AS n FROM ({sub}) GROUP BY day, severity",
+                                  params):
+            date_groups[row['day']][row['severity']] += row['n']
+            date_groups[row['day']]['total'] += row['n']
         
         dates = []
         current = start_date
@@ -160,48 +203,53 @@ class VulnAnalytics:
         return trend_data
     
     def get_top_vulnerabilities(self, limit: int = 10, days: int = None) -> List[Dict]:
-        """获取出现次数最多的漏洞类型"""
-        records = self._filter_by_days(days)
-        vuln_counts = defaultdict(lambda: {'count': 0, 'severity': '', 'name': ''})
-        
-        for record in records:
-            vuln_counts[record.template_id]['count'] += 1
-            vuln_counts[record.template_id]['severity'] = record.severity
-            vuln_counts[record.template_id]['name'] = record.name
-        
-        sorted_vulns = sorted(vuln_counts.items(), key=lambda x: x[1]['count'], reverse=True)[:limit]
+        """获取出现次数最多的漏洞类型（名称与严重程度取最近一次出现的值）"""
+        sub, params = self._bucket_sql('day, template_id, name, severity',
+                                       f'{self._DAY}, {self._TEMPLATE}, {self._NAME}, {self._SEVERITY}',
+                                       'analytics_daily_template', days)
+        rows = self._db.query(f"""
+            SELECT template_id, SUM(count) AS count, name, severity, MAX(day)
+            FROM ({sub})
+            GROUP BY template_id
+            ORDER BY count DESC, template_id
+            LIMIT ?
+        """, params + [limit])
         return [
             {
-                'template_id': tid,
-                'name': d['name'],
-                'severity': d['severity'],
-                'count': d['count']
+                'template_id': row['template_id'],
+                'name': row['name'],
+                'severity': row['severity'],
+                'count': row['count']
             }
-            for tid, d in sorted_vulns
+            for row in rows
         ]
     
     def get_top_affected_hosts(self, limit: int = 10, days: int = None) -> List[Dict]:
         """获取受影响最多的主机"""
-        records = self._filter_by_days(days)
-        host_stats = defaultdict(lambda: {'total': 0, 'critical': 0, 'high': 0, 'medium': 0, 'low': 0})
-        
-        for record in records:
-            host_stats[record.host]['total'] += 1
-            if record.severity in host_stats[record.host]:
-                host_stats[record.host][record.severity] += 1
-        
-        sorted_hosts = sorted(
-            host_stats.items(),
-            key=lambda x: (x[1]['critical'], x[1]['high'], x[1]['total']),
-            reverse=True
-        )[:limit]
-        
-        return [{'host': host, **stats} for host, stats in sorted_hosts]
+        sub, params = self._bucket_sql('host, severity', f'{self._HOST}, {self._SEVERITY}',
+                                       'analytics_daily_host', days)
+        rows = self._db.query(f"""
+            SELECT host,
+                   SUM(count) AS total,
+                   SUM(CASE WHEN severity = 'critical' THEN count ELSE 0 END) AS critical,
+                   SUM(CASE WHEN severity = 'high' THEN count ELSE 0 END) AS high,
+                   SUM(CASE WHEN severity = 'medium' THEN count ELSE 0 END) AS medium,
+                   SUM(CASE WHEN severity = 'low' THEN count ELSE 0 END) AS low
+            FROM ({sub})
+            GROUP BY host
+            ORDER BY critical DESC, high DESC, total DESC
+            LIMIT ?
+        """, params + [limit])
+        return [
+            {'host': row['host'], 'total': row['total'], 'critical': row['critical'],
+             'high': row['high'], 'medium': row['medium'], 'low': row['low']}
+            for row in rows
+        ]
     
     def get_summary_stats(self, days: int = None) -> Dict:
         """获取汇总统计信息"""
-        records = self._filter_by_days(days)
-        if not records:
+        severity_dist = {k: v for k, v in self.get_severity_distribution(days).items() if v}
+        if not severity_dist:
             return {
                 'total_vulns': 0,
                 'unique_vulns': 0,
@@ -211,59 +259,53 @@ class VulnAnalytics:
                 'severity_distribution': {}
             }
         
-        severity_dist = defaultdict(int)
-        unique_templates = set()
-        unique_hosts = set()
-        
-        for record in records:
-            severity_dist[record.severity] += 1
-            unique_templates.add(record.template_id)
-            unique_hosts.add(record.host)
+        sub, params = self._bucket_sql('template_id', self._TEMPLATE, 'analytics_daily_template', days)
+        unique_vulns = self._db.query_one(f"SELECT COUNT(DISTINCT template_id) FROM ({sub})", params)[0]
+        sub, params = self._bucket_sql('host', self._HOST, 'analytics_daily_host', days)
+        affected_hosts = self._db.query_one(f"SELECT COUNT(DISTINCT host) FROM ({sub})", params)[0]
         
         return {
-            'total_vulns': len(records),
-            'unique_vulns': len(unique_templates),
-            'affected_hosts': len(unique_hosts),
+            'total_vulns': sum(severity_dist.values()),
+            'unique_vulns': unique_vulns,
+            'affected_hosts': affected_hosts,
             'critical_count': severity_dist.get('critical', 0),
             'high_count': severity_dist.get('high', 0),
-            'severity_distribution': dict(severity_dist)
+            'severity_distribution': severity_dist
         }
     
-    def _filter_by_days(self, days: int = None) -> List[VulnRecord]:
-        """按天数过滤记录"""
-        if days is None:
-            return self._vuln_records
-        cutoff = datetime.now() - timedelta(days=days)
-        return [r for r in self._vuln_records if r.timestamp >= cutoff]
-    
     def export_csv(self, filepath: str, days: int = None) -> bool:
-        """导出漏洞数据到CSV"""
+        """导出漏洞数据到CSV（逐行读取明细，不整体载入内存）"""
         try:
-            import csv
-            records = self._filter_by_days(days)
-            with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
+            cutoff, _ = self._range(days)
+            count = 0
+            with open(filepath, 'w', newline='', encoding='utf-8-sig') as f, self._db.reader() as conn:
                 writer = csv.writer(f)
                 writer.writerow(['ID', 'Template', 'Name', 'Severity', 'Host', 'Matched', 'Time', 'Tags'])
-                for r in records:
+                cursor = conn.execute("""
+                    SELECT v.template_id, v.matched_at, v.severity, v.recorded_at, f.name, f.host, f.tags
+                    FROM vuln_results v
+                    LEFT JOIN findings f ON f.id = v.finding_id
+                    WHERE v.recorded_at >= ?
+                    ORDER BY v.recorded_at
+                """, (cutoff or '',))
+                for row in cursor:
+                    tags = json.loads(row['tags'] or '[]')
                     writer.writerow([
-                        r.id, r.template_id, r.name, r.severity,
-                        r.host, r.matched_at, r.timestamp.isoformat(),
-                        ','.join(r.tags)
+                        f"{row['template_id']}_{row['matched_at']}", row['template_id'], row['name'],
+                        row['severity'], row['host'], row['matched_at'], row['recorded_at'],
+                        ','.join(tags) if isinstance(tags, list) else tags
                     ])
-            logger.info(f'Exported {len(records)} records to {filepath}')
+                    count += 1
+            logger.info(f'Exported {count} records to {filepath}')
             return True
         except Exception as e:
             logger.error(f'Export failed: {e}')
             return False
     
     def clear_old_records(self, days: int = 90):
-        """清除超过指定天数的旧记录"""
-        cutoff = datetime.now() - timedelta(days=days)
-        old_count = len(self._vuln_records)
-        self._vuln_records = [r for r in self._vuln_records if r.timestamp >= cutoff]
-        removed = old_count - len(self._vuln_records)
+        """清除超过指定天数的旧扫描及结果（汇总由触发器同步扣减）"""
+        removed = self.history.delete_results_before(datetime.now().astimezone() - timedelta(days=days))
         if removed > 0:
-            self._save_history()
             logger.info(f'Cleared {removed} old records')
         return removed
 
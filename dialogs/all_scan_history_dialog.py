@@ -1,16 +1,21 @@
 """
-全部扫描历史记录弹窗 - 支持分页查看所有历史
+全部扫描历史记录弹窗 - 支持筛选与分页查看所有历史
+翻页使用 (scan_time, id) 键集分页，深页与首页同样只读取一页数据
 """
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget,
-                             QTableWidgetItem, QHeaderView, QPushButton, QLabel,
-                             QComboBox, QMessageBox, QApplication, QWidget)
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
+                             QComboBox, QMessageBox, QDateEdit, QLineEdit)
+from PyQt5.QtCore import Qt, QDate
 
+from core.scan_history import ScanFilter
 from core.ui_scale import scaled, scaled_style
+from dialogs.scan_history_view import ScanHistoryModel, create_history_view
 from i18n import tr
 
 
+STATUS_FILTERS = ['', 'completed', 'failed', 'stopped', 'interrupted', 'running', 'imported']
+SEVERITY_FILTERS = ['', 'info', 'low', 'medium', 'high', 'critical']
+
+
 class AllScanHistoryDialog(QDialog):
     """全部扫描历史记录弹窗"""
     
@@ -26,6 +31,10 @@ class AllScanHistoryDialog(QDialog):
         self.page_size = 50
         self.total_records = 0
         self.total_pages = 1
+        self.filters = ScanFilter()
+        # 当前页的查询锚点：(after, before, from_end, limit)，刷新时按原锚点重查
+        self._anchor = (None, None, False, self.page_size)
+        self._records = []
         
         self.init_ui()
         self.load_data()
@@ -33,7 +42,7 @@ class AllScanHistoryDialog(QDialog):
     def init_ui(self):
         """初始化界面"""
         # 应用 FORTRESS 样式
-        from core.fortress_style import get_dialog_stylesheet, get_button_style, get_secondary_button_style, get_table_button_style
+        from core.fortress_style import get_dialog_stylesheet, get_button_style, get_secondary_button_style
         
         # 使用传入的颜色配置，如果未传入则默认空字典（将使用默认样式）
         self.setStyleSheet(get_dialog_stylesheet(self.colors))
@@ -61,28 +70,55 @@ class AllScanHistoryDialog(QDialog):
         
         layout.addLayout(top_row)
         
-        # 历史记录表格
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(7)
-        self.history_table.setHorizontalHeaderLabels([tr("history.col_time"), tr("history.col_targets"), tr("history.col_pocs"), tr("history.col_vulns"), tr("history.col_status"), tr("history.col_detail"), tr("history.col_export")])
-        self.history_table.verticalHeader().setVisible(False)
-        
-        header = self.history_table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.Stretch)  # 时间列拉伸
-        for i in range(1, 5):  # 目标数、POC数、漏洞数、状态列自适应
-            header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
-        # 详情和导出列设置固定宽度，防止被挤压
-        header.setSectionResizeMode(5, QHeaderView.Fixed)
-        header.setSectionResizeMode(6, QHeaderView.Fixed)
-        self.history_table.setColumnWidth(5, scaled(100))  # 详情列 - 与仪表盘保持一致
-        self.history_table.setColumnWidth(6, scaled(100))  # 导出列 - 与仪表盘保持一致
-
-        # 设置行高，确保按钮完全显示（与仪表盘一致）
-        self.history_table.verticalHeader().setDefaultSectionSize(scaled(45))
-        self.history_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        # 筛选条件
+        filter_row = QHBoxLayout()
+        filter_row.addWidget(QLabel(tr("history.filter_status")))
+        self.status_combo = QComboBox()
+        for status in STATUS_FILTERS:
+            self.status_combo.addItem(tr(f"scan_status.{status}") if status else tr("history.filter_all"), status)
+        filter_row.addWidget(self.status_combo)
+        
+        filter_row.addWidget(QLabel(tr("history.filter_date_from")))
+        self.date_from_edit = self._create_date_edit()
+        filter_row.addWidget(self.date_from_edit)
+        filter_row.addWidget(QLabel(tr("history.filter_date_to")))
+        self.date_to_edit = self._create_date_edit()
+        filter_row.addWidget(self.date_to_edit)
+        
+        filter_row.addWidget(QLabel(tr("history.filter_target")))
+        self.target_edit = QLineEdit()
+        self.target_edit.setPlaceholderText(tr("history.filter_target_placeholder"))
+        self.target_edit.returnPressed.connect(self.apply_filters)
+        filter_row.addWidget(self.target_edit, 1)
         
-        self.history_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.history_table.setAlternatingRowColors(True)
+        filter_row.addWidget(QLabel(tr("history.filter_min_severity")))
+        self.severity_combo = QComboBox()
+        for severity in SEVERITY_FILTERS:
+            self.severity_combo.addItem(tr(f"severity.{severity}") if severity else tr("history.filter_all"), severity)
+        filter_row.addWidget(self.severity_combo)
+        
+        btn_apply = QPushButton(tr("history.filter_apply"))
+        btn_apply.setStyleSheet(get_button_style('primary', self.colors))
+        btn_apply.clicked.connect(self.apply_filters)
+        filter_row.addWidget(btn_apply)
+        
+        btn_reset = QPushButton(tr("history.filter_reset"))
+        btn_reset.setStyleSheet(get_secondary_button_style(self.colors))
+        btn_reset.clicked.connect(self.reset_filters)
+        filter_row.addWidget(btn_reset)
+        
+        layout.addLayout(filter_row)
+        
+        # 历史记录表格（模型按需渲染，按钮由委托绘制）
+        self.history_model = ScanHistoryModel(
+            [tr("history.col_time"), tr("history.col_targets"), tr("history.col_pocs"), tr("history.col_vulns"),
+             tr("history.col_status"), tr("history.col_detail"), tr("history.col_export")],
+            parent=self,
+        )
+        self.history_table = create_history_view(
+            self.history_model, self.colors, self.show_scan_detail, self.export_scan_record,
+            export_type='success', detail_text=tr("history.col_detail"), export_text=tr("history.col_export"),
+        )
         layout.addWidget(self.history_table)
         
         # 分页控制
@@ -98,8 +134,6 @@ class AllScanHistoryDialog(QDialog):
         self.btn_prev.clicked.connect(lambda: self.goto_page(self.current_page - 1))
         page_row.addWidget(self.btn_prev)
         
-        self.page_label = QLabel(tr("history.page_info", current=1, total=1))
-        self.page_label.setAlignment(Qt.AlignCenter)
         self.page_label = QLabel(tr("history.page_info", current=1, total=1))
         self.page_label.setAlignment(Qt.AlignCenter)
         text_secondary = self.colors.get('text_secondary', '#6b7280')
@@ -137,18 +171,59 @@ class AllScanHistoryDialog(QDialog):
         
         layout.addLayout(btn_row)
     
+    def _create_date_edit(self):
+        """日期选择框，最小日期显示为“不限”"""
+        edit = QDateEdit()
+        edit.setCalendarPopup(True)
+        edit.setDisplayFormat("yyyy-MM-dd")
+        edit.setMinimumDate(QDate(2000, 1, 1))
+        edit.setSpecialValueText(tr("history.filter_any"))
+        edit.setDate(edit.minimumDate())
+        return edit
+    
+    def _date_value(self, edit) -> str:
+        date = edit.date()
+        return "" if date == edit.minimumDate() else date.toString("yyyy-MM-dd")
+    
+    def apply_filters(self):
+        """应用筛选条件并回到第一页"""
+        self.filters = ScanFilter(
+            status=self.status_combo.currentData() or "",
+            date_from=self._date_value(self.date_from_edit),
+            date_to=self._date_value(self.date_to_edit),
+            target=self.target_edit.text().strip(),
+            min_severity=self.severity_combo.currentData() or "",
+        )
+        self.goto_page(1, force=True)
+    
+    def reset_filters(self):
+        """清空筛选条件"""
+        self.status_combo.setCurrentIndex(0)
+        self.severity_combo.setCurrentIndex(0)
+        self.date_from_edit.setDate(self.date_from_edit.minimumDate())
+        self.date_to_edit.setDate(self.date_to_edit.minimumDate())
+        self.target_edit.clear()
+        self.apply_filters()
+    
     def load_data(self):
-        """加载数据"""
+        """按当前页锚点加载数据（刷新时保持在当前页）"""
         from core.scan_history import get_scan_history
         
         history_mgr = get_scan_history()
         
-        # 获取分页数据
-        result = history_mgr.get_all_scans(self.current_page, self.page_size)
-        records = result.get('records', [])
-        self.total_records = result.get('total', 0)
+        self.total_records = history_mgr.count_scans(self.filters)
         self.total_pages = max(1, (self.total_records + self.page_size - 1) // self.page_size)
         
+        after, before, from_end, limit = self._anchor
+        records = history_mgr.query_scans(self.filters, after=after, before=before,
+                                          from_end=from_end, limit=limit)
+        if not records and self.current_page > 1:
+            # 数据被删除或筛选结果变少导致当前页为空时回到第一页
+            self.current_page = 1
+            self._anchor = (None, None, False, self.page_size)
+            records = history_mgr.query_scans(self.filters, limit=self.page_size)
+        self._records = records
+        
         # 更新信息
         self.info_label.setText(tr("history.total_records", count=self.total_records))
         self.page_label.setText(tr("history.page_info", current=self.current_page, total=self.total_pages))
@@ -160,87 +235,37 @@ class AllScanHistoryDialog(QDialog):
         self.btn_last.setEnabled(self.current_page < self.total_pages)
         
         # 填充表格
-        self.history_table.setUpdatesEnabled(False)
-        self.history_table.setRowCount(0)
-        self.history_table.setRowCount(len(records))
-        
-        for row, record in enumerate(records):
-            # 时间
-            scan_time = record.get('scan_time', '')[:19]
-            self.history_table.setItem(row, 0, QTableWidgetItem(scan_time))
-            
-            # 目标数
-            self.history_table.setItem(row, 1, QTableWidgetItem(str(record.get('target_count', 0))))
-            
-            # POC 数
-            self.history_table.setItem(row, 2, QTableWidgetItem(str(record.get('poc_count', 0))))
-            
-            # 漏洞数
-            vuln_count = record.get('vuln_count', 0)
-            vuln_item = QTableWidgetItem(str(vuln_count))
-            if vuln_count > 0:
-                vuln_item.setForeground(QColor('#e74c3c'))
-                vuln_item.setFont(QFont("Arial", scaled(10), QFont.Bold))
-            self.history_table.setItem(row, 3, vuln_item)
-            
-            # 状态
-            status = record.get('status', 'completed')
-            # 将英文内部键映射为显示文本
-            _scan_status_display = {
-                'completed': tr('scan_status.completed'),
-                'failed': tr('scan_status.failed'),
-                'stopped': tr('scan_status.stopped'),
-            }
-            display_status = _scan_status_display.get(status, status)
-            status_item = QTableWidgetItem(display_status)
-            if status == 'stopped':
-                status_item.setForeground(QColor('#e67e22'))
-            else:
-                status_item.setForeground(QColor('#27ae60'))
-            self.history_table.setItem(row, 4, status_item)
-            
-            # 查看详情按钮 - 使用统一样式和容器居中（与仪表盘一致）
-            from core.fortress_style import get_table_button_style
-            btn_detail = QPushButton(tr("history.col_detail"))
-            btn_detail.setStyleSheet(get_table_button_style('info', self.colors, 60))
-            btn_detail.setCursor(Qt.PointingHandCursor)
-            btn_detail.clicked.connect(lambda checked, sid=record.get('id'): self.show_scan_detail(sid))
-            # 创建容器使按钮居中（调整边距让按钮靠左）
-            detail_widget = QWidget()
-            detail_widget.setObjectName("cell_container")
-            detail_widget.setStyleSheet(scaled_style("#cell_container { background: transparent; }"))
-            detail_layout = QHBoxLayout(detail_widget)
-            detail_layout.setContentsMargins(scaled(0), scaled(2), scaled(10), scaled(2))
-            detail_layout.addWidget(btn_detail)
-            self.history_table.setCellWidget(row, 5, detail_widget)
-            
-            # 导出按钮 - 使用统一样式和容器居中（与仪表盘一致）
-            btn_export = QPushButton(tr("history.col_export"))
-            btn_export.setStyleSheet(get_table_button_style('success', self.colors, 60))
-            btn_export.setCursor(Qt.PointingHandCursor)
-            btn_export.clicked.connect(lambda checked, sid=record.get('id'): self.export_scan_record(sid))
-            # 创建容器使按钮居中（调整边距让按钮靠左）
-            export_widget = QWidget()
-            export_widget.setObjectName("cell_container")
-            export_widget.setStyleSheet(scaled_style("#cell_container { background: transparent; }"))
-            export_layout = QHBoxLayout(export_widget)
-            export_layout.setContentsMargins(scaled(0), scaled(2), scaled(10), scaled(2))
-            export_layout.addWidget(btn_export)
-            self.history_table.setCellWidget(row, 6, export_widget)
-        
-        self.history_table.setUpdatesEnabled(True)
+        self.history_model.set_records(records)
     
-    def goto_page(self, page):
-        """跳转到指定页"""
-        if 1 <= page <= self.total_pages:
-            self.current_page = page
-            self.load_data()
+    @staticmethod
+    def _record_key(record) -> tuple:
+        return (record['scan_time'], record['id'])
+    
+    def goto_page(self, page, force=False):
+        """跳转到指定页：首页/末页直接定位，上一页/下一页以当前页首尾记录为键集锚点"""
+        if not force and not (1 <= page <= self.total_pages and page != self.current_page):
+            return
+        if page <= 1:
+            page, anchor = 1, (None, None, False, self.page_size)
+        elif page >= self.total_pages:
+            page = self.total_pages
+            # 末页只取余下的记录，使各页边界与从首页逐页翻动时一致
+            remainder = self.total_records - (self.total_pages - 1) * self.page_size
+            anchor = (None, None, True, remainder or self.page_size)
+        elif page == self.current_page + 1 and self._records:
+            anchor = (self._record_key(self._records[-1]), None, False, self.page_size)
+        elif page == self.current_page - 1 and self._records:
+            anchor = (None, self._record_key(self._records[0]), False, self.page_size)
+        else:
+            return
+        self.current_page = page
+        self._anchor = anchor
+        self.load_data()
     
     def on_page_size_changed(self, text):
         """每页条数改变"""
         self.page_size = int(text)
-        self.current_page = 1  # 重置到第一页
-        self.load_data()
+        self.goto_page(1, force=True)  # 重置到第一页
     
     def show_scan_detail(self, scan_id):
         """显示扫描详情 - 调用父窗口方法"""
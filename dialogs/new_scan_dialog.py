@@ -11,7 +11,7 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
                              QSplitter, QCheckBox, QMessageBox)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
-from core.target_utils import parse_targets_text
+from core.target_utils import count_targets, parse_targets_text
 from core.ui_scale import scaled, scaled_style
 from core.paths import resource_path
 from i18n import tr
@@ -621,7 +621,7 @@ class NewScanDialog(QDialog):
     def _update_target_count(self):
         """更新目标数量"""
         text = self.txt_targets.toPlainText().strip()
-        count = len(parse_targets_text(text)) if text else 0
+        count = count_targets(parse_targets_text(text)) if text else 0
         self.lbl_target_count.setText(tr("scan.target_count", count=count))
     
     def _import_targets(self):
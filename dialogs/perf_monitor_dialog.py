@@ -0,0 +1,173 @@
+"""
+性能监控弹窗 - 按进程树展示 GUI、nuclei 子进程与工作线程的资源占用，并配置告警阈值
+"""
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QGroupBox,
+    QTreeWidget, QTreeWidgetItem, QHeaderView, QFormLayout, QSpinBox, QCheckBox
+)
+from PyQt5.QtCore import Qt
+
+from core.perf_monitor import get_perf_monitor
+from core.settings_manager import get_settings
+from core.ui_scale import scaled, scaled_style
+from i18n import tr
+
+# (阈值键, 标签 i18n 键, 最大值, 后缀)
+THRESHOLD_FIELDS = [
+    ('process_cpu_warning', 'perf.dialog.cpu_warning', 6400, ' %'),
+    ('process_cpu_critical', 'perf.dialog.cpu_critical', 6400, ' %'),
+    ('process_rss_warning_mb', 'perf.dialog.rss_warning', 65536, ' MB'),
+    ('process_rss_critical_mb', 'perf.dialog.rss_critical', 65536, ' MB'),
+    ('process_sockets_warning', 'perf.dialog.sockets_warning', 65535, ''),
+]
+
+
+class PerfMonitorDialog(QDialog):
+    """进程资源监控弹窗"""
+
+    def __init__(self, parent=None, colors=None):
+        super().__init__(parent)
+        self.colors = colors if colors else {}
+        self.monitor = get_perf_monitor()
+        self.settings = get_settings()
+        self.init_ui()
+
+        # 采样由主窗口在弹窗打开期间启动
+        self.monitor.stats_updated.connect(self.on_stats_updated)
+        current = self.monitor.get_current_stats()
+        if current:
+            self.on_stats_updated(current)
+
+    def init_ui(self):
+        self.setWindowTitle(tr("perf.dialog.title"))
+        self.resize(scaled(820), scaled(560))
+
+        from core.fortress_style import get_dialog_stylesheet, get_button_style, get_secondary_button_style
+        self.setStyleSheet(get_dialog_stylesheet(self.colors))
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(scaled(12))
+        layout.setContentsMargins(scaled(20), scaled(20), scaled(20), scaled(20))
+
+        self.summary_label = QLabel(tr("perf.dialog.waiting"))
+        text_primary = self.colors.get('text_primary', '#1f2937')
+        self.summary_label.setStyleSheet(scaled_style(f"font-weight: bold; font-size: 13px; color: {text_primary};"))
+        layout.addWidget(self.summary_label)
+
+        # 进程树
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(7)
+        self.tree.setHeaderLabels([
+            tr("perf.dialog.col_name"), tr("perf.dialog.col_pid"), tr("perf.dialog.col_cpu"),
+            tr("perf.dialog.col_rss"), tr("perf.dialog.col_sockets"),
+            tr("perf.dialog.col_io_read"), tr("perf.dialog.col_io_write"),
+        ])
+        header = self.tree.header()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for column in range(1, 7):
+            header.setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        layout.addWidget(self.tree, 1)
+
+        # 告警阈值
+        thresholds = self.monitor.get_thresholds()
+        threshold_group = QGroupBox(tr("perf.dialog.thresholds_group"))
+        form = QFormLayout()
+        self.threshold_inputs = {}
+        for key, label_key, maximum, suffix in THRESHOLD_FIELDS:
+            spin = QSpinBox()
+            spin.setRange(1, maximum)
+            spin.setSuffix(suffix)
+            spin.setValue(int(thresholds.get(key, 1)))
+            form.addRow(tr(label_key), spin)
+            self.threshold_inputs[key] = spin
+
+        self.auto_throttle_checkbox = QCheckBox(tr("perf.dialog.auto_throttle"))
+        self.auto_throttle_checkbox.setToolTip(tr("perf.dialog.auto_throttle_tooltip"))
+        self.auto_throttle_checkbox.setChecked(bool(thresholds.get('auto_throttle')))
+        form.addRow("", self.auto_throttle_checkbox)
+        threshold_group.setLayout(form)
+        layout.addWidget(threshold_group)
+
+        btn_layout = QHBoxLayout()
+        btn_save = QPushButton(tr("perf.dialog.save_thresholds"))
+        btn_save.setStyleSheet(get_button_style('primary', self.colors))
+        btn_save.clicked.connect(self.save_thresholds)
+        btn_layout.addWidget(btn_save)
+        btn_layout.addStretch()
+
+        btn_close = QPushButton(tr("common.close"))
+        btn_close.setStyleSheet(get_secondary_button_style(self.colors))
+        btn_close.clicked.connect(self.accept)
+        btn_layout.addWidget(btn_close)
+        layout.addLayout(btn_layout)
+
+    def save_thresholds(self):
+        thresholds = {key: spin.value() for key, spin in self.threshold_inputs.items()}
+        thresholds['auto_throttle'] = self.auto_throttle_checkbox.isChecked()
+        self.monitor.set_thresholds(thresholds)
+        self.settings.save_perf_thresholds(thresholds)
+        self.summary_label.setText(tr("perf.dialog.thresholds_saved"))
+
+    def on_stats_updated(self, stats):
+        processes = stats.get('processes') or []
+        if not processes:
+            self.summary_label.setText(tr("perf.dialog.psutil_missing"))
+            return
+
+        self.summary_label.setText(tr(
+            "perf.dialog.summary",
+            cpu=stats.get('own_cpu_percent', 0),
+            rss=stats.get('own_rss_mb', 0),
+            sockets=stats.get('own_sockets', 0),
+            system_cpu=stats.get('cpu_percent', 0),
+        ))
+
+        expanded = {
+            self.tree.topLevelItem(i).data(1, Qt.UserRole)
+            for i in range(self.tree.topLevelItemCount())
+            if self.tree.topLevelItem(i).isExpanded()
+        }
+        self.tree.clear()
+
+        items = {}
+        for proc in processes:
+            item = QTreeWidgetItem([
+                f"{proc['name']} ({tr('perf.role.' + proc['role'])})",
+                str(proc['pid']),
+                f"{proc['cpu_percent']:.1f}",
+                f"{proc['rss_mb']:.1f}",
+                str(proc['sockets']),
+                f"{proc['io_read_mb']:.2f}",
+                f"{proc['io_write_mb']:.2f}",
+            ])
+            item.setData(1, Qt.UserRole, proc['pid'])
+            items[proc['pid']] = (item, proc)
+
+        for pid, (item, proc) in items.items():
+            parent = items.get(proc.get('parent_pid'))
+            if parent is not None and parent[0] is not item:
+                parent[0].addChild(item)
+            else:
+                self.tree.addTopLevelItem(item)
+
+        # GUI 进程下挂各线程
+        gui = next((item for item, proc in items.values() if proc['role'] == 'gui'), None)
+        if gui is not None:
+            threads_item = QTreeWidgetItem([tr("perf.dialog.threads", count=len(stats.get('threads') or []))])
+            for thread in stats.get('threads') or []:
+                threads_item.addChild(QTreeWidgetItem([
+                    thread['name'], str(thread['thread_id']), f"{thread['cpu_percent']:.1f}",
+                ]))
+            gui.insertChild(0, threads_item)
+
+        for i in range(self.tree.topLevelItemCount()):
+            top = self.tree.topLevelItem(i)
+            if not expanded or top.data(1, Qt.UserRole) in expanded:
+                top.setExpanded(True)
+
+    def done(self, result):
+        try:
+            self.monitor.stats_updated.disconnect(self.on_stats_updated)
+        except TypeError:
+            pass
+        super().done(result)
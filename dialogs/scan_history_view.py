@@ -0,0 +1,167 @@
+"""
+扫描历史表格 - 基于 QAbstractTableModel 的按需渲染
+仪表盘与全部历史弹窗共用；详情/导出按钮由委托绘制，不再为每行创建 QPushButton
+"""
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QTableView, QHeaderView
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QEvent, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPainter
+
+from core.ui_scale import scaled
+from i18n import tr
+
+DETAIL_COLUMN = 5
+EXPORT_COLUMN = 6
+
+
+def _default_status_text(status) -> str:
+    status_map = {
+        'completed': tr('scan_status.completed'),
+        'failed': tr('scan_status.failed'),
+        'stopped': tr('scan_status.stopped'),
+        'cancelled': tr('scan_status.stopped'),
+        'running': tr('scan_status.running'),
+        'interrupted': tr('scan_status.interrupted'),
+        'imported': tr('scan_status.imported'),
+    }
+    return status_map.get(str(status), str(status))
+
+
+class ScanHistoryModel(QAbstractTableModel):
+    """扫描记录表格模型，只在视图请求时生成单元格数据"""
+
+    def __init__(self, headers, status_formatter=None, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.status_formatter = status_formatter or _default_status_text
+        self.records = []
+        self._bold_font = QFont("Arial", scaled(10), QFont.Bold)
+
+    def set_records(self, records):
+        self.beginResetModel()
+        self.records = list(records or [])
+        self.endResetModel()
+
+    def append_records(self, records):
+        records = list(records or [])
+        if not records:
+            return
+        start = len(self.records)
+        self.beginInsertRows(QModelIndex(), start, start + len(records) - 1)
+        self.records.extend(records)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.headers):
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.records):
+            return None
+        record = self.records[index.row()]
+        column = index.column()
+
+        if role == Qt.UserRole:
+            return record.get('id')
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return str(record.get('scan_time') or '')[:19]
+            if column == 1:
+                return str(record.get('target_count') or 0)
+            if column == 2:
+                return str(record.get('poc_count') or 0)
+            if column == 3:
+                return str(record.get('vuln_count') or 0)
+            if column == 4:
+                return self.status_formatter(record.get('status', 'completed'))
+            return None
+        if role == Qt.ForegroundRole:
+            if column == 3 and (record.get('vuln_count') or 0) > 0:
+                return QColor('#e74c3c')
+            if column == 4:
+                return QColor('#e67e22') if record.get('status') == 'stopped' else QColor('#27ae60')
+        if role == Qt.FontRole and column == 3 and (record.get('vuln_count') or 0) > 0:
+            return self._bold_font
+        return None
+
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """在单元格内绘制按钮外观，点击时发出所在行的扫描 ID"""
+
+    clicked = pyqtSignal(object)
+
+    def __init__(self, text, color, hover_color, parent=None):
+        super().__init__(parent)
+        self.text = text
+        self.color = QColor(color)
+        self.hover_color = QColor(hover_color)
+
+    def _button_rect(self, option):
+        return option.rect.adjusted(scaled(8), scaled(7), -scaled(8), -scaled(7))
+
+    def paint(self, painter, option, index):
+        rect = self._button_rect(option)
+        hovered = bool(option.state & QStyle.State_MouseOver)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.hover_color if hovered else self.color)
+        painter.drawRoundedRect(rect, scaled(4), scaled(4))
+        font = QFont(option.font)
+        font.setPixelSize(scaled(12))
+        painter.setFont(font)
+        painter.setPen(QColor('white'))
+        painter.drawText(rect, Qt.AlignCenter, self.text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                and self._button_rect(option).contains(event.pos())):
+            scan_id = index.data(Qt.UserRole)
+            if scan_id is not None:
+                self.clicked.emit(scan_id)
+            return True
+        return False
+
+
+def create_history_view(model, colors, on_detail, on_export, detail_type='info', export_type='warning',
+                        detail_text=None, export_text=None):
+    """创建绑定模型的历史表格视图，详情/导出列使用按钮委托"""
+    colors = colors or {}
+    view = QTableView()
+    view.setModel(model)
+    view.setSelectionBehavior(QTableView.SelectRows)
+    view.setAlternatingRowColors(True)
+    view.setMouseTracking(True)
+    view.verticalHeader().setVisible(False)
+    view.verticalHeader().setDefaultSectionSize(scaled(45))
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+
+    header = view.horizontalHeader()
+    header.setSectionResizeMode(0, QHeaderView.Stretch)
+    for column in range(1, DETAIL_COLUMN):
+        header.setSectionResizeMode(column, QHeaderView.ResizeToContents)
+    # 详情和导出列：固定宽度以适配按钮
+    for column in (DETAIL_COLUMN, EXPORT_COLUMN):
+        header.setSectionResizeMode(column, QHeaderView.Fixed)
+        view.setColumnWidth(column, scaled(100))
+
+    for column, text, btn_type, callback in (
+        (DETAIL_COLUMN, detail_text or tr("common.detail"), detail_type, on_detail),
+        (EXPORT_COLUMN, export_text or tr("common.export"), export_type, on_export),
+    ):
+        delegate = ActionButtonDelegate(
+            text,
+            colors.get(f'btn_{btn_type}', '#3b82f6'),
+            colors.get(f'btn_{btn_type}_hover', '#2563eb'),
+            parent=view,
+        )
+        delegate.clicked.connect(callback)
+        view.setItemDelegateForColumn(column, delegate)
+    return view
@@ -357,6 +357,9 @@ class SettingsDialog(QDialog):
         auto_update = self.settings.get_auto_check_update()
         self.auto_update_checkbox.setChecked(auto_update)
 
+        # 加载诊断设置
+        self.profiling_checkbox.setChecked(self.settings.get_scan_profiling())
+
     def save_and_close(self):
         """保存设置并关闭"""
         # 保存语言设置
@@ -369,6 +372,9 @@ class SettingsDialog(QDialog):
         # 保存更新设置
         self.settings.set_auto_check_update(self.auto_update_checkbox.isChecked())
 
+        # 保存诊断设置
+        self.settings.set_scan_profiling(self.profiling_checkbox.isChecked())
+
         if new_lang != old_lang:
             init_language(new_lang)
             QMessageBox.information(self, tr("msg.success"), tr("settings.saved_restart_hint"))
@@ -396,6 +402,17 @@ class SettingsDialog(QDialog):
 
         lang_group.setLayout(lang_layout)
         layout.addWidget(lang_group)
+
+        # 诊断设置
+        diag_group = QGroupBox(tr("settings.general.diagnostics_group"))
+        diag_layout = QVBoxLayout()
+
+        self.profiling_checkbox = QCheckBox(tr("settings.general.scan_profiling"))
+        self.profiling_checkbox.setToolTip(tr("settings.general.scan_profiling_tooltip"))
+        diag_layout.addWidget(self.profiling_checkbox)
+
+        diag_group.setLayout(diag_layout)
+        layout.addWidget(diag_group)
         layout.addStretch()
 
     def setup_update_tab(self):
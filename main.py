@@ -163,6 +163,9 @@ def display_scan_status(status: str) -> str:
         "failed": tr("scan_status.failed"),
         "stopped": tr("scan_status.stopped"),
         "cancelled": tr("scan_status.stopped"),
+        "running": tr("scan_status.running"),
+        "interrupted": tr("scan_status.interrupted"),
+        "imported": tr("scan_status.imported"),
     }
     return status_map.get(str(status), str(status))
 
@@ -189,12 +192,15 @@ def message_text(text: str) -> str:
 
 
 # 导入核心逻辑
+from core.logger import get_logger
 from core.poc_library import POCLibrary
 from core.nuclei_runner import NucleiScanThread
 from core.settings_manager import get_settings
-from core.target_utils import dedupe_targets, parse_targets_text
+from core.target_utils import count_targets, dedupe_targets, parse_targets_text
 from core.version import __version__, __author__
 
+logger = get_logger("main")
+
 # 导入弹窗组件
 from dialogs.settings_dialog import SettingsDialog
 from dialogs.fofa_dialog import FofaDialog
@@ -217,6 +223,77 @@ class PlainPasteTextEdit(QPlainTextEdit):
         else:
             super().insertFromMimeData(source)
 
+class ThroughputChart(QWidget):
+    """
+    实时吞吐折线图：RPS（实线）与错误率（虚线），数据来自 nuclei -stats 采样
+    """
+    MAX_POINTS = 120
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rps_points = deque(maxlen=self.MAX_POINTS)
+        self.error_points = deque(maxlen=self.MAX_POINTS)
+        self.setFixedHeight(scaled(60))
+        self.setMinimumWidth(scaled(160))
+
+    def clear(self):
+        self.rps_points.clear()
+        self.error_points.clear()
+        self.update()
+
+    def add_sample(self, rps, error_rate):
+        self.rps_points.append(max(0.0, float(rps or 0)))
+        self.error_points.append(max(0.0, min(1.0, float(error_rate or 0))))
+        self.update()
+
+    def _draw_line(self, painter, points, peak, color, style=Qt.SolidLine):
+        if len(points) < 2 or peak <= 0:
+            return
+        rect = self.rect().adjusted(4, 4, -4, -4)
+        step = rect.width() / (self.MAX_POINTS - 1)
+        offset = self.MAX_POINTS - len(points)
+        pen = QPen(QColor(color))
+        pen.setWidth(2)
+        pen.setStyle(style)
+        painter.setPen(pen)
+        previous = None
+        for index, value in enumerate(points):
+            x = rect.left() + (offset + index) * step
+            y = rect.bottom() - rect.height() * value / peak
+            if previous is not None:
+                painter.drawLine(int(previous[0]), int(previous[1]), int(x), int(y))
+            previous = (x, y)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setBrush(QBrush(QColor(FORTRESS_COLORS.get('table_header', '#f1f5f9'))))
+        painter.setPen(Qt.NoPen)
+        painter.drawRoundedRect(self.rect(), 8, 8)
+        self._draw_line(painter, self.rps_points, max(self.rps_points, default=0), "#10b981")
+        self._draw_line(painter, self.error_points, 1.0, "#ef4444", Qt.DashLine)
+        painter.end()
+
+
+class ExportThread(QThread):
+    """Run one export function in the background and report whether it succeeded."""
+
+    finished_signal = pyqtSignal(bool, str)  # 是否成功, 导出文件路径
+
+    def __init__(self, export_fn, file_path):
+        super().__init__()
+        self.export_fn = export_fn
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            ok = bool(self.export_fn())
+        except Exception as exc:
+            print(f"[!] {tr('export.failed', error=str(exc))}")
+            ok = False
+        self.finished_signal.emit(ok, self.file_path)
+
+
 class POCLoadThread(QThread):
     """Load POC metadata in the background to keep the UI responsive."""
 
@@ -235,6 +312,8 @@ class POCLoadThread(QThread):
 
 
 class MainWindow(QMainWindow):
+    result_stream_finished = pyqtSignal(int)  # 流式写入器在后台落库并更新记录后发出（记录 ID）
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Nuclei GUI Scanner - By 辰辰")
@@ -261,6 +340,17 @@ class MainWindow(QMainWindow):
         self.all_poc_data = []
         self.all_scan_pocs = []
         self._poc_load_thread = None
+        self._template_validation_thread = None
+        self._scan_profiler = None
+        self._perf_monitor_bound = False
+        # 进程资源监控的使用方：监控弹窗打开 / 扫描进行中（开启自动降速时需要采样）
+        self._perf_dialog_open = False
+        self._perf_scan_active = False
+        self._perf_alert_times = {}
+        self._rate_governor = None
+        self._result_stream = None  # 扫描期间流式写入漏洞结果
+        self._result_writers = []  # 已结束、仍在后台落库的结果写入线程
+        self._export_thread = None  # 后台导出扫描记录
         self._scan_poc_table_dirty = True
         self._scan_runtime_vuln_count = 0
         self._scan_runtime_severity_counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0, 'info': 0}
@@ -283,9 +373,33 @@ class MainWindow(QMainWindow):
         from core.task_queue_manager import get_task_queue_manager
         self.task_queue = get_task_queue_manager()
         self.task_queue.task_status_changed.connect(self._on_task_status_changed)
+        self.result_stream_finished.connect(self._on_result_stream_finished)
+
+        # 旧版扫描历史在后台迁移，完成前在状态栏显示进度
+        self._watch_history_migration()
 
         # 启动时检查更新（如果启用）
         self._check_update_on_startup()
+
+    def _watch_history_migration(self):
+        from core.scan_history import get_scan_history
+        history = get_scan_history()
+        if history.is_ready():
+            return
+        timer = QTimer(self)
+
+        def _poll():
+            if history.is_ready():
+                timer.stop()
+                self.status_bar.showMessage(tr("history.migration_done"), 5000)
+                self.refresh_dashboard()
+                return
+            done, total = history.migration_progress()
+            self.status_bar.showMessage(tr("history.migrating", done=done, total=total))
+
+        timer.timeout.connect(_poll)
+        timer.start(1000)
+        _poll()
     
     def _set_window_icon(self):
         """设置窗口图标（会显示在标题栏和任务栏）"""
@@ -426,6 +540,29 @@ class MainWindow(QMainWindow):
         else:
             # 最大化时保存原始大小
             self.settings.save_window_geometry(-1, -1, -1, -1, True)
+        if self._template_validation_thread and self._template_validation_thread.isRunning():
+            # stop() 会结束正在运行的 nuclei -validate 子进程，线程随后很快退出
+            self._template_validation_thread.stop()
+            self._template_validation_thread.wait(5000)
+        pipeline_thread = getattr(self, 'fofa_pipeline_thread', None)
+        if pipeline_thread is not None and pipeline_thread.isRunning():
+            pipeline_thread.stop()
+            pipeline_thread.wait(5000)
+        if self._export_thread is not None and self._export_thread.isRunning():
+            # 导出线程正在写文件，退出前有限等待
+            self._export_thread.wait(10000)
+        self._stop_scan_profiler()
+        import time
+        if self._result_stream is not None:
+            self._finish_result_stream("interrupted", time.time() - getattr(self, 'scan_start_time', time.time()),
+                                       len(self.scan_results_data))
+        # 写入线程为守护线程，退出前有限等待剩余结果落库
+        deadline = time.monotonic() + 10
+        for writer in self._result_writers:
+            writer.join(max(0, deadline - time.monotonic()))
+        if self._perf_monitor_bound:
+            from core.perf_monitor import get_perf_monitor
+            get_perf_monitor().stop()
         event.accept()
 
 
@@ -536,6 +673,23 @@ class MainWindow(QMainWindow):
             }}
         """)
         self.status_bar.showMessage(tr("status.ready_simple"))
+
+        # 进程资源监控入口
+        self.btn_perf_monitor = QPushButton(tr("perf.dialog.open"))
+        self.btn_perf_monitor.setFlat(True)
+        self.btn_perf_monitor.setCursor(Qt.PointingHandCursor)
+        self.btn_perf_monitor.setStyleSheet(scaled_style(f"""
+            QPushButton {{
+                color: {FORTRESS_COLORS['text_secondary']};
+                border: none;
+                padding: 2px 8px;
+            }}
+            QPushButton:hover {{
+                color: {FORTRESS_COLORS['btn_primary']};
+            }}
+        """))
+        self.btn_perf_monitor.clicked.connect(self._open_perf_monitor)
+        self.status_bar.addPermanentWidget(self.btn_perf_monitor)
     
     def _create_nav_panel(self):
         """创建左侧导航栏（支持 DPI 缩放）"""
@@ -788,6 +942,19 @@ class MainWindow(QMainWindow):
         self.fofa_btn_search.clicked.connect(self._fofa_do_search)
         search_row.addWidget(self.fofa_btn_search)
 
+        # 边搜边扫：存活资产按块直接送入任务队列
+        self.fofa_btn_pipeline = self._create_fortress_button(tr("fofa.search_and_scan"), "warning")
+        self.fofa_btn_pipeline.setToolTip(tr("fofa.search_and_scan_tip"))
+        self.fofa_btn_pipeline.clicked.connect(self._fofa_pipeline_scan)
+        search_row.addWidget(self.fofa_btn_pipeline)
+
+        # 停止采集；已送入任务队列的扫描任务继续执行
+        self.fofa_btn_pipeline_stop = self._create_fortress_button(tr("fofa.stop_pipeline"), "secondary")
+        self.fofa_btn_pipeline_stop.setToolTip(tr("fofa.stop_pipeline_tip"))
+        self.fofa_btn_pipeline_stop.clicked.connect(self._fofa_stop_pipeline)
+        self.fofa_btn_pipeline_stop.hide()
+        search_row.addWidget(self.fofa_btn_pipeline_stop)
+
         right_layout.addLayout(search_row)
 
         # 状态和进度
@@ -1078,6 +1245,11 @@ class MainWindow(QMainWindow):
         self.settings_use_native = QCheckBox(tr("settings.use_native_scanner"))
         form_layout.addWidget(self.settings_use_native, row, 0, 1, 2)
 
+        row += 1
+        self.settings_trace_log = QCheckBox(tr("settings.trace_log"))
+        self.settings_trace_log.setToolTip(tr("settings.trace_log_tip"))
+        form_layout.addWidget(self.settings_trace_log, row, 0, 1, 2)
+
         scan_layout.addWidget(form_container)
         scan_layout.addStretch()
         
@@ -1896,6 +2068,7 @@ class MainWindow(QMainWindow):
         self.progress_bar.setValue(0)
         self.progress_bar.show()
         self.current_task_id = task_id
+        self._reset_scan_throughput()
 
         # 禁用开始按钮，启用停止/暂停按钮
         self.btn_start.setEnabled(False)
@@ -1911,6 +2084,7 @@ class MainWindow(QMainWindow):
             self.current_scan_targets = task.targets
             self.current_scan_templates = task.templates
             self.current_scan_config = {}
+            self._begin_result_stream(task.targets, task.templates, {})
 
             # 恢复已有进度
             if task.progress > 0:
@@ -1931,6 +2105,9 @@ class MainWindow(QMainWindow):
             # result_found -> add_scan_result
             worker.result_found.connect(self._on_worker_result_found)
 
+            # task_stats -> 实时吞吐
+            worker.task_stats.connect(self._on_worker_stats)
+
             # task_progress -> update_progress
             worker.task_progress.connect(self._on_worker_progress)
             
@@ -1948,6 +2125,11 @@ class MainWindow(QMainWindow):
         self.btn_stop.setEnabled(True)
         self.btn_pause.setEnabled(True)
 
+        self._reset_rate_governor()
+        self._start_scan_profiler(
+            lambda: getattr(getattr(getattr(worker, '_scan_thread', None), 'process', None), 'pid', None)
+        )
+
         # 更新状态指示
         self.status_indicator.setText(tr("status.scanning"))
         # 简单设置样式
@@ -2111,6 +2293,8 @@ class MainWindow(QMainWindow):
         self.btn_pause.setEnabled(False)
         self.btn_pause.setText(tr("task.pause"))  # 重置按钮文本
         self.progress_bar.hide()
+        self._stop_scan_profiler()
+        self._set_perf_scan_active(False)
 
         result_count = len(self.scan_results_data)
         self.lbl_progress.setText(tr("scan.completed_found", count=result_count))
@@ -2135,6 +2319,7 @@ class MainWindow(QMainWindow):
         queue = get_task_queue_manager()
         targets = getattr(self, 'current_scan_targets', [])
         pocs = getattr(self, 'current_scan_templates', [])
+        task = None
 
         if hasattr(self, 'current_task_id') and self.current_task_id:
             task = queue.get_task(self.current_task_id)
@@ -2154,21 +2339,27 @@ class MainWindow(QMainWindow):
         from core.scan_history import get_scan_history
         history = get_scan_history()
 
-        # 添加扫描记录
-        scan_id = history.add_scan_record(
-            target_count=len(targets),
-            poc_count=len(pocs),
-            vuln_count=result_count,
-            duration=duration,
-            targets=targets,
-            pocs=pocs,
-            config=getattr(self, 'current_scan_config', {}),
-            status=status
-        )
+        stats_series = self._stats_series_payload(self._current_scan_attr('stats_series', task))
+
+        target_count = count_targets(targets)
+        # 结果已在扫描过程中流式写入，这里只需更新记录；流不可用时一次性批量写入
+        scan_id = self._finish_result_stream(status, duration, result_count, target_count, len(pocs), stats_series)
+        if scan_id is None:
+            scan_id = history.add_scan_record(
+                target_count=target_count,
+                poc_count=len(pocs),
+                vuln_count=result_count,
+                duration=duration,
+                targets=targets,
+                pocs=pocs,
+                config=getattr(self, 'current_scan_config', {}),
+                status=status,
+                stats_series=stats_series
+            )
+            self._write_results_async(history, scan_id, self.scan_results_data)
 
-        # 添加漏洞结果
-        for result in self.scan_results_data:
-            history.add_vuln_result(scan_id, result)
+        self._record_poc_usage(pocs, self.scan_results_data, target_count, scan_id,
+                               self._current_scan_attr('telemetry', task))
 
         # 刷新仪表盘
         self.refresh_dashboard()
@@ -2261,7 +2452,7 @@ class MainWindow(QMainWindow):
 
         # 重新实现 _add_task_to_queue 的部分逻辑以获取 ID 并启动
         from core.task_queue_manager import TaskPriority
-        task_name = tr("task.scan_task_name", targets=len(targets), pocs=len(pocs))
+        task_name = tr("task.scan_task_name", targets=count_targets(targets), pocs=len(pocs))
         task_id = queue.add_task(
             name=task_name,
             targets=targets,
@@ -2665,6 +2856,176 @@ class MainWindow(QMainWindow):
         if hasattr(self, 'scan_stat_low'):
             self.scan_stat_low.value_label.setText(str(severity_counts['low']))
 
+    def _reset_scan_throughput(self):
+        """清空实时吞吐卡片与折线图"""
+        for card_name in ('scan_stat_rps', 'scan_stat_error_rate', 'scan_stat_eta'):
+            card = getattr(self, card_name, None)
+            if card is not None:
+                card.value_label.setText("-")
+        if hasattr(self, 'scan_throughput_chart'):
+            self.scan_throughput_chart.clear()
+
+    def _on_scan_stats(self, sample):
+        """处理 nuclei -stats 采样：更新 RPS / 错误率 / 预计剩余时间"""
+        rps = sample.get('interval_rps') or sample.get('rps') or 0
+        error_rate = sample.get('interval_error_rate', sample.get('error_rate', 0)) or 0
+        if hasattr(self, 'scan_stat_rps'):
+            self.scan_stat_rps.value_label.setText(f"{rps:.0f}" if rps >= 10 else f"{rps:.1f}")
+        if hasattr(self, 'scan_stat_error_rate'):
+            self.scan_stat_error_rate.value_label.setText(f"{sample.get('error_rate', 0) * 100:.1f}%")
+        if hasattr(self, 'scan_stat_eta'):
+            eta = sample.get('eta_seconds')
+            if eta is None:
+                eta_text = "-"
+            elif eta >= 3600:
+                eta_text = f"{int(eta // 3600)}:{int(eta % 3600 // 60):02d}:{int(eta % 60):02d}"
+            else:
+                eta_text = f"{int(eta // 60)}:{int(eta % 60):02d}"
+            self.scan_stat_eta.value_label.setText(eta_text)
+        if hasattr(self, 'scan_throughput_chart'):
+            self.scan_throughput_chart.add_sample(rps, error_rate)
+
+    def _on_governor_stats(self, task_id, sample):
+        """所有运行中扫描（直接扫描与队列任务）的 stats 采样都交给速率调节器，按任务分别跟踪错误率"""
+        if self._rate_governor is not None and self._auto_throttle_enabled():
+            self._rate_governor.on_scan_stats(sample, source=task_id)
+
+    def _on_governed_task_status(self, task_id, status):
+        if status in ('completed', 'cancelled', 'failed') and self._rate_governor is not None:
+            self._rate_governor.forget_source(task_id)
+
+    def _on_worker_stats(self, task_id, sample):
+        """处理 Worker 统计采样信号"""
+        if task_id == getattr(self, 'current_task_id', None):
+            self._on_scan_stats(sample)
+
+    def _ensure_perf_monitor(self):
+        """绑定进程资源监控的告警与速率调节器（是否采样由 _update_perf_monitor 决定）"""
+        from core.perf_monitor import get_perf_monitor
+        monitor = get_perf_monitor()
+        if not self._perf_monitor_bound:
+            from core.rate_governor import RateGovernor
+            monitor.set_thresholds(self.settings.get_perf_thresholds())
+            monitor.alert_triggered.connect(self._on_perf_alert)
+            # 速率调节器：过载告警（需开启自动降速）与目标错误率驱动扫描降速/恢复
+            self._rate_governor = RateGovernor()
+            monitor.throttle_requested.connect(self._rate_governor.on_pressure)
+            monitor.stats_updated.connect(self._rate_governor.on_sample)
+            self._rate_governor.factor_changed.connect(self._on_rate_factor_changed)
+            from core.task_queue_manager import get_task_queue_manager
+            queue = get_task_queue_manager()
+            queue.task_stats.connect(self._on_governor_stats)
+            queue.task_status_changed.connect(self._on_governed_task_status)
+            self._perf_monitor_bound = True
+        return monitor
+
+    def _update_perf_monitor(self):
+        """只在监控弹窗打开，或扫描进行中且开启了自动降速时采样"""
+        monitor = self._ensure_perf_monitor()
+        needed = self._perf_dialog_open or (self._perf_scan_active and self._auto_throttle_enabled())
+        if needed and not monitor.is_running:
+            monitor.start()
+        elif not needed and monitor.is_running:
+            monitor.stop()
+
+    def _set_perf_scan_active(self, active):
+        self._perf_scan_active = active
+        self._update_perf_monitor()
+
+    def _on_perf_alert(self, level, message):
+        """性能告警：同类告警 30 秒内只提示一次"""
+        import re
+        import time
+        alert_key = re.sub(r'[\d.]+', '', message)
+        now = time.time()
+        if now - self._perf_alert_times.get(alert_key, 0) < 30:
+            return
+        self._perf_alert_times[alert_key] = now
+        self.status_bar.showMessage(message, 5000)
+        if not self.btn_start.isEnabled():
+            self.append_log(f"[Perf/{level}] {message}")
+
+    def _reset_rate_governor(self):
+        """没有其他扫描在运行时，新扫描开始前速率系数复位为 1；否则新扫描沿用当前系数"""
+        self._ensure_perf_monitor()
+        from core.task_queue_manager import get_task_queue_manager
+        queue = get_task_queue_manager()
+        current_task_id = getattr(self, 'current_task_id', None)
+        if not [task_id for task_id in queue.get_running_task_ids() if task_id != current_task_id]:
+            self._rate_governor.reset()
+            queue.set_rate_factor(self._rate_governor.factor)
+        self._set_perf_scan_active(True)
+
+    def _auto_throttle_enabled(self):
+        from core.perf_monitor import get_perf_monitor
+        return bool(get_perf_monitor().get_thresholds().get('auto_throttle'))
+
+    def _on_rate_factor_changed(self, factor, reason):
+        """将速率系数应用到所有运行中的扫描（直接扫描线程及任务队列中的全部 Worker）"""
+        if not self._auto_throttle_enabled():
+            return
+        from core.task_queue_manager import get_task_queue_manager
+        governed = get_task_queue_manager().set_rate_factor(factor)
+        if getattr(self, 'scan_thread', None) is not None and self.scan_thread.isRunning():
+            self.scan_thread.set_rate_factor(factor)
+            governed += 1
+        if not governed:
+            return
+        self.append_log(tr("governor.adjusted", percent=int(factor * 100), reason=tr(f"governor.reason.{reason}")))
+
+    def _open_perf_monitor(self):
+        """打开进程资源监控弹窗"""
+        from dialogs.perf_monitor_dialog import PerfMonitorDialog
+        self._perf_dialog_open = True
+        self._update_perf_monitor()
+        try:
+            dialog = PerfMonitorDialog(self, colors=FORTRESS_COLORS)
+            dialog.exec_()
+        finally:
+            # 弹窗中可能修改了自动降速开关，按当前需要决定是否继续采样
+            self._perf_dialog_open = False
+            self._update_perf_monitor()
+
+    def _start_scan_profiler(self, pid_provider=None):
+        """设置中启用诊断时，为本次扫描启动性能剖析"""
+        self._stop_scan_profiler()
+        if not self.settings.get_scan_profiling():
+            return
+        from core.scan_profiler import ScanProfiler
+        name = f"scan_{getattr(self, 'current_task_id', None) or 'direct'}"
+        self._scan_profiler = ScanProfiler(name=name, pid_provider=pid_provider)
+        self._scan_profiler.start()
+        self.append_log(tr("profiler.started"))
+
+    def _stop_scan_profiler(self):
+        """停止性能剖析并导出 speedscope / 火焰图文件"""
+        profiler = self._scan_profiler
+        if profiler is None:
+            return
+        self._scan_profiler = None
+        profiler.stop()
+        try:
+            paths = profiler.export()
+        except Exception as e:
+            self.append_log(tr("profiler.export_failed", error=str(e)))
+            return
+        summary = profiler.summary()
+        event_loop = summary.get('event_loop', {})
+        self.append_log(tr("profiler.exported", path=paths['speedscope']))
+        self.append_log(tr(
+            "profiler.summary",
+            lag_max=event_loop.get('lag_max_ms', 0),
+            stalls=event_loop.get('stalls_over_250ms', 0),
+            threads=", ".join(f"{name}={count}" for name, count in profiler.busy_threads(3)),
+        ))
+
+    def _current_scan_attr(self, name, task=None):
+        """读取当前扫描的遥测/统计对象，队列任务优先于直接扫描线程"""
+        value = getattr(task, name, None) if task is not None else None
+        if value is None:
+            value = getattr(getattr(self, 'scan_thread', None), name, None)
+        return value
+
     def _update_dashboard_vuln_count_realtime(self):
         """Update dashboard counters from cached historical data and runtime totals."""
         total_display = self._historical_vuln_count + self._scan_runtime_vuln_count
@@ -2736,7 +3097,7 @@ class MainWindow(QMainWindow):
 
         queue = get_task_queue_manager()
         queue.set_scan_config(self.settings.get_scan_config())
-        task_name = tr("task.scan_task_name", targets=len(targets), pocs=len(pocs))
+        task_name = tr("task.scan_task_name", targets=count_targets(targets), pocs=len(pocs))
 
         task_id = queue.add_task(
             name=task_name,
@@ -2749,7 +3110,7 @@ class MainWindow(QMainWindow):
         QMessageBox.information(
             self,
             tr("task.added_to_queue"),
-            tr("task.added_to_queue_detail", task_id=task_id, targets=len(targets), pocs=len(pocs))
+            tr("task.added_to_queue_detail", task_id=task_id, targets=count_targets(targets), pocs=len(pocs))
         )
     
     def _set_selected_pocs(self, poc_paths):
@@ -2822,25 +3183,33 @@ class MainWindow(QMainWindow):
             self.fofa_history_manager.clear_fofa_history()
             self._fofa_refresh_history()
     
-    def _fofa_do_search(self):
-        """执行 FOFA 搜索"""
-        from core.fofa_client import FofaSearchThread
-        
+    def _fofa_search_params(self):
+        """读取 FOFA 搜索语句、配置与数量，缺失时提示并返回 None"""
         query = self.fofa_query_input.text().strip()
         if not query:
             QMessageBox.warning(self, tr("msg.hint"), tr("fofa.enter_query"))
-            return
+            return None
         
         fofa_config = self.settings.get_fofa_config()
         if not fofa_config.get("api_key"):
             QMessageBox.warning(self, tr("msg.hint"), tr("fofa.configure_api_first"))
             self._switch_page(5)  # 切换到设置页
-            return
+            return None
         
         try:
             size = int(self.fofa_size_combo.currentText())
         except ValueError:
             size = 100
+        return query, fofa_config, size
+
+    def _fofa_do_search(self):
+        """执行 FOFA 搜索"""
+        from core.fofa_client import FofaSearchThread
+        
+        params = self._fofa_search_params()
+        if params is None:
+            return
+        query, fofa_config, size = params
         
         self.fofa_btn_search.setEnabled(False)
         self.fofa_btn_search.setText(tr("fofa.searching"))
@@ -2855,8 +3224,84 @@ class MainWindow(QMainWindow):
         )
         self.fofa_search_thread.result_signal.connect(self._fofa_on_search_result)
         self.fofa_search_thread.error_signal.connect(self._fofa_on_search_error)
+        self.fofa_search_thread.progress_signal.connect(self.fofa_status_label.setText)
         self.fofa_search_thread.start()
     
+    def _fofa_pipeline_scan(self):
+        """边搜边扫：采集到的资产去重、探测存活后按块送入任务队列，不等待搜索全部完成"""
+        from core.asset_pipeline import AssetPipelineThread, ScanTaskFeeder
+        from core.fofa_client import FofaEngine, FOFA_PAGE_SIZE
+        from core.task_queue_manager import get_task_queue_manager
+
+        params = self._fofa_search_params()
+        if params is None:
+            return
+        query, fofa_config, size = params
+
+        pocs = list(self.pending_scan_pocs)
+        if not pocs:
+            QMessageBox.warning(self, tr("msg.hint"), tr("scan.select_pocs_first"))
+            self._switch_page(1)  # POC 管理页
+            return
+
+        queue = get_task_queue_manager()
+        queue.set_scan_config(self.settings.get_scan_config())
+        self.fofa_pipeline_feeder = ScanTaskFeeder(queue, query, pocs)
+
+        engine = FofaEngine(fofa_config.get("api_key", ""), fofa_config.get("api_url", ""),
+                            email=fofa_config.get("email", ""))
+        self.fofa_pipeline_thread = AssetPipelineThread({engine.name: engine}, query,
+                                                        page_size=FOFA_PAGE_SIZE, max_results=size)
+        self.fofa_pipeline_thread.chunk_ready.connect(self.fofa_pipeline_feeder.feed)
+        self.fofa_pipeline_thread.progress_signal.connect(self._fofa_on_pipeline_progress)
+        self.fofa_pipeline_thread.result_signal.connect(self._fofa_on_pipeline_result)
+        self.fofa_pipeline_thread.error_signal.connect(self._fofa_on_search_error)
+        self.fofa_pipeline_thread.finished.connect(self._fofa_on_pipeline_finished)
+
+        self.fofa_btn_search.setEnabled(False)
+        self.fofa_btn_pipeline.setEnabled(False)
+        self.fofa_btn_pipeline_stop.setEnabled(True)
+        self.fofa_btn_pipeline_stop.show()
+        self.fofa_progress.show()
+        self.fofa_status_label.setText(tr("fofa.searching_with_size", size=size))
+        self.fofa_pipeline_thread.start()
+
+    def _fofa_stop_pipeline(self):
+        """停止边搜边扫的资产采集与存活探测"""
+        thread = getattr(self, 'fofa_pipeline_thread', None)
+        if thread is None or not thread.isRunning():
+            return
+        thread.stop()
+        self.fofa_btn_pipeline_stop.setEnabled(False)
+        self.fofa_status_label.setText(tr("fofa.pipeline_stopping"))
+
+    def _fofa_on_pipeline_finished(self):
+        """采集线程结束（完成、出错或被停止）后恢复按钮"""
+        self.fofa_btn_search.setEnabled(True)
+        self.fofa_btn_search.setText(tr("common.search"))
+        self.fofa_btn_pipeline.setEnabled(True)
+        self.fofa_btn_pipeline_stop.hide()
+        self.fofa_progress.hide()
+
+    def _fofa_on_pipeline_progress(self, counts):
+        """边搜边扫进度"""
+        self.fofa_status_label.setText(tr(
+            "fofa.pipeline_progress",
+            collected=counts.get('collected', 0), alive=counts.get('alive', 0),
+            sent=counts.get('sent', 0), tasks=len(self.fofa_pipeline_feeder.task_ids),
+        ))
+
+    def _fofa_on_pipeline_result(self, result):
+        """边搜边扫采集结束：结果照常显示并记入历史，扫描任务在队列中继续执行"""
+        rows = [asset.result.extra.get('row') or {"host": asset.target} for asset in result.get('results', [])]
+        self._fofa_on_search_result(rows)
+        stats = result.get('stats', {})
+        self.fofa_status_label.setText(tr(
+            "fofa.pipeline_complete",
+            collected=stats.get('collected', 0), alive=stats.get('alive', 0),
+            tasks=len(self.fofa_pipeline_feeder.task_ids),
+        ))
+
     def _fofa_on_search_result(self, results):
         """FOFA 搜索完成"""
         self.fofa_btn_search.setEnabled(True)
@@ -3529,6 +3974,7 @@ class MainWindow(QMainWindow):
             self.settings_no_httpx.setChecked(scan_config.get("no_httpx", False))
             self.settings_verbose.setChecked(scan_config.get("verbose", False))
             self.settings_use_native.setChecked(scan_config.get("use_native_scanner", False))
+            self.settings_trace_log.setChecked(scan_config.get("trace_log", False))
             if hasattr(self, 'settings_oast_mode'):
                 mode_index = self.settings_oast_mode.findData(scan_config.get("oast_mode", "auto"))
                 self.settings_oast_mode.setCurrentIndex(mode_index if mode_index >= 0 else 0)
@@ -3574,6 +4020,7 @@ class MainWindow(QMainWindow):
                 "no_httpx": self.settings_no_httpx.isChecked(),
                 "verbose": self.settings_verbose.isChecked(),
                 "use_native_scanner": self.settings_use_native.isChecked(),
+                "trace_log": self.settings_trace_log.isChecked(),
                 "oast_mode": self.settings_oast_mode.currentData() if hasattr(self, 'settings_oast_mode') else "auto",
                 "oast_server": self.settings_oast_server.text().strip() if hasattr(self, 'settings_oast_server') else "",
                 "oast_token": self.settings_oast_token.text().strip() if hasattr(self, 'settings_oast_token') else "",
@@ -3952,14 +4399,15 @@ class MainWindow(QMainWindow):
         top_group = QLabel(tr("dashboard.top_templates"))
         top_group.setStyleSheet(scaled_style("font-weight: bold; margin-top: 10px;"))
         left_layout.addWidget(top_group)
-        
-        for tpl in stats.get('top_templates', [])[:5]:
-            tpl_label = QLabel(f"• {tpl['template'][:30]}... ({tpl['count']})")
-            tpl_label.setStyleSheet(scaled_style("color: #7f8c8d; font-size: 11px;"))
-            left_layout.addWidget(tpl_label)
-        
-        if not stats.get('top_templates'):
-            left_layout.addWidget(QLabel(tr("dashboard.no_data")))
+        self.dashboard_top_templates_layout = QVBoxLayout()
+        left_layout.addLayout(self.dashboard_top_templates_layout)
+
+        # 最近 30 天受影响最多的主机（VulnAnalytics 按天汇总）
+        top_hosts_group = QLabel(tr("dashboard.top_hosts"))
+        top_hosts_group.setStyleSheet(scaled_style("font-weight: bold; margin-top: 10px;"))
+        left_layout.addWidget(top_hosts_group)
+        self.dashboard_top_hosts_layout = QVBoxLayout()
+        left_layout.addLayout(self.dashboard_top_hosts_layout)
         
         left_panel.setLayout(left_layout)
         content_splitter.addWidget(left_panel)
@@ -3968,26 +4416,19 @@ class MainWindow(QMainWindow):
         center_panel = QGroupBox(tr("dashboard.scan_history"))
         center_layout = QVBoxLayout()
         
-        self.history_table = QTableWidget()
+        # 历史表格使用模型按需渲染，详情/导出按钮由委托绘制
+        from dialogs.scan_history_view import ScanHistoryModel, create_history_view
+        self.history_model = ScanHistoryModel(
+            [tr("history.time"), tr("history.target"), tr("history.poc"), tr("history.vuln"),
+             tr("history.status"), tr("common.detail"), tr("common.export")],
+            status_formatter=display_scan_status, parent=self,
+        )
+        self.history_table = create_history_view(
+            self.history_model, FORTRESS_COLORS, self.show_scan_detail, self.export_scan_record
+        )
         # 应用 FORTRESS 表格样式（美化表头和序号）
         from core.fortress_style import get_table_stylesheet
         self.history_table.setStyleSheet(get_table_stylesheet(FORTRESS_COLORS))
-        
-        self.history_table.setColumnCount(7)
-        self.history_table.setHorizontalHeaderLabels([tr("history.time"), tr("history.target"), tr("history.poc"), tr("history.vuln"), tr("history.status"), tr("common.detail"), tr("common.export")])
-        self.history_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
-        for i in range(1, 5):
-            self.history_table.horizontalHeader().setSectionResizeMode(i, QHeaderView.ResizeToContents)
-            
-        # 详情和导出列：设置固定宽度以适配按钮
-        for i in [5, 6]:
-            self.history_table.horizontalHeader().setSectionResizeMode(i, QHeaderView.Fixed)
-            self.history_table.setColumnWidth(i, scaled(100))
-        self.history_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.history_table.setAlternatingRowColors(True)
-        # 增加行高，让按钮显示不拥挤
-        self.history_table.verticalHeader().setDefaultSectionSize(scaled(45))
-        self.history_table.verticalHeader().setVisible(False) # 隐藏垂直表头，统一风格
         # 移除高度限制，让表格自动填充可用空间
         self.history_table.setMinimumHeight(scaled(200))
         center_layout.addWidget(self.history_table, 1)  # stretch factor = 1，让表格优先获取空间
@@ -4147,105 +4588,31 @@ class MainWindow(QMainWindow):
         from core.fortress_style import get_table_stylesheet
         self.history_table.setStyleSheet(get_table_stylesheet(FORTRESS_COLORS))
 
+        self._refresh_dashboard_analytics()
+
         # 刷新历史表格
-        history = history_mgr.get_recent_scans(20)
-        
-        self.history_table.setUpdatesEnabled(False)
-        self.history_table.setRowCount(0)
-        self.history_table.setRowCount(len(history))
-        
-        for row, record in enumerate(history):
-            # 时间
-            scan_time = record.get('scan_time', '')[:19]  # 截取日期时间
-            self.history_table.setItem(row, 0, QTableWidgetItem(scan_time))
-            
-            # Targets
-            self.history_table.setItem(row, 1, QTableWidgetItem(str(record.get('target_count', 0))))
-            
-            # POC 数
-            self.history_table.setItem(row, 2, QTableWidgetItem(str(record.get('poc_count', 0))))
-            
-            # Vulns
-            vuln_count = record.get('vuln_count', 0)
-            vuln_item = QTableWidgetItem(str(vuln_count))
-            if vuln_count > 0:
-                vuln_item.setForeground(QColor('#e74c3c'))
-                vuln_item.setFont(QFont("Arial", scaled(10), QFont.Bold))
-            self.history_table.setItem(row, 3, vuln_item)
-            
-            # 状态
-            status = record.get('status', 'completed')
-            status_item = QTableWidgetItem(display_scan_status(status))
-            if status == 'stopped':
-                status_item.setForeground(QColor('#e67e22'))
-            else:
-                status_item.setForeground(QColor('#27ae60'))
-            self.history_table.setItem(row, 4, status_item)
-            
-            # 查看详情按钮
-            btn_detail = QPushButton(tr("common.detail"))
-            btn_detail.setCursor(Qt.PointingHandCursor)
-            # 强制指定 QPushButton#ID 选择器，优先级最高
-            btn_detail.setStyleSheet(scaled_style(f"""
-                QPushButton {{
-                    background-color: {FORTRESS_COLORS['btn_info']};
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    font-family: "Microsoft YaHei", sans-serif;
-                    font-size: 12px;
-                    font-weight: normal;
-                    padding: 0px;
-                    min-height: 0px;
-                    min-width: 0px;
-                }}
-                QPushButton:hover {{
-                    background-color: {FORTRESS_COLORS['btn_info_hover']};
-                }}
-            """))
-            btn_detail.setProperty("scan_id", record.get('id'))
-            btn_detail.clicked.connect(lambda checked, sid=record.get('id'): self.show_scan_detail(sid))
-            # 创建容器居中按钮
-            w_detail = QWidget()
-            w_detail.setObjectName("cell_container")
-            w_detail.setStyleSheet("#cell_container { background: transparent; }")
-            l_detail = QHBoxLayout(w_detail)
-            l_detail.setContentsMargins(scaled(2), scaled(2), scaled(2), scaled(2))
-            l_detail.addWidget(btn_detail)
-            self.history_table.setCellWidget(row, 5, w_detail)
-
-            # 导出按钮
-            btn_export = QPushButton(tr("common.export"))
-            btn_export.setCursor(Qt.PointingHandCursor)
-            btn_export.setStyleSheet(scaled_style(f"""
-                QPushButton {{
-                    background-color: {FORTRESS_COLORS['btn_warning']};
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    font-family: "Microsoft YaHei", sans-serif;
-                    font-size: 12px;
-                    font-weight: normal;
-                    padding: 0px;
-                    min-height: 0px;
-                    min-width: 0px;
-                }}
-                QPushButton:hover {{
-                    background-color: {FORTRESS_COLORS['btn_warning_hover']};
-                }}
-            """))
-            btn_export.setProperty("scan_id", record.get('id'))
-            btn_export.clicked.connect(lambda checked, sid=record.get('id'): self.export_scan_record(sid))
-            # 创建容器居中按钮
-            w_export = QWidget()
-            w_export.setObjectName("cell_container")
-            w_export.setStyleSheet("#cell_container { background: transparent; }")
-            l_export = QHBoxLayout(w_export)
-            l_export.setContentsMargins(scaled(2), scaled(2), scaled(2), scaled(2))
-            l_export.addWidget(btn_export)
-            self.history_table.setCellWidget(row, 6, w_export)
-        
-        self.history_table.setUpdatesEnabled(True)
+        self.history_model.set_records(history_mgr.get_recent_scans(20))
+
+    def _refresh_dashboard_analytics(self):
+        """刷新仪表盘的 TOP 模板与 TOP 主机列表"""
+        from core.vuln_analytics import get_vuln_analytics
+        analytics = get_vuln_analytics()
+        templates = [f"{item['template_id'][:30]}... ({item['count']})"
+                     for item in analytics.get_top_vulnerabilities(5)]
+        hosts = [f"{item['host'][:30]} ({item['total']})"
+                 for item in analytics.get_top_affected_hosts(5, days=30) if item['host']]
+        for layout, lines in ((self.dashboard_top_templates_layout, templates),
+                              (self.dashboard_top_hosts_layout, hosts)):
+            while layout.count():
+                item = layout.takeAt(0)
+                if item.widget():
+                    item.widget().deleteLater()
+            for line in lines:
+                label = QLabel(f"• {line}")
+                label.setStyleSheet(scaled_style("color: #7f8c8d; font-size: 11px;"))
+                layout.addWidget(label)
+            if not lines:
+                layout.addWidget(QLabel(tr("dashboard.no_data")))
     
     def _update_card_value(self, card, value):
         """更新统计卡片的值"""
@@ -4268,9 +4635,11 @@ class MainWindow(QMainWindow):
         import json  # 需要 json 解析 raw_json
         from core.fortress_style import apply_fortress_style, get_table_stylesheet
         
-        vulns = get_scan_history().get_scan_vulns(scan_id)
+        history = get_scan_history()
+        vulns = history.get_scan_vulns(scan_id)
+        delta = history.get_scan_delta(scan_id)
         
-        if not vulns:
+        if not vulns and not delta['resolved']:
             QMessageBox.information(self, tr("history.scan_detail"), tr("history.no_vulns_found"))
             return
         
@@ -4285,7 +4654,20 @@ class MainWindow(QMainWindow):
         # 信息标签
         lbl_info = QLabel(tr("history.vulns_found", count=len(vulns)))
         lbl_info.setStyleSheet(scaled_style(f"font-weight: bold; font-size: 14px; color: {FORTRESS_COLORS['text_primary']};"))
-        layout.addWidget(lbl_info)
+        
+        # 相对上一次同目标扫描的差异：只看新增/已修复时不必逐条复查重复发现
+        info_row = QHBoxLayout()
+        info_row.addWidget(lbl_info)
+        info_row.addStretch()
+        chk_delta = None
+        if delta['previous_scan_id']:
+            lbl_delta = QLabel(tr("history.delta_summary", new=delta['new'], recurring=delta['recurring'],
+                                  resolved=delta['resolved'], scan_id=delta['previous_scan_id']))
+            lbl_delta.setStyleSheet(scaled_style(f"font-size: 12px; color: {FORTRESS_COLORS['text_secondary']};"))
+            info_row.addWidget(lbl_delta)
+            chk_delta = QCheckBox(tr("history.delta_only"))
+            info_row.addWidget(chk_delta)
+        layout.addLayout(info_row)
         
         # 详情列表
         table = QTableWidget()
@@ -4308,113 +4690,130 @@ class MainWindow(QMainWindow):
         
         table.setSelectionBehavior(QTableWidget.SelectRows)
         table.setAlternatingRowColors(True)
-        table.setRowCount(len(vulns))
+        shown = {'rows': vulns}
         
-        from dialogs.poc_editor_dialog import POCEditorDialog
+        def fill_table(rows):
+            shown['rows'] = rows
+            table.clearContents()
+            table.setRowCount(len(rows))
+        
+            from dialogs.poc_editor_dialog import POCEditorDialog
 
-        for row, v in enumerate(vulns):
-            # 解析 raw_json 获取请求详情
-            raw_data = {}
-            try:
-                if v.get('raw_json'):
-                    raw_data = json.loads(v['raw_json'])
-            except:
-                pass
+            for row, v in enumerate(rows):
+                # 解析 raw_json 获取请求详情
+                raw_data = {}
+                try:
+                    if v.get('raw_json'):
+                        raw_data = json.loads(v['raw_json'])
+                except:
+                    pass
             
-            # 解析请求信息 - 兼容 nuclei.exe 和 native_scanner 两种格式
-            method = "GET"
-            body = ""
-            full_request = ""
-            curl_command = ""
-            response_data = ""
+                # 解析请求信息 - 兼容 nuclei.exe 和 native_scanner 两种格式
+                method = "GET"
+                body = ""
+                full_request = ""
+                curl_command = ""
+                response_data = ""
             
-            if raw_data:
-                # 优先使用 nuclei.exe 的格式 (request 字段包含Full request)
-                if raw_data.get('request'):
-                    full_request = raw_data['request']
-                    # 解析请求方法
-                    first_line = full_request.split('\r\n')[0] if '\r\n' in full_request else full_request.split('\n')[0]
-                    if first_line:
-                        parts = first_line.split(' ')
-                        if parts:
-                            method = parts[0]
-                    # 解析请求 body (在空行之后)
-                    if '\r\n\r\n' in full_request:
-                        body = full_request.split('\r\n\r\n', 1)[1] if len(full_request.split('\r\n\r\n')) > 1 else ""
-                    elif '\n\n' in full_request:
-                        body = full_request.split('\n\n', 1)[1] if len(full_request.split('\n\n')) > 1 else ""
-                else:
-                    # native_scanner 格式
-                    method = raw_data.get('request_method', 'GET')
-                    body = raw_data.get('request_body', '')
+                if raw_data:
+                    # 优先使用 nuclei.exe 的格式 (request 字段包含Full request)
+                    if raw_data.get('request'):
+                        full_request = raw_data['request']
+                        # 解析请求方法
+                        first_line = full_request.split('\r\n')[0] if '\r\n' in full_request else full_request.split('\n')[0]
+                        if first_line:
+                            parts = first_line.split(' ')
+                            if parts:
+                                method = parts[0]
+                        # 解析请求 body (在空行之后)
+                        if '\r\n\r\n' in full_request:
+                            body = full_request.split('\r\n\r\n', 1)[1] if len(full_request.split('\r\n\r\n')) > 1 else ""
+                        elif '\n\n' in full_request:
+                            body = full_request.split('\n\n', 1)[1] if len(full_request.split('\n\n')) > 1 else ""
+                    else:
+                        # native_scanner 格式
+                        method = raw_data.get('request_method', 'GET')
+                        body = raw_data.get('request_body', '')
                 
-                # 获取其他有用字段
-                curl_command = raw_data.get('curl-command', '')
-                response_data = raw_data.get('response', '')
+                    # 获取其他有用字段
+                    curl_command = raw_data.get('curl-command', '')
+                    response_data = raw_data.get('response', '')
             
-            # 严重程度
-            sev = v.get('severity', 'unknown')
-            sev_item = QTableWidgetItem(sev)
-            if sev == 'critical':
-                sev_item.setForeground(QColor('#9b59b6'))
-                sev_item.setFont(QFont("Arial", scaled(9), QFont.Bold))
-            elif sev == 'high':
-                sev_item.setForeground(QColor('#e74c3c'))
-                sev_item.setFont(QFont("Arial", scaled(9), QFont.Bold))
-            elif sev == 'medium':
-                sev_item.setForeground(QColor('#e67e22'))
-            elif sev == 'low':
-                sev_item.setForeground(QColor('#3498db'))
-            elif sev == 'info':
-                sev_item.setForeground(QColor('#1abc9c'))
-            table.setItem(row, 0, sev_item)
+                # 严重程度
+                sev = v.get('severity', 'unknown')
+                sev_item = QTableWidgetItem(sev)
+                if chk_delta is not None and chk_delta.isChecked() and v.get('delta'):
+                    sev_item.setText(f"{sev} · {tr('history.delta_' + v['delta'])}")
+                if sev == 'critical':
+                    sev_item.setForeground(QColor('#9b59b6'))
+                    sev_item.setFont(QFont("Arial", scaled(9), QFont.Bold))
+                elif sev == 'high':
+                    sev_item.setForeground(QColor('#e74c3c'))
+                    sev_item.setFont(QFont("Arial", scaled(9), QFont.Bold))
+                elif sev == 'medium':
+                    sev_item.setForeground(QColor('#e67e22'))
+                elif sev == 'low':
+                    sev_item.setForeground(QColor('#3498db'))
+                elif sev == 'info':
+                    sev_item.setForeground(QColor('#1abc9c'))
+                table.setItem(row, 0, sev_item)
             
-            # POC ID
-            table.setItem(row, 1, QTableWidgetItem(v.get('template_id', '')))
+                # POC ID
+                table.setItem(row, 1, QTableWidgetItem(v.get('template_id', '')))
             
-            # 目标
-            table.setItem(row, 2, QTableWidgetItem(v.get('matched_at', '')))
+                # 目标
+                table.setItem(row, 2, QTableWidgetItem(v.get('matched_at', '')))
             
-            # Payload / 请求
-            payload_text = method
-            if body:
-                # 如果有 body，显示部分内容
-                clean_body = body.strip().replace('\r\n', ' ').replace('\n', ' ')
-                if len(clean_body) > 50:
-                    payload_text += f": {clean_body[:50]}..."
-                else:
-                    payload_text += f": {clean_body}"
+                # Payload / 请求
+                payload_text = method
+                if body:
+                    # 如果有 body，显示部分内容
+                    clean_body = body.strip().replace('\r\n', ' ').replace('\n', ' ')
+                    if len(clean_body) > 50:
+                        payload_text += f": {clean_body[:50]}..."
+                    else:
+                        payload_text += f": {clean_body}"
             
-            payload_item = QTableWidgetItem(payload_text)
-            if full_request or body:
-                payload_item.setToolTip(f"Full request:\n\n{full_request if full_request else body}")
-            table.setItem(row, 3, payload_item)
-
-            # 路径
-            path = v.get('template_path')
-            display_path = path if path else ""
-            path_item = QTableWidgetItem(os.path.basename(display_path) if display_path else "") # 只显示文件名，完整路径放 tooltip
-            path_item.setToolTip(display_path)
-            table.setItem(row, 4, path_item)
+                payload_item = QTableWidgetItem(payload_text)
+                if full_request or body:
+                    payload_item.setToolTip(f"Full request:\n\n{full_request if full_request else body}")
+                table.setItem(row, 3, payload_item)
+
+                # 路径
+                path = v.get('template_path')
+                display_path = path if path else ""
+                path_item = QTableWidgetItem(os.path.basename(display_path) if display_path else "") # 只显示文件名，完整路径放 tooltip
+                path_item.setToolTip(display_path)
+                table.setItem(row, 4, path_item)
             
-            # 操作按钮 - 只保留一个详情按钮，POC编辑在详情窗口中
-            btn_detail = QPushButton(tr("common.detail"))
-            btn_detail.setToolTip(tr("report.detail_tooltip"))
-            btn_detail.setStyleSheet(scaled_style(f"""
-                QPushButton {{
-                    background-color: {FORTRESS_COLORS['btn_info']};
-                    color: white;
-                    border: none;
-                    border-radius: 3px;
-                    padding: 3px 10px;
-                }}
-                QPushButton:hover {{
-                    background-color: {FORTRESS_COLORS['btn_info_hover']};
-                }}
-            """))
-            btn_detail.clicked.connect(lambda checked, vd=v, rd=raw_data: self._show_vuln_detail(vd, rd))
-            table.setCellWidget(row, 5, btn_detail)
+                # 操作按钮 - 只保留一个详情按钮，POC编辑在详情窗口中
+                btn_detail = QPushButton(tr("common.detail"))
+                btn_detail.setToolTip(tr("report.detail_tooltip"))
+                btn_detail.setStyleSheet(scaled_style(f"""
+                    QPushButton {{
+                        background-color: {FORTRESS_COLORS['btn_info']};
+                        color: white;
+                        border: none;
+                        border-radius: 3px;
+                        padding: 3px 10px;
+                    }}
+                    QPushButton:hover {{
+                        background-color: {FORTRESS_COLORS['btn_info_hover']};
+                    }}
+                """))
+                btn_detail.clicked.connect(lambda checked, vd=v, rd=raw_data: self._show_vuln_detail(vd, rd))
+                table.setCellWidget(row, 5, btn_detail)
+        
+        
+        def on_delta_toggled(checked):
+            if checked:
+                fill_table(history.get_scan_vulns(scan_id, delta_only=True) + history.get_resolved_findings(scan_id))
+            else:
+                fill_table(vulns)
         
+        fill_table(vulns)
+        if chk_delta is not None:
+            chk_delta.toggled.connect(on_delta_toggled)
         layout.addWidget(table)
         
         # 按钮
@@ -4422,7 +4821,7 @@ class MainWindow(QMainWindow):
         btn_row.addStretch()
         
         btn_copy = self._create_fortress_button(tr("report.copy_all"), "primary")
-        btn_copy.clicked.connect(lambda: self._copy_vulns_to_clipboard(vulns))
+        btn_copy.clicked.connect(lambda: self._copy_vulns_to_clipboard(shown['rows']))
         btn_row.addWidget(btn_copy)
         
         btn_close = self._create_fortress_button("OK", "warning")
@@ -4531,106 +4930,25 @@ class MainWindow(QMainWindow):
             curl_command = raw_data.get('curl-command', '')
             response_data = raw_data.get('response', '')
         
-        # === 从 POC 文件解析Full request链 ===
+        # === 从 POC 文件还原完整请求链 ===
+        from core.export_manager import request_chain_renderer
         poc_requests_text = ""
         poc_path = vuln_data.get('template_path') or (raw_data.get('template-path') if raw_data else None)
+        try:
+            request_steps = request_chain_renderer().render(
+                poc_path, vuln_data.get('template_id', ''), vuln_data.get('matched_at', ''),
+                full_request, response_data)
+        except Exception:
+            # 解析失败，忽略
+            request_steps = ()
         
-        # 从 matched_at 提取实际的 Hostname
-        matched_url = vuln_data.get('matched_at', '')
-        actual_hostname = ""
-        actual_base_url = ""
-        if matched_url:
-            try:
-                from urllib.parse import urlparse
-                parsed = urlparse(matched_url)
-                # 获取 host:port 格式
-                if parsed.port and parsed.port not in [80, 443]:
-                    actual_hostname = f"{parsed.hostname}:{parsed.port}"
-                else:
-                    actual_hostname = parsed.hostname or ""
-                # 获取完整的 base URL (scheme://host:port)
-                actual_base_url = f"{parsed.scheme}://{actual_hostname}"
-            except:
-                pass
-        
-        if poc_path and os.path.exists(poc_path):
-            try:
-                import yaml
-                with open(poc_path, 'r', encoding='utf-8') as f:
-                    poc_content = yaml.safe_load(f)
-                
-                # 解析 http 部分的请求
-                http_section = poc_content.get('http', [])
-                if http_section:
-                    request_steps = []
-                    step_num = 1
-                    
-                    for item in http_section:
-                        # 检查 raw 请求
-                        raw_requests = item.get('raw', [])
-                        if raw_requests:
-                            for raw_req in raw_requests:
-                                # 替换模板变量
-                                req_content = raw_req.strip()
-                                if actual_hostname:
-                                    req_content = req_content.replace('{{Hostname}}', actual_hostname)
-                                    req_content = req_content.replace('{{BaseURL}}', actual_base_url)
-                                    req_content = req_content.replace('{{Host}}', actual_hostname)
-                                
-                                request_steps.append({
-                                    'step': step_num,
-                                    'type': 'raw',
-                                    'content': req_content
-                                })
-                                step_num += 1
-                        
-                        # 检查 path/method 形式的请求
-                        if item.get('path') or item.get('method'):
-                            req_method = item.get('method', 'GET')
-                            paths = item.get('path', [])
-                            if isinstance(paths, str):
-                                paths = [paths]
-                            for path in paths:
-                                # 替换模板变量
-                                actual_path = path
-                                actual_body = item.get('body', '')
-                                if actual_hostname:
-                                    actual_path = actual_path.replace('{{Hostname}}', actual_hostname)
-                                    actual_path = actual_path.replace('{{BaseURL}}', actual_base_url)
-                                    if actual_body:
-                                        actual_body = actual_body.replace('{{Hostname}}', actual_hostname)
-                                        actual_body = actual_body.replace('{{BaseURL}}', actual_base_url)
-                                
-                                request_steps.append({
-                                    'step': step_num,
-                                    'type': 'standard',
-                                    'method': req_method,
-                                    'path': actual_path,
-                                    'body': actual_body
-                                })
-                                step_num += 1
-                    
-                    # 生成请求链文本
-                    if len(request_steps) > 1:
-                        poc_requests_text = f"\n⚠️ This POC contains {len(request_steps)} request steps, execute in order：\n\n"
-                        
-                        for req in request_steps:
-                            poc_requests_text += f"────────── Step {req['step']} ──────────\n"
-                            if req['type'] == 'raw':
-                                poc_requests_text += f"{req['content']}\n\n"
-                            else:
-                                poc_requests_text += f"{req['method']} {req['path']}\n"
-                                if req.get('body'):
-                                    poc_requests_text += f"\n{req['body']}\n"
-                                poc_requests_text += "\n"
-                    elif len(request_steps) == 1:
-                        # 单步骤，使用 POC 中的原始请求替代
-                        req = request_steps[0]
-                        if req['type'] == 'raw' and not full_request:
-                            full_request = req['content']
-            except Exception as e:
-                # 解析失败，忽略
-                pass
+        if len(request_steps) > 1:
+            poc_requests_text = f"\n⚠️ This POC contains {len(request_steps)} request steps, execute in order：\n\n"
+            for num, step in enumerate(request_steps, 1):
+                poc_requests_text += f"────────── Step {num} ──────────\n{step.content}\n\n"
+        elif len(request_steps) == 1 and request_steps[0].kind == 'raw' and not full_request:
+            # 单步骤，使用 POC 中的原始请求替代
+            full_request = request_steps[0].content
         
         # 构建详情内容
         detail_content = f"""════════════════════════════════════════════════════════════════
@@ -4811,13 +5129,18 @@ class MainWindow(QMainWindow):
     
     def export_scan_record(self, scan_id):
         """导出单次扫描记录"""
+        if self._export_thread is not None and self._export_thread.isRunning():
+            QMessageBox.information(self, tr("export.title"), tr("export.in_progress"))
+            return
+
         from core.scan_history import get_scan_history
-        from core.export_manager import export_to_csv, export_to_html
+        from core.export_manager import (export_to_csv, export_to_html, export_to_jsonl_gz, export_to_parquet,
+                                         export_to_sqlite, parquet_available, default_export_workers)
+        from itertools import chain
         
-        # 获取扫描记录和Vulns据
+        # 获取扫描记录（漏洞结果在导出时按需读取）
         history = get_scan_history()
         scan_record = history.get_scan_record(scan_id)
-        vulns = history.get_scan_vulns(scan_id)
         
         if not scan_record:
             QMessageBox.warning(self, tr("msg.error"), tr("history.record_not_found"))
@@ -4846,9 +5169,15 @@ class MainWindow(QMainWindow):
         layout.addWidget(format_label)
         
         format_combo = QComboBox()
-        format_combo.addItems([tr("export.html_recommended"), tr("export.csv_excel")])
+        format_combo.addItems([tr("export.html_recommended"), tr("export.csv_excel"), tr("export.jsonl_gz"),
+                               tr("export.parquet"), tr("export.sqlite")])
         layout.addWidget(format_combo)
         
+        # 差异模式：只导出相对上一次同目标扫描的新增与已修复发现
+        chk_delta = QCheckBox(tr("export.delta_only"))
+        chk_delta.setEnabled(bool(scan_record.get('previous_scan_id')))
+        layout.addWidget(chk_delta)
+        
         # 按钮
         btn_layout = QHBoxLayout()
         btn_layout.addStretch()
@@ -4867,11 +5196,23 @@ class MainWindow(QMainWindow):
             return
         
         # 获取选择的格式
-        is_html = format_combo.currentIndex() == 0
+        format_index = format_combo.currentIndex()
+        is_html = format_index == 0
+        delta_only = chk_delta.isChecked()
+        if format_index == 3 and not parquet_available():
+            QMessageBox.warning(self, tr("msg.error"), tr("export.parquet_unavailable"))
+            return
+        
+        def iter_vulns():
+            # 导出直接消费数据库游标，不整体载入结果
+            if delta_only:
+                return chain(history.iter_scan_vulns(scan_id, delta_only=True),
+                             history.iter_resolved_findings(scan_id))
+            return history.iter_scan_vulns(scan_id)
         
         # 选择保存路径
         scan_time_str = scan_record.get('scan_time', '')[:10].replace('-', '')
-        default_name = f"scan_report_{scan_time_str}_{scan_id}"
+        default_name = f"scan_report_{scan_time_str}_{scan_id}" + ("_delta" if delta_only else "")
         
         if is_html:
             file_path, _ = QFileDialog.getSaveFileName(
@@ -4879,34 +5220,56 @@ class MainWindow(QMainWindow):
                 default_name + ".html",
                 "HTML Files (*.html)"
             )
-            if file_path:
-                if export_to_html(scan_record, vulns, file_path):
-                    msg_box = QMessageBox(self)
-                    msg_box.setIcon(QMessageBox.Question)
-                    msg_box.setWindowTitle(tr("export.export_success"))
-                    msg_box.setText(tr("report.exported_to", filepath=file_path))
-                    msg_box.setInformativeText(tr("report.open_now"))
-                    msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
-                    msg_box.setDefaultButton(QMessageBox.Yes)
-                    msg_box.button(QMessageBox.Yes).setText(tr("common.yes"))
-                    msg_box.button(QMessageBox.No).setText(tr("common.no"))
-                    reply = msg_box.exec_()
-                    if reply == QMessageBox.Yes:
-                        import os
-                        os.startfile(file_path)
-                else:
-                    QMessageBox.warning(self, tr("msg.error"), tr("export.failed_permission"))
-        else:
+            export_fn = lambda: export_to_html(scan_record, iter_vulns(), file_path, delta=delta_only)
+        elif format_index == 1:
             file_path, _ = QFileDialog.getSaveFileName(
                 self, tr("export.save_csv"), 
                 default_name + ".csv",
                 "CSV Files (*.csv)"
             )
-            if file_path:
-                if export_to_csv(scan_record, vulns, file_path):
-                    QMessageBox.information(self, tr("msg.success"), f"CSV exported to:\n{file_path}")
-                else:
-                    QMessageBox.warning(self, tr("msg.error"), tr("export.failed_permission"))
+            workers = default_export_workers(scan_record.get('vuln_count') or 0)
+            export_fn = lambda: export_to_csv(scan_record, iter_vulns(), file_path, delta=delta_only, workers=workers)
+        else:
+            # 机器可读格式：JSONL.gz / Parquet / SQLite
+            suffix, file_filter, exporter = {
+                2: (".jsonl.gz", "JSON Lines (*.jsonl.gz)", export_to_jsonl_gz),
+                3: (".parquet", "Parquet Files (*.parquet)", export_to_parquet),
+                4: (".sqlite", "SQLite Database (*.sqlite *.db)", export_to_sqlite),
+            }[format_index]
+            file_path, _ = QFileDialog.getSaveFileName(self, tr("export.save_data"), default_name + suffix, file_filter)
+            export_fn = lambda: exporter(scan_record, iter_vulns(), file_path)
+        if not file_path:
+            return
+
+        # 导出在后台线程中消费数据库游标并写文件，完成后回到 GUI 线程提示
+        self._export_thread = ExportThread(export_fn, file_path)
+        self._export_thread.finished_signal.connect(
+            lambda ok, path: self._on_export_finished(ok, path, format_index))
+        self._export_thread.start()
+        self.status_bar.showMessage(tr("export.running", filepath=file_path))
+
+    def _on_export_finished(self, ok, file_path, format_index):
+        self.status_bar.clearMessage()
+        if not ok:
+            QMessageBox.warning(self, tr("msg.error"), tr("export.failed_permission"))
+        elif format_index == 0:
+            msg_box = QMessageBox(self)
+            msg_box.setIcon(QMessageBox.Question)
+            msg_box.setWindowTitle(tr("export.export_success"))
+            msg_box.setText(tr("report.exported_to", filepath=file_path))
+            msg_box.setInformativeText(tr("report.open_now"))
+            msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+            msg_box.setDefaultButton(QMessageBox.Yes)
+            msg_box.button(QMessageBox.Yes).setText(tr("common.yes"))
+            msg_box.button(QMessageBox.No).setText(tr("common.no"))
+            reply = msg_box.exec_()
+            if reply == QMessageBox.Yes:
+                import os
+                os.startfile(file_path)
+        elif format_index == 1:
+            QMessageBox.information(self, tr("msg.success"), f"CSV exported to:\n{file_path}")
+        else:
+            QMessageBox.information(self, tr("msg.success"), tr("report.exported_to", filepath=file_path))
 
     # ================= POC 管理页面 =================
     def setup_poc_tab(self):
@@ -5063,6 +5426,33 @@ class MainWindow(QMainWindow):
         self.filter_poc_table()
         self.update_scan_poc_list(self.all_poc_data)
         self.statusBar().showMessage(tr("poc.loaded_count", count=len(self.all_poc_data)))
+        self._start_template_validation(pocs)
+
+    def _start_template_validation(self, pocs):
+        """后台校验 POC 模板，结果按内容哈希缓存，扫描时剔除已知损坏的模板"""
+        if self._template_validation_thread and self._template_validation_thread.isRunning():
+            return
+
+        from core.template_validator import TemplateValidationThread
+        paths = [poc.get("path") for poc in pocs if poc.get("path")]
+        if not paths:
+            return
+
+        thread = TemplateValidationThread(paths)
+        thread.finished_signal.connect(self._on_template_validation_finished)
+        # 线程真正退出后才释放引用，避免 QThread 仍在运行时被回收
+        thread.finished.connect(lambda: self._on_template_validation_thread_done(thread))
+        self._template_validation_thread = thread
+        thread.start()
+
+    def _on_template_validation_thread_done(self, thread):
+        if self._template_validation_thread is thread:
+            self._template_validation_thread = None
+        thread.deleteLater()
+
+    def _on_template_validation_finished(self, summary):
+        if summary.get("fail"):
+            self.statusBar().showMessage(tr("validator.summary", failed=summary.get("fail", 0), warned=summary.get("warn", 0)), 5000)
 
     def _on_poc_list_load_failed(self, error):
         QMessageBox.warning(self, tr("poc.refresh_failed"), tr("poc.refresh_error", error=error))
@@ -5587,6 +5977,11 @@ class MainWindow(QMainWindow):
         self.scan_stat_high = self._create_scan_stat_card(tr("severity.high"), "0", "#e74c3c")
         self.scan_stat_medium = self._create_scan_stat_card(tr("severity.medium"), "0", "#f97316")
         self.scan_stat_low = self._create_scan_stat_card(tr("severity.low"), "0", "#3b82f6")
+        self.scan_stat_rps = self._create_scan_stat_card(tr("scan.stat_rps"), "-", "#10b981")
+        self.scan_stat_error_rate = self._create_scan_stat_card(tr("scan.stat_error_rate"), "-", "#ef4444")
+        self.scan_stat_eta = self._create_scan_stat_card(tr("scan.stat_eta"), "-", "#0ea5e9")
+        self.scan_throughput_chart = ThroughputChart()
+        self.scan_throughput_chart.setToolTip(tr("scan.throughput_tooltip"))
         
         stats_layout.addWidget(self.scan_stat_targets)
         stats_layout.addWidget(self.scan_stat_pocs)
@@ -5595,6 +5990,10 @@ class MainWindow(QMainWindow):
         stats_layout.addWidget(self.scan_stat_high)
         stats_layout.addWidget(self.scan_stat_medium)
         stats_layout.addWidget(self.scan_stat_low)
+        stats_layout.addWidget(self.scan_stat_rps)
+        stats_layout.addWidget(self.scan_stat_error_rate)
+        stats_layout.addWidget(self.scan_stat_eta)
+        stats_layout.addWidget(self.scan_throughput_chart, 1)
         stats_layout.addStretch()
         
         layout.addWidget(stats_panel)
@@ -6018,16 +6417,17 @@ class MainWindow(QMainWindow):
         self.progress_bar.setValue(0)
         self.progress_bar.show()
         engine_name = tr("scan.engine_native") if use_native else tr("scan.engine_nuclei")
-        self.lbl_progress.setText(tr("scan.starting_engine", engine=engine_name, count=len(targets)))
+        self.lbl_progress.setText(tr("scan.starting_engine", engine=engine_name, count=count_targets(targets)))
         self.result_table.setRowCount(0)
         self.log_output.clear()
         self.full_log = deque(maxlen=3000)
         self.scan_results_data = []
         self._reset_scan_runtime_metrics()
+        self._reset_scan_throughput()
         self._load_historical_scan_metrics()
 
         self._update_scan_stats(
-            targets=len(targets),
+            targets=count_targets(targets),
             pocs=len(templates),
             vuln_count=0,
             severity_counts=self._scan_runtime_severity_counts,
@@ -6039,6 +6439,7 @@ class MainWindow(QMainWindow):
         self.current_scan_targets = targets
         self.current_scan_templates = templates
         self.current_scan_config = scan_config
+        self._begin_result_stream(targets, templates, scan_config)
 
         from core.task_queue_manager import get_task_queue_manager, TaskStatus
         import uuid
@@ -6046,7 +6447,7 @@ class MainWindow(QMainWindow):
         queue = get_task_queue_manager()
         queue.register_external_task(
             task_id=self.current_task_id,
-            name=tr("task.scan_task_name", targets=len(targets), pocs=len(templates)),
+            name=tr("task.scan_task_name", targets=count_targets(targets), pocs=len(templates)),
             targets=targets,
             templates=templates,
             status=TaskStatus.RUNNING
@@ -6055,11 +6456,19 @@ class MainWindow(QMainWindow):
         limit = scan_config.get("rate_limit", 150)
         bulk = scan_config.get("bulk_size", 25)
 
-        self.scan_thread = NucleiScanThread(targets, templates, limit, bulk, custom_args, use_native_scanner=use_native, oast_config=scan_config)
+        self.scan_thread = NucleiScanThread(targets, templates, limit, bulk, custom_args, use_native_scanner=use_native, oast_config=scan_config,
+                                            trace_log=scan_config.get("trace_log", False))
         self.scan_thread.log_signal.connect(self.append_log)
         self.scan_thread.result_signal.connect(self.add_scan_result)
         self.scan_thread.finished_signal.connect(self.scan_finished)
         self.scan_thread.progress_signal.connect(self.update_progress)
+        self.scan_thread.stats_signal.connect(self._on_scan_stats)
+        self.scan_thread.stats_signal.connect(lambda sample, task_id=self.current_task_id: self._on_governor_stats(task_id, sample))
+        scan_thread = self.scan_thread
+        self._reset_rate_governor()
+        # 队列中仍有任务在运行时，直接扫描沿用当前速率系数
+        scan_thread.set_rate_factor(self._rate_governor.factor)
+        self._start_scan_profiler(lambda: getattr(scan_thread.process, 'pid', None))
         self.scan_thread.start()
 
     def update_progress(self, current, total, description):
@@ -6160,6 +6569,8 @@ class MainWindow(QMainWindow):
         self.result_table.setRowHeight(row, scaled(50))
 
         self.scan_results_data.append(result)
+        if self._result_stream is not None:
+            self._result_stream.add(result)
         self._scan_runtime_vuln_count += 1
         severity_key = str(severity).lower()
         if severity_key in self._scan_runtime_severity_counts:
@@ -6221,6 +6632,13 @@ Description: {description}"""
         # 刷新任务列表
         self._refresh_task_list()
 
+        # 边搜边扫的任务由队列自动启动，主界面空闲时绑定以实时显示结果
+        feeder = getattr(self, 'fofa_pipeline_feeder', None)
+        if (feeder and feeder.owns(task_id) and status_value == TaskStatus.RUNNING.value
+                and not self.btn_stop.isEnabled()):
+            self._bind_running_task_to_ui(task_id)
+            return
+
         # 如果是当前运行的任务
         if hasattr(self, 'current_task_id') and self.current_task_id == task_id:
             # 如果任务完成、取消或失败，同步 UI 状态
@@ -6246,11 +6664,14 @@ Description: {description}"""
                 duration = (task.completed_at - task.started_at).total_seconds()
             
             # 保存到扫描历史
-            self._save_scan_history("completed", duration, task.result_count, task_results=task.results)
+            self._save_scan_history("completed", duration, task.result_count, task_results=task.results,
+                                    telemetry=getattr(task, 'telemetry', None),
+                                    stats_series=getattr(task, 'stats_series', None))
             
             self.statusBar().showMessage(tr("task.completed_msg", name=task.name, count=task.vuln_count), 5000)
 
-    def _save_scan_history(self, status, duration, result_count, task_results=None):
+    def _save_scan_history(self, status, duration, result_count, task_results=None, telemetry=None,
+                           stats_series=None):
         """保存扫描历史记录到仪表盘数据库"""
         # 修复：使用 ScanHistory 类（与仪表盘一致），而非 HistoryManager
         from core.scan_history import get_scan_history
@@ -6286,37 +6707,125 @@ Description: {description}"""
                 if not templates and task.templates:
                     templates = task.templates
 
-        target_count = len(targets) if targets else 0
+        target_count = count_targets(targets)
         poc_count = len(templates) if templates else 0
         
+        scan_id = None
         try:
             history_mgr = get_scan_history()
-            
-            # 添加扫描记录
-            scan_id = history_mgr.add_scan_record(
-                target_count=target_count,
-                poc_count=poc_count,
-                vuln_count=result_count,
-                duration=duration,
-                targets=targets,
-                pocs=templates,
-                config=config,
-                status=status
-            )
-            
-            # 保存每个漏洞结果详情
-            for result in results_to_save:
-                history_mgr.add_vuln_result(scan_id, result)
+
+            # 当前扫描的结果已流式写入，只需结束记录；后台任务的结果一次性批量写入
+            if task_results is None:
+                scan_id = self._finish_result_stream(status, duration, result_count, target_count, poc_count,
+                                                     self._stats_series_payload(stats_series))
+            if scan_id is None:
+                scan_id = history_mgr.add_scan_record(
+                    target_count=target_count,
+                    poc_count=poc_count,
+                    vuln_count=result_count,
+                    duration=duration,
+                    targets=targets,
+                    pocs=templates,
+                    config=config,
+                    status=status,
+                    stats_series=self._stats_series_payload(stats_series)
+                )
+                self._write_results_async(history_mgr, scan_id, results_to_save)
                 
             print(f"[ScanHistory] Saved scan record (ID: {scan_id}, status: {status}, vulns: {result_count})")
             
         except Exception as e:
             print(f"Save scan history failed: {e}")
+
+        self._record_poc_usage(templates, results_to_save, target_count, scan_id, telemetry)
             
         # 刷新仪表盘
         if hasattr(self, 'refresh_dashboard'):
             self.refresh_dashboard()
     
+    def _begin_result_stream(self, targets, pocs, config):
+        """扫描开始时创建 running 记录并打开流式写入器"""
+        from core.scan_history import get_scan_history
+        self._finish_result_stream("interrupted", 0, 0)
+        try:
+            history = get_scan_history()
+            scan_id = history.begin_scan_record(list(targets or []), list(pocs or []), config or {})
+            self._result_stream = history.open_result_stream(scan_id)
+        except Exception as e:
+            self._result_stream = None
+            self.append_log(f"[ScanHistory] Open result stream failed: {e}")
+
+    def _finish_result_stream(self, status, duration, result_count, target_count=None, poc_count=None,
+                              stats_series=None):
+        """结束流式写入并返回记录 ID（没有打开的流时返回 None）；
+        剩余结果落库与记录更新在写入线程完成，完成后经 result_stream_finished 信号刷新界面"""
+        stream = self._result_stream
+        if stream is None:
+            return None
+        self._result_stream = None
+        stream.finish(on_finished=self.result_stream_finished.emit, vuln_count=result_count, duration=duration,
+                      status=status, target_count=target_count, poc_count=poc_count, stats_series=stats_series)
+        self._track_result_writer(stream)
+        return stream.scan_id
+
+    def _write_results_async(self, history, scan_id, results):
+        """没有流式写入的结果（后台任务、流不可用）同样交给写入线程，不在 GUI 线程中批量落库"""
+        self._track_result_writer(history.write_results_async(
+            scan_id, results, on_finished=self.result_stream_finished.emit))
+
+    def _track_result_writer(self, writer):
+        self._result_writers = [w for w in self._result_writers if w.is_alive()]
+        self._result_writers.append(writer)
+
+    def _on_result_stream_finished(self, scan_id):
+        """流式记录已完整落库，刷新仪表盘"""
+        if hasattr(self, 'refresh_dashboard'):
+            self.refresh_dashboard()
+
+    def _stats_series_payload(self, series):
+        """将 StatsSeries 转为可保存的字典，没有采样时返回 None"""
+        if series is None or not getattr(series, 'samples', None):
+            return None
+        return series.to_dict()
+
+    def _record_poc_usage(self, templates, results, target_count, scan_id=None, telemetry=None):
+        """记录每个 POC 的使用次数、命中数及遥测耗时，供模板调度按期望价值排序"""
+        if not templates:
+            return
+
+        from core.poc_stats_manager import get_poc_stats_manager
+
+        path_to_id = {poc.get("path"): poc.get("id") for poc in getattr(self, "all_poc_data", []) or []}
+        hits = {}
+        for result in results or []:
+            key = result.get("template-path") or result.get("template-id")
+            if key:
+                hits[key] = hits.get(key, 0) + 1
+
+        poc_stats = []
+        for path in templates:
+            poc_id = path_to_id.get(path) or os.path.splitext(os.path.basename(path))[0]
+            stat = {
+                "poc_id": poc_id,
+                "poc_path": path,
+                "vuln_found": hits.get(path, 0) or hits.get(poc_id, 0),
+                "target_count": target_count,
+                "scan_id": scan_id,
+            }
+            timing = telemetry.lookup_template(path, poc_id) if telemetry else None
+            # nuclei 模式只有请求数（需开启 trace 日志），原生模式另有实测耗时；
+            # 只有命中记录、请求数为 0 的遥测说明不了成本，不计入
+            if timing and (timing["requests"] > 0 or timing["runtime_ms"] is not None):
+                stat["requests"] = timing["requests"]
+                if timing["runtime_ms"] is not None:
+                    stat["runtime_ms"] = timing["runtime_ms"]
+            poc_stats.append(stat)
+
+        try:
+            get_poc_stats_manager().record_batch_usage(poc_stats)
+        except Exception as e:
+            logger.error(f"Record POC usage failed: {e}")
+
     def _show_scan_result_detail(self, result):
         """显示扫描结果详情 - FORTRESS 风格"""
         import json
@@ -6461,9 +6970,13 @@ Description: {description}"""
                 self.scan_thread.finished_signal.disconnect(self.scan_finished)
             except:
                 pass
+            try:
+                self.scan_thread.stats_signal.disconnect(self._on_scan_stats)
+            except:
+                pass
             
             # 3. 立即更新 UI 状态（不等待线程结束）
-            self._reset_scan_ui_after_stop()
+            self._reset_scan_ui_after_stop(self.scan_thread)
             return
         
         # 情况2: 任务列表扫描（通过 TaskQueueManager）
@@ -6480,7 +6993,7 @@ Description: {description}"""
         # 没有找到正在运行的扫描
         self.append_log("[!] No running scan task")
     
-    def _reset_scan_ui_after_stop(self):
+    def _reset_scan_ui_after_stop(self, scan_thread=None):
         """停止扫描后重置 UI 状态"""
         self.btn_start.setEnabled(True)
         self.btn_start.setText(tr("scan.start_scan"))
@@ -6488,6 +7001,8 @@ Description: {description}"""
         self.btn_pause.setEnabled(False)
         self.btn_pause.setText(tr("task.pause"))
         self.progress_bar.hide()
+        self._stop_scan_profiler()
+        self._set_perf_scan_active(False)
         
         # 计算耗时
         import time
@@ -6496,7 +7011,9 @@ Description: {description}"""
         result_count = self.result_table.rowCount()
         
         # 保存扫描历史（标记为用户停止）
-        self._save_scan_history("stopped", duration, result_count)
+        self._save_scan_history("stopped", duration, result_count,
+                                telemetry=getattr(scan_thread, 'telemetry', None),
+                                stats_series=getattr(scan_thread, 'stats_series', None))
         
         # 更新任务队列中的状态为已取消
         if hasattr(self, 'current_task_id') and self.current_task_id:
@@ -6813,6 +7330,9 @@ def install_exception_hook():
 
 if __name__ == "__main__":
     import sys
+    import multiprocessing
+    # 打包后的程序中，导出等功能启动的子进程需要在这里接管
+    multiprocessing.freeze_support()
     from PyQt5.QtWidgets import QApplication, QDesktopWidget
     from PyQt5.QtGui import QFont
     from PyQt5.QtCore import Qt
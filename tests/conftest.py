@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# 测试不读写用户数据目录
+os.environ.setdefault("NUCLEI_GUI_DATA_DIR", tempfile.mkdtemp(prefix="nuclei_gui_test_"))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
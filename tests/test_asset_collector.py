@@ -0,0 +1,65 @@
+import time
+
+from core.asset_collector import AssetCollector
+from core.search_engine_base import SearchEngineBase, SearchResult
+
+
+class PagedEngine(SearchEngineBase):
+    """按页返回 10.0.0.x 目标；short_pages 中的页在服务端去重后只返回 7 条"""
+
+    name = "paged"
+    rate_limit = 0
+
+    def __init__(self, total, report_total=True, short_pages=(), delays=None):
+        super().__init__("key")
+        self.total = total
+        self.report_total = report_total
+        self.short_pages = set(short_pages)
+        self.delays = delays or {}
+        self.pages = []
+
+    def search(self, query, page=1, page_size=100):
+        self.pages.append(page)
+        time.sleep(self.delays.get(page, 0))
+        start = (page - 1) * page_size
+        positions = range(start, min(start + page_size, self.total))
+        if page in self.short_pages:
+            positions = positions[:7]
+        return {
+            'success': True,
+            'total': self.total if self.report_total else None,
+            'results': [SearchResult(ip=f"10.0.0.{i}") for i in positions],
+        }
+
+    def test_connection(self):
+        return {'success': True}
+
+
+def _collect(engine, **kwargs):
+    collector = AssetCollector({engine.name: engine}, "q", page_size=10, use_cache=False, **kwargs)
+    return collector, collector.collect()
+
+
+def test_short_middle_pages_do_not_end_collection_when_total_known():
+    engine = PagedEngine(100, short_pages=(3, 5))
+    collector, assets = _collect(engine, max_results=0)
+    assert sorted(engine.pages) == list(range(1, 11))
+    assert len(assets) == 100 - 2 * 3
+    assert collector.stats["paged"].pages == 10
+
+
+def test_short_page_ends_collection_when_total_unknown():
+    # 单线程逐页请求，第 4 页为短页后取消其余尚未开始的页（最多已有一页在途）
+    engine = PagedEngine(35, report_total=False)
+    collector = AssetCollector({engine.name: engine}, "q", page_size=10, max_results=100, workers=1,
+                               use_cache=False)
+    assets = collector.collect()
+    assert len(assets) == 35
+    assert max(engine.pages) <= 5
+
+
+def test_max_results_keeps_first_positions_regardless_of_completion_order():
+    # 第 2 页最慢完成，截断仍保留前 25 个位置的结果
+    engine = PagedEngine(100, delays={2: 0.3})
+    _, assets = _collect(engine, max_results=25)
+    assert sorted(int(a.target.rsplit(".", 1)[1]) for a in assets) == list(range(25))
@@ -0,0 +1,73 @@
+import sqlite3
+import threading
+from collections import Counter
+
+import pytest
+
+from core.db import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(tmp_path / "test.db")
+    database.transaction(lambda conn: conn.execute(
+        "CREATE TABLE items (name TEXT NOT NULL, code INTEGER UNIQUE)"))
+    yield database
+    database.close()
+
+
+def _queue_group(db, jobs):
+    """先用一个阻塞任务占住写线程，使 jobs 在队列中排成同一组提交"""
+    started, release = threading.Event(), threading.Event()
+
+    def _block(conn):
+        started.set()
+        release.wait(5)
+
+    blocker = db.transaction(_block, wait=False)
+    started.wait(5)
+    futures = [db.transaction(job, wait=False) for job in jobs]
+    release.set()
+    blocker.result(5)
+    return futures
+
+
+def test_failing_job_does_not_rerun_or_drop_its_group(db):
+    runs = Counter()
+
+    def insert(name, code):
+        def _job(conn):
+            runs[name] += 1
+            conn.execute("INSERT INTO items (name, code) VALUES (?, ?)", (name, code))
+            return name
+        return _job
+
+    jobs = [insert("a", 1), insert("b", 2), insert("dup", 1), insert("c", 3), insert("d", 4)]
+    futures = _queue_group(db, jobs)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[2].result(5)
+    assert [f.result(5) for i, f in enumerate(futures) if i != 2] == ["a", "b", "c", "d"]
+
+    assert runs["dup"] == 1
+    assert runs["c"] == 1 and runs["d"] == 1
+    rows = db.query("SELECT name FROM items ORDER BY code")
+    assert [row["name"] for row in rows] == ["a", "b", "c", "d"]
+
+
+def test_second_failure_only_rolls_back_that_job(db):
+    def insert(name, code, fail=False):
+        def _job(conn):
+            conn.execute("INSERT INTO items (name, code) VALUES (?, ?)", (name, code))
+            if fail:
+                raise ValueError(name)
+        return _job
+
+    futures = _queue_group(db, [insert("a", 1), insert("x", 2, fail=True), insert("b", 3),
+                                insert("y", 4, fail=True), insert("c", 5)])
+
+    errors = [type(f.exception(5)).__name__ if f.exception(5) else None for f in futures]
+    assert errors == [None, "ValueError", None, "ValueError", None]
+    rows = db.query("SELECT name FROM items ORDER BY code")
+    assert [row["name"] for row in rows] == ["a", "b", "c"]
+
@@ -0,0 +1,75 @@
+import json
+import os
+import stat
+import sys
+import threading
+
+import pytest
+from PyQt5.QtCore import Qt
+
+from core import nuclei_runner
+from core.nuclei_runner import NucleiScanThread
+
+FAKE_NUCLEI = '''#!{python}
+import json, os, signal, sys, time
+with open({calls!r}, "a") as f:
+    f.write(json.dumps(sys.argv[1:]) + "\\n")
+resume = os.path.join({tmp!r}, "resume-%d.cfg" % os.getpid())
+def on_term(*_):
+    open(resume, "w").close()
+    print("[INF] Creating resume file: " + resume, flush=True)
+    sys.exit(0)
+signal.signal(signal.SIGTERM, on_term)
+if "-resume" in sys.argv:
+    print(json.dumps({{"template-id": "t", "matched-at": "http://a", "host": "http://a"}}), flush=True)
+    sys.exit(0)
+for _ in range(100):
+    print(json.dumps({{"percent": "10", "requests": "1", "total": "10", "rps": "1", "errors": "0"}}), flush=True)
+    time.sleep(0.05)
+'''
+
+
+@pytest.mark.skipif(os.name == "nt", reason="needs an executable script and SIGTERM")
+def test_rate_change_restarts_nuclei_with_lower_rate_and_resumes(tmp_path, monkeypatch):
+    calls = tmp_path / "calls.jsonl"
+    script = tmp_path / "nuclei"
+    script.write_text(FAKE_NUCLEI.format(python=sys.executable, calls=str(calls), tmp=str(tmp_path)))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    template = tmp_path / "t.yaml"
+    template.write_text("id: t\ninfo:\n  name: t\n  severity: info\nhttp:\n  - method: GET\n    path: ['{{BaseURL}}']\n")
+    monkeypatch.setattr(nuclei_runner, "get_nuclei_path", lambda: str(script))
+    monkeypatch.setattr(NucleiScanThread, "RATE_RESTART_INTERVAL", 0)
+
+    scan = NucleiScanThread(["http://a"], [str(template)], rate_limit=100, bulk_size=20)
+    results = []
+    scan.result_signal.connect(results.append, Qt.DirectConnection)
+    running = threading.Event()
+    scan.stats_signal.connect(lambda _sample: running.set(), Qt.DirectConnection)
+    worker = threading.Thread(target=scan.run_single_mode, args=(scan.targets,))
+    worker.start()
+    assert running.wait(10)
+    scan.set_rate_factor(0.5)
+    worker.join(20)
+
+    assert not worker.is_alive()
+    argv = [json.loads(line) for line in calls.read_text().splitlines()]
+    assert len(argv) == 2
+    first, second = argv
+    assert first[first.index("-rl") + 1] == "100"
+    assert second[second.index("-rl") + 1] == "50"
+    assert second[second.index("-bs") + 1] == "10"
+    assert second[second.index("-c") + 1] == "12"
+    resume_file = second[second.index("-resume") + 1]
+    assert "-resume" not in first
+    # resume 文件在扫描结束后清理
+    assert not os.path.exists(resume_file)
+    assert len(results) == 1
+
+
+def test_custom_rate_args_are_scaled_instead_of_duplicated():
+    scan = NucleiScanThread(["http://a"], [], rate_limit=100, bulk_size=20,
+                            custom_args=["-c", "50", "-timeout", "5", "-rate-limit", "40"])
+    base, rest = scan._split_rate_args()
+
+    assert rest == ["-timeout", "5"]
+    assert scan._scaled_rate_args(base, 0.5) == ["-rl", "20", "-bs", "10", "-c", "25"]
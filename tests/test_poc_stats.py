@@ -0,0 +1,23 @@
+from core.poc_stats_manager import POCStatsManager
+from core.template_scheduler import estimate_cost_ms
+
+
+def _stat(poc_id, **extra):
+    return {'poc_id': poc_id, 'poc_path': f"/t/{poc_id}.yaml", 'vuln_found': 1, 'target_count': 1,
+            'scan_id': 1, **extra}
+
+
+def test_runs_without_requests_are_not_timed(tmp_path):
+    manager = POCStatsManager(str(tmp_path / "poc_stats.db"))
+    manager.record_batch_usage([
+        _stat("matched-only", requests=0),
+        _stat("traced", requests=4),
+        _stat("native", requests=0, runtime_ms=120.0),
+    ])
+    stats = manager.get_stats_by_paths(["/t/matched-only.yaml", "/t/traced.yaml", "/t/native.yaml"])
+
+    assert stats["/t/matched-only.yaml"]['timed_runs'] == 0
+    assert stats["/t/traced.yaml"]['timed_runs'] == 1
+    assert stats["/t/native.yaml"]['timed_runs'] == 1
+    # 没有成本数据时使用默认成本，而不是 1ms
+    assert estimate_cost_ms(stats["/t/matched-only.yaml"], default_cost=200.0) == 200.0
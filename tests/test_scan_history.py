@@ -0,0 +1,50 @@
+import json
+import sqlite3
+import threading
+
+from core.scan_history import ScanHistory
+
+
+def _result(i):
+    return {'template-id': f"t{i % 7}", 'host': 'http://a', 'matched-at': f"http://a/{i}",
+            'info': {'name': f"vuln {i}", 'severity': 'low'}}
+
+
+def test_legacy_results_migrate_in_background(tmp_path, monkeypatch):
+    path = str(tmp_path / "scan_history.db")
+    history = ScanHistory(path)
+    assert history.is_ready()
+    scan_id = history.add_scan_record(1, 1, 1200, 1.0, ["http://a"], ["t"], {})
+    history.add_vuln_results(scan_id, [_result(i) for i in range(1200)])
+    history.close()
+
+    # 还原为旧版格式：明文 raw_json、未关联发现库
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE vuln_results SET raw_json = ?, raw_blob = NULL, finding_id = NULL",
+                 (json.dumps(_result(0)),))
+    conn.execute("DELETE FROM findings")
+    conn.commit()
+    conn.close()
+
+    # 迁移线程被挡住时构造照常返回，记录处于未就绪状态
+    release = threading.Event()
+    run_migration = ScanHistory._run_data_migration
+
+    def _held(self):
+        release.wait(5)
+        run_migration(self)
+
+    monkeypatch.setattr(ScanHistory, "_run_data_migration", _held)
+    history = ScanHistory(path)
+    try:
+        assert not history.is_ready()
+        assert history.migration_progress() == (0, 2400)
+    finally:
+        release.set()
+
+    assert history.wait_ready(30)
+    assert history.migration_progress() == (2400, 2400)
+    unlinked = history._db.query_one("SELECT COUNT(*) FROM vuln_results WHERE finding_id IS NULL")[0]
+    assert unlinked == 0
+    assert len(list(history.iter_scan_vulns(scan_id))) == 1200
+    history.close()
@@ -0,0 +1,65 @@
+import pytest
+
+import core.asset_collector as asset_collector
+from core.asset_collector import AssetCollector
+from core.search_cache import SearchCache
+from core.search_engine_base import SearchEngineBase, SearchResult
+
+
+class FakeEngine(SearchEngineBase):
+    """500 条结果、每页 10 条，第 3 页有一行没有可扫描的目标"""
+
+    name = "fake"
+    rate_limit = 0
+    total = 500
+
+    def __init__(self):
+        super().__init__("key")
+        self.calls = 0
+
+    def search(self, query, page=1, page_size=100):
+        self.calls += 1
+        start = (page - 1) * page_size
+        results = []
+        for i in range(start, min(start + page_size, self.total)):
+            if i == 2 * page_size + 4:
+                results.append(SearchResult(title="no target"))
+            else:
+                results.append(SearchResult(ip=f"10.0.{i // 256}.{i % 256}", port=8080))
+        return {'success': True, 'total': self.total, 'results': results}
+
+    def test_connection(self):
+        return {'success': True}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = SearchCache(db_path=str(tmp_path / "search_cache.db"))
+    monkeypatch.setattr(asset_collector, "get_search_cache", lambda: cache)
+    return cache
+
+
+def _collect(engine):
+    return AssetCollector({engine.name: engine}, "q", page_size=10, max_results=0).collect()
+
+
+def test_cached_pages_keep_rows_without_target(cache):
+    engine = FakeEngine()
+    assert len(_collect(engine)) == 499
+    assert engine.calls == 50
+
+    for _ in range(2):
+        engine.calls = 0
+        assert len(_collect(engine)) == 499
+        assert engine.calls == 0
+
+
+def test_cached_page_has_original_length(cache):
+    engine = FakeEngine()
+    result = engine.search("q", 3, 10)
+    cache.put(engine.name, "q", 3, 10, result)
+
+    cached = cache.get(engine.name, "q", 3, 10)
+    assert cached is not None
+    assert len(cached['results']) == 10
+    assert [r.get_target_url() for r in cached['results']] == [r.get_target_url() for r in result['results']]
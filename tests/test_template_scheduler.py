@@ -0,0 +1,32 @@
+from core.poc_stats_manager import POCStatsManager
+from core.template_scheduler import estimate_hit_rate, order_templates_by_value
+
+
+def _run(manager, hits_by_poc):
+    manager.record_batch_usage([
+        {'poc_id': poc_id, 'poc_path': f"/t/{poc_id}.yaml", 'vuln_found': hits, 'target_count': 50,
+         'scan_id': 1}
+        for poc_id, hits in hits_by_poc.items()
+    ])
+
+
+def test_proven_template_runs_before_unknown_ones(tmp_path):
+    manager = POCStatsManager(str(tmp_path / "poc_stats.db"))
+    # 20 次扫描中 8 次命中；另有一个从未命中的模板
+    for scan in range(20):
+        _run(manager, {"proven": 3 if scan < 8 else 0, "dud": 0})
+
+    order = order_templates_by_value(["/t/new-a.yaml", "/t/dud.yaml", "/t/proven.yaml", "/t/new-b.yaml"],
+                                     manager)
+    assert order == ["/t/proven.yaml", "/t/new-a.yaml", "/t/new-b.yaml", "/t/dud.yaml"]
+
+
+def test_hit_rate_counts_scans_not_findings(tmp_path):
+    manager = POCStatsManager(str(tmp_path / "poc_stats.db"))
+    _run(manager, {"noisy": 40})
+    _run(manager, {"noisy": 0})
+
+    stats = manager.get_stats_by_paths(["/t/noisy.yaml"])["/t/noisy.yaml"]
+    assert stats['hit_scans'] == 1
+    assert estimate_hit_rate(stats) == 1 / 4
+    assert estimate_hit_rate(None, prior_rate=0.1) == 0.1
@@ -0,0 +1,41 @@
+import os
+import stat
+import sys
+import threading
+import time
+
+import pytest
+
+from core.template_validator import TemplateValidationCache, validate_template, validate_with_nuclei
+
+
+@pytest.fixture
+def slow_nuclei(tmp_path):
+    """一个长时间不退出的假 nuclei，模拟卡住的 nuclei -validate"""
+    script = tmp_path / "nuclei"
+    script.write_text(f"#!{sys.executable}\nimport time\ntime.sleep(60)\n")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="needs an executable script")
+def test_stop_kills_running_nuclei_validate(slow_nuclei, tmp_path):
+    stop = threading.Event()
+    threading.Timer(0.3, stop.set).start()
+
+    started = time.monotonic()
+    result = validate_with_nuclei(tmp_path / "t.yaml", slow_nuclei, stop_check=stop.is_set)
+
+    assert time.monotonic() - started < 5
+    assert result["unavailable"]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="needs an executable script")
+def test_stopped_validation_is_not_cached(slow_nuclei, tmp_path):
+    template = tmp_path / "t.yaml"
+    template.write_text("id: t\ninfo:\n  name: t\n  severity: info\n")
+    cache = TemplateValidationCache(tmp_path / "cache.json")
+
+    validate_template(template, cache, slow_nuclei, nuclei_all=True, stop_check=lambda: True)
+
+    assert cache.get(cache.content_hash(template)) is None
@@ -0,0 +1,30 @@
+import json
+
+from core.scan_history import ScanHistory
+from core.vuln_analytics import VulnAnalytics
+
+
+def test_legacy_json_is_imported_into_a_synthetic_scan(tmp_path):
+    records = [
+        {'template_id': f"t{i % 3}", 'name': f"vuln {i}", 'severity': 'high' if i % 2 else 'low',
+         'host': f"http://h{i % 2}", 'matched_at': f"http://h{i % 2}/{i}", 'timestamp': f"2024-05-0{i + 1}T10:00:00"}
+        for i in range(6)
+    ]
+    (tmp_path / "vuln_history.json").write_text(json.dumps({'records': records}), encoding='utf-8')
+    history = ScanHistory(str(tmp_path / "scan_history.db"))
+    try:
+        analytics = VulnAnalytics(data_dir=str(tmp_path), history=history)
+        assert analytics.wait_imported(10)
+
+        orphans = history._db.query_one("SELECT COUNT(*) FROM vuln_results WHERE scan_id IS NULL")[0]
+        assert orphans == 0
+        scans = history.get_recent_scans(10)
+        assert len(scans) == 1
+        scan = history.get_scan_record(scans[0]['id'])
+        assert scan['status'] == 'imported'
+        assert scan['vuln_count'] == 6
+        assert len(history.get_scan_vulns(scan['id'])) == 6
+        assert analytics.get_summary_stats()['total_vulns'] == 6
+        assert not (tmp_path / "vuln_history.json").exists()
+    finally:
+        history.close()